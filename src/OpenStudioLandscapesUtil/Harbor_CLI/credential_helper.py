@@ -0,0 +1,296 @@
+"""
+Docker credential helper (``docker-credential-openstudiolandscapes``)
+serving robot account credentials from a local store, so that render
+nodes neither run ``docker login`` at startup nor keep base64 encoded
+passwords in ``~/.docker/config.json``.
+
+Configure Docker to use it for the Harbor host::
+
+    {
+        "credHelpers": {
+            "harbor.example.com": "openstudiolandscapes"
+        }
+    }
+
+and provision the robot account once per node::
+
+    echo '{"ServerURL": "harbor.example.com", "Username": "robot$render", "Secret": "..."}' \\
+        | docker-credential-openstudiolandscapes store
+
+Protocol: https://github.com/docker/docker-credential-helpers
+
+``get`` runs on every pull, so only the standard library is imported
+at startup. Checking the credentials against Harbor's token service
+and refreshing the registry tokens cached by the CLI (see
+``harbor_cli.RegistryTokenCache``) happens in a detached background
+process at most every ``CHECK_INTERVAL`` seconds.
+"""
+
+import contextlib
+import fcntl
+import json
+import os
+import pathlib
+import sys
+import time
+import typing
+
+# Seconds between background checks of the stored credentials
+CHECK_INTERVAL: float = 900.0
+
+# Seconds a started background check is assumed to be running
+REFRESH_TIMEOUT: float = 60.0
+
+# Docker treats this message on stdout as "no credentials"
+CREDENTIALS_NOT_FOUND = "credentials not found in native keychain"
+
+
+class CredentialsNotFound(Exception):
+    pass
+
+
+def store_file() -> pathlib.Path:
+    """`credentials.json` in OPENSTUDIOLANDSCAPES__HARBOR_CACHE_DIR
+    (the same directory as the CLI's cached sessions and tokens)."""
+
+    cache_dir = os.environ.get("OPENSTUDIOLANDSCAPES__HARBOR_CACHE_DIR", "~/.cache/openstudiolandscapes-harbor")
+
+    return pathlib.Path(cache_dir).expanduser().joinpath("credentials.json")
+
+
+def server_key(
+        server_url: str,
+) -> str:
+    """`https://harbor.example.com/v2/` → `harbor.example.com`"""
+
+    return server_url.strip().split("://", 1)[-1].split("/", 1)[0]
+
+
+@contextlib.contextmanager
+def _locked(
+        name: str,
+        blocking: bool = True,
+) -> typing.Iterator[bool]:
+    """Whether the (inter process) lock `name` was acquired."""
+
+    lock_file = store_file().with_suffix(f".{name}.lock")
+    lock_file.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+    fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o600)
+
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def _read() -> typing.Dict[str, typing.Dict]:
+
+    try:
+        return json.loads(store_file().read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(
+        entries: typing.Dict[str, typing.Dict],
+) -> None:
+
+    path = store_file()
+    path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as fw:
+        json.dump(entries, fw)
+
+    os.replace(tmp, path)
+
+
+def _update(
+        key: str,
+        **values,
+) -> None:
+
+    with _locked(name="store"):
+        entries = _read()
+        if key in entries:
+            entries[key].update(values)
+            _write(entries)
+
+
+def get(
+        server_url: str,
+) -> typing.Dict[str, str]:
+    """The credentials of `server_url`, checked in the background
+    if the last check is older than CHECK_INTERVAL."""
+
+    entry: typing.Dict | None = _read().get(server_key(server_url))
+
+    if entry is None or entry.get("invalid"):
+        raise CredentialsNotFound(server_url)
+
+    if entry.get("checked_at", 0) + CHECK_INTERVAL <= time.time():
+        _refresh_background(server_url=entry["ServerURL"])
+
+    return {
+        "ServerURL": entry["ServerURL"],
+        "Username": entry["Username"],
+        "Secret": entry["Secret"],
+    }
+
+
+def store(
+        credentials: typing.Dict[str, str],
+) -> None:
+
+    with _locked(name="store"):
+        entries = _read()
+        entries[server_key(credentials["ServerURL"])] = {
+            "ServerURL": credentials["ServerURL"],
+            "Username": credentials["Username"],
+            "Secret": credentials["Secret"],
+            "checked_at": 0,
+        }
+        _write(entries)
+
+
+def erase(
+        server_url: str,
+) -> None:
+
+    with _locked(name="store"):
+        entries = _read()
+        if entries.pop(server_key(server_url), None) is not None:
+            _write(entries)
+
+
+def list_() -> typing.Dict[str, str]:
+
+    return {entry["ServerURL"]: entry["Username"] for entry in _read().values()}
+
+
+def _refresh_background(
+        server_url: str,
+) -> None:
+    """Run `refresh()` in a detached process, unless one was
+    started within REFRESH_TIMEOUT: stamped under the store lock,
+    so that concurrent `get`s (i.e. render nodes booting) start
+    a single one."""
+
+    key = server_key(server_url)
+    now = time.time()
+
+    with _locked(name="store"):
+        entries = _read()
+        entry: typing.Dict | None = entries.get(key)
+        if entry is None or entry.get("refresh_started_at", 0) + REFRESH_TIMEOUT > now:
+            return
+        entry["refresh_started_at"] = now
+        _write(entries)
+
+    import subprocess
+
+    subprocess.Popen(
+        [sys.executable, "-m", "OpenStudioLandscapesUtil.Harbor_CLI.credential_helper", "refresh", server_url],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def refresh(
+        server_url: str,
+) -> None:
+    """Check the credentials of `server_url` against Harbor's token
+    service (flagging them invalid if rejected, so that `get` reports
+    them missing instead of Docker failing with a 401 later on) and
+    refresh the registry tokens of the robot account cached by the
+    CLI that are due."""
+
+    with _locked(name="refresh", blocking=False) as locked:
+        if not locked:
+            return
+
+        entry: typing.Dict | None = _read().get(server_key(server_url))
+        if entry is None:
+            return
+
+        # the CLI with its dependencies, only in the background
+        import requests
+        from OpenStudioLandscapesUtil.Harbor_CLI import harbor_cli
+
+        scheme = "http" if entry["ServerURL"].startswith("http://") else "https"
+        host, _, port = server_key(entry["ServerURL"]).partition(":")
+
+        with harbor_cli.HarborClient(
+                host=host,
+                port=int(port or (80 if scheme == "http" else 443)),
+                user=entry["Username"],
+                password=entry["Secret"],
+                scheme=scheme,
+        ) as client:
+            try:
+                client.registry_token_fetch(scopes=[])
+                client.registry_tokens_refresh()
+            except harbor_cli.HarborAuthError:
+                _update(key=server_key(server_url), invalid=True, checked_at=time.time())
+                return
+            except (harbor_cli.HarborCLIError, requests.RequestException):
+                # unreachable, try again with the next check
+                _update(key=server_key(server_url), checked_at=time.time())
+                return
+
+        _update(key=server_key(server_url), invalid=False, checked_at=time.time())
+
+
+def main(
+        args: typing.List[str],
+) -> int:
+    """`get`, `store`, `erase`, `list` (reading stdin as Docker
+    hands it over) and `refresh SERVER_URL`."""
+
+    if not args or args[0] not in ["get", "store", "erase", "list", "refresh"]:
+        print("Usage: docker-credential-openstudiolandscapes <get|store|erase|list>", file=sys.stderr)
+        return 1
+
+    action = args[0]
+
+    try:
+        if action == "get":
+            print(json.dumps(get(server_url=sys.stdin.read().strip())))
+        elif action == "store":
+            store(credentials=json.loads(sys.stdin.read()))
+        elif action == "erase":
+            erase(server_url=sys.stdin.read().strip())
+        elif action == "list":
+            print(json.dumps(list_()))
+        elif action == "refresh":
+            refresh(server_url=args[1])
+    except CredentialsNotFound:
+        print(CREDENTIALS_NOT_FOUND)
+        return 1
+    except (IndexError, KeyError, ValueError) as e:
+        print(f"Invalid input: {e}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+def run():
+    """Entry point of `docker-credential-openstudiolandscapes`."""
+
+    sys.exit(main(sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    run()
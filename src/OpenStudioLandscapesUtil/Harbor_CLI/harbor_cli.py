@@ -21,14 +21,33 @@ References:
 """
 import argparse
 import base64
+import collections
 import configparser
+import contextlib
+import csv
+import datetime
+import email.utils
 import enum
+import fcntl
+import fnmatch
+import hashlib
+import io
+import itertools
+import json
+import math
 import os
 import pathlib
+import re
 import shutil
+import socket
 import subprocess
 import tarfile
+import tempfile
+import threading
+import time
 import typing
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from subprocess import CompletedProcess
 from typing import Union, Any, Dict
 
@@ -89,10 +108,14 @@ OPENSTUDIOLANDSCAPES__HARBOR_BIN_DIR: str = os.environ.get("OPENSTUDIOLANDSCAPES
 OPENSTUDIOLANDSCAPES__HARBOR_DATA_DIR: str = os.environ.get("OPENSTUDIOLANDSCAPES__HARBOR_DATA_DIR", "data")
 OPENSTUDIOLANDSCAPES__HARBOR_PREPARE: str = os.environ.get("OPENSTUDIOLANDSCAPES__HARBOR_PREPARE", "prepare")
 OPENSTUDIOLANDSCAPES__HARBOR_API_ENDPOINT: str = os.environ.get("OPENSTUDIOLANDSCAPES__HARBOR_API_ENDPOINT", "/api/v2.0")
+OPENSTUDIOLANDSCAPES__HARBOR_TOKEN: str = os.environ.get("OPENSTUDIOLANDSCAPES__HARBOR_TOKEN", "")
+OPENSTUDIOLANDSCAPES__HARBOR_CACHE_DIR: str = os.environ.get("OPENSTUDIOLANDSCAPES__HARBOR_CACHE_DIR", "~/.cache/openstudiolandscapes-harbor")
 
 # OPENSTUDIOLANDSCAPES__HARBOR_API_ENDPOINT: str = "http://{host}:{port}/api/v2.0"
 
 SYSTEMD_UNIT: pathlib.Path = pathlib.Path("/usr/lib/systemd/system/openstudiolandscapes-harbor.service")
+SYSTEMD_SLICE: pathlib.Path = pathlib.Path("/usr/lib/systemd/system/openstudiolandscapes-harbor.slice")
+SYSTEMD_WATCHDOG_UNIT: pathlib.Path = pathlib.Path("/usr/lib/systemd/system/openstudiolandscapes-harbor-watchdog.service")
 
 DOCKER_PROGRESS = [
     "auto",
@@ -102,6 +125,235 @@ DOCKER_PROGRESS = [
     "rawjson",
 ]
 
+COMPOSE_PROJECT_NAME: str = "openstudiolandscapes-harbor"
+
+# foreground: `docker compose up` attached, unit is active as soon as compose runs
+# wait:       `docker compose up --detach --wait`, unit is active once all
+#             containers report healthy
+START_MODES = [
+    "foreground",
+    "wait",
+]
+
+# down: `ExecStop` removes all containers and networks, every start recreates them
+# stop: `ExecStop` only stops the containers, the next start reuses them.
+#       Use `systemd reset` to remove them.
+STOP_MODES = [
+    "down",
+    "stop",
+]
+
+# restart: `ExecReload` restarts the whole stack at once
+# rolling: `ExecReload` restarts only the services whose configuration
+#          (`common/config/`) changed, one by one in dependency order,
+#          waiting for each to become healthy
+RELOAD_MODES = [
+    "restart",
+    "rolling",
+]
+
+# Subdirectories of `common/config/` (generated by `prepare`)
+# and the compose services reading them. `*` means all services.
+HARBOR_CONFIG_SERVICES: Dict[str, list[str]] = {
+    "core": ["core"],
+    "db": ["postgresql"],
+    "jobservice": ["jobservice"],
+    "log": ["log"],
+    "nginx": ["proxy"],
+    "portal": ["portal"],
+    "registry": ["registry"],
+    "registryctl": ["registryctl"],
+    "trivy-adapter": ["trivy-adapter"],
+    "shared": ["*"],
+}
+
+HARBOR_CONFIG_STATE: str = ".harbor-config-state.json"
+
+# Components reported by `/api/v2.0/health` and their compose services
+HARBOR_COMPONENT_SERVICES: Dict[str, str] = {
+    "core": "core",
+    "database": "postgresql",
+    "jobservice": "jobservice",
+    "portal": "portal",
+    "redis": "redis",
+    "registry": "registry",
+    "registryctl": "registryctl",
+    "trivy": "trivy-adapter",
+}
+
+# Recovery records of `watchdog()` (JSON lines)
+HARBOR_WATCHDOG_JOURNAL: str = ".harbor-watchdog.jsonl"
+
+# Picked up by `compose_cmd()` (and thus the systemd unit) if present
+COMPOSE_OVERRIDE: str = "docker-compose.override.yml"
+
+# Services of the docker-compose.yml generated by `prepare` (without Trivy)
+HARBOR_SERVICES: list[str] = [
+    "log",
+    "registry",
+    "registryctl",
+    "postgresql",
+    "core",
+    "portal",
+    "jobservice",
+    "redis",
+    "proxy",
+]
+
+# syslog is Harbor's default: all containers ship their logs
+# to the `log` container (tcp://localhost:1514)
+LOG_DRIVERS = [
+    "syslog",
+    "local",
+    "journald",
+    "json-file",
+]
+
+# Resource controls, rendered into
+#   - the `[Slice]` section of SYSTEMD_SLICE (the whole stack) and
+#   - per-service limits in COMPOSE_OVERRIDE.
+# All containers are placed into the slice via `cgroup_parent`, they
+# would otherwise end up in docker's own cgroup and not in the unit's.
+RESOURCE_PROFILES: Dict[str, Dict] = {
+    # Harbor next to other workloads: keep Trivy from
+    # starving registry and core.
+    "shared": {
+        "slice": {
+            "CPUWeight": 50,
+            "IOWeight": 50,
+            "MemoryHigh": "6G",
+            "MemoryMax": "8G",
+        },
+        "services": {
+            "registry": {"cpus": 2.0, "mem_limit": "2g", "pids_limit": 1024, "nofile": 65536},
+            "core": {"cpus": 2.0, "mem_limit": "1g", "pids_limit": 1024, "nofile": 65536},
+            "trivy-adapter": {"cpus": 1.0, "mem_limit": "2g", "pids_limit": 512, "nofile": 16384},
+        },
+    },
+    # Harbor on its own host.
+    "dedicated": {
+        "slice": {
+            "CPUWeight": 100,
+            "IOWeight": 100,
+            "MemoryHigh": "24G",
+            "MemoryMax": "28G",
+        },
+        "services": {
+            "registry": {"cpus": 8.0, "mem_limit": "8g", "pids_limit": 4096, "nofile": 1048576},
+            "core": {"cpus": 4.0, "mem_limit": "4g", "pids_limit": 4096, "nofile": 1048576},
+            "trivy-adapter": {"cpus": 2.0, "mem_limit": "4g", "pids_limit": 1024, "nofile": 65536},
+        },
+    },
+}
+
+
+# basic:   Basic auth on every request (Harbor verifies the password hash every time)
+# session: log in once (/c/login), reuse the session cookie and CSRF token
+# bearer:  `Authorization: Bearer <token>` (i.e. an OIDC ID token)
+AUTH_MODES = [
+    "basic",
+    "session",
+    "bearer",
+]
+
+# Harbor caps `page_size` of list endpoints at 100
+HARBOR_PAGE_SIZE_MAX: int = 100
+
+# usage:    used/hard, highest first
+# headroom: hard - used, lowest first
+# used:     highest first
+QUOTA_SORT_KEYS = [
+    "usage",
+    "headroom",
+    "used",
+]
+
+QUOTA_REPORT_FORMATS = [
+    "table",
+    "json",
+    "csv",
+]
+
+# Well-known upstream registries: (Harbor registry adapter type, endpoint URL).
+# Anything else is a `docker-registry` (any registry implementing the v2 API).
+REGISTRY_ENDPOINTS: Dict[str, tuple[str, str]] = {
+    "docker.io": ("docker-hub", "https://hub.docker.com"),
+    "hub.docker.com": ("docker-hub", "https://hub.docker.com"),
+    "registry-1.docker.io": ("docker-hub", "https://hub.docker.com"),
+    "ghcr.io": ("github-ghcr", "https://ghcr.io"),
+    "quay.io": ("quay", "https://quay.io"),
+    "gcr.io": ("google-gcr", "https://gcr.io"),
+}
+
+# Accept header for manifests (single platform and lists/indexes)
+MANIFEST_MEDIA_TYPES: list[str] = [
+    "application/vnd.oci.image.index.v1+json",
+    "application/vnd.docker.distribution.manifest.list.v2+json",
+    "application/vnd.oci.image.manifest.v1+json",
+    "application/vnd.docker.distribution.manifest.v2+json",
+]
+
+MANIFEST_INDEX_MEDIA_TYPES: list[str] = MANIFEST_MEDIA_TYPES[:2]
+
+# Media types of images built from legacy `docker save` tarballs
+# (uncompressed layers, their digests are the config's `diff_ids`)
+OCI_MANIFEST_MEDIA_TYPE = "application/vnd.oci.image.manifest.v1+json"
+OCI_CONFIG_MEDIA_TYPE = "application/vnd.oci.image.config.v1+json"
+OCI_LAYER_MEDIA_TYPE = "application/vnd.oci.image.layer.v1.tar"
+
+# Annotations naming the images of an OCI image layout (`index.json`)
+OCI_REF_NAME_ANNOTATIONS: list[str] = [
+    "org.opencontainers.image.ref.name",
+    "io.containerd.image.name",
+]
+
+BLOB_CHUNK_SIZE: int = 8 * 1024 ** 2
+
+# Retention rule templates (retain ... per repository) and their parameter
+RETENTION_TEMPLATES: Dict[str, str | None] = {
+    "latestPushedK": "latestPushedK",  # the K most recently pushed artifacts
+    "latestPulledN": "latestPulledN",  # the N most recently pulled artifacts
+    "nDaysSinceLastPush": "nDaysSinceLastPush",  # artifacts pushed within N days
+    "nDaysSinceLastPull": "nDaysSinceLastPull",  # artifacts pulled within N days
+    "always": None,  # all artifacts
+}
+
+# push: replicate local resources to the remote registry
+# pull: replicate resources of the remote registry into this Harbor
+REPLICATION_DIRECTIONS = [
+    "push",
+    "pull",
+]
+
+REPLICATION_TRIGGERS = [
+    "manual",
+    "scheduled",
+    "event_based",
+]
+
+# `status` of finished replication executions
+REPLICATION_DONE_STATUSES: list[str] = [
+    "succeed",
+    "failed",
+    "stopped",
+]
+
+# `src_resource`/`dst_resource` of replication tasks: `library/nginx:[1.27,latest]`
+REPLICATION_TASK_RESOURCE = re.compile(r"^(?P<repository>[^:\[\]]+)(?::\[(?P<references>[^\]]*)\])?")
+
+# `job_status` of finished garbage collection runs
+GC_DONE_STATUSES: list[str] = [
+    "success",
+    "error",
+    "stopped",
+]
+
+# Summary lines of the garbage collection log (the numbers are rough for dry runs)
+#   "3 blobs and 1 manifests are actually deleted" / "... eligible for deletion"
+#   "The GC job actual frees up 12 MB space." / "The GC could free up 12 MB space, ..."
+GC_LOG_OBJECTS = re.compile(r"(\d+) blobs and (\d+) manifests")
+GC_LOG_FREED = re.compile(r"free(?:s)? up ([\d.]+) ?([KMGTP]?i?B)\b")
+
 
 class RequestMethod(enum.StrEnum):
     GET = "GET"
@@ -109,12 +361,59 @@ class RequestMethod(enum.StrEnum):
     PUT = "PUT"
     DELETE = "DELETE"
     HEAD = "HEAD"
+    PATCH = "PATCH"
 
 
 class HarborCLIError(Exception):
     pass
 
 
+class HarborAPIError(HarborCLIError):
+    """An error response of the Harbor API."""
+
+    def __init__(
+            self,
+            status_code: int,
+            message: str,
+            errors: list | None = None,
+            response: requests.Response | None = None,
+    ):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+        self.message = message
+        self.errors = errors or []
+        self.response = response
+
+
+class HarborAuthError(HarborAPIError):
+    pass
+
+
+class HarborNotFoundError(HarborAPIError):
+    pass
+
+
+class HarborConflictError(HarborAPIError):
+    pass
+
+
+class HarborRateLimitError(HarborAPIError):
+    pass
+
+
+class HarborServerError(HarborAPIError):
+    pass
+
+
+_HARBOR_API_ERRORS: Dict[int, type[HarborAPIError]] = {
+    401: HarborAuthError,
+    403: HarborAuthError,
+    404: HarborNotFoundError,
+    409: HarborConflictError,
+    429: HarborRateLimitError,
+}
+
+
 # ---- Python API ----
 # The functions defined in this section can be imported by users in their
 # Python scripts/interactive interpreter, e.g. via
@@ -129,6 +428,287 @@ def auth_tokenized(
     return f"{base64.b64encode(str(':'.join([user, password])).encode('utf-8')).decode('ascii')}"
 
 
+def auth_cache_file(
+        kind: str,
+        host: str,
+        port: int,
+        user: str,
+) -> pathlib.Path:
+
+    name = "-".join([kind, host, str(port), user])
+    name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+    return pathlib.Path(OPENSTUDIOLANDSCAPES__HARBOR_CACHE_DIR).expanduser().joinpath("auth", f"{name}.json")
+
+
+def auth_cache_read(
+        cache_file: pathlib.Path,
+) -> Dict | None:
+    """The cached credentials, if not expired."""
+
+    try:
+        data: dict = json.loads(cache_file.read_text())
+    except (OSError, ValueError):
+        return None
+
+    if data.get("expires_at", 0) <= time.time():
+        _logger.debug(f"{cache_file.as_posix()} expired.")
+        return None
+
+    return data
+
+
+def auth_cache_write(
+        cache_file: pathlib.Path,
+        data: Dict,
+) -> None:
+
+    cache_file.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+
+    tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as fw:
+        json.dump(data, fw)
+
+    os.replace(tmp, cache_file)
+
+
+def token_expiry(
+        token: str,
+        ttl: float,
+) -> float:
+    """`exp` of a JWT, `now + ttl` for other tokens."""
+
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, ValueError, KeyError, TypeError):
+        return time.time() + ttl
+
+
+def registry_scopes(
+        request: requests.PreparedRequest,
+) -> list[str]:
+    """The token scopes a registry (`/v2`) request needs:
+    `repository:<name>:pull` (`pull,push` for writes), plus
+    `pull` of the source repository of a cross-repository
+    mount."""
+
+    url = urllib.parse.urlsplit(request.url)
+    match = re.match(r"^/v2/(?P<name>.+?)/(?:blobs|manifests|tags)(?:/|$)", url.path)
+
+    if match is None:
+        # /v2/ (version check), /v2/_catalog
+        return []
+
+    action = "pull" if request.method in ["GET", "HEAD"] else "pull,push"
+    scopes = [f"repository:{match.group('name')}:{action}"]
+
+    mount_from = urllib.parse.parse_qs(url.query).get("from")
+    if mount_from:
+        scopes.append(f"repository:{mount_from[0]}:pull")
+
+    return scopes
+
+
+def parse_www_authenticate(
+        header: str,
+) -> Dict[str, str]:
+    """`Bearer realm="https://harbor/service/token",service="harbor-registry"`
+    → `{"realm": ..., "service": ...}` (empty for other schemes)."""
+
+    scheme, _, params = header.strip().partition(" ")
+
+    if scheme.lower() != "bearer":
+        return {}
+
+    return {k: v for k, v in re.findall(r'(\w+)="([^"]*)"', params)}
+
+
+class RegistryTokenCache:
+    """Registry bearer tokens (the token service, `/service/token`)
+    per scope, shared by all processes of a user on one host: a
+    JSON file (`auth_cache_file()`) guarded by an `fcntl` lock.
+
+    A token is refreshed once `refresh` of its lifetime passed:
+    the first process to notice fetches a new one while the
+    others keep using the still valid one. Expired tokens block
+    until one process fetched a new one, so that only a single
+    request per scope reaches the token service."""
+
+    def __init__(
+            self,
+            cache_file: pathlib.Path,
+            refresh: float = 0.75,
+    ):
+        self.cache_file = cache_file
+        self.lock_file = cache_file.with_suffix(".lock")
+        self.refresh = refresh
+
+        self._entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _locked(
+            self,
+            blocking: bool = True,
+    ) -> typing.Iterator[bool]:
+        """Whether the (inter process) lock was acquired."""
+
+        self.lock_file.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o600)
+
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _read(self) -> Dict[str, Dict]:
+
+        try:
+            return json.loads(self.cache_file.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def entry(
+            self,
+            ttl: float,
+            token: str,
+    ) -> Dict:
+        """A cache entry of a token valid for `ttl` seconds."""
+
+        now = time.time()
+
+        return {
+            "token": token,
+            "expires_at": now + ttl,
+            "refresh_at": now + ttl * self.refresh,
+        }
+
+    def token(
+            self,
+            key: str,
+            fetch: typing.Callable[[], Dict],
+    ) -> str:
+        """The token of `key` (i.e. service and scopes), `fetch()`
+        (returning an `entry()`) if there is no fresh one."""
+
+        with self._lock:
+            entry: Dict | None = self._entries.get(key)
+            if entry is None or entry["refresh_at"] <= time.time():
+                entry = self._read().get(key) or entry
+
+            if entry is not None and entry["refresh_at"] > time.time():
+                self._entries[key] = entry
+                return entry["token"]
+
+            valid = entry is not None and entry["expires_at"] > time.time()
+
+            with self._locked(blocking=not valid) as locked:
+                if not locked:
+                    # another process refreshes it
+                    return entry["token"]
+
+                entries: Dict[str, Dict] = self._read()
+
+                if key in entries and entries[key]["refresh_at"] > time.time():
+                    # refreshed by another process in the meantime
+                    entry = entries[key]
+                else:
+                    _logger.debug(f"Fetching registry token for {key}")
+                    entry = fetch()
+                    entries = {k: v for k, v in entries.items() if v["expires_at"] > time.time()}
+                    entries[key] = entry
+                    auth_cache_write(cache_file=self.cache_file, data=entries)
+
+            self._entries[key] = entry
+
+            return entry["token"]
+
+    def keys(self) -> list[str]:
+
+        return list(self._read())
+
+    def invalidate(
+            self,
+            key: str | None = None,
+    ) -> None:
+        """Forget the token of `key` (all tokens if `None`)."""
+
+        with self._lock, self._locked():
+            if key is None:
+                self._entries.clear()
+                self.cache_file.unlink(missing_ok=True)
+                return
+
+            self._entries.pop(key, None)
+            entries: Dict[str, Dict] = self._read()
+            if entries.pop(key, None) is not None:
+                auth_cache_write(cache_file=self.cache_file, data=entries)
+
+
+_SIZE_UNITS: Dict[str, int] = {
+    "": 1,
+    "K": 1024,
+    "M": 1024 ** 2,
+    "G": 1024 ** 3,
+    "T": 1024 ** 4,
+    "P": 1024 ** 5,
+}
+
+
+def parse_size(
+        size: str | int | float,
+) -> int:
+    """`10G`, `500Mi`, `1024` (bytes) → bytes (binary units).
+    `-1` means unlimited."""
+
+    value = str(size).strip().upper().removesuffix("B").removesuffix("I")
+    unit = value[-1] if value and value[-1] in _SIZE_UNITS else ""
+
+    try:
+        number = float(value[:len(value) - len(unit)])
+    except ValueError:
+        raise HarborCLIError(f"Invalid size: {size}.")
+
+    # `inf`, `nan`, `1e400`, `1e300T`
+    if not math.isfinite(number * _SIZE_UNITS[unit]):
+        raise HarborCLIError(f"Invalid size: {size}.")
+
+    if number < 0:
+        if number != -1:
+            raise HarborCLIError(f"Invalid size: {size}.")
+        return -1
+
+    return int(number * _SIZE_UNITS[unit])
+
+
+def format_size(
+        size: int | None,
+) -> str:
+    """Bytes → `1.5G` (binary units), `-1`/`None` → `unlimited`."""
+
+    if size is None or size < 0:
+        return "unlimited"
+
+    for unit in ["", "K", "M", "G", "T"]:
+        if size < 1024 or unit == "T":
+            break
+        size /= 1024
+
+    return f"{size:.0f}{unit}" if unit == "" else f"{size:.1f}{unit}"
+
+
 def curlify(
         request: requests.PreparedRequest,
 ) -> list[str]:
@@ -160,103 +740,1069 @@ def curlify(
     return cmd
 
 
-def download(
-        url: str,
-        destination_directory: pathlib.Path,
-) -> Union[pathlib.Path, Exception]:
-    """Step 1"""
+def _curl_config_quote(
+        value: str,
+) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\r", "\\r")
+    return f'"{escaped}"'
 
-    destination_directory = destination_directory.expanduser().resolve()
 
-    _logger.debug(url)
-    _logger.debug(destination_directory)
+def curl_config(
+        requests_: typing.Iterable[requests.PreparedRequest],
+) -> str:
+    """One curl config (`curl --config`) for all `requests_`,
+    separated by `next`. curl prints the status code,
+    method and URL of every response (the bodies are discarded)."""
+
+    blocks: list[str] = []
+
+    for request in requests_:
+        lines: list[str] = [
+            f"url = {_curl_config_quote(request.url)}",
+            f"request = {_curl_config_quote(request.method)}",
+            *[f"header = {_curl_config_quote(f'{k}: {v}')}" for k, v in request.headers.items()
+              if k.lower() != "content-length"],
+        ]
 
-    destination_directory.mkdir(parents=True, exist_ok=True)
+        if request.body is not None:
+            body = request.body.decode("utf-8") if isinstance(request.body, bytes) else request.body
+            lines.append(f"data-binary = {_curl_config_quote(body)}")
 
-    if not destination_directory.exists():
-        destination_directory.mkdir(
-            parents=True, exist_ok=True
-        )  # create folder if it does not exist
+        lines.extend(
+            [
+                "silent",
+                "show-error",
+                'output = "/dev/null"',
+                f"write-out = {_curl_config_quote('%{http_code} %{method} %{url_effective}' + chr(10))}",
+            ]
+        )
 
-    tar_filename = url.split("/")[-1].replace(" ", "_")  # be careful with file names
-    tar_file_path = destination_directory / tar_filename
+        blocks.append("\n".join(lines))
 
-    r = requests.get(url, stream=True)
-    if r.ok:
-        _logger.info("Saving to %s" % tar_file_path.absolute().as_posix())
-        with open(tar_file_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=1024 * 8):
-                if chunk:
-                    f.write(chunk)
-                    f.flush()
-                    os.fsync(f.fileno())
+    return "\nnext\n".join(blocks) + "\n"
 
-        return tar_file_path
 
-    else:  # HTTP status code 4XX/5XX
-        raise Exception(
-            "Download failed: status code {}\n{}".format(r.status_code, r.text)
+def curl_batch(
+        requests_: typing.Iterable[requests.PreparedRequest],
+        config_file: pathlib.Path,
+        parallel_max: int = 8,
+) -> list[str]:
+    """Write `curl_config()` of `requests_` to `config_file`
+    (mode 0600, it contains credentials) and return the single
+    curl command running them, `parallel_max` at a time, over
+    reused connections."""
+
+    if parallel_max < 1:
+        raise HarborCLIError(f"Invalid parallel max: {parallel_max}.")
+
+    config_file = config_file.expanduser().resolve()
+    config_file.parent.mkdir(parents=True, exist_ok=True)
+
+    fd = os.open(config_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as fw:
+        fw.write(curl_config(requests_))
+    os.chmod(config_file, 0o600)
+
+    cmd = [
+        shutil.which("curl"),
+        "--parallel",
+        "--parallel-max",
+        str(parallel_max),
+        "--config",
+        config_file.as_posix(),
+    ]
+
+    return cmd
+
+
+def retry_after(
+        response: requests.Response,
+) -> float | None:
+    """Seconds to wait according to the `Retry-After` header
+    (delta seconds or HTTP date) of a 429/503 response."""
+
+    if response.status_code not in [429, 503]:
+        return None
+
+    value: str | None = response.headers.get("Retry-After")
+
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrency:
+    """Limits the requests in flight of (all threads using) a
+    `HarborClient` with AIMD:
+
+      - The limit grows by 1 per `limit` healthy responses
+        (about one per round trip).
+      - It is halved (at most once per round trip) on 429,
+        5xx, connection errors or when the p95 latency of the
+        last `window` responses exceeds `latency_tolerance`
+        times the best p95 seen so far.
+
+    `Retry-After` pauses all requests. `max_rps` is a hard
+    ceiling on the request rate (token bucket without burst)."""
+
+    def __init__(
+            self,
+            initial: int = 4,
+            min_limit: int = 1,
+            max_limit: int = 64,
+            max_rps: float | None = None,
+            window: int = 20,
+            latency_tolerance: float = 2.0,
+    ):
+        if not 1 <= min_limit <= max_limit:
+            raise HarborCLIError(f"Invalid concurrency limits: {min_limit}..{max_limit}.")
+        if max_rps is not None and max_rps <= 0:
+            raise HarborCLIError(f"Invalid max rps: {max_rps}.")
+
+        self.limit: int = min(max(initial, min_limit), max_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_rps = max_rps
+        self.latency_tolerance = latency_tolerance
+
+        self.inflight: int = 0
+        self.throttled: int = 0
+        self.decreases: int = 0
+        # (time, limit) of every change
+        self.history: list[tuple[float, int]] = [(time.monotonic(), self.limit)]
+
+        self._condition = threading.Condition()
+        self._latencies: collections.deque = collections.deque(maxlen=window)
+        self._baseline: float | None = None
+        self._since_decrease: int = 0
+        self._since_increase: int = 0
+        self._resume_at: float = 0.0
+        self._next_token_at: float = 0.0
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = self._resume_at - now
+
+                if wait <= 0 and self.inflight < self.limit:
+                    if self.max_rps is None or self._next_token_at <= now:
+                        if self.max_rps is not None:
+                            self._next_token_at = max(self._next_token_at, now) + 1.0 / self.max_rps
+                        self.inflight += 1
+                        return
+                    wait = self._next_token_at - now
+
+                self._condition.wait(timeout=wait if wait > 0 else None)
+
+    def release(
+            self,
+            latency: float,
+            throttled: bool = False,
+            retry_after_: float | None = None,
+    ) -> None:
+
+        with self._condition:
+            self.inflight -= 1
+            self._since_decrease += 1
+
+            if retry_after_:
+                self._resume_at = max(self._resume_at, time.monotonic() + retry_after_)
+
+            if throttled:
+                self.throttled += 1
+                self._decrease()
+            else:
+                self._latencies.append(latency)
+
+                if len(self._latencies) == self._latencies.maxlen:
+                    latencies = sorted(self._latencies)
+                    p95 = latencies[int(len(latencies) * 0.95) - 1]
+                    if self._baseline is None or p95 < self._baseline:
+                        self._baseline = p95
+
+                    if p95 > self._baseline * self.latency_tolerance:
+                        self._decrease()
+                    else:
+                        self._increase()
+                else:
+                    self._increase()
+
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self) -> typing.Iterator[None]:
+        """Acquire/release around a request without a response
+        (counted as a failure if it raises)."""
+
+        self.acquire()
+        start = time.monotonic()
+        throttled = True
+        try:
+            yield
+            throttled = False
+        finally:
+            self.release(latency=time.monotonic() - start, throttled=throttled)
+
+    def stats(self) -> Dict:
+
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "max_limit_reached": max(limit for _, limit in self.history),
+                "throttled": self.throttled,
+                "decreases": self.decreases,
+            }
+
+    def _decrease(self) -> None:
+        # one decrease per round trip, the responses of the requests
+        # in flight were caused by the previous limit
+        if self._since_decrease < self.limit and self.decreases:
+            return
+        self._since_decrease = 0
+        self._since_increase = 0
+        self.decreases += 1
+        self._latencies.clear()
+        self._set_limit(self.limit // 2)
+
+    def _increase(self) -> None:
+        self._since_increase += 1
+        if self._since_increase >= self.limit:
+            self._since_increase = 0
+            self._set_limit(self.limit + 1)
+
+    def _set_limit(
+            self,
+            limit: int,
+    ) -> None:
+        limit = min(max(limit, self.min_limit), self.max_limit)
+        if limit != self.limit:
+            _logger.debug(f"Concurrency limit: {self.limit} -> {limit}")
+            self.history.append((time.monotonic(), limit))
+        self.limit = limit
+
+
+class HarborClient:
+    """Executes requests against the Harbor API over a pooled
+    keep-alive session.
+
+    Raises a `HarborAPIError` subclass for error responses.
+
+    `concurrency` (see `AdaptiveConcurrency`) limits the requests
+    in flight across all threads sharing the client. 429/503
+    responses are retried (`retries` times) after `Retry-After`.
+
+    `auth` (see AUTH_MODES):
+      - `basic`: Basic auth header on every request.
+      - `session`: log in once and reuse the session cookie and
+        CSRF token. Cached on disk (`auth_cache_file()`) for
+        `session_ttl` seconds (Harbor's default session timeout
+        is 30 minutes).
+      - `bearer`: `token` as bearer token. Cached on disk until
+        it expires (JWT `exp` or `token_ttl`), so that subsequent
+        clients do not need the `token` argument.
+
+    Registry (`/v2`) requests carry a bearer token of the registry's
+    token service for their scope (see `registry_scopes()`), shared
+    with other processes through `RegistryTokenCache`.
+
+    Usage:
+        with HarborClient(host=..., port=..., user=..., password=...) as client:
+            client.request(RequestMethod.GET, "/projects")
+    """
+
+    def __init__(
+            self,
+            host: str,
+            port: int,
+            user: str,
+            password: str,
+            scheme: str = "http",
+            timeout: float = 30.0,
+            pool_maxsize: int = 16,
+            auth: str = AUTH_MODES[0],
+            token: str | None = None,
+            session_ttl: float = 1500.0,
+            token_ttl: float = 3600.0,
+            concurrency: AdaptiveConcurrency | None = None,
+            retries: int = 3,
+    ):
+        if auth not in AUTH_MODES:
+            raise HarborCLIError(f"Invalid auth mode: {auth}. Choose from {AUTH_MODES}.")
+
+        self.host = host
+        self.port = port
+        self.user = user
+        self.timeout = timeout
+        self.auth = auth
+        self.session_ttl = session_ttl
+        self.concurrency = concurrency
+        self.retries = retries
+        self.origin = f"{scheme}://{host}:{port}"
+        self.base_url = f"{self.origin}{OPENSTUDIOLANDSCAPES__HARBOR_API_ENDPOINT}"
+
+        self._password = password
+        self._lock = threading.Lock()
+        # session: {"cookies": {...}, "csrf_token": ..., "expires_at": ...}
+        # bearer: {"token": ..., "expires_at": ...}
+        self._auth_state: Dict | None = None
+        self._auth_cache_file = auth_cache_file(kind=auth, host=host, port=port, user=user)
+        self.registry_tokens = RegistryTokenCache(
+            cache_file=auth_cache_file(kind="registry", host=host, port=port, user=user),
         )
+        # Harbor's token service, updated by `WWW-Authenticate` challenges
+        self._registry_challenge: Dict[str, str] = {
+            "realm": f"{self.origin}/service/token",
+            "service": "harbor-registry",
+        }
 
+        self.session = requests.Session()
 
-def extract(
-        extract_to: pathlib.Path,
-        tar_file: pathlib.Path,
-) -> Union[pathlib.Path, Exception]:
-    """Step 2"""
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=pool_maxsize,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
-    extract_to = extract_to.expanduser().resolve()
-    tar_file = tar_file.expanduser().resolve()
+        self.session.headers.update(
+            {
+                "accept": "application/json",
+            }
+        )
 
-    if extract_to == tar_file.parent:
-        raise HarborCLIError(
-            f"{tar_file.as_posix()} should be extracted to a subdirectory."
-        ) from FileNotFoundError(tar_file)
+        if auth == "basic":
+            self.session.headers.update(
+                {
+                    "authorization": f"Basic {auth_tokenized(user=user, password=password)}",
+                }
+            )
 
+        elif auth == "bearer":
+            if token:
+                self._auth_state = {
+                    "token": token,
+                    "expires_at": token_expiry(token=token, ttl=token_ttl),
+                }
+                auth_cache_write(cache_file=self._auth_cache_file, data=self._auth_state)
+            else:
+                self._auth_state = auth_cache_read(cache_file=self._auth_cache_file)
+            if self._auth_state is None:
+                raise HarborCLIError(
+                    f"No (valid) bearer token for {user}@{host}:{port}. "
+                    f"Specify one with --token."
+                )
+
+        elif auth == "session":
+            self._auth_state = auth_cache_read(cache_file=self._auth_cache_file)
+
+        # project_name: exists, see caching_existence()
+        self.existence_cache: Dict[str, bool] | None = None
+
+    def __enter__(self) -> "HarborClient":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def url(
+            self,
+            path: str,
+    ) -> str:
+        return f"{self.base_url}{path}"
+
+    def prepare(
+            self,
+            method: RequestMethod | str,
+            path: str,
+            headers: Dict | None = None,
+            **kwargs,
+    ) -> requests.PreparedRequest:
+        """`kwargs` are passed on to `requests.Request` (`json`, `params`, ...)."""
 
-    if extract_to.exists():
-        if bool(list(extract_to.iterdir())):
-            raise HarborCLIError(
-                f"{extract_to.as_posix()} is not empty. "
-                f"Aborted. Clear it first if that's "
-                f"really what you want."
+        request: requests.Request = requests.Request(
+            method=str(method),
+            url=self.url(path),
+            headers=headers,
+            **kwargs,
+        )
+
+        return self.session.prepare_request(request)
+
+    def prepare_registry(
+            self,
+            method: RequestMethod | str,
+            path: str,
+            headers: Dict | None = None,
+            **kwargs,
+    ) -> requests.PreparedRequest:
+        """A request against the registry API (`/v2{path}`),
+        authenticated with a bearer token (see `authorize()`)."""
+
+        request: requests.Request = requests.Request(
+            method=str(method),
+            url=f"{self.origin}/v2{path}",
+            headers=headers,
+            **kwargs,
+        )
+
+        return self.session.prepare_request(request)
+
+    def login(self) -> Dict:
+        """Log in (`/c/login`) and cache the session cookie and
+        CSRF token. Harbor requires a CSRF token (handed out with
+        any API response) to log in."""
+
+        _logger.debug(f"Logging in as {self.user}...")
+
+        response = self.session.get(self.url("/systeminfo"), timeout=self.timeout)
+        if not response.ok:
+            raise self.error(response)
+
+        cookies: dict = response.cookies.get_dict()
+        csrf_token = response.headers.get("X-Harbor-Csrf-Token")
+
+        response = self.session.post(
+            f"{self.origin}/c/login",
+            data={
+                "principal": self.user,
+                "password": self._password,
+            },
+            headers={"X-Harbor-Csrf-Token": csrf_token} if csrf_token else {},
+            cookies=cookies,
+            timeout=self.timeout,
+        )
+        if not response.ok:
+            raise self.error(response)
+
+        cookies.update(response.cookies.get_dict())
+
+        self._auth_state = {
+            "cookies": cookies,
+            "csrf_token": response.headers.get("X-Harbor-Csrf-Token", csrf_token),
+            "expires_at": time.time() + self.session_ttl,
+        }
+
+        auth_cache_write(cache_file=self._auth_cache_file, data=self._auth_state)
+
+        return self._auth_state
+
+    def logout(self) -> None:
+        """Forget the cached session/token."""
+
+        self._auth_state = None
+        self._auth_cache_file.unlink(missing_ok=True)
+        self.registry_tokens.invalidate()
+
+    def registry_token(
+            self,
+            scopes: typing.List[str],
+    ) -> str:
+        """A token of the registry's token service for `scopes`
+        (cached, see `RegistryTokenCache`)."""
+
+        return self.registry_tokens.token(
+            key=self._registry_token_key(scopes=scopes),
+            fetch=lambda: self.registry_token_fetch(scopes=scopes),
+        )
+
+    def registry_token_fetch(
+            self,
+            scopes: typing.List[str],
+    ) -> Dict:
+        """Request a token for `scopes` from the registry's token
+        service (bypassing the cache). Returns a cache entry
+        (see `RegistryTokenCache.entry()`)."""
+
+        challenge: Dict[str, str] = self._registry_challenge
+
+        response = self.session.get(
+            challenge["realm"],
+            params=[("service", challenge["service"]), *(("scope", scope) for scope in scopes)],
+            auth=(self.user, self._password),
+            timeout=self.timeout,
+        )
+        if not response.ok:
+            raise self.error(response)
+
+        data: Dict = response.json()
+
+        # the default lifetime of the token specification
+        return self.registry_tokens.entry(
+            ttl=float(data.get("expires_in") or 60),
+            token=data.get("token") or data["access_token"],
+        )
+
+    def registry_tokens_refresh(self) -> None:
+        """Refresh the cached registry tokens (of any scope) that
+        are due (see `RegistryTokenCache`)."""
+
+        for key in self.registry_tokens.keys():
+            service, *scopes = key.split(" ")
+            if scopes and service == self._registry_challenge["service"]:
+                self.registry_token(scopes=scopes)
+
+    def _registry_token_key(
+            self,
+            scopes: typing.List[str],
+    ) -> str:
+
+        return " ".join([self._registry_challenge["service"], *sorted(scopes)])
+
+    def authorize(
+            self,
+            request: requests.PreparedRequest,
+    ) -> requests.PreparedRequest:
+        """Replace the authorization of `request` (i.e. the Basic
+        header of a request prepared without this client) by the
+        client's. Registry (`/v2`) requests get a registry token."""
+
+        if self.is_registry(request):
+            request.headers["authorization"] = f"Bearer {self.registry_token(scopes=registry_scopes(request))}"
+            return request
+
+        if self.auth == "basic" or not self.is_api(request):
+            return request
+
+        request.headers.pop("authorization", None)
+
+        if self.auth == "bearer":
+            request.headers["authorization"] = f"Bearer {self._auth_state['token']}"
+
+        elif self.auth == "session":
+            with self._lock:
+                if self._auth_state is None or self._auth_state["expires_at"] <= time.time():
+                    self.login()
+                state = self._auth_state
+            request.headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in state["cookies"].items())
+            if request.method not in ["GET", "HEAD", "OPTIONS"] and state.get("csrf_token"):
+                request.headers["X-Harbor-Csrf-Token"] = state["csrf_token"]
+
+        return request
+
+    def send(
+            self,
+            request: requests.PreparedRequest,
+            stream: bool = False,
+    ) -> requests.Response:
+        """`stream`: do not read the body yet (`response.iter_content()`)."""
+
+        for attempt in range(self.retries + 1):
+            response: requests.Response = self._send(request, stream=stream)
+
+            _logger.debug(f"{request.method} {request.url}: {response.status_code}")
+
+            wait: float | None = retry_after(response)
+            if wait is None or attempt == self.retries:
+                break
+
+            _logger.info(f"{request.method} {request.url}: {response.status_code}, retrying in {wait:.1f}s")
+            if self.concurrency is None:
+                # otherwise acquire() waits
+                time.sleep(wait)
+
+        if not response.ok:
+            raise self.error(response)
+
+        return response
+
+    def _send(
+            self,
+            request: requests.PreparedRequest,
+            stream: bool = False,
+    ) -> requests.Response:
+
+        if self.concurrency is None:
+            return self._send_authorized(request, stream=stream)
+
+        self.concurrency.acquire()
+        start = time.monotonic()
+        response: requests.Response | None = None
+
+        try:
+            response = self._send_authorized(request, stream=stream)
+        finally:
+            self.concurrency.release(
+                latency=time.monotonic() - start,
+                throttled=response is None or response.status_code == 429 or response.status_code >= 500,
+                retry_after_=None if response is None else retry_after(response),
             )
 
-    if not tar_file.exists():
-        raise HarborCLIError(
-            f"{tar_file.as_posix()} not found."
-        ) from FileNotFoundError(tar_file)
+        return response
 
+    def _send_authorized(
+            self,
+            request: requests.PreparedRequest,
+            stream: bool = False,
+    ) -> requests.Response:
 
-    _logger.debug(extract_to)
-    _logger.debug(tar_file)
+        response: requests.Response = self.session.send(
+            self.authorize(request),
+            timeout=self.timeout,
+            stream=stream,
+        )
 
-    harbor_bin_dir: pathlib.Path = extract_to
-    harbor_bin_dir.mkdir(parents=True, exist_ok=True)
+        if response.status_code == 401 and self.is_registry(request):
+            # token revoked or the token service moved
+            challenge: Dict[str, str] = parse_www_authenticate(response.headers.get("WWW-Authenticate", ""))
+            if "realm" in challenge:
+                _logger.debug(f"Registry token rejected. Fetching a new one from {challenge['realm']}.")
+                self.registry_tokens.invalidate(key=self._registry_token_key(scopes=registry_scopes(request)))
+                self._registry_challenge = {
+                    "realm": challenge["realm"],
+                    "service": challenge.get("service", self._registry_challenge["service"]),
+                }
+                response = self.session.send(
+                    self.authorize(request),
+                    timeout=self.timeout,
+                    stream=stream,
+                )
+
+        elif self.auth == "session" and response.status_code == 401 and self.is_api(request):
+            # session expired server side
+            _logger.debug("Session expired. Logging in again.")
+            with self._lock:
+                self._auth_state = None
+            response = self.session.send(
+                self.authorize(request),
+                timeout=self.timeout,
+                stream=stream,
+            )
 
-    # equivalent to tar --strip-components=1
-    # Credits: https://stackoverflow.com/a/78461535
-    strip1 = lambda member, path: member.replace(
-        name=pathlib.Path(*pathlib.Path(member.path).parts[1:])
-    )
+        return response
+
+    def is_api(
+            self,
+            request: requests.PreparedRequest,
+    ) -> bool:
+
+        return request.url.startswith(self.base_url)
+
+    def is_registry(
+            self,
+            request: requests.PreparedRequest,
+    ) -> bool:
+
+        return request.url.startswith(f"{self.origin}/v2/")
+
+    def request(
+            self,
+            method: RequestMethod | str,
+            path: str,
+            headers: Dict | None = None,
+            **kwargs,
+    ) -> Any:
+        """Send a request and return the parsed (JSON) response body."""
+
+        response: requests.Response = self.send(
+            self.prepare(
+                method=method,
+                path=path,
+                headers=headers,
+                **kwargs,
+            )
+        )
 
-    _logger.debug("Extracting tar file...")
-    with tarfile.open(tar_file, "r:gz") as tar:
-        tar.extractall(
-            path=harbor_bin_dir,
-            filter=strip1,
+        return self.parse(response)
+
+    def iter_pages(
+            self,
+            path: str,
+            params: Dict | None = None,
+            page_size: int = HARBOR_PAGE_SIZE_MAX,
+    ) -> typing.Iterator[Dict]:
+        """Yield the items of a list endpoint page by page, following
+        the `Link: <...>; rel="next"` header.
+
+        The next page is fetched in the background while the items
+        of the current one are consumed, so at most two pages are
+        held in memory."""
+
+        request: requests.PreparedRequest = self.prepare(
+            method=RequestMethod.GET,
+            path=path,
+            params={**(params or {}), "page": 1, "page_size": page_size},
         )
-    _logger.debug("All files extracted to %s" % harbor_bin_dir.as_posix())
 
-    return extract_to
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self.send, request)
+
+            try:
+                while future is not None:
+                    response: requests.Response = future.result()
+
+                    next_link: str | None = response.links.get("next", {}).get("url")
+                    future = None
+                    if next_link:
+                        request = request.copy()
+                        request.prepare_url(urllib.parse.urljoin(self.origin, next_link), None)
+                        future = executor.submit(self.send, request)
+
+                    yield from self.parse(response) or []
+            finally:
+                # consumer stopped early
+                if future is not None:
+                    future.cancel()
+
+    def fetch_pages(
+            self,
+            path: str,
+            params: Dict | None = None,
+            page_size: int = HARBOR_PAGE_SIZE_MAX,
+            concurrency: int = 8,
+    ) -> list[Dict]:
+        """All items of a list endpoint. The first page tells the
+        total (`X-Total-Count`), the remaining pages are fetched
+        `concurrency` at a time. For endpoints small enough to be
+        held in memory (use `iter_pages()` otherwise)."""
+
+        def _page(page: int) -> requests.Response:
+            return self.send(
+                self.prepare(
+                    method=RequestMethod.GET,
+                    path=path,
+                    params={**(params or {}), "page": page, "page_size": page_size},
+                )
+            )
 
+        response: requests.Response = _page(1)
+        items: list[Dict] = self.parse(response) or []
 
-def _configure(args) -> str:
+        total = int(response.headers.get("X-Total-Count", len(items)))
+        pages = range(2, -(-total // page_size) + 1)
 
-    harbor_config_dict: dict = {
-        "hostname": args.host,
-        "http": {"port": args.port},
-        "harbor_admin_password": args.password,
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            for response in executor.map(_page, pages):
+                items.extend(self.parse(response) or [])
+
+        return items
+
+    @contextlib.contextmanager
+    def caching_existence(self) -> typing.Iterator[Dict[str, bool]]:
+        """Remember the results of `project_exists()` (and of
+        creations/deletions) until the end of the block."""
+
+        previous = self.existence_cache
+        self.existence_cache = {} if previous is None else previous
+
+        try:
+            yield self.existence_cache
+        finally:
+            self.existence_cache = previous
+
+    def project_exists(
+            self,
+            project_name: str,
+    ) -> bool:
+        """`HEAD /projects?project_name=`"""
+
+        if self.existence_cache is not None and project_name in self.existence_cache:
+            return self.existence_cache[project_name]
+
+        try:
+            self.send(
+                self.prepare(
+                    method=RequestMethod.HEAD,
+                    path="/projects",
+                    params={"project_name": project_name},
+                )
+            )
+            exists = True
+        except HarborNotFoundError:
+            exists = False
+
+        self.project_existence(project_name=project_name, exists=exists)
+
+        return exists
+
+    def project_existence(
+            self,
+            project_name: str,
+            exists: bool,
+    ) -> None:
+
+        if self.existence_cache is not None:
+            self.existence_cache[project_name] = exists
+
+    @staticmethod
+    def parse(
+            response: requests.Response,
+    ) -> Any:
+
+        if not response.content:
+            return None
+
+        if "json" in response.headers.get("Content-Type", ""):
+            return response.json()
+
+        return response.text
+
+    @staticmethod
+    def error(
+            response: requests.Response,
+    ) -> HarborAPIError:
+        """Harbor reports errors as `{"errors": [{"code": ..., "message": ...}]}`."""
+
+        errors: list = []
+
+        try:
+            errors = response.json().get("errors", [])
+        except (ValueError, AttributeError):
+            pass
+
+        message = "; ".join(e.get("message", "") for e in errors) or response.reason or ""
+
+        if response.status_code >= 500:
+            error_class = HarborServerError
+        else:
+            error_class = _HARBOR_API_ERRORS.get(response.status_code, HarborAPIError)
+
+        return error_class(
+            status_code=response.status_code,
+            message=message,
+            errors=errors,
+            response=response,
+        )
+
+
+def bulk_execute(
+        func: typing.Callable[[Any], Any],
+        items: typing.Iterable,
+        concurrency: int = 8,
+        label: typing.Callable[[Any], str] = str,
+) -> list[Dict]:
+    """Call `func(item)` for all `items`, `concurrency` at a time.
+
+    Returns one record per item (in the order of `items`):
+    `{"item", "ok", "latency", "result", "error"}`.
+    """
+
+    if concurrency < 1:
+        raise HarborCLIError(f"Invalid concurrency: {concurrency}.")
+
+    items = list(items)
+
+    def _execute(item) -> Dict:
+        start = time.monotonic()
+        try:
+            result = func(item)
+            error = None
+        except (HarborCLIError, requests.RequestException) as e:
+            result = None
+            error = str(e)
+        return {
+            "item": item,
+            "ok": error is None,
+            "latency": time.monotonic() - start,
+            "result": result,
+            "error": error,
+        }
+
+    records: list[Dict | None] = [None] * len(items)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(_execute, item): i for i, item in enumerate(items)}
+        for n, future in enumerate(as_completed(futures), start=1):
+            record = future.result()
+            records[futures[future]] = record
+            _logger.info(
+                f"[{n}/{len(items)}] {label(record['item'])}: "
+                f"{'ok' if record['ok'] else record['error']} "
+                f"({record['latency'] * 1000:.0f}ms)"
+            )
+
+    return records
+
+
+def bulk_summary(
+        records: typing.List[Dict],
+        duration: float,
+) -> str:
+
+    latencies = sorted(r["latency"] for r in records)
+    failed = [r for r in records if not r["ok"]]
+
+    summary = f"{len(records) - len(failed)} ok, {len(failed)} failed in {duration:.2f}s"
+
+    if latencies:
+        summary += (
+            f" (latency p50 {latencies[len(latencies) // 2] * 1000:.0f}ms, "
+            f"p95 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000:.0f}ms, "
+            f"max {latencies[-1] * 1000:.0f}ms)"
+        )
+
+    return summary
+
+
+def benchmark_auth(
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        auth_modes: typing.List[str] = AUTH_MODES[:2],
+        count: int = 100,
+        token: str | None = None,
+) -> Dict[str, Dict]:
+    """Send `count` lightweight requests (`GET /projects?page_size=1`)
+    per auth mode (each with a fresh client and no cached session)
+    and measure the latency per request, including the login.
+
+    Returns `{auth_mode: {"count", "total", "mean", "p95"}}` (seconds).
+    """
+
+    results: Dict[str, Dict] = {}
+
+    for auth in auth_modes:
+        with HarborClient(
+                host=host,
+                port=port,
+                user=user,
+                password=password,
+                auth=auth,
+                token=token,
+        ) as client:
+            if auth == "session":
+                client.logout()
+
+            latencies: list[float] = []
+            start = time.monotonic()
+
+            for _ in range(count):
+                t = time.monotonic()
+                client.request(RequestMethod.GET, "/projects", params={"page_size": 1})
+                latencies.append(time.monotonic() - t)
+
+            total = time.monotonic() - start
+
+        latencies.sort()
+
+        results[auth] = {
+            "count": count,
+            "total": total,
+            "mean": total / count,
+            "p95": latencies[min(count - 1, int(count * 0.95))],
+        }
+
+        print(
+            f"{auth}: {count} requests in {total:.2f}s "
+            f"(mean {results[auth]['mean'] * 1000:.1f}ms, "
+            f"p95 {results[auth]['p95'] * 1000:.1f}ms)"
+        )
+
+    return results
+
+
+def download(
+        url: str,
+        destination_directory: pathlib.Path,
+) -> Union[pathlib.Path, Exception]:
+    """Step 1"""
+
+    destination_directory = destination_directory.expanduser().resolve()
+
+    _logger.debug(url)
+    _logger.debug(destination_directory)
+
+    destination_directory.mkdir(parents=True, exist_ok=True)
+
+    if not destination_directory.exists():
+        destination_directory.mkdir(
+            parents=True, exist_ok=True
+        )  # create folder if it does not exist
+
+    tar_filename = url.split("/")[-1].replace(" ", "_")  # be careful with file names
+    tar_file_path = destination_directory / tar_filename
+
+    r = requests.get(url, stream=True)
+    if r.ok:
+        _logger.info("Saving to %s" % tar_file_path.absolute().as_posix())
+        with open(tar_file_path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=1024 * 8):
+                if chunk:
+                    f.write(chunk)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+        return tar_file_path
+
+    else:  # HTTP status code 4XX/5XX
+        raise Exception(
+            "Download failed: status code {}\n{}".format(r.status_code, r.text)
+        )
+
+
+def extract(
+        extract_to: pathlib.Path,
+        tar_file: pathlib.Path,
+) -> Union[pathlib.Path, Exception]:
+    """Step 2"""
+
+    extract_to = extract_to.expanduser().resolve()
+    tar_file = tar_file.expanduser().resolve()
+
+    if extract_to == tar_file.parent:
+        raise HarborCLIError(
+            f"{tar_file.as_posix()} should be extracted to a subdirectory."
+        ) from FileNotFoundError(tar_file)
+
+
+    if extract_to.exists():
+        if bool(list(extract_to.iterdir())):
+            raise HarborCLIError(
+                f"{extract_to.as_posix()} is not empty. "
+                f"Aborted. Clear it first if that's "
+                f"really what you want."
+            )
+
+    if not tar_file.exists():
+        raise HarborCLIError(
+            f"{tar_file.as_posix()} not found."
+        ) from FileNotFoundError(tar_file)
+
+
+    _logger.debug(extract_to)
+    _logger.debug(tar_file)
+
+    harbor_bin_dir: pathlib.Path = extract_to
+    harbor_bin_dir.mkdir(parents=True, exist_ok=True)
+
+    # equivalent to tar --strip-components=1
+    # Credits: https://stackoverflow.com/a/78461535
+    strip1 = lambda member, path: member.replace(
+        name=pathlib.Path(*pathlib.Path(member.path).parts[1:])
+    )
+
+    _logger.debug("Extracting tar file...")
+    with tarfile.open(tar_file, "r:gz") as tar:
+        tar.extractall(
+            path=harbor_bin_dir,
+            filter=strip1,
+        )
+    _logger.debug("All files extracted to %s" % harbor_bin_dir.as_posix())
+
+    return extract_to
+
+
+def _configure(args) -> str:
+
+    harbor_config_dict: dict = {
+        "hostname": args.host,
+        "http": {"port": args.port},
+        "harbor_admin_password": args.password,
         "database": {
             "password": "root123",
             "max_idle_conns": 100,
@@ -416,1144 +1962,7001 @@ def prepare(
     return proc.returncode
 
 
-def systemd_unit_dict(
-        working_directory: pathlib.Path,
-        exec_start: typing.List[str],
-        exec_reload: typing.List[str],
-        exec_stop: typing.List[str],
-) -> typing.Dict:
+def compose_images(
+        compose_file: pathlib.Path,
+) -> list[str]:
+    """Unique images referenced by the services of a compose file
+    (in order of appearance)."""
 
-    unit_dict = {
-        "Unit": {
-            "Description": "Harbor for OpenStudioLandscapes",
-            "Documentation": "https://github.com/michimussato/OpenStudioLandscapes/blob/main/wiki/guides/harbor.md",
-        },
-        "Service": {
-            "Type": "simple",
-            "User": "root",
-            "Group": "root",
-            "Restart": "always",
-            "WorkingDirectory": working_directory.as_posix(),
-            "ExecStart": " ".join(exec_start),
-            "ExecReload": " ".join(exec_reload),
-            "ExecStop": " ".join(exec_stop),
-        },
-        "Install": {
-            "WantedBy": "multi-user.target",
-        },
-    }
+    compose: dict = compose_load(compose_file=compose_file)
 
-    _logger.debug(unit_dict)
+    images: list[str] = []
 
-    return unit_dict
+    for service in (compose.get("services") or {}).values():
+        image = (service or {}).get("image")
+        if image and image not in images:
+            images.append(image)
 
+    _logger.debug(f"{images = }")
 
-def systemd_install(
-        su_method: str,
-        outfile: pathlib.Path,
-        start: bool,
-        enable: bool,
-        harbor_bin_dir: pathlib.Path,
-) -> list[str | Any]:
-    """Step 5"""
+    return images
 
-    outfile = pathlib.Path(outfile).expanduser().resolve()
 
-    _logger.debug(start)
-    _logger.debug(enable)
+def image_present(
+        image: str,
+        docker: str,
+) -> bool:
 
-    _cmd_harbor = [
-        shutil.which("docker"),
-        "compose",
-        "--progress",
-        DOCKER_PROGRESS[2],
-        "--file",
-        harbor_bin_dir.joinpath("docker-compose.yml").as_posix(),
-        "--project-name",
-        "openstudiolandscapes-harbor",
-    ]
+    proc = subprocess.run(
+        [
+            docker,
+            "image",
+            "inspect",
+            "--format",
+            "{{.Id}}",
+            image,
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
 
-    exec_start = [
-        *_cmd_harbor,
-        "up",
-        "--remove-orphans",
-    ]
+    return proc.returncode == 0
 
-    exec_reload = [
-        *_cmd_harbor,
-        "restart",
-    ]
 
-    exec_stop = [
-        *_cmd_harbor,
-        "down",
-    ]
+def pull_images(
+        compose_file: pathlib.Path,
+        concurrency: int = 4,
+        docker: str | None = None,
+) -> Dict[str, int]:
+    """Step 4.1
 
-    unit_dict: dict = systemd_unit_dict(
-        working_directory=harbor_bin_dir,
-        exec_start=exec_start,
-        exec_reload=exec_reload,
-        exec_stop=exec_stop,
-    )
+    Pull the images of the generated `docker-compose.yml`
+    that are missing locally, `concurrency` at a time, so that
+    the first `docker compose up` of the systemd unit does not
+    have to pull them one after another.
 
-    unit: configparser.ConfigParser = configparser.ConfigParser()
-    # Change from case insensitive to case sensitive
-    # https://docs.python.org/3/library/configparser.html#configparser.ConfigParser.optionxform
-    unit.optionxform = str
+    Returns a dict of `image: returncode` for the pulled images.
+    """
 
-    unit.read_dict(unit_dict)
+    docker = docker or shutil.which("docker")
 
-    unit_file_tmp = outfile
+    if docker is None:
+        raise HarborCLIError("`docker` not found.")
 
-    unit_file_tmp.parent.mkdir(parents=True, exist_ok=True)
+    if concurrency < 1:
+        raise HarborCLIError(f"Invalid concurrency: {concurrency}.")
 
-    with open(unit_file_tmp, "w") as fw:
-        unit.write(fw, space_around_delimiters=False)
+    images: list[str] = compose_images(compose_file=compose_file)
 
-    with open(unit_file_tmp, "r") as fr:
-        unit_file_content = fr.read()
+    missing: list[str] = [i for i in images if not image_present(image=i, docker=docker)]
 
-    _logger.debug(unit_file_content)
+    _logger.info(
+        f"{len(images) - len(missing)} of {len(images)} images present locally, "
+        f"pulling {len(missing)}."
+    )
 
-    copy_service = [
-        shutil.which("cp"),
-        unit_file_tmp.as_posix(),
-        SYSTEMD_UNIT.as_posix(),
-    ]
+    def _pull(image: str) -> tuple[str, int, float]:
+        start = time.monotonic()
+        proc = subprocess.run(
+            [
+                docker,
+                "pull",
+                "--quiet",
+                image,
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+        )
+        if proc.returncode != 0:
+            _logger.error(f"{image}: {proc.stdout.strip()}")
+        return image, proc.returncode, time.monotonic() - start
+
+    results: Dict[str, int] = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(_pull, image) for image in missing]
+        for i, future in enumerate(as_completed(futures), start=1):
+            image, returncode, duration = future.result()
+            results[image] = returncode
+            print(
+                f"[{i}/{len(missing)}] {image}: "
+                f"{'done' if returncode == 0 else 'failed'} ({duration:.1f}s)"
+            )
 
-    set_permissions = [
-        shutil.which("chmod"),
-        "644",
-        SYSTEMD_UNIT.as_posix(),
-    ]
+    failed = [image for image, returncode in results.items() if returncode != 0]
 
-    daemon_reload = [
-        shutil.which("systemctl"),
-        "daemon-reload",
-    ]
+    if failed:
+        raise HarborCLIError(
+            f"Failed to pull {len(failed)} image(s): {', '.join(failed)}"
+        )
 
-    systemctl_start = [
-        shutil.which("systemctl"),
-        "start",
-        SYSTEMD_UNIT.name,
-    ]
+    return results
 
-    systemctl_enable = [
-        shutil.which("systemctl"),
-        "enable",
-        SYSTEMD_UNIT.name,
-    ]
 
-    install_service = [
-        *copy_service,
-        "&&",
-        *set_permissions,
-        "&&",
-        *daemon_reload,
-    ]
+def harbor_health(
+        host: str,
+        port: int,
+        timeout: float = 5.0,
+) -> Dict:
+    """`GET /api/v2.0/health`"""
 
-    if start:
-        install_service.extend(
-            [
-                "&&",
-                *systemctl_start,
-            ]
-        )
+    response = requests.get(
+        f"http://{host}:{port}{OPENSTUDIOLANDSCAPES__HARBOR_API_ENDPOINT}/health",
+        timeout=timeout,
+    )
+    response.raise_for_status()
 
-    if enable:
-        install_service.extend(
-            [
-                "&&",
-                *systemctl_enable,
-            ]
-        )
+    return response.json()
 
-    _logger.debug(f"{install_service = }")
 
-    sudo_bash_c = [
-        *_SU_METHODS[su_method],
-        *SHELL,
-    ]
+def sd_notify(
+        state: str,
+) -> bool:
+    """Send `state` (i.e. `READY=1`) to the systemd notification
+    socket. Returns False if not running under a `Type=notify`
+    (or `NotifyAccess=all`) unit."""
 
-    cmd = [
-        *sudo_bash_c,
-        " ".join(install_service)
-    ]
+    notify_socket = os.environ.get("NOTIFY_SOCKET")
 
-    # _logger.debug(f"{cmd = }")
+    if not notify_socket:
+        _logger.debug("NOTIFY_SOCKET not set.")
+        return False
 
-    # proc = subprocess.run(
-    #     [
-    #         *sudo_bash_c,
-    #         " ".join(install_service)
-    #     ],
-    #     shell=True,
-    #     check=True,
-    # )
+    if notify_socket.startswith("@"):
+        # abstract namespace socket
+        notify_socket = "\0" + notify_socket[1:]
 
-    _logger.info("Execute the following command manually:")
-    print(f"{' '.join(sudo_bash_c)} \"{' '.join(install_service)}\"")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.connect(notify_socket)
+        sock.sendall(state.encode("utf-8"))
 
-    return cmd
+    _logger.debug(f"{state = }")
 
+    return True
 
-def systemd_uninstall(
-        su_method: str,
-) -> list[str | Any]:
 
-    systemctl_disable = [
-        shutil.which("systemctl"),
-        "disable",
-        "--now",
-        SYSTEMD_UNIT.name,
-    ]
+def wait_ready(
+        host: str,
+        port: int,
+        timeout: float = 300.0,
+        interval: float = 2.0,
+        notify: bool = False,
+) -> Dict:
+    """Poll `/api/v2.0/health` until Harbor reports `healthy`.
+    With `notify`, `READY=1` is sent to systemd once it does."""
+
+    deadline = time.monotonic() + timeout
+    status: Any = None
+
+    while True:
+        try:
+            health: dict = harbor_health(host=host, port=port, timeout=min(interval * 2, 10.0))
+            status = health.get("status")
+            if status == "healthy":
+                break
+            unhealthy = [c["name"] for c in health.get("components", []) if c.get("status") != "healthy"]
+            status = f"{status} ({', '.join(unhealthy)})"
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError, ValueError) as e:
+            status = e.__class__.__name__
+
+        _logger.info(f"Harbor not ready yet: {status}")
+
+        if notify:
+            sd_notify(f"STATUS=Waiting for Harbor: {status}")
+
+        if time.monotonic() + interval > deadline:
+            raise HarborCLIError(
+                f"Harbor at {host}:{port} not healthy after {timeout}s: {status}"
+            )
 
-    remove_service = [
-        shutil.which("rm"),
-        SYSTEMD_UNIT.as_posix(),
-    ]
+        time.sleep(interval)
 
-    daemon_reload = [
-        shutil.which("systemctl"),
-        "daemon-reload",
-    ]
+    _logger.info("Harbor is healthy.")
 
-    uninstall_service = [
-        *systemctl_disable,
-        "&&",
-        *remove_service,
-        "&&",
-        *daemon_reload,
-    ]
+    if notify:
+        sd_notify("READY=1\nSTATUS=Harbor is healthy")
 
-    _logger.debug(f"{uninstall_service = }")
+    return health
 
-    sudo_bash_c = [
-        *_SU_METHODS[su_method],
-        *SHELL,
-    ]
+
+def compose_cmd(
+        harbor_bin_dir: pathlib.Path,
+        docker: str | None = None,
+) -> list[str]:
 
     cmd = [
-        *sudo_bash_c,
-        " ".join(uninstall_service)
+        docker or shutil.which("docker"),
+        "compose",
+        "--progress",
+        DOCKER_PROGRESS[2],
+        "--file",
+        harbor_bin_dir.joinpath("docker-compose.yml").as_posix(),
     ]
 
-    # _logger.debug(f"{cmd = }")
-
-    # proc = subprocess.run(
-    #     [
-    #         *sudo_bash_c,
-    #         " ".join(install_service)
-    #     ],
-    #     shell=True,
-    #     check=True,
-    # )
+    # With --file, compose does not pick up the override by itself
+    if harbor_bin_dir.joinpath(COMPOSE_OVERRIDE).exists():
+        cmd.extend(
+            [
+                "--file",
+                harbor_bin_dir.joinpath(COMPOSE_OVERRIDE).as_posix(),
+            ]
+        )
 
-    _logger.info("Execute the following command manually:")
-    print(f"{' '.join(sudo_bash_c)} \"{' '.join(uninstall_service)}\"")
+    cmd.extend(
+        [
+            "--project-name",
+            COMPOSE_PROJECT_NAME,
+        ]
+    )
 
     return cmd
 
 
-def systemd_status() -> list[str | Any]:
+def _deep_merge(
+        base: Dict,
+        update: Dict,
+) -> Dict:
 
-    systemctl_status = [
-        shutil.which("systemctl"),
-        "--full",
-        "--no-pager",
-        SYSTEMD_UNIT.name,
-    ]
+    merged = dict(base)
 
-    _logger.debug(f"{systemctl_status = }")
+    for k, v in update.items():
+        if isinstance(v, dict) and isinstance(merged.get(k), dict):
+            merged[k] = _deep_merge(merged[k], v)
+        else:
+            merged[k] = v
 
-    sudo_bash_c = [
-        # *SU_METHOD,
-        *SHELL,
-    ]
+    return merged
 
-    cmd = [
-        *sudo_bash_c,
-        " ".join(systemctl_status)
-    ]
 
-    # _logger.debug(f"{cmd = }")
+def compose_override_write(
+        harbor_bin_dir: pathlib.Path,
+        override: Dict,
+) -> pathlib.Path:
+    """Merge `override` into COMPOSE_OVERRIDE (in `harbor_bin_dir`)."""
 
-    # proc = subprocess.run(
-    #     [
-    #         *sudo_bash_c,
-    #         " ".join(install_service)
-    #     ],
-    #     shell=True,
-    #     check=True,
-    # )
+    override_file = harbor_bin_dir.expanduser().resolve().joinpath(COMPOSE_OVERRIDE)
 
-    _logger.info("Execute the following command manually:")
-    print(f"{' '.join(sudo_bash_c)} \"{' '.join(systemctl_status)}\"")
+    existing: dict = {}
 
-    return cmd
+    if override_file.exists():
+        with open(override_file, "r") as fr:
+            existing = yaml.safe_load(fr) or {}
 
+    override_file.parent.mkdir(parents=True, exist_ok=True)
 
-def systemd_journalctl() -> list[str | Any]:
+    with open(override_file, "w") as fw:
+        yaml.dump(
+            _deep_merge(existing, override),
+            fw,
+            indent=2,
+        )
 
-    journalctl_fu = [
-        shutil.which("journalctl"),
-        "--follow",
-        "--unit",
-        SYSTEMD_UNIT.name,
-    ]
+    _logger.info(f"Wrote {override_file.as_posix()}")
 
-    _logger.debug(f"{journalctl_fu = }")
+    return override_file
 
-    sudo_bash_c = [
-        # *SU_METHOD,
-        *SHELL,
-    ]
 
-    cmd = [
-        *sudo_bash_c,
-        " ".join(journalctl_fu)
-    ]
+def compose_override_remove(
+        harbor_bin_dir: pathlib.Path,
+        key: str,
+) -> pathlib.Path | None:
+    """Remove `key` (i.e. `cgroup_parent`) from all services
+    in COMPOSE_OVERRIDE (in `harbor_bin_dir`), if it exists."""
 
-    # proc = subprocess.run(
-    #     [
-    #         *sudo_bash_c,
-    #         " ".join(install_service)
-    #     ],
-    #     shell=True,
-    #     check=True,
-    # )
+    override_file = harbor_bin_dir.expanduser().resolve().joinpath(COMPOSE_OVERRIDE)
 
-    _logger.info("Execute the following command manually:")
-    print(f"{' '.join(sudo_bash_c)} \"{' '.join(journalctl_fu)}\"")
+    if not override_file.exists():
+        return None
 
-    return cmd
+    with open(override_file, "r") as fr:
+        override: dict = yaml.safe_load(fr) or {}
 
+    for service in (override.get("services") or {}).values():
+        if isinstance(service, dict):
+            service.pop(key, None)
 
-def project_create(
-        host: str,
-        port: int,
-        user: str,
-        password: str,
-        project_name: str,
-) -> list[str | Any]:
+    with open(override_file, "w") as fw:
+        yaml.dump(
+            override,
+            fw,
+            indent=2,
+        )
 
-    def project_create_request_dict(project_name_) -> Dict:
-        _project_create_dict: dict = {
-            "endpoint": f"http://{host}:{port}{OPENSTUDIOLANDSCAPES__HARBOR_API_ENDPOINT}/projects",
-            # "endpoint": f"{OPENSTUDIOLANDSCAPES__HARBOR_API_ENDPOINT.format(host=host, port=port)}/projects",
-            "method": RequestMethod.POST.value,
-            "headers": {
-                "accept": "application/json",
-                "authorization": f"Basic {auth_tokenized(user=user, password=password)}",
-                "X-Resource-Name-In-Location": "false",
-                "Content-Type": "application/json",
+    _logger.info(f"Removed {key} from {override_file.as_posix()}")
+
+    return override_file
+
+
+def compose_override_logging(
+        log_driver: str,
+        services: typing.List[str],
+        max_buffer_size: str = "4m",
+        max_size: str = "50m",
+        max_file: int = 5,
+        compose: Dict | None = None,
+) -> Dict:
+    """Logging configuration for all `services` using `log_driver`
+    in `non-blocking` mode: log messages are buffered (up to
+    `max_buffer_size` per container) and dropped if the buffer is
+    full instead of blocking the container's stdout/stderr.
+
+    For `syslog`, the options of the existing `compose`
+    (`syslog-address`, `tag`) are kept, and `log` (the syslog
+    server listening on 1514 itself) is left untouched: pointed
+    at its own port, harbor-log could not start.
+    """
+
+    if log_driver not in LOG_DRIVERS:
+        raise HarborCLIError(f"Invalid log driver: {log_driver}. Choose from {LOG_DRIVERS}.")
+
+    override: dict = {"services": {}}
+
+    for service in services:
+        if log_driver == "syslog" and service == "log":
+            continue
+
+        options: dict = {
+            "mode": "non-blocking",
+            "max-buffer-size": max_buffer_size,
+        }
+
+        if log_driver == "syslog":
+            existing: dict = (
+                ((((compose or {}).get("services") or {}).get(service) or {}).get("logging") or {})
+            )
+            options.update(
+                {
+                    "syslog-address": "tcp://localhost:1514",
+                    "tag": service,
+                    **(existing.get("options") or {}),
+                }
+            )
+        elif log_driver in ["local", "json-file"]:
+            options.update(
+                {
+                    "max-size": max_size,
+                    "max-file": str(max_file),
+                }
+            )
+        elif log_driver == "journald":
+            options.update(
+                {
+                    "tag": service,
+                }
+            )
+
+        override["services"][service] = {
+            "logging": {
+                "driver": log_driver,
+                "options": options,
             },
-            "payload": {
-                # json encoding happens automatically.
-                # no need to wrap this dict in json.dumps()
-                # https://stackoverflow.com/questions/25242262/dump-to-json-adds-additional-double-quotes-and-escaping-of-quotes
-                "json": {
-                    "project_name": project_name_,
-                    "public": True,
-                },
-            }
         }
-        return _project_create_dict
 
-    def project_create_request_prepared(
-            request_dict: Dict,
-    ) -> requests.PreparedRequest:
+    return override
 
-        payload = request_dict["payload"]
 
-        _logger.debug(f"{payload = }")
+def resource_profile(
+        profile: str,
+) -> Dict:
+    """A profile from RESOURCE_PROFILES or the path to
+    a YAML file with the same structure."""
 
-        request: requests.Request = requests.Request(
-            method=request_dict["method"],
-            url=request_dict["endpoint"],
-            headers=request_dict["headers"],
-            **payload,
+    if profile in RESOURCE_PROFILES:
+        return RESOURCE_PROFILES[profile]
+
+    profile_file = pathlib.Path(profile).expanduser()
+
+    if not profile_file.is_file():
+        raise HarborCLIError(
+            f"Unknown resource profile: {profile}. "
+            f"Choose from {list(RESOURCE_PROFILES)} or specify a YAML file."
         )
 
-        return request.prepare()
+    with open(profile_file, "r") as fr:
+        loaded = yaml.safe_load(fr)
 
-    prepared_request = project_create_request_prepared(
-        request_dict=project_create_request_dict(
-            project_name_=project_name
-        ),
-    )
+    if not isinstance(loaded, dict):
+        raise HarborCLIError(f"Invalid resource profile {profile_file.as_posix()}: not a mapping.")
 
-    # sudo_bash_c = [
-    #     # *_SU_METHODS[su_method],
-    #     *SHELL,
-    # ]
+    for key in ["slice", "services"]:
+        if not isinstance(loaded.get(key), dict):
+            raise HarborCLIError(f"Invalid resource profile {profile_file.as_posix()}: `{key}` (mapping) missing.")
 
-    cmd: list = curlify(prepared_request)
+    for service, limits in loaded["services"].items():
+        for key in ["cpus", "mem_limit", "pids_limit", "nofile"]:
+            if key not in (limits or {}):
+                raise HarborCLIError(
+                    f"Invalid resource profile {profile_file.as_posix()}: `services.{service}.{key}` missing."
+                )
 
-    _logger.info("Execute the following command manually:")
-    print(f"{' '.join(cmd)}")
+    return loaded
 
-    return cmd
 
+def systemd_slice_dict(
+        profile: Dict,
+) -> typing.Dict:
 
-def project_delete(
+    slice_dict = {
+        "Unit": {
+            "Description": "Slice for Harbor for OpenStudioLandscapes",
+            "Before": "slices.target",
+        },
+        "Slice": {k: str(v) for k, v in profile["slice"].items()},
+    }
+
+    _logger.debug(slice_dict)
+
+    return slice_dict
+
+
+def compose_override_resources(
+        profile: Dict,
+        services: typing.List[str],
+) -> Dict:
+
+    override: dict = {"services": {}}
+
+    for service in services:
+        override["services"][service] = {
+            "cgroup_parent": SYSTEMD_SLICE.name,
+        }
+
+        limits = profile.get("services", {}).get(service)
+
+        if limits is None:
+            continue
+
+        override["services"][service].update(
+            {
+                "cpus": limits["cpus"],
+                "mem_limit": limits["mem_limit"],
+                "pids_limit": limits["pids_limit"],
+                "ulimits": {
+                    "nofile": {
+                        "soft": limits["nofile"],
+                        "hard": limits["nofile"],
+                    },
+                },
+            }
+        )
+
+    return override
+
+
+def harbor_cli_cmd(
         host: str,
         port: int,
-        user: str,
-        password: str,
-        project_name: str,
-) -> list[str | Any]:
-
-    def project_delete_request_dict(project_name_) -> Dict:
-        _project_delete_dict: dict = {
-            "endpoint": f"http://{host}:{port}{OPENSTUDIOLANDSCAPES__HARBOR_API_ENDPOINT}/projects/{project_name_}",
-            "method": RequestMethod.DELETE.value,
-            "headers": {
-                "accept": "application/json",
-                "X-Is-Resource-Name": "false",
-                "authorization": f"Basic {auth_tokenized(user=user, password=password)}",
-            },
-            "payload": {
-                # # json encoding happens automatically.
-                # # no need to wrap this dict in json.dumps()
-                # # https://stackoverflow.com/questions/25242262/dump-to-json-adds-additional-double-quotes-and-escaping-of-quotes
-                # "json": {
-                #     "project_name": project_name_,
-                #     "public": True,
-                # },
-            }
-        }
-        return _project_delete_dict
-
-    def project_delete_request_prepared(
-            request_dict: Dict,
-    ) -> requests.PreparedRequest:
+        harbor_bin_dir: pathlib.Path | None = None,
+) -> list[str]:
+    """The command to invoke this CLI from within the systemd unit."""
 
-        # payload = request_dict["payload"]
-        #
-        # _logger.debug(f"{payload = }")
+    cmd = [
+        sys.executable,
+        "-m",
+        "OpenStudioLandscapesUtil.Harbor_CLI.harbor_cli",
+        "--host",
+        host,
+        "--port",
+        str(port),
+    ]
 
-        request: requests.Request = requests.Request(
-            method=request_dict["method"],
-            url=request_dict["endpoint"],
-            headers=request_dict["headers"],
-            # **payload,
+    if harbor_bin_dir is not None:
+        harbor_bin_dir = harbor_bin_dir.expanduser().resolve()
+        cmd.extend(
+            [
+                "--harbor-root-dir",
+                harbor_bin_dir.parent.as_posix(),
+                "--harbor-bin",
+                harbor_bin_dir.name,
+            ]
         )
 
-        return request.prepare()
+    return cmd
 
-    prepared_request = project_delete_request_prepared(
-        request_dict=project_delete_request_dict(
-            project_name_=project_name
-        ),
-    )
 
-    # sudo_bash_c = [
-    #     # *_SU_METHODS[su_method],
-    #     *SHELL,
-    # ]
+def compose_load(
+        compose_file: pathlib.Path,
+) -> Dict:
 
-    cmd: list = curlify(prepared_request)
+    compose_file = compose_file.expanduser().resolve()
 
-    _logger.info("Execute the following command manually:")
-    print(f"{' '.join(cmd)}")
+    if not compose_file.exists():
+        raise HarborCLIError(
+            f"{compose_file.as_posix()} not found. "
+            f"Run `openstudiolandscapesutil-harborcli prepare install` first."
+        ) from FileNotFoundError(compose_file)
 
-    return cmd
+    with open(compose_file, "r") as fr:
+        compose: dict = yaml.safe_load(fr) or {}
 
+    return compose
 
-# ---- CLI ----
-# The functions defined in this section are wrappers around the main Python
-# API allowing them to be called directly from the terminal as a CLI
-# executable/script.
 
+def compose_service_order(
+        compose: Dict,
+) -> list[str]:
+    """Services sorted such that every service comes after
+    the services it `depends_on` (stable with respect to the
+    order in the compose file)."""
 
-def eval_(
-        args: argparse.Namespace,
-) -> Union[pathlib.Path, subprocess.CompletedProcess, list, None]:
+    services: dict = compose.get("services") or {}
 
-    _logger.debug(f"{args = }")
+    depends_on: Dict[str, set[str]] = {}
 
-    _logger.debug(f"{args.command = }")
+    for name, service in services.items():
+        deps = (service or {}).get("depends_on") or []
+        # depends_on can be a list or a dict (long syntax)
+        depends_on[name] = {d for d in deps if d in services}
 
-    # dotenv_ = args.dot_env
-    #
-    # if dotenv_ is not None:
-    #     dotenv_: pathlib.Path = args.dot_env.expanduser().resolve()
-    #     if not dotenv_.exists():
-    #         raise FileNotFoundError(f"{dotenv_.as_posix()} does not exist")
-    #
-    # load_dotenv(
-    #     dotenv_path=dotenv_,
-    #     verbose=True,
-    # )
+    order: list[str] = []
 
-    if args.command == "prepare":
-        _logger.debug(f"{args.prepare_command = }")
+    while len(order) < len(services):
+        ready = [n for n in services if n not in order and depends_on[n].issubset(order)]
+        if not ready:
+            raise HarborCLIError(
+                f"Circular depends_on between: "
+                f"{', '.join(n for n in services if n not in order)}"
+            )
+        order.extend(ready)
 
-        if args.prepare_command == "download":
-            result: pathlib.Path = _cli_download(args)
-            _logger.debug(f"{result = }")
-            return result
+    return order
 
-        elif args.prepare_command == "extract":
-            result: pathlib.Path = _cli_extract(args)
-            _logger.debug(f"{result = }")
-            return result
 
-        elif args.prepare_command == "configure":
-            if args.dry_run:
-                # from pprint import pprint
-                print(_configure(args))
-                return None
-            else:
-                result = _cli_configure(args)
-                _logger.debug(f"{result = }")
-                return result
+def config_snapshot(
+        config_dir: pathlib.Path,
+) -> Dict[str, str]:
+    """`relative path: sha256` of all files below `config_dir`."""
 
-        elif args.prepare_command == "install":
-            result: subprocess.CompletedProcess = _cli_install(args)
-            _logger.debug(f"{result = }")
-            return result
+    snapshot: Dict[str, str] = {}
 
-    elif args.command == "systemd":
-        _logger.debug(f"{args.systemd_command = }")
+    if not config_dir.exists():
+        return snapshot
 
-        if args.systemd_command == "install":
-            result: list = _cli_systemd_install(args)
-            _logger.debug(f"{result = }")
-            return result
+    for f in sorted(config_dir.rglob("*")):
+        if f.is_file():
+            snapshot[f.relative_to(config_dir).as_posix()] = hashlib.sha256(f.read_bytes()).hexdigest()
 
-        elif args.systemd_command == "uninstall":
-            result: list = _cli_systemd_uninstall(args)
-            _logger.debug(f"{result = }")
-            return result
+    return snapshot
 
-        elif args.systemd_command == "status":
-            result: list = _cli_systemd_status()
-            _logger.debug(f"{result = }")
-            return result
 
-        elif args.systemd_command == "journalctl":
-            result: list = _cli_systemd_journalctl()
-            _logger.debug(f"{result = }")
-            return result
+def config_changed_services(
+        previous: Dict[str, str],
+        current: Dict[str, str],
+        services: typing.List[str],
+) -> set[str]:
+    """Services affected by the differences between two
+    `config_snapshot()`s."""
 
-    elif args.command == "project":
-        _logger.debug(f"{args.project_command = }")
+    changed_files = {
+        f for f in set(previous) | set(current)
+        if previous.get(f) != current.get(f)
+    }
 
-        if args.project_command == "create":
-            result: list = _cli_project_create(args)
-            _logger.debug(f"{result = }")
-            return result
+    changed: set[str] = set()
 
-        if args.project_command == "delete":
-            result: list = _cli_project_delete(args)
-            _logger.debug(f"{result = }")
-            return result
+    for f in changed_files:
+        config_subdir = f.split("/")[0]
+        affected = HARBOR_CONFIG_SERVICES.get(
+            config_subdir,
+            [config_subdir] if config_subdir in services else ["*"],
+        )
+        if "*" in affected:
+            return set(services)
+        changed.update(a for a in affected if a in services)
 
+    return changed
 
-def _cli_download(
-        args: argparse.Namespace,
-) -> pathlib.Path:
 
-    result = download(
-        url=args.url,
-        destination_directory=args.harbor_root_dir.joinpath(args.harbor_download),
+def container_status(
+        container: str,
+        docker: str,
+) -> str:
+    """Health status of a container (`healthy`, `unhealthy`, `starting`) or,
+    if it has no healthcheck, its state (`running`, `exited`, ...)."""
+
+    proc = subprocess.run(
+        [
+            docker,
+            "inspect",
+            "--format",
+            "{{if .State.Health}}{{.State.Health.Status}}{{else}}{{.State.Status}}{{end}}",
+            container,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True,
     )
 
-    return result
+    if proc.returncode != 0:
+        return "missing"
 
+    return proc.stdout.strip()
 
-def _cli_extract(
-        args: argparse.Namespace,
-) -> pathlib.Path:
 
-    result = extract(
-        extract_to=args.harbor_root_dir.joinpath(args.harbor_bin),
-        tar_file=args.tar_file,
-    )
+def wait_container_healthy(
+        container: str,
+        docker: str,
+        timeout: float = 120.0,
+        interval: float = 2.0,
+) -> str:
 
-    return result
+    deadline = time.monotonic() + timeout
 
+    while True:
+        status = container_status(container=container, docker=docker)
+        if status in ["healthy", "running"]:
+            return status
+        if time.monotonic() + interval > deadline:
+            raise HarborCLIError(
+                f"{container} not healthy after {timeout}s: {status}"
+            )
+        _logger.debug(f"{container}: {status}")
+        time.sleep(interval)
 
-def _cli_configure(
-        args: argparse.Namespace,
-) -> pathlib.Path:
 
-    harbor_yml_data: str = _configure(args=args)
+def compose_container_name(
+        compose: Dict,
+        service: str,
+) -> str:
 
-    result: pathlib.Path = configure(
-        destination_directory=args.harbor_root_dir.joinpath(args.harbor_bin),
-        overwrite=args.overwrite,
-        harbor_yml_data=harbor_yml_data,
-    )
+    container_name = (compose["services"][service] or {}).get("container_name")
 
-    return result
+    return container_name or f"{COMPOSE_PROJECT_NAME}-{service}-1"
 
 
-def _cli_install(
-        args: argparse.Namespace,
-) -> subprocess.CompletedProcess:
+def rolling_reload(
+        harbor_bin_dir: pathlib.Path,
+        record_only: bool = False,
+        health_timeout: float = 120.0,
+        interval: float = 2.0,
+        docker: str | None = None,
+) -> list[str]:
+    """Restart (recreate) only the services whose configuration under
+    `common/config/` changed since the last recorded snapshot,
+    one at a time in `depends_on` order, waiting for each to
+    become healthy before moving on to the next.
 
-    result: subprocess.CompletedProcess = prepare(
-        prepare_script=args.harbor_root_dir.joinpath(args.harbor_bin, args.harbor_prepare),
-        # config_file=None,  # args.config_file,
-    )
+    The snapshot is recorded in `HARBOR_CONFIG_STATE` (in
+    `harbor_bin_dir`); `record_only` only records it (i.e. on start).
+    Without a recorded snapshot, all services are restarted.
 
-    return result
+    Returns the restarted services.
+    """
 
+    docker = docker or shutil.which("docker")
 
-def _cli_systemd_install(
-        args: argparse.Namespace,
-) -> list:
+    harbor_bin_dir = harbor_bin_dir.expanduser().resolve()
+    state_file = harbor_bin_dir.joinpath(HARBOR_CONFIG_STATE)
 
-    result: list = systemd_install(
-        su_method=args.su_method,
-        outfile=args.outfile,
-        start=args.start,
-        enable=args.enable,
-        harbor_bin_dir=args.harbor_root_dir.joinpath(args.harbor_bin),
+    current: Dict[str, str] = config_snapshot(
+        config_dir=harbor_bin_dir.joinpath("common", "config"),
     )
 
-    return result
+    if record_only:
+        state_file.write_text(json.dumps(current, indent=2))
+        _logger.info(f"Recorded configuration snapshot to {state_file.as_posix()}.")
+        return []
 
+    compose: dict = compose_load(compose_file=harbor_bin_dir.joinpath("docker-compose.yml"))
+    order: list[str] = compose_service_order(compose=compose)
 
-def _cli_systemd_uninstall(
-        args: argparse.Namespace,
-) -> list:
+    if state_file.exists():
+        previous: Dict[str, str] = json.loads(state_file.read_text())
+        changed: set[str] = config_changed_services(
+            previous=previous,
+            current=current,
+            services=order,
+        )
+    else:
+        _logger.warning(f"{state_file.as_posix()} not found. Restarting all services.")
+        changed = set(order)
 
-    result: list = systemd_uninstall(
-        su_method=args.su_method,
+    restart: list[str] = [service for service in order if service in changed]
+
+    _logger.info(f"Services to restart: {restart}")
+
+    _cmd_harbor = compose_cmd(
+        harbor_bin_dir=harbor_bin_dir,
+        docker=docker,
     )
 
-    return result
+    for i, service in enumerate(restart, start=1):
+        start = time.monotonic()
+        # recreate instead of `restart`: a restarted container
+        # keeps its environment, i.e. `common/config/*/env`
+        # written by `prepare` would not be applied
+        subprocess.run([*_cmd_harbor, "up", "--detach", "--no-deps", "--force-recreate", service], check=True)
+        status = wait_container_healthy(
+            container=compose_container_name(compose=compose, service=service),
+            docker=docker,
+            timeout=health_timeout,
+            interval=interval,
+        )
+        print(f"[{i}/{len(restart)}] {service}: {status} ({time.monotonic() - start:.1f}s)")
 
+    state_file.write_text(json.dumps(current, indent=2))
 
-def _cli_systemd_status() -> list:
+    return restart
 
-    result: list = systemd_status()
 
-    return result
+def watchdog(
+        harbor_bin_dir: pathlib.Path,
+        host: str,
+        port: int,
+        interval: float = 30.0,
+        backoff_initial: float = 10.0,
+        backoff_max: float = 600.0,
+        grace_period: float = 300.0,
+        cycles: int | None = None,
+        docker: str | None = None,
+) -> list[Dict]:
+    """Every `interval` seconds, check the health of each Harbor
+    container and of the components reported by `/api/v2.0/health`
+    and restart only the unhealthy services. Repeated restarts of
+    the same service back off exponentially (`backoff_initial`
+    doubling up to `backoff_max`).
+
+    Nothing is restarted during the first `grace_period` seconds
+    (started alongside `docker compose up`, the containers are still
+    being created), unless all services became healthy before.
+
+    Recoveries are appended to HARBOR_WATCHDOG_JOURNAL (in
+    `harbor_bin_dir`). Runs forever unless `cycles` is given.
+
+    Returns the recovery records.
+    """
 
+    docker = docker or shutil.which("docker")
 
-def _cli_systemd_journalctl() -> list:
+    harbor_bin_dir = harbor_bin_dir.expanduser().resolve()
+    journal_file = harbor_bin_dir.joinpath(HARBOR_WATCHDOG_JOURNAL)
 
-    result: list = systemd_journalctl()
+    compose: dict = compose_load(compose_file=harbor_bin_dir.joinpath("docker-compose.yml"))
+    services: list[str] = compose_service_order(compose=compose)
 
-    return result
+    _cmd_harbor = compose_cmd(
+        harbor_bin_dir=harbor_bin_dir,
+        docker=docker,
+    )
 
+    # service: {"since": ..., "restarts": ..., "next_attempt": ...}
+    unhealthy_state: Dict[str, Dict] = {}
+    recoveries: list[Dict] = []
 
-def _cli_project_create(
-        args: argparse.Namespace,
-) -> list:
+    cycle = 0
+    grace_until = time.time() + grace_period
 
-    result: list = project_create(
-        host=args.host,
-        port=args.port,
-        user=args.user,
-        password=args.password,
-        project_name=args.project_name,
-    )
+    while cycles is None or cycle < cycles:
+        cycle += 1
+        now = time.time()
 
-    return result
+        statuses: Dict[str, str] = {
+            service: container_status(
+                container=compose_container_name(compose=compose, service=service),
+                docker=docker,
+            )
+            for service in services
+        }
 
+        try:
+            health: dict = harbor_health(host=host, port=port)
+            for component in health.get("components", []):
+                service = HARBOR_COMPONENT_SERVICES.get(component["name"])
+                if (
+                        service in statuses
+                        and component.get("status") != "healthy"
+                        and statuses[service] in ["healthy", "running"]
+                ):
+                    statuses[service] = f"component {component['status']}"
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError, ValueError) as e:
+            # core (or proxy) itself is down, the container status covers it
+            _logger.debug(f"/health: {e.__class__.__name__}")
+
+        unhealthy: Dict[str, str] = {
+            service: status for service, status in statuses.items()
+            if status not in ["healthy", "running", "starting"]
+        }
 
-def _cli_project_delete(
-        args: argparse.Namespace,
-) -> list:
+        if now < grace_until:
+            if unhealthy or "starting" in statuses.values():
+                _logger.debug(f"Grace period: {unhealthy}")
+                sd_notify(
+                    f"STATUS={len(services) - len(unhealthy)}/{len(services)} services healthy (starting)"
+                )
+                if cycles is None or cycle < cycles:
+                    time.sleep(interval)
+                continue
+            # everything is up, end the grace period early
+            grace_until = now
+
+        for service, state in list(unhealthy_state.items()):
+            if service not in unhealthy and statuses[service] != "starting":
+                record = {
+                    "service": service,
+                    "unhealthy_since": state["since"],
+                    "recovered": now,
+                    "recovery_seconds": round(now - state["since"], 3),
+                    "restarts": state["restarts"],
+                }
+                _logger.info(
+                    f"{service} recovered after {record['recovery_seconds']}s "
+                    f"({record['restarts']} restart(s))."
+                )
+                with open(journal_file, "a") as fa:
+                    fa.write(json.dumps(record) + "\n")
+                recoveries.append(record)
+                del unhealthy_state[service]
+
+        for service, status in unhealthy.items():
+            state = unhealthy_state.setdefault(
+                service,
+                {"since": now, "restarts": 0, "next_attempt": now},
+            )
 
-    result: list = project_delete(
-        host=args.host,
-        port=args.port,
-        user=args.user,
-        password=args.password,
-        project_name=args.project_name,
-    )
+            if now < state["next_attempt"]:
+                _logger.debug(f"{service}: {status}, backing off until {state['next_attempt']}")
+                continue
 
-    return result
+            _logger.warning(f"{service}: {status}. Restarting ({state['restarts'] + 1}).")
 
+            if status == "missing":
+                cmd = [*_cmd_harbor, "up", "--detach", service]
+            else:
+                cmd = [*_cmd_harbor, "restart", service]
 
-_formatter = argparse.ArgumentDefaultsHelpFormatter
+            proc = subprocess.run(cmd)
 
+            if proc.returncode != 0:
+                _logger.error(f"{' '.join(cmd)} failed with exit code {proc.returncode}.")
 
-def parse_args(args):
-    """Parse command line parameters
+            state["restarts"] += 1
+            state["next_attempt"] = now + min(
+                backoff_initial * 2 ** (state["restarts"] - 1),
+                backoff_max,
+            )
 
-    Args:
-      args (List[str]): command line parameters as list of strings
-          (for example  ``["--help"]``).
+        sd_notify(
+            f"STATUS={len(services) - len(unhealthy)}/{len(services)} services healthy"
+        )
 
-    Returns:
-      :obj:`argparse.Namespace`: command line parameters namespace
-    """
-    main_parser = argparse.ArgumentParser(
-        prog="OpenStudioLandscapes Harbor CLI",
-        description="A tool to facilitate Harbor setup and "
-                    "getting it up and running using systemd.",
-        formatter_class=_formatter,
-    )
-    main_parser.add_argument(
-        "--version",
+        if cycles is None or cycle < cycles:
+            time.sleep(interval)
+
+    return recoveries
+
+
+def systemd_unit_dict(
+        working_directory: pathlib.Path,
+        exec_start: typing.List[str],
+        exec_reload: typing.List[str],
+        exec_stop: typing.List[str],
+        unit_type: str = "simple",
+        service_extra: typing.Dict | None = None,
+) -> typing.Dict:
+    """`service_extra` is merged into the `[Service]` section.
+    Keys with a `None` value are removed from it."""
+
+    unit_dict = {
+        "Unit": {
+            "Description": "Harbor for OpenStudioLandscapes",
+            "Documentation": "https://github.com/michimussato/OpenStudioLandscapes/blob/main/wiki/guides/harbor.md",
+        },
+        "Service": {
+            "Type": unit_type,
+            "User": "root",
+            "Group": "root",
+            "Restart": "always",
+            "WorkingDirectory": working_directory.as_posix(),
+            "ExecStart": " ".join(exec_start),
+            "ExecReload": " ".join(exec_reload),
+            "ExecStop": " ".join(exec_stop),
+        },
+        "Install": {
+            "WantedBy": "multi-user.target",
+        },
+    }
+
+    for k, v in (service_extra or {}).items():
+        if v is None:
+            unit_dict["Service"].pop(k, None)
+        else:
+            unit_dict["Service"][k] = v
+
+    _logger.debug(unit_dict)
+
+    return unit_dict
+
+
+def systemd_install(
+        su_method: str,
+        outfile: pathlib.Path,
+        start: bool,
+        enable: bool,
+        harbor_bin_dir: pathlib.Path,
+        start_mode: str = START_MODES[0],
+        wait_ready_timeout: int | None = None,
+        host: str = OPENSTUDIOLANDSCAPES__HARBOR_HOSTNAME,
+        port: int = OPENSTUDIOLANDSCAPES__HARBOR_PORT,
+        docker: str | None = None,
+        stop_mode: str = STOP_MODES[0],
+        stop_timeout: int = 30,
+        timeout_stop_sec: int = 120,
+        reload_mode: str = RELOAD_MODES[0],
+        resource_profile_: str | None = None,
+        watchdog_interval: int | None = None,
+) -> list[str | Any]:
+    """Step 5
+
+    `start_mode`:
+      - `foreground`: `Type=simple` running `docker compose up`.
+        With `wait_ready_timeout`, an `ExecStartPost` polls
+        `/api/v2.0/health` so that the unit only becomes active
+        once Harbor is healthy.
+      - `wait`: `Type=oneshot` running `docker compose up --detach --wait`,
+        the unit becomes active once all containers are healthy.
+
+    `stop_mode`:
+      - `down`: `ExecStop` runs `docker compose down`.
+      - `stop`: `ExecStop` runs `docker compose stop --timeout <stop_timeout>`
+        and containers and networks are kept between restarts
+        (`docker compose up` reuses unchanged containers).
+        `TimeoutStopSec` is set to `timeout_stop_sec`.
+
+    `reload_mode`:
+      - `restart`: `ExecReload` runs `docker compose restart`.
+      - `rolling`: `ExecReload` runs `systemd reload --rolling`
+        (see `rolling_reload()`), `ExecStartPre` records the
+        configuration snapshot it compares against.
+
+    `resource_profile_` (see RESOURCE_PROFILES): writes SYSTEMD_SLICE
+    (CPUWeight, IOWeight, MemoryHigh, MemoryMax) and per-service limits
+    to COMPOSE_OVERRIDE, with all containers placed into the slice.
+
+    `watchdog_interval`: writes SYSTEMD_WATCHDOG_UNIT (bound to the
+    Harbor unit) running `systemd watchdog`, which restarts unhealthy
+    containers individually, and relaxes `Restart=always` to
+    `Restart=on-failure`.
+    """
+
+    outfile = pathlib.Path(outfile).expanduser().resolve()
+
+    _logger.debug(start)
+    _logger.debug(enable)
+    _logger.debug(start_mode)
+
+    if start_mode not in START_MODES:
+        raise HarborCLIError(f"Invalid start mode: {start_mode}. Choose from {START_MODES}.")
+
+    if stop_mode not in STOP_MODES:
+        raise HarborCLIError(f"Invalid stop mode: {stop_mode}. Choose from {STOP_MODES}.")
+
+    if reload_mode not in RELOAD_MODES:
+        raise HarborCLIError(f"Invalid reload mode: {reload_mode}. Choose from {RELOAD_MODES}.")
+
+    service_extra = {}
+    slice_file_tmp: pathlib.Path | None = None
+
+    if resource_profile_ is not None:
+        profile: dict = resource_profile(profile=resource_profile_)
+
+        compose_override_write(
+            harbor_bin_dir=harbor_bin_dir,
+            override=compose_override_resources(
+                profile=profile,
+                services=list(compose_load(harbor_bin_dir.joinpath("docker-compose.yml"))["services"]),
+            ),
+        )
+
+        slice_unit: configparser.ConfigParser = configparser.ConfigParser()
+        slice_unit.optionxform = str
+        slice_unit.read_dict(systemd_slice_dict(profile=profile))
+
+        slice_file_tmp = outfile.with_name(SYSTEMD_SLICE.name)
+        slice_file_tmp.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(slice_file_tmp, "w") as fw:
+            slice_unit.write(fw, space_around_delimiters=False)
+
+        service_extra.update(
+            {
+                "Slice": SYSTEMD_SLICE.name,
+            }
+        )
+
+    watchdog_file_tmp: pathlib.Path | None = None
+
+    if watchdog_interval is not None:
+        watchdog_unit: configparser.ConfigParser = configparser.ConfigParser()
+        watchdog_unit.optionxform = str
+        watchdog_unit.read_dict(
+            {
+                "Unit": {
+                    "Description": "Watchdog for Harbor for OpenStudioLandscapes",
+                    "BindsTo": SYSTEMD_UNIT.name,
+                    "After": SYSTEMD_UNIT.name,
+                },
+                "Service": {
+                    "Type": "simple",
+                    "User": "root",
+                    "Group": "root",
+                    "Restart": "on-failure",
+                    "RestartSec": "30",
+                    "ExecStart": " ".join(
+                        [
+                            *harbor_cli_cmd(host=host, port=port, harbor_bin_dir=harbor_bin_dir),
+                            "systemd",
+                            "watchdog",
+                            "--interval",
+                            str(watchdog_interval),
+                        ]
+                    ),
+                },
+                "Install": {
+                    "WantedBy": SYSTEMD_UNIT.name,
+                },
+            }
+        )
+
+        watchdog_file_tmp = outfile.with_name(SYSTEMD_WATCHDOG_UNIT.name)
+        watchdog_file_tmp.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(watchdog_file_tmp, "w") as fw:
+            watchdog_unit.write(fw, space_around_delimiters=False)
+
+        service_extra.update(
+            {
+                "Restart": "on-failure",
+            }
+        )
+
+    _cmd_harbor = compose_cmd(
+        harbor_bin_dir=harbor_bin_dir,
+        docker=docker,
+    )
+
+    unit_type = "simple"
+
+    if start_mode == "wait":
+        unit_type = "oneshot"
+        exec_start = [
+            *_cmd_harbor,
+            "up",
+            "--detach",
+            "--wait",
+            "--remove-orphans",
+        ]
+        service_extra.update(
+            {
+                "RemainAfterExit": "yes",
+                # Restart= is not allowed for oneshot services
+                # (the watchdog still works)
+                "Restart": None,
+                "TimeoutStartSec": str(wait_ready_timeout or 600),
+            }
+        )
+
+    else:
+        exec_start = [
+            *_cmd_harbor,
+            "up",
+            "--remove-orphans",
+        ]
+
+        if wait_ready_timeout is not None:
+            service_extra.update(
+                {
+                    "ExecStartPost": " ".join(
+                        [
+                            *harbor_cli_cmd(host=host, port=port),
+                            "systemd",
+                            "wait-ready",
+                            "--timeout",
+                            str(wait_ready_timeout),
+                        ]
+                    ),
+                    "TimeoutStartSec": str(wait_ready_timeout + 30),
+                }
+            )
+
+    if reload_mode == "rolling":
+        _cmd_harbor_cli = harbor_cli_cmd(
+            host=host,
+            port=port,
+            harbor_bin_dir=harbor_bin_dir,
+        )
+        exec_reload = [
+            *_cmd_harbor_cli,
+            "systemd",
+            "reload",
+            "--rolling",
+        ]
+        service_extra.update(
+            {
+                "ExecStartPre": " ".join(
+                    [
+                        *_cmd_harbor_cli,
+                        "systemd",
+                        "reload",
+                        "--record",
+                    ]
+                ),
+            }
+        )
+
+    else:
+        exec_reload = [
+            *_cmd_harbor,
+            "restart",
+        ]
+
+    if stop_mode == "stop":
+        exec_stop = [
+            *_cmd_harbor,
+            "stop",
+            "--timeout",
+            str(stop_timeout),
+        ]
+        service_extra.update(
+            {
+                "TimeoutStopSec": str(timeout_stop_sec),
+            }
+        )
+
+    else:
+        exec_stop = [
+            *_cmd_harbor,
+            "down",
+        ]
+
+    unit_dict: dict = systemd_unit_dict(
+        working_directory=harbor_bin_dir,
+        exec_start=exec_start,
+        exec_reload=exec_reload,
+        exec_stop=exec_stop,
+        unit_type=unit_type,
+        service_extra=service_extra,
+    )
+
+    unit: configparser.ConfigParser = configparser.ConfigParser()
+    # Change from case insensitive to case sensitive
+    # https://docs.python.org/3/library/configparser.html#configparser.ConfigParser.optionxform
+    unit.optionxform = str
+
+    unit.read_dict(unit_dict)
+
+    unit_file_tmp = outfile
+
+    unit_file_tmp.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(unit_file_tmp, "w") as fw:
+        unit.write(fw, space_around_delimiters=False)
+
+    with open(unit_file_tmp, "r") as fr:
+        unit_file_content = fr.read()
+
+    _logger.debug(unit_file_content)
+
+    copy_service = [
+        shutil.which("cp"),
+        unit_file_tmp.as_posix(),
+        SYSTEMD_UNIT.as_posix(),
+    ]
+
+    set_permissions = [
+        shutil.which("chmod"),
+        "644",
+        SYSTEMD_UNIT.as_posix(),
+    ]
+
+    daemon_reload = [
+        shutil.which("systemctl"),
+        "daemon-reload",
+    ]
+
+    systemctl_start = [
+        shutil.which("systemctl"),
+        "start",
+        SYSTEMD_UNIT.name,
+    ]
+
+    systemctl_enable = [
+        shutil.which("systemctl"),
+        "enable",
+        SYSTEMD_UNIT.name,
+    ]
+
+    if watchdog_file_tmp is not None:
+        systemctl_start.append(SYSTEMD_WATCHDOG_UNIT.name)
+        systemctl_enable.append(SYSTEMD_WATCHDOG_UNIT.name)
+
+    install_service = [
+        *copy_service,
+        "&&",
+        *set_permissions,
+        "&&",
+    ]
+
+    if slice_file_tmp is not None:
+        install_service.extend(
+            [
+                shutil.which("cp"),
+                slice_file_tmp.as_posix(),
+                SYSTEMD_SLICE.as_posix(),
+                "&&",
+                shutil.which("chmod"),
+                "644",
+                SYSTEMD_SLICE.as_posix(),
+                "&&",
+            ]
+        )
+
+    if watchdog_file_tmp is not None:
+        install_service.extend(
+            [
+                shutil.which("cp"),
+                watchdog_file_tmp.as_posix(),
+                SYSTEMD_WATCHDOG_UNIT.as_posix(),
+                "&&",
+                shutil.which("chmod"),
+                "644",
+                SYSTEMD_WATCHDOG_UNIT.as_posix(),
+                "&&",
+            ]
+        )
+
+    install_service.extend(
+        [
+            *daemon_reload,
+        ]
+    )
+
+    if start:
+        install_service.extend(
+            [
+                "&&",
+                *systemctl_start,
+            ]
+        )
+
+    if enable:
+        install_service.extend(
+            [
+                "&&",
+                *systemctl_enable,
+            ]
+        )
+
+    _logger.debug(f"{install_service = }")
+
+    sudo_bash_c = [
+        *_SU_METHODS[su_method],
+        *SHELL,
+    ]
+
+    cmd = [
+        *sudo_bash_c,
+        " ".join(install_service)
+    ]
+
+    # _logger.debug(f"{cmd = }")
+
+    # proc = subprocess.run(
+    #     [
+    #         *sudo_bash_c,
+    #         " ".join(install_service)
+    #     ],
+    #     shell=True,
+    #     check=True,
+    # )
+
+    _logger.info("Execute the following command manually:")
+    print(f"{' '.join(sudo_bash_c)} \"{' '.join(install_service)}\"")
+
+    return cmd
+
+
+def systemd_uninstall(
+        su_method: str,
+        harbor_bin_dir: pathlib.Path | None = None,
+) -> list[str | Any]:
+    """Also removes SYSTEMD_WATCHDOG_UNIT and SYSTEMD_SLICE (if
+    installed with a watchdog or a resource profile, respectively)
+    and, with `harbor_bin_dir`, the `cgroup_parent`
+    entries pointing at it from COMPOSE_OVERRIDE. Containers
+    only leave the slice once recreated (see `systemd_reset()`)."""
+
+    if harbor_bin_dir is not None:
+        compose_override_remove(
+            harbor_bin_dir=harbor_bin_dir,
+            key="cgroup_parent",
+        )
+
+    # not installed without --watchdog
+    systemctl_disable_watchdog = [
+        shutil.which("systemctl"),
+        "disable",
+        "--now",
+        SYSTEMD_WATCHDOG_UNIT.name,
+        "2>/dev/null",
+        "||",
+        "true",
+    ]
+
+    systemctl_disable = [
+        shutil.which("systemctl"),
+        "disable",
+        "--now",
+        SYSTEMD_UNIT.name,
+    ]
+
+    remove_service = [
+        shutil.which("rm"),
+        SYSTEMD_UNIT.as_posix(),
+    ]
+
+    remove_watchdog = [
+        shutil.which("rm"),
+        "-f",
+        SYSTEMD_WATCHDOG_UNIT.as_posix(),
+    ]
+
+    remove_slice = [
+        shutil.which("rm"),
+        "-f",
+        SYSTEMD_SLICE.as_posix(),
+    ]
+
+    daemon_reload = [
+        shutil.which("systemctl"),
+        "daemon-reload",
+    ]
+
+    uninstall_service = [
+        *systemctl_disable_watchdog,
+        "&&",
+        *systemctl_disable,
+        "&&",
+        *remove_service,
+        "&&",
+        *remove_watchdog,
+        "&&",
+        *remove_slice,
+        "&&",
+        *daemon_reload,
+    ]
+
+    _logger.debug(f"{uninstall_service = }")
+
+    sudo_bash_c = [
+        *_SU_METHODS[su_method],
+        *SHELL,
+    ]
+
+    cmd = [
+        *sudo_bash_c,
+        " ".join(uninstall_service)
+    ]
+
+    # _logger.debug(f"{cmd = }")
+
+    # proc = subprocess.run(
+    #     [
+    #         *sudo_bash_c,
+    #         " ".join(install_service)
+    #     ],
+    #     shell=True,
+    #     check=True,
+    # )
+
+    _logger.info("Execute the following command manually:")
+    print(f"{' '.join(sudo_bash_c)} \"{' '.join(uninstall_service)}\"")
+
+    return cmd
+
+
+def systemd_reset(
+        su_method: str,
+        harbor_bin_dir: pathlib.Path,
+        start: bool,
+        docker: str | None = None,
+) -> list[str | Any]:
+    """Stop the unit and remove all Harbor containers and
+    networks (`docker compose down --remove-orphans`)."""
+
+    systemctl_stop = [
+        shutil.which("systemctl"),
+        "stop",
+        SYSTEMD_UNIT.name,
+    ]
+
+    compose_down = [
+        *compose_cmd(harbor_bin_dir=harbor_bin_dir, docker=docker),
+        "down",
+        "--remove-orphans",
+    ]
+
+    reset_service = [
+        *systemctl_stop,
+        "&&",
+        *compose_down,
+    ]
+
+    if start:
+        reset_service.extend(
+            [
+                "&&",
+                shutil.which("systemctl"),
+                "start",
+                SYSTEMD_UNIT.name,
+            ]
+        )
+
+    _logger.debug(f"{reset_service = }")
+
+    sudo_bash_c = [
+        *_SU_METHODS[su_method],
+        *SHELL,
+    ]
+
+    cmd = [
+        *sudo_bash_c,
+        " ".join(reset_service)
+    ]
+
+    _logger.info("Execute the following command manually:")
+    print(f"{' '.join(sudo_bash_c)} \"{' '.join(reset_service)}\"")
+
+    return cmd
+
+
+def benchmark_restart(
+        harbor_bin_dir: pathlib.Path,
+        cycles: int = 3,
+        stop_modes: typing.List[str] = STOP_MODES,
+        docker: str | None = None,
+) -> Dict[str, list[float]]:
+    """Measure the restart latency (stop + `up --detach --wait`)
+    of each stop mode. Harbor has to be stopped via systemd
+    first, this bounces the containers `cycles` times per mode
+    and takes them down again afterwards (also on failure), so
+    that they do not run outside the unit.
+
+    Returns a dict of `stop_mode: [seconds, ...]`.
+    """
+
+    if cycles < 1:
+        raise HarborCLIError(f"Invalid number of cycles: {cycles}.")
+
+    for stop_mode in stop_modes:
+        if stop_mode not in STOP_MODES:
+            raise HarborCLIError(f"Invalid stop mode: {stop_mode}. Choose from {STOP_MODES}.")
+
+    _cmd_harbor = compose_cmd(
+        harbor_bin_dir=harbor_bin_dir,
+        docker=docker,
+    )
+
+    cmd_up = [
+        *_cmd_harbor,
+        "up",
+        "--detach",
+        "--wait",
+        "--remove-orphans",
+    ]
+
+    results: Dict[str, list[float]] = {}
+
+    try:
+        subprocess.run(cmd_up, check=True)
+
+        for stop_mode in stop_modes:
+            cmd_stop = [*_cmd_harbor, stop_mode]
+
+            results[stop_mode] = []
+
+            for i in range(cycles):
+                start = time.monotonic()
+                subprocess.run(cmd_stop, check=True)
+                subprocess.run(cmd_up, check=True)
+                duration = time.monotonic() - start
+                results[stop_mode].append(duration)
+                _logger.info(f"{stop_mode} [{i + 1}/{cycles}]: {duration:.2f}s")
+    finally:
+        _logger.info("Taking the containers down again (start Harbor via systemd).")
+        proc = subprocess.run([*_cmd_harbor, "down"])
+        if proc.returncode != 0:
+            _logger.error(f"docker compose down failed with exit code {proc.returncode}.")
+
+    for stop_mode, durations in results.items():
+        durations_sorted = sorted(durations)
+        print(
+            f"{stop_mode}: "
+            f"min {durations_sorted[0]:.2f}s, "
+            f"median {durations_sorted[len(durations_sorted) // 2]:.2f}s, "
+            f"max {durations_sorted[-1]:.2f}s "
+            f"({len(durations)} restarts)"
+        )
+
+    return results
+
+
+def systemd_reload() -> list[str | Any]:
+
+    systemctl_reload = [
+        shutil.which("systemctl"),
+        "reload",
+        SYSTEMD_UNIT.name,
+    ]
+
+    _logger.debug(f"{systemctl_reload = }")
+
+    sudo_bash_c = [
+        # *SU_METHOD,
+        *SHELL,
+    ]
+
+    cmd = [
+        *sudo_bash_c,
+        " ".join(systemctl_reload)
+    ]
+
+    _logger.info("Execute the following command manually:")
+    print(f"{' '.join(sudo_bash_c)} \"{' '.join(systemctl_reload)}\"")
+
+    return cmd
+
+
+def systemd_status() -> list[str | Any]:
+
+    systemctl_status = [
+        shutil.which("systemctl"),
+        "--full",
+        "--no-pager",
+        SYSTEMD_UNIT.name,
+    ]
+
+    _logger.debug(f"{systemctl_status = }")
+
+    sudo_bash_c = [
+        # *SU_METHOD,
+        *SHELL,
+    ]
+
+    cmd = [
+        *sudo_bash_c,
+        " ".join(systemctl_status)
+    ]
+
+    # _logger.debug(f"{cmd = }")
+
+    # proc = subprocess.run(
+    #     [
+    #         *sudo_bash_c,
+    #         " ".join(install_service)
+    #     ],
+    #     shell=True,
+    #     check=True,
+    # )
+
+    _logger.info("Execute the following command manually:")
+    print(f"{' '.join(sudo_bash_c)} \"{' '.join(systemctl_status)}\"")
+
+    return cmd
+
+
+def systemd_journalctl() -> list[str | Any]:
+
+    journalctl_fu = [
+        shutil.which("journalctl"),
+        "--follow",
+        "--unit",
+        SYSTEMD_UNIT.name,
+    ]
+
+    _logger.debug(f"{journalctl_fu = }")
+
+    sudo_bash_c = [
+        # *SU_METHOD,
+        *SHELL,
+    ]
+
+    cmd = [
+        *sudo_bash_c,
+        " ".join(journalctl_fu)
+    ]
+
+    # proc = subprocess.run(
+    #     [
+    #         *sudo_bash_c,
+    #         " ".join(install_service)
+    #     ],
+    #     shell=True,
+    #     check=True,
+    # )
+
+    _logger.info("Execute the following command manually:")
+    print(f"{' '.join(sudo_bash_c)} \"{' '.join(journalctl_fu)}\"")
+
+    return cmd
+
+
+def project_create_request(
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        project_name: str,
+        public: bool = True,
+        storage_limit: int | None = None,
+        registry_id: int | None = None,
+) -> requests.PreparedRequest:
+    """`storage_limit` in bytes, -1 for unlimited (Harbor's
+    default quota if `None`). With `registry_id` (see
+    `registry_endpoint_ensure()`), the project is a proxy
+    cache of that registry."""
+
+    def project_create_request_dict(project_name_) -> Dict:
+        _project_create_dict: dict = {
+            "endpoint": f"http://{host}:{port}{OPENSTUDIOLANDSCAPES__HARBOR_API_ENDPOINT}/projects",
+            # "endpoint": f"{OPENSTUDIOLANDSCAPES__HARBOR_API_ENDPOINT.format(host=host, port=port)}/projects",
+            "method": RequestMethod.POST.value,
+            "headers": {
+                "accept": "application/json",
+                "authorization": f"Basic {auth_tokenized(user=user, password=password)}",
+                "X-Resource-Name-In-Location": "false",
+                "Content-Type": "application/json",
+            },
+            "payload": {
+                # json encoding happens automatically.
+                # no need to wrap this dict in json.dumps()
+                # https://stackoverflow.com/questions/25242262/dump-to-json-adds-additional-double-quotes-and-escaping-of-quotes
+                "json": {
+                    "project_name": project_name_,
+                    "public": public,
+                },
+            }
+        }
+        if storage_limit is not None:
+            _project_create_dict["payload"]["json"]["storage_limit"] = storage_limit
+        if registry_id is not None:
+            _project_create_dict["payload"]["json"]["registry_id"] = registry_id
+        return _project_create_dict
+
+    def project_create_request_prepared(
+            request_dict: Dict,
+    ) -> requests.PreparedRequest:
+
+        payload = request_dict["payload"]
+
+        _logger.debug(f"{payload = }")
+
+        request: requests.Request = requests.Request(
+            method=request_dict["method"],
+            url=request_dict["endpoint"],
+            headers=request_dict["headers"],
+            **payload,
+        )
+
+        return request.prepare()
+
+    prepared_request = project_create_request_prepared(
+        request_dict=project_create_request_dict(
+            project_name_=project_name
+        ),
+    )
+
+    return prepared_request
+
+
+def project_create(
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        project_name: str,
+        client: HarborClient | None = None,
+        public: bool = True,
+        storage_limit: int | None = None,
+        registry_id: int | None = None,
+) -> list[str | Any] | Dict:
+    """Without a `client`, print the curl command to
+    create the project (and return it). With a `client`,
+    existing projects are skipped (`HEAD` first)."""
+
+    prepared_request = project_create_request(
+        host=host,
+        port=port,
+        user=user,
+        password=password,
+        project_name=project_name,
+        public=public,
+        storage_limit=storage_limit,
+        registry_id=registry_id,
+    )
+
+    if client is not None:
+        if client.project_exists(project_name=project_name):
+            _logger.info(f"Project {project_name} already exists. Skipped.")
+            return {
+                "project_name": project_name,
+                "status_code": 200,
+                "skipped": True,
+            }
+        response: requests.Response = client.send(prepared_request)
+        client.project_existence(project_name=project_name, exists=True)
+        _logger.info(f"Project {project_name} created.")
+        return {
+            "project_name": project_name,
+            "status_code": response.status_code,
+            "location": response.headers.get("Location"),
+        }
+
+    # sudo_bash_c = [
+    #     # *_SU_METHODS[su_method],
+    #     *SHELL,
+    # ]
+
+    cmd: list = curlify(prepared_request)
+
+    _logger.info("Execute the following command manually:")
+    print(f"{' '.join(cmd)}")
+
+    return cmd
+
+
+def project_delete(
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        project_name: str,
+        client: HarborClient | None = None,
+) -> list[str | Any] | Dict:
+    """Without a `client`, print the curl command to
+    delete the project (and return it). With a `client`,
+    missing projects are skipped (`HEAD` first)."""
+
+    def project_delete_request_dict(project_name_) -> Dict:
+        _project_delete_dict: dict = {
+            "endpoint": f"http://{host}:{port}{OPENSTUDIOLANDSCAPES__HARBOR_API_ENDPOINT}/projects/{project_name_}",
+            "method": RequestMethod.DELETE.value,
+            "headers": {
+                "accept": "application/json",
+                "X-Is-Resource-Name": "false",
+                "authorization": f"Basic {auth_tokenized(user=user, password=password)}",
+            },
+            "payload": {
+                # # json encoding happens automatically.
+                # # no need to wrap this dict in json.dumps()
+                # # https://stackoverflow.com/questions/25242262/dump-to-json-adds-additional-double-quotes-and-escaping-of-quotes
+                # "json": {
+                #     "project_name": project_name_,
+                #     "public": True,
+                # },
+            }
+        }
+        return _project_delete_dict
+
+    def project_delete_request_prepared(
+            request_dict: Dict,
+    ) -> requests.PreparedRequest:
+
+        # payload = request_dict["payload"]
+        #
+        # _logger.debug(f"{payload = }")
+
+        request: requests.Request = requests.Request(
+            method=request_dict["method"],
+            url=request_dict["endpoint"],
+            headers=request_dict["headers"],
+            # **payload,
+        )
+
+        return request.prepare()
+
+    prepared_request = project_delete_request_prepared(
+        request_dict=project_delete_request_dict(
+            project_name_=project_name
+        ),
+    )
+
+    if client is not None:
+        if not client.project_exists(project_name=project_name):
+            _logger.info(f"Project {project_name} does not exist. Skipped.")
+            return {
+                "project_name": project_name,
+                "status_code": 404,
+                "skipped": True,
+            }
+        response: requests.Response = client.send(prepared_request)
+        client.project_existence(project_name=project_name, exists=False)
+        _logger.info(f"Project {project_name} deleted.")
+        return {
+            "project_name": project_name,
+            "status_code": response.status_code,
+        }
+
+    # sudo_bash_c = [
+    #     # *_SU_METHODS[su_method],
+    #     *SHELL,
+    # ]
+
+    cmd: list = curlify(prepared_request)
+
+    _logger.info("Execute the following command manually:")
+    print(f"{' '.join(cmd)}")
+
+    return cmd
+
+
+def projects_manifest(
+        manifest: pathlib.Path | None,
+) -> list[Dict]:
+    """Read the projects to create from a YAML file, either
+
+        projects:
+          - name: show-a
+            public: false
+            storage_limit: 500G
+          - show-b
+
+    or a plain list. Without `manifest` (or `-`), project names
+    are read from stdin, one per line."""
+
+    if manifest is None or manifest.as_posix() == "-":
+        entries: list = [
+            line.strip() for line in sys.stdin
+            if line.strip() and not line.strip().startswith("#")
+        ]
+    else:
+        manifest = manifest.expanduser().resolve()
+        if not manifest.exists():
+            raise HarborCLIError(
+                f"{manifest.as_posix()} not found."
+            ) from FileNotFoundError(manifest)
+        with open(manifest, "r") as fr:
+            entries = yaml.safe_load(fr) or []
+        if isinstance(entries, dict):
+            entries = entries.get("projects") or []
+
+    projects: list[Dict] = []
+
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"name": entry}
+        if "name" not in entry:
+            raise HarborCLIError(f"Project without name: {entry}")
+        if entry.get("storage_limit") is not None:
+            entry["storage_limit"] = parse_size(entry["storage_limit"])
+        projects.append(entry)
+
+    return projects
+
+
+def project_apply(
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        projects: typing.List[Dict],
+        client: HarborClient,
+        concurrency: int = 8,
+) -> list[Dict]:
+    """Create `projects` (see `projects_manifest()`),
+    `concurrency` at a time. Existing projects are skipped.
+
+    Returns one record per project (see `bulk_execute()`)."""
+
+    def _create(project: Dict) -> Dict:
+        return project_create(
+            host=host,
+            port=port,
+            user=user,
+            password=password,
+            project_name=project["name"],
+            client=client,
+            public=project.get("public", True),
+            storage_limit=project.get("storage_limit"),
+        )
+
+    start = time.monotonic()
+
+    with client.caching_existence():
+        records: list[Dict] = bulk_execute(
+            func=_create,
+            items=projects,
+            concurrency=concurrency,
+            label=lambda project: project["name"],
+        )
+
+    _logger.info(bulk_summary(records=records, duration=time.monotonic() - start))
+    if client.concurrency is not None:
+        _logger.info(f"Concurrency: {client.concurrency.stats()}")
+
+    return records
+
+
+def project_apply_curl(
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        projects: typing.List[Dict],
+        config_file: pathlib.Path,
+        parallel_max: int = 8,
+) -> list[str]:
+    """Print (and return) the single `curl --parallel` command
+    creating `projects` (see `curl_batch()`). Existing projects
+    are reported as 409 by curl."""
+
+    cmd: list = curl_batch(
+        requests_=(
+            project_create_request(
+                host=host,
+                port=port,
+                user=user,
+                password=password,
+                project_name=project["name"],
+                public=project.get("public", True),
+                storage_limit=project.get("storage_limit"),
+            )
+            for project in projects
+        ),
+        config_file=config_file,
+        parallel_max=parallel_max,
+    )
+
+    _logger.info("Execute the following command manually:")
+    print(f"{' '.join(cmd)}")
+
+    return cmd
+
+
+def repository_path(
+        project_name: str,
+        repository_name: str,
+) -> str:
+    """`/projects/{project_name}/repositories/{repository_name}`
+
+    `repository_name` is relative to the project (`library/a/b` → `a/b`)
+    and its slashes have to be double encoded (`a%252Fb`)."""
+
+    repository_name = repository_name.removeprefix(f"{project_name}/")
+    quoted = urllib.parse.quote(urllib.parse.quote(repository_name, safe=""), safe="")
+
+    return f"/projects/{urllib.parse.quote(project_name, safe='')}/repositories/{quoted}"
+
+
+def iter_projects(
+        client: HarborClient,
+        query: str | None = None,
+) -> typing.Iterator[Dict]:
+    """`GET /projects`, `query` as in Harbor's `q` (i.e. `name=~show`)."""
+
+    for project in client.iter_pages(
+            path="/projects",
+            params={"q": query} if query else None,
+    ):
+        yield {
+            "name": project["name"],
+            "project_id": project.get("project_id"),
+            "public": (project.get("metadata") or {}).get("public") == "true",
+            "repo_count": project.get("repo_count", 0),
+            "creation_time": project.get("creation_time"),
+        }
+
+
+def iter_repositories(
+        client: HarborClient,
+        project_name: str | None = None,
+) -> typing.Iterator[Dict]:
+    """`GET /projects/{project_name}/repositories`
+    (`GET /repositories` across all projects without `project_name`)."""
+
+    path = "/repositories"
+    if project_name is not None:
+        path = f"/projects/{urllib.parse.quote(project_name, safe='')}/repositories"
+
+    for repository in client.iter_pages(path=path):
+        yield {
+            "name": repository["name"],
+            "artifact_count": repository.get("artifact_count", 0),
+            "pull_count": repository.get("pull_count", 0),
+            "update_time": repository.get("update_time"),
+        }
+
+
+def iter_artifacts(
+        client: HarborClient,
+        project_name: str,
+        repository_name: str | None = None,
+) -> typing.Iterator[Dict]:
+    """Artifacts (with their tags) of `repository_name`, or of all
+    repositories of `project_name`."""
+
+    if repository_name is None:
+        repository_names: typing.Iterable[str] = (
+            repository["name"] for repository in iter_repositories(client=client, project_name=project_name)
+        )
+    else:
+        repository_names = [repository_name]
+
+    for repository_name_ in repository_names:
+        repository_name_ = f"{project_name}/{repository_name_.removeprefix(f'{project_name}/')}"
+
+        for artifact in client.iter_pages(
+                path=f"{repository_path(project_name=project_name, repository_name=repository_name_)}/artifacts",
+                params={"with_tag": "true", "with_label": "false", "with_scan_overview": "false"},
+        ):
+            yield {
+                "repository": repository_name_,
+                "digest": artifact["digest"],
+                "size": artifact.get("size", 0),
+                "push_time": artifact.get("push_time"),
+                "pull_time": artifact.get("pull_time"),
+                "tags": [tag["name"] for tag in artifact.get("tags") or []],
+            }
+
+
+def iter_tags(
+        client: HarborClient,
+        project_name: str,
+        repository_name: str,
+        reference: str,
+) -> typing.Iterator[Dict]:
+    """Tags of the artifact `reference` (digest or tag)."""
+
+    path = (
+        f"{repository_path(project_name=project_name, repository_name=repository_name)}"
+        f"/artifacts/{urllib.parse.quote(reference, safe='')}/tags"
+    )
+
+    for tag in client.iter_pages(path=path):
+        yield {
+            "name": tag["name"],
+            "push_time": tag.get("push_time"),
+            "pull_time": tag.get("pull_time"),
+            "immutable": tag.get("immutable", False),
+        }
+
+
+def artifact_reference(
+        artifact: str,
+) -> tuple[str, str, str]:
+    """`show-dev/comp/nuke:v1` → (`show-dev`, `comp/nuke`, `v1`),
+    `show-dev/comp@sha256:...` → (`show-dev`, `comp`, `sha256:...`).
+
+    References artifacts of this Harbor (no registry prefix),
+    `latest` if no tag or digest is given."""
+
+    artifact = artifact.strip()
+
+    if "@" in artifact:
+        repository, reference = artifact.split("@", 1)
+    else:
+        repository, reference = artifact, "latest"
+        name = repository.rsplit("/", 1)[-1]
+        if ":" in name:
+            repository, reference = repository.rsplit(":", 1)
+
+    project_name, _, repository_name = repository.partition("/")
+
+    if not project_name or not repository_name or not reference:
+        raise HarborCLIError(f"Invalid artifact: {artifact}. Expected `project/repository[:tag|@digest]`.")
+
+    return project_name, repository_name, reference
+
+
+def artifact_copy(
+        client: HarborClient,
+        source: str,
+        project_name: str,
+        repository_name: str | None = None,
+) -> Dict:
+    """Copy the artifact `source` (see `artifact_reference()`)
+    into the project `project_name` (same repository name unless
+    `repository_name`) with Harbor's server-side copy
+    (`POST .../artifacts?from=`): no layers are transferred
+    through the client.
+
+    The copy is skipped if the digest already exists in the target
+    repository; a tag `source` refers to is added if missing there.
+    `status`: `copied`, `tagged` or `exists`."""
+
+    source_project_name, source_repository_name, reference = artifact_reference(artifact=source)
+    repository_name = repository_name or source_repository_name
+    source_path: str = repository_path(project_name=source_project_name, repository_name=source_repository_name)
+    target_path: str = repository_path(project_name=project_name, repository_name=repository_name)
+
+    artifact: Dict = client.request(
+        method=RequestMethod.GET,
+        path=f"{source_path}/artifacts/{urllib.parse.quote(reference, safe='')}",
+        params={"with_tag": "false"},
+    )
+    digest: str = artifact["digest"]
+
+    record: Dict = {
+        "source": source,
+        "target": f"{project_name}/{repository_name}@{digest}",
+        "digest": digest,
+        "size": artifact.get("size", 0),
+        "status": "copied",
+    }
+
+    try:
+        target_tags: list[str] = [
+            tag["name"]
+            for tag in client.request(
+                method=RequestMethod.GET,
+                path=f"{target_path}/artifacts/{urllib.parse.quote(digest, safe='')}",
+                params={"with_tag": "true"},
+            ).get("tags") or []
+        ]
+    except HarborNotFoundError:
+        try:
+            client.request(
+                method=RequestMethod.POST,
+                path=f"{target_path}/artifacts",
+                # by digest: the tag might move in the meantime
+                params={"from": f"{source_project_name}/{source_repository_name}@{digest}"},
+            )
+            _logger.info(f"{source} copied to {record['target']}.")
+            return record
+        except HarborConflictError:
+            # copied concurrently (i.e. by another tag of the same digest)
+            target_tags = [tag["name"] for tag in iter_tags(
+                client=client,
+                project_name=project_name,
+                repository_name=repository_name,
+                reference=digest,
+            )]
+
+    record["status"] = "exists"
+
+    if not reference.startswith("sha256:") and reference not in target_tags:
+        try:
+            client.request(
+                method=RequestMethod.POST,
+                path=f"{target_path}/artifacts/{urllib.parse.quote(digest, safe='')}/tags",
+                json={"name": reference},
+            )
+        except HarborConflictError:
+            # tagged concurrently
+            return record
+        record["status"] = "tagged"
+        _logger.info(f"{record['target']} tagged {reference}.")
+    else:
+        _logger.info(f"{record['target']} exists, skipped.")
+
+    return record
+
+
+def artifact_promote(
+        client: HarborClient,
+        sources: typing.List[str],
+        project_name: str,
+        concurrency: int = 8,
+) -> list[Dict]:
+    """`artifact_copy()` of all `sources` into `project_name`,
+    `concurrency` at a time (see `bulk_execute()`)."""
+
+    start = time.monotonic()
+
+    records: list[Dict] = bulk_execute(
+        func=lambda source: artifact_copy(
+            client=client,
+            source=source,
+            project_name=project_name,
+        ),
+        items=sources,
+        concurrency=concurrency,
+    )
+
+    _logger.info(bulk_summary(records=records, duration=time.monotonic() - start))
+
+    return records
+
+
+def project_summary(
+        client: HarborClient,
+        project_name: str,
+) -> Dict:
+    """`GET /projects/{project_name}/summary` (repo count, quota)."""
+
+    return client.request(
+        method=RequestMethod.GET,
+        path=f"/projects/{urllib.parse.quote(project_name, safe='')}/summary",
+        headers={"X-Is-Resource-Name": "true"},
+    )
+
+
+def repository_delete(
+        client: HarborClient,
+        project_name: str,
+        repository_name: str,
+) -> Dict:
+    """Delete a repository (and all its artifacts)."""
+
+    client.request(
+        method=RequestMethod.DELETE,
+        path=repository_path(project_name=project_name, repository_name=repository_name),
+    )
+
+    return {
+        "repository": repository_name,
+    }
+
+
+def gc_trigger(
+        client: HarborClient,
+        delete_untagged: bool = False,
+        workers: int = 1,
+        dry_run: bool = False,
+) -> Dict:
+    """Trigger a garbage collection run now (`dry_run`:
+    only estimate what it would free).
+    Returns its `id` (`None` if Harbor did not tell)."""
+
+    response: requests.Response = client.send(
+        client.prepare(
+            method=RequestMethod.POST,
+            path="/system/gc/schedule",
+            json={
+                "schedule": {"type": "Manual"},
+                "parameters": {
+                    "delete_untagged": delete_untagged,
+                    "workers": workers,
+                    **({"dry_run": True} if dry_run else {}),
+                },
+            },
+        )
+    )
+
+    location: str = response.headers.get("Location", "")
+    gc_id = location.rstrip("/").rsplit("/", 1)[-1] if location else None
+
+    _logger.info(f"Garbage collection {gc_id} triggered{' (dry run)' if dry_run else ''}.")
+
+    return {
+        "id": int(gc_id) if gc_id and gc_id.isdigit() else None,
+        "location": location or None,
+    }
+
+
+def gc_schedule(
+        client: HarborClient,
+        cron: str | None,
+        delete_untagged: bool = False,
+        workers: int = 1,
+) -> Dict:
+    """Schedule the garbage collection (`cron` with or without
+    the leading seconds field, i.e. `0 3 * * 6`), or remove the
+    schedule (`None`). Returns the schedule."""
+
+    if cron is None:
+        schedule: Dict = {"type": "None"}
+    else:
+        fields = cron.split()
+        if len(fields) == 5:
+            # Harbor's cron starts with seconds
+            fields = ["0", *fields]
+        if len(fields) != 6:
+            raise HarborCLIError(f"Invalid cron expression: {cron}.")
+        schedule = {"type": "Custom", "cron": " ".join(fields)}
+
+    current: Dict = client.request(method=RequestMethod.GET, path="/system/gc/schedule") or {}
+    exists = (current.get("schedule") or {}).get("type") not in [None, "", "None"]
+
+    client.request(
+        # POST fails if a schedule exists, PUT if none does
+        method=RequestMethod.PUT if exists else RequestMethod.POST,
+        path="/system/gc/schedule",
+        json={
+            "schedule": schedule,
+            "parameters": {
+                "delete_untagged": delete_untagged,
+                "workers": workers,
+            },
+        },
+    )
+
+    _logger.info(f"Garbage collection schedule: {schedule}")
+
+    return schedule
+
+
+def gc_log_parse(
+        log: str,
+) -> Dict:
+    """Blobs, manifests and bytes (to be) freed according
+    to the garbage collection log (`None` if not found)."""
+
+    objects = GC_LOG_OBJECTS.findall(log)
+    freed = GC_LOG_FREED.findall(log)
+
+    return {
+        "blobs": int(objects[-1][0]) if objects else None,
+        "manifests": int(objects[-1][1]) if objects else None,
+        "bytes_freed": parse_size(f"{freed[-1][0]}{freed[-1][1]}") if freed else None,
+    }
+
+
+def _gc_record(
+        job: Dict,
+) -> Dict:
+
+    try:
+        parameters: Dict = json.loads(job.get("job_parameters") or "{}")
+    except ValueError:
+        parameters = {}
+
+    duration: float | None = None
+    if job.get("creation_time") and job.get("update_time"):
+        duration = (
+            datetime.datetime.fromisoformat(job["update_time"])
+            - datetime.datetime.fromisoformat(job["creation_time"])
+        ).total_seconds()
+
+    status: str = (job.get("job_status") or "").lower()
+
+    return {
+        "id": job["id"],
+        "status": status,
+        "trigger": (job.get("schedule") or {}).get("type"),
+        "dry_run": bool(parameters.get("dry_run", False)),
+        "delete_untagged": bool(parameters.get("delete_untagged", False)),
+        "creation_time": job.get("creation_time"),
+        "update_time": job.get("update_time"),
+        # until the last update for runs in progress
+        "duration": duration,
+    }
+
+
+def gc_status(
+        client: HarborClient,
+        gc_id: int,
+        with_log: bool = True,
+) -> Dict:
+    """The garbage collection run `gc_id` (see `_gc_record()`),
+    with the numbers of its log once it is done."""
+
+    record: Dict = _gc_record(client.request(method=RequestMethod.GET, path=f"/system/gc/{gc_id}"))
+
+    if with_log and record["status"] in GC_DONE_STATUSES:
+        record.update(
+            gc_log_parse(log=client.request(method=RequestMethod.GET, path=f"/system/gc/{gc_id}/log") or "")
+        )
+
+    return record
+
+
+def gc_wait(
+        client: HarborClient,
+        gc_id: int,
+        timeout: float = 3600.0,
+        interval: float = 1.0,
+        max_interval: float = 30.0,
+) -> Dict:
+    """Poll `gc_status()` until the run is done, backing off
+    from `interval` to `max_interval` seconds (runs take
+    seconds to hours)."""
+
+    deadline = time.monotonic() + timeout
+
+    while True:
+        record: Dict = gc_status(client=client, gc_id=gc_id)
+
+        if record["status"] in GC_DONE_STATUSES:
+            _logger.info(
+                f"Garbage collection {gc_id}: {record['status']} after {record['duration']}s, "
+                f"{format_size(record.get('bytes_freed') or 0)} "
+                f"{'could be ' if record['dry_run'] else ''}freed."
+            )
+            return record
+
+        if time.monotonic() + interval > deadline:
+            raise HarborCLIError(f"Garbage collection {gc_id} not done after {timeout}s ({record['status']}).")
+
+        _logger.debug(f"Garbage collection {gc_id}: {record['status']}, next check in {interval:.1f}s")
+        time.sleep(interval)
+        interval = min(interval * 1.5, max_interval)
+
+
+def gc_run(
+        client: HarborClient,
+        dry_run: bool = False,
+        delete_untagged: bool = False,
+        workers: int = 1,
+        wait: bool = True,
+        timeout: float = 3600.0,
+) -> Dict:
+    """Trigger a garbage collection and (with `wait`)
+    return its result (see `gc_wait()`)."""
+
+    triggered: Dict = gc_trigger(
+        client=client,
+        delete_untagged=delete_untagged,
+        workers=workers,
+        dry_run=dry_run,
+    )
+
+    if not wait:
+        return triggered
+
+    if triggered["id"] is None:
+        raise HarborCLIError("Harbor did not return the id of the garbage collection run.")
+
+    return gc_wait(client=client, gc_id=triggered["id"], timeout=timeout)
+
+
+def gc_history(
+        client: HarborClient,
+        limit: int = 20,
+        with_log: bool = True,
+        concurrency: int = 8,
+) -> list[Dict]:
+    """The last `limit` garbage collection runs, newest first
+    (with the numbers of their logs, fetched concurrently)."""
+
+    jobs: list[Dict] = []
+
+    for job in client.iter_pages(
+            path="/system/gc",
+            params={"sort": "-creation_time"},
+            page_size=max(1, min(limit, HARBOR_PAGE_SIZE_MAX)),
+    ):
+        jobs.append(job)
+        if len(jobs) >= limit:
+            break
+
+    records: list[Dict] = [_gc_record(job) for job in jobs]
+
+    if with_log:
+        done = [record for record in records if record["status"] in GC_DONE_STATUSES]
+
+        def _log(record: Dict) -> str:
+            return client.request(method=RequestMethod.GET, path=f"/system/gc/{record['id']}/log") or ""
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            for record, log in zip(done, executor.map(_log, done)):
+                record.update(gc_log_parse(log=log))
+
+    return records
+
+
+def project_purge(
+        host: str,
+        port: int,
+        user: str,
+        password: str,
+        project_name: str,
+        client: HarborClient,
+        concurrency: int = 8,
+        gc: bool = False,
+) -> Dict:
+    """Delete all repositories of the project (`concurrency`
+    at a time), then the project itself and, with `gc`,
+    trigger a garbage collection. The garbage collection is
+    registry wide, so it leaves untagged artifacts (of all
+    projects) alone.
+
+    `bytes_freed` is the storage the project used according
+    to its quota. The blobs are only removed from disk by the
+    garbage collection (and only if no other project
+    references them)."""
+
+    if not client.project_exists(project_name=project_name):
+        _logger.info(f"Project {project_name} does not exist. Skipped.")
+        return {
+            "project_name": project_name,
+            "status_code": 404,
+            "skipped": True,
+        }
+
+    summary: Dict = project_summary(client=client, project_name=project_name)
+    bytes_used: int = max(0, ((summary.get("quota") or {}).get("used") or {}).get("storage", 0))
+
+    _logger.info(
+        f"Purging project {project_name}: "
+        f"{summary.get('repo_count', 0)} repositories, {bytes_used} bytes."
+    )
+
+    records: list[Dict] = bulk_execute(
+        func=lambda repository_name: repository_delete(
+            client=client,
+            project_name=project_name,
+            repository_name=repository_name,
+        ),
+        # a list: the pages must not shift while deleting
+        items=[repository["name"] for repository in iter_repositories(client=client, project_name=project_name)],
+        concurrency=concurrency,
+    )
+
+    failed: list[Dict] = [record for record in records if not record["ok"]]
+
+    if failed:
+        errors = "; ".join(f"{record['item']}: {record['error']}" for record in failed)
+        raise HarborCLIError(
+            f"Project {project_name} not deleted, {len(failed)} of {len(records)} "
+            f"repositories could not be deleted: {errors}"
+        )
+
+    result: Dict = project_delete(
+        host=host,
+        port=port,
+        user=user,
+        password=password,
+        project_name=project_name,
+        client=client,
+    )
+
+    result.update(
+        {
+            "repositories": len(records),
+            "bytes_freed": bytes_used,
+        }
+    )
+
+    if gc:
+        result["gc"] = gc_trigger(client=client, delete_untagged=False)
+
+    _logger.info(f"Project {project_name} purged ({len(records)} repositories, {bytes_used} bytes).")
+
+    return result
+
+
+def quota_report(
+        client: HarborClient,
+        concurrency: int = 8,
+        sort: str = QUOTA_SORT_KEYS[0],
+) -> list[Dict]:
+    """Storage quota of all projects (`/quotas`), sorted by
+    `sort` (see QUOTA_SORT_KEYS), most critical first.
+
+    `usage` (used/hard) and `headroom` (hard - used) are `None`
+    for unlimited quotas."""
+
+    if sort not in QUOTA_SORT_KEYS:
+        raise HarborCLIError(f"Invalid sort key: {sort}. Choose from {QUOTA_SORT_KEYS}.")
+
+    records: list[Dict] = []
+
+    for quota in client.fetch_pages(
+            path="/quotas",
+            params={"reference": "project"},
+            concurrency=concurrency,
+    ):
+        hard: int = (quota.get("hard") or {}).get("storage", -1)
+        used: int = (quota.get("used") or {}).get("storage", 0)
+        limited = hard >= 0
+
+        records.append(
+            {
+                "project_name": (quota.get("ref") or {}).get("name"),
+                "hard": hard,
+                "used": used,
+                "usage": round(used / hard, 4) if limited and hard else (1.0 if limited else None),
+                "headroom": hard - used if limited else None,
+            }
+        )
+
+    # unlimited quotas last
+    sort_keys: Dict[str, typing.Callable[[Dict], tuple]] = {
+        "usage": lambda r: (r["usage"] is None, -(r["usage"] or 0), r["headroom"] or 0),
+        "headroom": lambda r: (r["headroom"] is None, r["headroom"] or 0, -(r["usage"] or 0)),
+        "used": lambda r: (-r["used"],),
+    }
+
+    records.sort(key=sort_keys[sort])
+
+    return records
+
+
+def quota_report_format(
+        records: typing.List[Dict],
+        format_: str = QUOTA_REPORT_FORMATS[0],
+) -> str:
+    """Render `quota_report()` as table, JSON or CSV."""
+
+    fields: list[str] = ["project_name", "hard", "used", "usage", "headroom"]
+
+    if format_ == "json":
+        return json.dumps(records, indent=2)
+
+    if format_ == "csv":
+        stream = io.StringIO()
+        writer = csv.DictWriter(stream, fieldnames=fields, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(records)
+        return stream.getvalue().rstrip("\n")
+
+    if format_ == "table":
+        rows: list[list[str]] = [["PROJECT", "HARD", "USED", "USAGE", "HEADROOM"]]
+        for record in records:
+            rows.append(
+                [
+                    str(record["project_name"]),
+                    format_size(record["hard"]),
+                    format_size(record["used"]),
+                    "-" if record["usage"] is None else f"{record['usage'] * 100:.1f}%",
+                    "-" if record["headroom"] is None else format_size(max(0, record["headroom"])),
+                ]
+            )
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        return "\n".join(
+            "  ".join(cell.ljust(width) if i == 0 else cell.rjust(width) for i, (cell, width) in enumerate(zip(row, widths)))
+            for row in rows
+        )
+
+    raise HarborCLIError(f"Invalid format: {format_}. Choose from {QUOTA_REPORT_FORMATS}.")
+
+
+def registry_endpoint_ensure(
+        client: HarborClient,
+        endpoint: str,
+        credential: str | None = None,
+        type_: str | None = None,
+) -> Dict:
+    """The registry endpoint (`/registries`) with the URL
+    `endpoint` (`docker.io`, `https://registry.example.com`, ...,
+    see REGISTRY_ENDPOINTS), created if missing.
+
+    `credential`: `access_key:access_secret` for the upstream
+    registry (anonymous otherwise). `type_`: the Harbor registry
+    adapter (i.e. `harbor`), guessed from `endpoint` if `None`."""
+
+    host = urllib.parse.urlsplit(endpoint if "://" in endpoint else f"https://{endpoint}").netloc
+    guessed_type, url = REGISTRY_ENDPOINTS.get(
+        host,
+        ("docker-registry", endpoint if "://" in endpoint else f"https://{endpoint}"),
+    )
+    type_ = type_ or guessed_type
+    url = url.rstrip("/")
+
+    for registry in client.iter_pages(path="/registries"):
+        if registry.get("url", "").rstrip("/") == url:
+            _logger.info(f"Registry endpoint {registry['name']} ({url}) exists.")
+            return {
+                "id": registry["id"],
+                "name": registry["name"],
+                "url": url,
+                "type": registry.get("type", type_),
+                "created": False,
+            }
+
+    name = host.replace(":", "-")
+    payload: Dict = {
+        "name": name,
+        "type": type_,
+        "url": url,
+        "insecure": False,
+    }
+
+    if credential is not None:
+        access_key, _, access_secret = credential.partition(":")
+        payload["credential"] = {
+            "type": "basic",
+            "access_key": access_key,
+            "access_secret": access_secret,
+        }
+
+    response: requests.Response = client.send(
+        client.prepare(
+            method=RequestMethod.POST,
+            path="/registries",
+            json=payload,
+        )
+    )
+
+    registry_id = response.headers.get("Location", "").rstrip("/").rsplit("/", 1)[-1]
+
+    if not registry_id.isdigit():
+        raise HarborCLIError(f"Registry endpoint {name} created, but Harbor did not return its id.")
+
+    _logger.info(f"Registry endpoint {name} ({url}) created.")
+
+    return {
+        "id": int(registry_id),
+        "name": name,
+        "url": url,
+        "type": type_,
+        "created": True,
+    }
+
+
+def parse_image_reference(
+        image: str,
+) -> tuple[str, str]:
+    """`nginx:1.27` → (`library/nginx`, `1.27`),
+    `docker.io/grafana/grafana@sha256:...` → (`grafana/grafana`, `sha256:...`).
+
+    The registry (if any) is dropped: the repository is pulled
+    through a proxy cache project of that registry. Single
+    component names are Docker Hub official images (`library/`)."""
+
+    image = image.strip()
+
+    if "@" in image:
+        repository, reference = image.split("@", 1)
+    else:
+        repository, reference = image, "latest"
+        name = repository.rsplit("/", 1)[-1]
+        if ":" in name:
+            repository, reference = repository.rsplit(":", 1)
+
+    components = repository.split("/")
+    if len(components) > 1 and ("." in components[0] or ":" in components[0] or components[0] == "localhost"):
+        components = components[1:]
+    if len(components) == 1:
+        components = ["library", *components]
+
+    return "/".join(components), reference
+
+
+def proxy_cache_warm_image(
+        client: HarborClient,
+        project_name: str,
+        image: str,
+        platform: str | None = "linux/amd64",
+        blobs: bool = False,
+) -> Dict:
+    """Pull the manifest (list) of `image` through the proxy
+    cache project `project_name`, the manifest of `platform`
+    (all platforms if `None`) and, with `blobs`, its config
+    and layers, so that Harbor caches them."""
+
+    repository, reference = parse_image_reference(image)
+    path = f"/{project_name}/{repository}"
+
+    def _manifest(reference_: str) -> tuple[Dict, requests.Response]:
+        response_ = client.send(
+            client.prepare_registry(
+                method=RequestMethod.GET,
+                path=f"{path}/manifests/{reference_}",
+                headers={"Accept": ", ".join(MANIFEST_MEDIA_TYPES)},
+            )
+        )
+        return response_.json(), response_
+
+    manifest, response = _manifest(reference)
+    media_type: str = manifest.get("mediaType") or response.headers.get("Content-Type", "")
+
+    record: Dict = {
+        "image": image,
+        "digest": response.headers.get("Docker-Content-Digest"),
+        "media_type": media_type,
+        "manifests": 1,
+        "blobs": 0,
+        "bytes": 0,
+    }
+
+    manifests: list[Dict] = [manifest]
+
+    if media_type in MANIFEST_INDEX_MEDIA_TYPES:
+        manifests = []
+        for descriptor in manifest.get("manifests", []):
+            descriptor_platform = descriptor.get("platform") or {}
+            os_arch = f"{descriptor_platform.get('os')}/{descriptor_platform.get('architecture')}"
+            if platform is not None and platform != os_arch:
+                continue
+            manifests.append(_manifest(descriptor["digest"])[0])
+            record["manifests"] += 1
+
+    if blobs:
+        for manifest_ in manifests:
+            for descriptor in [manifest_.get("config"), *manifest_.get("layers", [])]:
+                if not descriptor:
+                    continue
+                response = client.send(
+                    client.prepare_registry(
+                        method=RequestMethod.GET,
+                        path=f"{path}/blobs/{descriptor['digest']}",
+                    ),
+                    stream=True,
+                )
+                with response:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        record["bytes"] += len(chunk)
+                record["blobs"] += 1
+
+    return record
+
+
+def proxy_cache_warm(
+        client: HarborClient,
+        project_name: str,
+        images: typing.List[str],
+        concurrency: int = 8,
+        platform: str | None = "linux/amd64",
+        blobs: bool = False,
+) -> list[Dict]:
+    """`proxy_cache_warm_image()` for all `images`,
+    `concurrency` at a time (see `bulk_execute()`)."""
+
+    start = time.monotonic()
+
+    records: list[Dict] = bulk_execute(
+        func=lambda image: proxy_cache_warm_image(
+            client=client,
+            project_name=project_name,
+            image=image,
+            platform=platform,
+            blobs=blobs,
+        ),
+        items=images,
+        concurrency=concurrency,
+    )
+
+    _logger.info(bulk_summary(records=records, duration=time.monotonic() - start))
+
+    return records
+
+
+def images_list(
+        images_file: pathlib.Path | None,
+) -> list[str]:
+    """Image references, one per line (`#` comments), from
+    `images_file` or stdin (`None` or `-`)."""
+
+    if images_file is None or images_file.as_posix() == "-":
+        lines: typing.Iterable[str] = sys.stdin
+    else:
+        images_file = images_file.expanduser().resolve()
+        if not images_file.exists():
+            raise HarborCLIError(
+                f"{images_file.as_posix()} not found."
+            ) from FileNotFoundError(images_file)
+        lines = images_file.read_text().splitlines()
+
+    return [line.strip() for line in lines if line.strip() and not line.strip().startswith("#")]
+
+
+def retention_manifest(
+        manifest: pathlib.Path,
+) -> list[Dict]:
+    """Read retention policies from a YAML file:
+
+        policies:
+          - projects: ["show-*"]       # project name patterns
+            schedule: "0 3 * * *"      # optional, cron
+            rules:
+              - template: latestPushedK  # see RETENTION_TEMPLATES
+                value: 10
+                tags: "**"               # doublestar pattern
+                exclude_tags: false      # tags NOT matching `tags`
+                untagged: true           # untagged artifacts match, too
+                repositories: "**"
+                exclude_repositories: false
+
+    A single policy may be given without the `policies` list.
+    An artifact is retained if any rule retains it, all other
+    artifacts of the repositories matched by the rules are
+    deleted."""
+
+    manifest = manifest.expanduser().resolve()
+    if not manifest.exists():
+        raise HarborCLIError(
+            f"{manifest.as_posix()} not found."
+        ) from FileNotFoundError(manifest)
+
+    with open(manifest, "r") as fr:
+        data = yaml.safe_load(fr) or {}
+
+    policies: list[Dict] = data.get("policies", [data]) if isinstance(data, dict) else data
+
+    for policy in policies:
+        if not policy.get("projects") or not policy.get("rules"):
+            raise HarborCLIError(f"Retention policy without projects or rules: {policy}")
+        if isinstance(policy["projects"], str):
+            policy["projects"] = [policy["projects"]]
+        for rule in policy["rules"]:
+            if rule.get("template") not in RETENTION_TEMPLATES:
+                raise HarborCLIError(
+                    f"Invalid retention template: {rule.get('template')}. "
+                    f"Choose from {list(RETENTION_TEMPLATES)}."
+                )
+            if RETENTION_TEMPLATES[rule["template"]] is not None and not isinstance(rule.get("value"), int):
+                raise HarborCLIError(f"Retention rule {rule['template']} requires an integer value.")
+
+    return policies
+
+
+def doublestar_match(
+        pattern: str,
+        value: str,
+) -> bool:
+    """Harbor's (doublestar) selector patterns: `**` matches
+    across `/`, `*` and `?` do not, `{a,b}` alternatives."""
+
+    regex = ""
+    i = 0
+
+    while i < len(pattern):
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "{" and "}" in pattern[i:]:
+            end = pattern.index("}", i)
+            regex += "(?:" + "|".join(re.escape(a) for a in pattern[i + 1:end].split(",")) + ")"
+            i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+
+    return re.fullmatch(regex, value) is not None
+
+
+def retention_policy(
+        policy: Dict,
+        project_id: int,
+) -> Dict:
+    """The `/retentions` payload of a `retention_manifest()` policy."""
+
+    rules: list[Dict] = []
+
+    for rule in policy["rules"]:
+        param = RETENTION_TEMPLATES[rule["template"]]
+        rules.append(
+            {
+                "action": "retain",
+                "template": rule["template"],
+                "params": {param: rule["value"]} if param else {},
+                "tag_selectors": [
+                    {
+                        "kind": "doublestar",
+                        "decoration": "excludes" if rule.get("exclude_tags") else "matches",
+                        "pattern": rule.get("tags", "**"),
+                        "extras": json.dumps({"untagged": rule.get("untagged", True)}),
+                    }
+                ],
+                "scope_selectors": {
+                    "repository": [
+                        {
+                            "kind": "doublestar",
+                            "decoration": "repoExcludes" if rule.get("exclude_repositories") else "repoMatches",
+                            "pattern": rule.get("repositories", "**"),
+                        }
+                    ]
+                },
+            }
+        )
+
+    schedule: str = policy.get("schedule") or ""
+    if len(schedule.split()) == 5:
+        # Harbor's cron starts with seconds
+        schedule = f"0 {schedule}"
+
+    return {
+        "algorithm": "or",
+        "rules": rules,
+        "trigger": {
+            "kind": "Schedule",
+            "settings": {"cron": schedule},
+        },
+        "scope": {
+            "level": "project",
+            "ref": project_id,
+        },
+    }
+
+
+def retention_project_apply(
+        client: HarborClient,
+        project_name: str,
+        policy: Dict,
+) -> Dict:
+    """Create or update (if the project has one) the
+    retention policy of the project."""
+
+    project: Dict = client.request(
+        method=RequestMethod.GET,
+        path=f"/projects/{urllib.parse.quote(project_name, safe='')}",
+        headers={"X-Is-Resource-Name": "true"},
+    )
+
+    payload: Dict = retention_policy(policy=policy, project_id=project["project_id"])
+    retention_id = (project.get("metadata") or {}).get("retention_id")
+
+    if retention_id:
+        client.request(method=RequestMethod.PUT, path=f"/retentions/{retention_id}", json=payload)
+        _logger.info(f"Retention policy {retention_id} of {project_name} updated.")
+        return {"project_name": project_name, "retention_id": int(retention_id), "created": False}
+
+    response: requests.Response = client.send(
+        client.prepare(method=RequestMethod.POST, path="/retentions", json=payload)
+    )
+    retention_id = response.headers.get("Location", "").rstrip("/").rsplit("/", 1)[-1]
+    _logger.info(f"Retention policy {retention_id} of {project_name} created.")
+
+    return {
+        "project_name": project_name,
+        "retention_id": int(retention_id) if retention_id.isdigit() else None,
+        "created": True,
+    }
+
+
+def retention_projects(
+        client: HarborClient,
+        policies: typing.List[Dict],
+) -> list[tuple[str, Dict]]:
+    """(project name, policy) of all projects matched by the
+    `projects` patterns of `policies` (the first policy wins)."""
+
+    matched: Dict[str, Dict] = {}
+
+    for project in iter_projects(client=client):
+        for policy in policies:
+            if any(fnmatch.fnmatchcase(project["name"], pattern) for pattern in policy["projects"]):
+                matched.setdefault(project["name"], policy)
+                break
+
+    return list(matched.items())
+
+
+def retention_apply(
+        client: HarborClient,
+        policies: typing.List[Dict],
+        concurrency: int = 8,
+        simulate: bool = False,
+) -> list[Dict]:
+    """Apply `policies` (see `retention_manifest()`) to all
+    matching projects, `concurrency` at a time. With `simulate`,
+    only compute what they would delete (`retention_simulate()`)."""
+
+    func = retention_simulate if simulate else retention_project_apply
+
+    start = time.monotonic()
+
+    records: list[Dict] = bulk_execute(
+        func=lambda item: func(client=client, project_name=item[0], policy=item[1]),
+        items=retention_projects(client=client, policies=policies),
+        concurrency=concurrency,
+        label=lambda item: item[0],
+    )
+
+    _logger.info(bulk_summary(records=records, duration=time.monotonic() - start))
+
+    return records
+
+
+def _retention_rule_matches(
+        rule: Dict,
+        artifact: Dict,
+) -> bool:
+
+    repository = artifact["repository"].split("/", 1)[-1]
+    repository_match = doublestar_match(rule.get("repositories", "**"), repository)
+    if repository_match == bool(rule.get("exclude_repositories")):
+        return False
+
+    if not artifact["tags"]:
+        return rule.get("untagged", True)
+
+    tag_pattern = rule.get("tags", "**")
+    if rule.get("exclude_tags"):
+        return any(not doublestar_match(tag_pattern, tag) for tag in artifact["tags"])
+    return any(doublestar_match(tag_pattern, tag) for tag in artifact["tags"])
+
+
+def _retention_retained(
+        rule: Dict,
+        artifacts: typing.List[Dict],
+        now: datetime.datetime,
+) -> set[str]:
+    """Digests of the `artifacts` (of one repository) retained by `rule`."""
+
+    candidates = [artifact for artifact in artifacts if _retention_rule_matches(rule=rule, artifact=artifact)]
+
+    def _time(value: str | None) -> datetime.datetime:
+        if not value:
+            return datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+        return datetime.datetime.fromisoformat(value)
+
+    template = rule["template"]
+
+    if template == "always":
+        retained = candidates
+    elif template in ["latestPushedK", "latestPulledN"]:
+        key = "push_time" if template == "latestPushedK" else "pull_time"
+        retained = sorted(candidates, key=lambda a: _time(a[key]), reverse=True)[:rule["value"]]
+    else:
+        key = "push_time" if template == "nDaysSinceLastPush" else "pull_time"
+        since = now - datetime.timedelta(days=rule["value"])
+        retained = [artifact for artifact in candidates if _time(artifact[key]) >= since]
+
+    return {artifact["digest"] for artifact in retained}
+
+
+def retention_simulate(
+        client: HarborClient,
+        project_name: str,
+        policy: Dict,
+        now: datetime.datetime | None = None,
+) -> Dict:
+    """What `policy` would delete from the project, computed
+    locally from the streamed artifact listing (one repository
+    in memory at a time), nothing is changed on the server.
+
+    `retained` of a rule counts the artifacts it retains on its
+    own; an artifact is deleted if no rule retains it."""
+
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+
+    result: Dict = {
+        "project_name": project_name,
+        "artifacts": 0,
+        "tags": 0,
+        "removed_artifacts": 0,
+        "removed_tags": 0,
+        "removed_bytes": 0,
+        "rules": [{"template": rule["template"], "value": rule.get("value"), "retained": 0} for rule in policy["rules"]],
+    }
+
+    for _, group in itertools.groupby(
+            iter_artifacts(client=client, project_name=project_name),
+            key=lambda artifact: artifact["repository"],
+    ):
+        artifacts: list[Dict] = list(group)
+
+        result["artifacts"] += len(artifacts)
+        result["tags"] += sum(len(artifact["tags"]) for artifact in artifacts)
+
+        repository = artifacts[0]["repository"].split("/", 1)[-1]
+        in_scope = any(
+            doublestar_match(rule.get("repositories", "**"), repository) != bool(rule.get("exclude_repositories"))
+            for rule in policy["rules"]
+        )
+        if not in_scope:
+            continue
+
+        retained: set[str] = set()
+        for rule, rule_result in zip(policy["rules"], result["rules"]):
+            retained_ = _retention_retained(rule=rule, artifacts=artifacts, now=now)
+            rule_result["retained"] += len(retained_)
+            retained |= retained_
+
+        for artifact in artifacts:
+            if artifact["digest"] not in retained:
+                result["removed_artifacts"] += 1
+                result["removed_tags"] += len(artifact["tags"])
+                result["removed_bytes"] += artifact["size"]
+
+    return result
+
+
+def replication_policy(
+        name: str,
+        remote_registry_id: int,
+        direction: str = REPLICATION_DIRECTIONS[0],
+        dest_namespace: str | None = None,
+        name_filter: str | None = None,
+        tag_filter: str | None = None,
+        resource_filter: str | None = None,
+        trigger: str = REPLICATION_TRIGGERS[0],
+        cron: str | None = None,
+        speed: int = -1,
+        override: bool = True,
+        deletion: bool = False,
+        enabled: bool = True,
+) -> Dict:
+    """The `/replication/policies` payload.
+
+    `name_filter`/`tag_filter` are doublestar patterns
+    (`library/**`, `v*`), `resource_filter` `image` or
+    `artifact`. `speed`: bandwidth limit of each task in KiB/s
+    (-1 unlimited), `cron` for `scheduled` triggers."""
+
+    if direction not in REPLICATION_DIRECTIONS:
+        raise HarborCLIError(f"Invalid direction: {direction}. Choose from {REPLICATION_DIRECTIONS}.")
+    if trigger not in REPLICATION_TRIGGERS:
+        raise HarborCLIError(f"Invalid trigger: {trigger}. Choose from {REPLICATION_TRIGGERS}.")
+    if (trigger == "scheduled") != (cron is not None):
+        raise HarborCLIError("A cron expression is required for (and only for) scheduled triggers.")
+
+    if cron is not None and len(cron.split()) == 5:
+        # Harbor's cron starts with seconds
+        cron = f"0 {cron}"
+
+    filters: list[Dict] = []
+    if name_filter:
+        filters.append({"type": "name", "value": name_filter})
+    if tag_filter:
+        filters.append({"type": "tag", "value": tag_filter, "decoration": "matches"})
+    if resource_filter:
+        filters.append({"type": "resource", "value": resource_filter})
+
+    remote: Dict = {"id": remote_registry_id}
+
+    return {
+        "name": name,
+        "src_registry": remote if direction == "pull" else None,
+        "dest_registry": remote if direction == "push" else None,
+        "dest_namespace": dest_namespace,
+        "filters": filters,
+        "trigger": {
+            "type": trigger,
+            "trigger_settings": {"cron": cron or ""},
+        },
+        "speed": speed,
+        "override": override,
+        "deletion": deletion,
+        "enabled": enabled,
+    }
+
+
+def replication_policy_find(
+        client: HarborClient,
+        name: str,
+) -> Dict | None:
+
+    for policy in client.iter_pages(path="/replication/policies", params={"name": name}):
+        # `name` is a fuzzy filter
+        if policy["name"] == name:
+            return policy
+
+    return None
+
+
+def replication_policy_apply(
+        client: HarborClient,
+        policy: Dict,
+) -> Dict:
+    """Create the replication policy (see `replication_policy()`)
+    or update the one with the same name."""
+
+    existing: Dict | None = replication_policy_find(client=client, name=policy["name"])
+
+    if existing is not None:
+        client.request(method=RequestMethod.PUT, path=f"/replication/policies/{existing['id']}", json=policy)
+        _logger.info(f"Replication policy {policy['name']} ({existing['id']}) updated.")
+        return {"id": existing["id"], "name": policy["name"], "created": False}
+
+    response: requests.Response = client.send(
+        client.prepare(method=RequestMethod.POST, path="/replication/policies", json=policy)
+    )
+    policy_id = response.headers.get("Location", "").rstrip("/").rsplit("/", 1)[-1]
+    _logger.info(f"Replication policy {policy['name']} ({policy_id}) created.")
+
+    return {
+        "id": int(policy_id) if policy_id.isdigit() else None,
+        "name": policy["name"],
+        "created": True,
+    }
+
+
+def iter_replication_policies(
+        client: HarborClient,
+) -> typing.Iterator[Dict]:
+
+    for policy in client.iter_pages(path="/replication/policies"):
+        yield {
+            "id": policy["id"],
+            "name": policy["name"],
+            "direction": "pull" if policy.get("src_registry") else "push",
+            "remote": (policy.get("src_registry") or policy.get("dest_registry") or {}).get("url"),
+            "trigger": (policy.get("trigger") or {}).get("type"),
+            "speed": policy.get("speed", -1),
+            "filters": {f["type"]: f["value"] for f in policy.get("filters") or []},
+            "enabled": policy.get("enabled", False),
+        }
+
+
+def _replication_policy_get(
+        client: HarborClient,
+        name: str,
+) -> Dict:
+
+    policy: Dict | None = replication_policy_find(client=client, name=name)
+
+    if policy is None:
+        raise HarborCLIError(f"Replication policy {name} not found.")
+
+    return policy
+
+
+def replication_execution_wait(
+        client: HarborClient,
+        execution_id: int,
+        timeout: float = 3600.0,
+        interval: float = 1.0,
+        max_interval: float = 30.0,
+) -> Dict:
+    """Poll the execution until it is done, backing off
+    from `interval` to `max_interval` seconds."""
+
+    deadline = time.monotonic() + timeout
+
+    while True:
+        execution: Dict = client.request(method=RequestMethod.GET, path=f"/replication/executions/{execution_id}")
+        status: str = (execution.get("status") or "").lower()
+
+        if status in REPLICATION_DONE_STATUSES:
+            _logger.info(f"Replication execution {execution_id}: {status}.")
+            return execution
+
+        if time.monotonic() + interval > deadline:
+            raise HarborCLIError(f"Replication execution {execution_id} not done after {timeout}s ({status}).")
+
+        _logger.debug(f"Replication execution {execution_id}: {status}, next check in {interval:.1f}s")
+        time.sleep(interval)
+        interval = min(interval * 1.5, max_interval)
+
+
+def _replication_task_artifacts(
+        task: Dict,
+        direction: str,
+) -> list[tuple[str, str]]:
+    """(repository, reference) replicated by `task`, on this Harbor's
+    side (the source of push, the destination of pull replications)."""
+
+    resource: str = task.get("src_resource" if direction == "push" else "dst_resource") or ""
+    match = REPLICATION_TASK_RESOURCE.match(resource)
+
+    if match is None:
+        return []
+
+    references = [r.strip() for r in (match.group("references") or "").split(",") if r.strip()]
+
+    return [(match.group("repository"), reference) for reference in references]
+
+
+def _replication_execution_record(
+        client: HarborClient,
+        execution: Dict,
+        direction: str,
+        speed: int,
+        executor: ThreadPoolExecutor,
+        artifacts_cache: Dict[tuple[str, str], Dict | None],
+) -> Dict:
+    """`execution` with its effective throughput (see
+    `replication_status()`). The artifacts looked up are
+    kept in `artifacts_cache` (for the next execution)."""
+
+    def _artifact(artifact: tuple[str, str]) -> Dict | None:
+        repository, reference = artifact
+        project_name, _, repository_name = repository.partition("/")
+        try:
+            result: dict = client.request(
+                method=RequestMethod.GET,
+                path=f"{repository_path(project_name=project_name, repository_name=repository_name)}"
+                     f"/artifacts/{urllib.parse.quote(reference, safe='')}",
+            )
+        except HarborNotFoundError:
+            # deleted since
+            return None
+        return {"digest": result.get("digest"), "size": result.get("size", 0)}
+
+    tasks: list[Dict] = list(
+        client.iter_pages(path=f"/replication/executions/{execution['id']}/tasks")
+    )
+
+    artifacts: list[tuple[str, str]] = []
+    for task in tasks:
+        if (task.get("status") or "").lower() == "succeed" and task.get("operation", "copy") == "copy":
+            artifacts.extend(_replication_task_artifacts(task=task, direction=direction))
+    artifacts = list(dict.fromkeys(artifacts))
+
+    missing = [artifact for artifact in artifacts if artifact not in artifacts_cache]
+    artifacts_cache.update(zip(missing, executor.map(_artifact, missing)))
+
+    # several tags (`repo:[v1,v1.0]`) of one digest are one artifact
+    sizes: Dict[str, int] = {
+        artifacts_cache[artifact]["digest"] or f"{artifact[0]}:{artifact[1]}": artifacts_cache[artifact]["size"]
+        for artifact in artifacts
+        if artifacts_cache[artifact] is not None
+    }
+    unknown_size: int = sum(1 for artifact in artifacts if artifacts_cache[artifact] is None)
+
+    duration: float | None = None
+    if execution.get("start_time"):
+        end = (
+            datetime.datetime.fromisoformat(execution["end_time"])
+            if execution.get("end_time") and not execution["end_time"].startswith("0001")
+            else datetime.datetime.now(datetime.timezone.utc)
+        )
+        duration = (end - datetime.datetime.fromisoformat(execution["start_time"])).total_seconds()
+
+    bytes_: int = sum(sizes.values())
+    throughput = bytes_ / duration if duration else None
+
+    return {
+        "id": execution["id"],
+        "status": (execution.get("status") or "").lower(),
+        "trigger": execution.get("trigger"),
+        "start_time": execution.get("start_time"),
+        "end_time": execution.get("end_time"),
+        "tasks": len(tasks),
+        "succeed": execution.get("succeed", 0),
+        "failed": execution.get("failed", 0),
+        "artifacts": len(sizes) + unknown_size,
+        "bytes": bytes_,
+        "unknown_size": unknown_size,
+        "duration": duration,
+        "throughput": throughput,
+        "speed": speed * 1024 if speed > 0 else None,
+        "utilization": round(throughput / (speed * 1024), 3) if throughput and speed > 0 else None,
+    }
+
+
+def replication_status(
+        client: HarborClient,
+        name: str,
+        limit: int = 10,
+        concurrency: int = 8,
+) -> list[Dict]:
+    """The last `limit` executions of the replication policy
+    `name`, newest first, with their effective throughput:
+    the size of the replicated artifacts (looked up on this
+    Harbor, as tasks do not report bytes) over the execution's
+    duration.
+
+    `utilization` relates the throughput to the policy's
+    `speed` limit (which applies per task)."""
+
+    policy: Dict = _replication_policy_get(client=client, name=name)
+    direction = "pull" if policy.get("src_registry") else "push"
+
+    executions: list[Dict] = []
+    for execution in client.iter_pages(
+            path="/replication/executions",
+            params={"policy_id": policy["id"], "sort": "-start_time"},
+            page_size=max(1, min(limit, HARBOR_PAGE_SIZE_MAX)),
+    ):
+        executions.append(execution)
+        if len(executions) >= limit:
+            break
+
+    artifacts_cache: Dict[tuple[str, str], Dict | None] = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        records: list[Dict] = [
+            _replication_execution_record(
+                client=client,
+                execution=execution,
+                direction=direction,
+                speed=policy.get("speed", -1),
+                executor=executor,
+                artifacts_cache=artifacts_cache,
+            )
+            for execution in executions
+        ]
+
+    return records
+
+
+def replication_run(
+        client: HarborClient,
+        name: str,
+        wait: bool = True,
+        timeout: float = 3600.0,
+        concurrency: int = 8,
+) -> Dict:
+    """Start an execution of the replication policy `name`
+    and (with `wait`) return it once done, with its
+    throughput (see `replication_status()`)."""
+
+    policy: Dict = _replication_policy_get(client=client, name=name)
+
+    response: requests.Response = client.send(
+        client.prepare(
+            method=RequestMethod.POST,
+            path="/replication/executions",
+            json={"policy_id": policy["id"]},
+        )
+    )
+
+    execution_id = response.headers.get("Location", "").rstrip("/").rsplit("/", 1)[-1]
+    _logger.info(f"Replication execution {execution_id} of {name} started.")
+
+    if not wait:
+        return {"id": int(execution_id) if execution_id.isdigit() else None}
+
+    execution: Dict = replication_execution_wait(client=client, execution_id=int(execution_id), timeout=timeout)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        record: Dict = _replication_execution_record(
+            client=client,
+            execution=execution,
+            direction="pull" if policy.get("src_registry") else "push",
+            speed=policy.get("speed", -1),
+            executor=executor,
+            artifacts_cache={},
+        )
+
+    return record
+
+
+class _OCISource:
+    """Files of an OCI image layout or `docker save` output,
+    either a directory or a (possibly compressed) tarball.
+
+    Uncompressed tarballs are read in place: `open()` seeks to
+    the member in a file object of its own, so that blobs can be
+    read from several threads. Compressed tarballs cannot be
+    seeked without decompressing from the start, they are
+    extracted once to a temporary directory instead."""
+
+    def __init__(
+            self,
+            path: pathlib.Path,
+    ):
+        self.path = path.expanduser().resolve()
+
+        if not self.path.exists():
+            raise HarborCLIError(f"{self.path.as_posix()} not found.") from FileNotFoundError(self.path)
+
+        self.sizes: Dict[str, int] = {}
+        # name: member (of an uncompressed tarball)
+        self.members: Dict[str, tarfile.TarInfo] = {}
+        # the directory the files are in (unless in `members`)
+        self.root: pathlib.Path = self.path
+        self._tmp: tempfile.TemporaryDirectory | None = None
+
+        if self.path.is_file():
+            try:
+                with tarfile.open(self.path, mode="r:") as tar:
+                    for member in tar.getmembers():
+                        if member.isfile():
+                            self.members[member.name.removeprefix("./")] = member
+                            self.sizes[member.name.removeprefix("./")] = member.size
+                return
+            except tarfile.ReadError:
+                _logger.info(f"Extracting {self.path.as_posix()}...")
+                self._tmp = tempfile.TemporaryDirectory(prefix="openstudiolandscapes-harbor-")
+                self.root = pathlib.Path(self._tmp.name)
+                with tarfile.open(self.path) as tar:
+                    tar.extractall(
+                        self.root,
+                        members=[member for member in tar.getmembers() if member.isfile()],
+                        filter="data",
+                    )
+
+        for file in self.root.rglob("*"):
+            if file.is_file():
+                self.sizes[file.relative_to(self.root).as_posix()] = file.stat().st_size
+
+    def __contains__(
+            self,
+            name: str,
+    ) -> bool:
+        return name in self.sizes
+
+    @contextlib.contextmanager
+    def open(
+            self,
+            name: str,
+    ) -> typing.Iterator[typing.BinaryIO]:
+
+        if name not in self.sizes:
+            raise HarborCLIError(f"{name} not found in {self.path.as_posix()}.")
+
+        if name in self.members:
+            # reads the first header only, `extractfile` seeks to the member
+            with open(self.path, "rb") as fr, tarfile.open(fileobj=fr, mode="r:") as tar:
+                yield tar.extractfile(self.members[name])
+            return
+
+        with open(self.root / name, "rb") as file:
+            yield file
+
+    def read(
+            self,
+            name: str,
+    ) -> bytes:
+
+        with self.open(name) as file:
+            return file.read()
+
+
+def _oci_blob_name(
+        digest: str,
+) -> str:
+    """`sha256:abc...` → `blobs/sha256/abc...`"""
+
+    algorithm, _, encoded = digest.partition(":")
+
+    return f"blobs/{algorithm}/{encoded}"
+
+
+def oci_image_load(
+        path: pathlib.Path,
+        ref: str | None = None,
+) -> Dict:
+    """Read the image at `path` for `oci_push()`: an OCI image
+    layout (directory or tarball, as written by `docker save`
+    since Docker 25) or a legacy `docker save` tarball
+    (`manifest.json`).
+
+    `ref` selects one of several images by name (i.e. `1.27` or
+    `docker.io/library/nginx:1.27`).
+
+    Returns `{"manifests": [(media type, body), ...], "blobs":
+    {digest: {"name", "size"}}, "tag", "source"}`. Manifests
+    are ordered children first: the last one is tagged."""
+
+    source = _OCISource(path=path)
+
+    if "index.json" in source:
+        image: Dict = _oci_layout_load(source=source, ref=ref)
+    elif "manifest.json" in source:
+        image = _docker_save_load(source=source, ref=ref)
+    else:
+        raise HarborCLIError(f"{source.path.as_posix()} is neither an OCI image layout nor a `docker save` tarball.")
+
+    image["source"] = source
+
+    return image
+
+
+def _oci_layout_load(
+        source: _OCISource,
+        ref: str | None = None,
+) -> Dict:
+
+    descriptors: list[Dict] = json.loads(source.read("index.json")).get("manifests", [])
+
+    def _names(descriptor_: Dict) -> list[str]:
+        annotations: Dict = descriptor_.get("annotations") or {}
+        return [annotations[a] for a in OCI_REF_NAME_ANNOTATIONS if a in annotations]
+
+    if ref is not None:
+        descriptors = [d for d in descriptors if ref in _names(d) or any(n.endswith(f":{ref}") for n in _names(d))]
+
+    if len(descriptors) != 1:
+        names = [n for d in json.loads(source.read("index.json")).get("manifests", []) for n in _names(d)[:1]]
+        raise HarborCLIError(
+            f"{source.path.as_posix()}: {len(descriptors)} images match {ref or 'any name'}, "
+            f"select one of {names}."
+        )
+
+    image: Dict = {"manifests": [], "blobs": {}, "tag": None}
+
+    name = next(iter(_names(descriptors[0])), None)
+    if name is not None:
+        # `1.27` or `docker.io/library/nginx:1.27`
+        last = name.rsplit("/", 1)[-1]
+        image["tag"] = last.rsplit(":", 1)[-1] if ":" in last else None if "/" in name else name
+
+    def _load(descriptor_: Dict) -> Dict:
+        body: bytes = source.read(_oci_blob_name(descriptor_["digest"]))
+        manifest: Dict = json.loads(body)
+        media_type: str = manifest.get("mediaType") or descriptor_.get("mediaType")
+
+        if media_type in MANIFEST_INDEX_MEDIA_TYPES:
+            children: list[Dict] = [
+                child for child in manifest.get("manifests", [])
+                if _oci_blob_name(child["digest"]) in source
+            ]
+            if len(children) < len(manifest.get("manifests", [])):
+                # `docker save` only exports the platforms pulled locally
+                _logger.warning(
+                    f"{descriptor_['digest']}: {len(children)} of {len(manifest.get('manifests', []))} "
+                    f"platforms present, pushing an index of those (with a new digest)."
+                )
+                if not children:
+                    raise HarborCLIError(f"{descriptor_['digest']}: no platform manifest present.")
+                manifest["manifests"] = children
+                body = json.dumps(manifest, separators=(",", ":")).encode()
+            for child in children:
+                _load(child)
+        else:
+            for blob in [manifest.get("config"), *manifest.get("layers", [])]:
+                if blob and not blob.get("urls"):
+                    image["blobs"][blob["digest"]] = {"name": _oci_blob_name(blob["digest"]), "size": blob["size"]}
+
+        image["manifests"].append((media_type, body))
+
+        return manifest
+
+    _load(descriptors[0])
+
+    return image
+
+
+def _docker_save_load(
+        source: _OCISource,
+        ref: str | None = None,
+) -> Dict:
+
+    entries: list[Dict] = json.loads(source.read("manifest.json"))
+
+    if ref is not None:
+        entries = [
+            e for e in entries
+            if ref in (e.get("RepoTags") or []) or any(t.endswith(f":{ref}") for t in e.get("RepoTags") or [])
+        ]
+
+    if len(entries) != 1:
+        raise HarborCLIError(
+            f"{source.path.as_posix()}: {len(entries)} images match {ref or 'any name'}, "
+            f"select one of {[t for e in json.loads(source.read('manifest.json')) for t in e.get('RepoTags') or []]}."
+        )
+
+    entry: Dict = entries[0]
+    config_body: bytes = source.read(entry["Config"])
+    diff_ids: list[str] = json.loads(config_body).get("rootfs", {}).get("diff_ids", [])
+
+    if len(diff_ids) != len(entry["Layers"]):
+        raise HarborCLIError(f"{entry['Config']}: {len(diff_ids)} diff_ids for {len(entry['Layers'])} layers.")
+
+    config_digest = f"sha256:{hashlib.sha256(config_body).hexdigest()}"
+
+    image: Dict = {
+        "manifests": [],
+        "blobs": {config_digest: {"name": entry["Config"], "size": len(config_body)}},
+        "tag": (entry.get("RepoTags") or [":latest"])[0].rsplit(":", 1)[-1],
+    }
+
+    layers: list[Dict] = []
+    for diff_id, layer in zip(diff_ids, entry["Layers"]):
+        # uncompressed layers: the digest is the diff_id
+        image["blobs"][diff_id] = {"name": layer, "size": source.sizes[layer]}
+        layers.append({"mediaType": OCI_LAYER_MEDIA_TYPE, "digest": diff_id, "size": source.sizes[layer]})
+
+    manifest: Dict = {
+        "schemaVersion": 2,
+        "mediaType": OCI_MANIFEST_MEDIA_TYPE,
+        "config": {"mediaType": OCI_CONFIG_MEDIA_TYPE, "digest": config_digest, "size": len(config_body)},
+        "layers": layers,
+    }
+    image["manifests"].append((OCI_MANIFEST_MEDIA_TYPE, json.dumps(manifest, separators=(",", ":")).encode()))
+
+    return image
+
+
+def _registry_location(
+        response: requests.Response,
+) -> str:
+    """The `Location` of an upload relative to `/v2`
+    (it may be absolute or relative to the origin)."""
+
+    location = urllib.parse.urlsplit(response.headers["Location"])
+    path = location.path.removeprefix("/v2")
+
+    return f"{path}?{location.query}" if location.query else path
+
+
+def oci_blob_push(
+        client: HarborClient,
+        repository: str,
+        digest: str,
+        size: int,
+        open_: typing.Callable[[], typing.ContextManager[typing.BinaryIO]],
+        mount_from: typing.List[str] | None = None,
+        chunk_size: int = BLOB_CHUNK_SIZE,
+) -> Dict:
+    """Make the blob `digest` available in `repository`
+    (`project/repository`):
+
+    - `HEAD`: skipped if it exists already
+    - cross-repository mount from one of `mount_from` (tried in
+      order, the uploads started by the failed ones are cancelled)
+    - upload in chunks of `chunk_size` (`PATCH`), verifying the
+      digest while reading, and complete it (`PUT ?digest=`).
+
+    `status`: `exists`, `mounted` or `uploaded`."""
+
+    record: Dict = {"digest": digest, "size": size, "status": "exists", "bytes_uploaded": 0}
+
+    try:
+        client.send(client.prepare_registry(method=RequestMethod.HEAD, path=f"/{repository}/blobs/{digest}"))
+        return record
+    except HarborNotFoundError:
+        pass
+
+    location: str | None = None
+
+    for mount_repository in mount_from or []:
+        if mount_repository == repository:
+            continue
+        if location is not None:
+            # not mountable from the previous repository
+            try:
+                client.send(client.prepare_registry(method=RequestMethod.DELETE, path=location))
+            except HarborNotFoundError:
+                pass
+        response: requests.Response = client.send(
+            client.prepare_registry(
+                method=RequestMethod.POST,
+                path=f"/{repository}/blobs/uploads/",
+                params={"mount": digest, "from": mount_repository},
+            )
+        )
+        if response.status_code == 201:
+            record["status"] = "mounted"
+            return record
+        # 202: not mountable, an upload was started instead
+        # (used if none of `mount_from` can mount it)
+        location = _registry_location(response)
+
+    if location is None:
+        location = _registry_location(
+            client.send(client.prepare_registry(method=RequestMethod.POST, path=f"/{repository}/blobs/uploads/"))
+        )
+
+    sha256 = hashlib.sha256()
+    offset = 0
+
+    with open_() as file:
+        while chunk := file.read(chunk_size):
+            sha256.update(chunk)
+            response = client.send(
+                client.prepare_registry(
+                    method=RequestMethod.PATCH,
+                    path=location,
+                    headers={
+                        "Content-Type": "application/octet-stream",
+                        "Content-Range": f"{offset}-{offset + len(chunk) - 1}",
+                    },
+                    data=chunk,
+                )
+            )
+            offset += len(chunk)
+            location = _registry_location(response)
+
+    if f"sha256:{sha256.hexdigest()}" != digest:
+        raise HarborCLIError(f"{digest}: content has digest sha256:{sha256.hexdigest()}.")
+
+    client.send(client.prepare_registry(method=RequestMethod.PUT, path=location, params={"digest": digest}))
+
+    record["status"] = "uploaded"
+    record["bytes_uploaded"] = offset
+
+    return record
+
+
+def oci_push(
+        client: HarborClient,
+        path: pathlib.Path,
+        project_name: str,
+        repository_name: str,
+        tag: str | None = None,
+        ref: str | None = None,
+        mount_from: typing.List[str] | None = None,
+        concurrency: int = 4,
+        chunk_size: int = BLOB_CHUNK_SIZE,
+) -> Dict:
+    """Push the image at `path` (see `oci_image_load()`) to
+    `project_name/repository_name:tag` over the registry API, no
+    Docker daemon involved.
+
+    Blobs (deduplicated across platforms) are pushed `concurrency`
+    at a time (see `oci_blob_push()`), the manifests once all
+    blobs are in place. `tag` defaults to the image's name
+    (`latest` if it has none)."""
+
+    image: Dict = oci_image_load(path=path, ref=ref)
+    source: _OCISource = image["source"]
+    repository = f"{project_name}/{repository_name}"
+    tag = tag or image["tag"] or "latest"
+
+    start = time.monotonic()
+
+    blobs: list[Dict] = bulk_execute(
+        func=lambda item: oci_blob_push(
+            client=client,
+            repository=repository,
+            digest=item[0],
+            size=item[1]["size"],
+            open_=lambda: source.open(item[1]["name"]),
+            mount_from=mount_from,
+            chunk_size=chunk_size,
+        ),
+        items=image["blobs"].items(),
+        concurrency=concurrency,
+        label=lambda item: item[0],
+    )
+
+    if not all(blob["ok"] for blob in blobs):
+        raise HarborCLIError(
+            f"{repository}: {sum(1 for b in blobs if not b['ok'])} blobs failed: "
+            f"{next(b['error'] for b in blobs if not b['ok'])}"
+        )
+
+    digest: str = ""
+    for i, (media_type, body) in enumerate(image["manifests"]):
+        digest = f"sha256:{hashlib.sha256(body).hexdigest()}"
+        client.send(
+            client.prepare_registry(
+                method=RequestMethod.PUT,
+                path=f"/{repository}/manifests/{tag if i == len(image['manifests']) - 1 else digest}",
+                headers={"Content-Type": media_type},
+                data=body,
+            )
+        )
+
+    statuses = collections.Counter(blob["result"]["status"] for blob in blobs)
+
+    record: Dict = {
+        "repository": repository,
+        "tag": tag,
+        "digest": digest,
+        "manifests": len(image["manifests"]),
+        "blobs": len(blobs),
+        "exists": statuses["exists"],
+        "mounted": statuses["mounted"],
+        "uploaded": statuses["uploaded"],
+        "bytes_uploaded": sum(blob["result"]["bytes_uploaded"] for blob in blobs),
+        "duration": round(time.monotonic() - start, 3),
+    }
+
+    _logger.info(
+        f"{repository}:{tag}@{digest}: {record['uploaded']} blobs uploaded, "
+        f"{record['mounted']} mounted, {record['exists']} existed."
+    )
+
+    return record
+
+
+def blob_store_dir() -> pathlib.Path:
+    """The content-addressed blob store shared by all pulls
+    (`blobs/sha256/...` in OPENSTUDIOLANDSCAPES__HARBOR_CACHE_DIR)."""
+
+    return pathlib.Path(OPENSTUDIOLANDSCAPES__HARBOR_CACHE_DIR).expanduser().joinpath("blobs")
+
+
+def oci_blob_fetch(
+        client: HarborClient,
+        repository: str,
+        digest: str,
+        size: int,
+        blob_store: pathlib.Path,
+) -> Dict:
+    """Download the blob `digest` of `repository` into
+    `blob_store` (`sha256/...`), verifying the digest while
+    streaming. Blobs in the store already are not downloaded
+    again; the store is safe to share between concurrent pulls
+    (blobs are moved into place once complete).
+
+    `status`: `cached` or `downloaded`."""
+
+    target: pathlib.Path = blob_store.joinpath(_oci_blob_name(digest).removeprefix("blobs/"))
+    record: Dict = {"digest": digest, "size": size, "status": "cached", "bytes_downloaded": 0}
+
+    if target.is_file() and target.stat().st_size == size:
+        return record
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp: pathlib.Path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    response: requests.Response = client.send(
+        client.prepare_registry(method=RequestMethod.GET, path=f"/{repository}/blobs/{digest}"),
+        stream=True,
+    )
+
+    sha256 = hashlib.sha256()
+
+    try:
+        with response, open(tmp, "wb") as fw:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                sha256.update(chunk)
+                fw.write(chunk)
+                record["bytes_downloaded"] += len(chunk)
+
+        if f"sha256:{sha256.hexdigest()}" != digest:
+            raise HarborCLIError(f"{repository}@{digest}: content has digest sha256:{sha256.hexdigest()}.")
+
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    record["status"] = "downloaded"
+
+    return record
+
+
+def _oci_layout_link(
+        source: pathlib.Path,
+        target: pathlib.Path,
+) -> None:
+    """Hard link `source` to `target` (a copy across file systems)."""
+
+    if target.exists():
+        return
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def oci_pull(
+        client: HarborClient,
+        image: str,
+        oci_dir: pathlib.Path,
+        platform: str | None = "linux/amd64",
+        blob_store: pathlib.Path | None = None,
+        concurrency: int = 4,
+) -> Dict:
+    """Pull `image` (`project/repository[:tag|@digest]`) into the
+    OCI image layout `oci_dir` over the registry API, no Docker
+    daemon involved.
+
+    Of an index, the manifest of `platform` (all platforms if
+    `None`) is pulled. Blobs are downloaded `concurrency` at a
+    time into `blob_store` (see `oci_blob_fetch()`, `blob_store_dir()`
+    if `None`) and hard linked into `oci_dir`, so images sharing
+    layers only download the new ones. `index.json` names the
+    image by its tag (`org.opencontainers.image.ref.name`); other
+    images in `oci_dir` are kept."""
+
+    project_name, repository_name, reference = artifact_reference(artifact=image)
+    repository = f"{project_name}/{repository_name}"
+    oci_dir = oci_dir.expanduser().resolve()
+    blob_store = (blob_store or blob_store_dir()).expanduser().resolve()
+
+    def _manifest(reference_: str) -> tuple[str, bytes, str]:
+        response_: requests.Response = client.send(
+            client.prepare_registry(
+                method=RequestMethod.GET,
+                path=f"/{repository}/manifests/{reference_}",
+                headers={"Accept": ", ".join(MANIFEST_MEDIA_TYPES)},
+            )
+        )
+        body_: bytes = response_.content
+        digest_ = f"sha256:{hashlib.sha256(body_).hexdigest()}"
+        expected = reference_ if reference_.startswith("sha256:") else response_.headers.get("Docker-Content-Digest")
+        if expected and expected != digest_:
+            raise HarborCLIError(f"{repository}@{expected}: manifest has digest {digest_}.")
+        media_type_: str = json.loads(body_).get("mediaType") or response_.headers.get("Content-Type", "")
+        return media_type_, body_, digest_
+
+    media_type, body, digest = _manifest(reference)
+    manifests: list[tuple[str, bytes, str]] = [(media_type, body, digest)]
+
+    if media_type in MANIFEST_INDEX_MEDIA_TYPES:
+        children: list[Dict] = []
+        for descriptor in json.loads(body).get("manifests", []):
+            descriptor_platform = descriptor.get("platform") or {}
+            os_arch = f"{descriptor_platform.get('os')}/{descriptor_platform.get('architecture')}"
+            if platform is None or platform == os_arch:
+                children.append(descriptor)
+
+        if not children:
+            raise HarborCLIError(f"{image}: no manifest for {platform}.")
+
+        manifests = [_manifest(child["digest"]) for child in children]
+        if platform is None:
+            # the index itself is only kept with all of its platforms
+            manifests.append((media_type, body, digest))
+
+    blobs: Dict[str, int] = {}
+    for media_type_, body_, _ in manifests:
+        if media_type_ in MANIFEST_INDEX_MEDIA_TYPES:
+            continue
+        manifest: Dict = json.loads(body_)
+        for descriptor in [manifest.get("config"), *manifest.get("layers", [])]:
+            if descriptor and not descriptor.get("urls"):
+                blobs[descriptor["digest"]] = descriptor["size"]
+
+    start = time.monotonic()
+
+    records: list[Dict] = bulk_execute(
+        func=lambda item: oci_blob_fetch(
+            client=client,
+            repository=repository,
+            digest=item[0],
+            size=item[1],
+            blob_store=blob_store,
+        ),
+        items=blobs.items(),
+        concurrency=concurrency,
+        label=lambda item: item[0],
+    )
+
+    if not all(record["ok"] for record in records):
+        raise HarborCLIError(
+            f"{image}: {sum(1 for r in records if not r['ok'])} blobs failed: "
+            f"{next(r['error'] for r in records if not r['ok'])}"
+        )
+
+    oci_dir.mkdir(parents=True, exist_ok=True)
+    oci_dir.joinpath("oci-layout").write_text(json.dumps({"imageLayoutVersion": "1.0.0"}))
+
+    for digest_ in blobs:
+        _oci_layout_link(
+            source=blob_store.joinpath(_oci_blob_name(digest_).removeprefix("blobs/")),
+            target=oci_dir.joinpath(_oci_blob_name(digest_)),
+        )
+
+    for _, body_, digest_ in manifests:
+        target: pathlib.Path = oci_dir.joinpath(_oci_blob_name(digest_))
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(body_)
+
+    # the top level: the index, or the platform's manifest
+    media_type, body, digest = manifests[-1]
+    descriptor: Dict = {"mediaType": media_type, "digest": digest, "size": len(body)}
+    if not reference.startswith("sha256:"):
+        descriptor["annotations"] = {"org.opencontainers.image.ref.name": reference}
+
+    index_file: pathlib.Path = oci_dir.joinpath("index.json")
+    index: Dict = json.loads(index_file.read_text()) if index_file.exists() else {"schemaVersion": 2, "manifests": []}
+    index["manifests"] = [
+        d for d in index.get("manifests", [])
+        if d["digest"] != digest
+        and (d.get("annotations") or {}).get("org.opencontainers.image.ref.name") != reference
+    ] + [descriptor]
+    index_file.write_text(json.dumps(index, indent=2))
+
+    statuses = collections.Counter(record["result"]["status"] for record in records)
+
+    result: Dict = {
+        "image": image,
+        "digest": digest,
+        "oci_dir": oci_dir.as_posix(),
+        "manifests": len(manifests),
+        "blobs": len(records),
+        "cached": statuses["cached"],
+        "downloaded": statuses["downloaded"],
+        "bytes_downloaded": sum(record["result"]["bytes_downloaded"] for record in records),
+        "duration": round(time.monotonic() - start, 3),
+    }
+
+    _logger.info(
+        f"{image}@{digest}: {result['downloaded']} blobs downloaded, {result['cached']} cached."
+    )
+
+    return result
+
+
+# ---- CLI ----
+# The functions defined in this section are wrappers around the main Python
+# API allowing them to be called directly from the terminal as a CLI
+# executable/script.
+
+
+def eval_(
+        args: argparse.Namespace,
+) -> Union[pathlib.Path, subprocess.CompletedProcess, list, None]:
+
+    _logger.debug(f"{args = }")
+
+    _logger.debug(f"{args.command = }")
+
+    # dotenv_ = args.dot_env
+    #
+    # if dotenv_ is not None:
+    #     dotenv_: pathlib.Path = args.dot_env.expanduser().resolve()
+    #     if not dotenv_.exists():
+    #         raise FileNotFoundError(f"{dotenv_.as_posix()} does not exist")
+    #
+    # load_dotenv(
+    #     dotenv_path=dotenv_,
+    #     verbose=True,
+    # )
+
+    if args.command == "prepare":
+        _logger.debug(f"{args.prepare_command = }")
+
+        if args.prepare_command == "download":
+            result: pathlib.Path = _cli_download(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        elif args.prepare_command == "extract":
+            result: pathlib.Path = _cli_extract(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        elif args.prepare_command == "configure":
+            if args.dry_run:
+                # from pprint import pprint
+                print(_configure(args))
+                if args.log_driver is not None:
+                    print(yaml.dump(_configure_logging(args), indent=2))
+                return None
+            else:
+                result = _cli_configure(args)
+                _logger.debug(f"{result = }")
+                return result
+
+        elif args.prepare_command == "install":
+            result: subprocess.CompletedProcess = _cli_install(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        elif args.prepare_command == "pull-images":
+            result: dict = _cli_pull_images(args)
+            _logger.debug(f"{result = }")
+            return result
+
+    elif args.command == "systemd":
+        _logger.debug(f"{args.systemd_command = }")
+
+        if args.systemd_command == "install":
+            result: list = _cli_systemd_install(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        elif args.systemd_command == "uninstall":
+            result: list = _cli_systemd_uninstall(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        elif args.systemd_command == "status":
+            result: list = _cli_systemd_status()
+            _logger.debug(f"{result = }")
+            return result
+
+        elif args.systemd_command == "journalctl":
+            result: list = _cli_systemd_journalctl()
+            _logger.debug(f"{result = }")
+            return result
+
+        elif args.systemd_command == "reset":
+            result: list = _cli_systemd_reset(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        elif args.systemd_command == "benchmark-restart":
+            result: dict = _cli_systemd_benchmark_restart(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        elif args.systemd_command == "reload":
+            result: list = _cli_systemd_reload(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        elif args.systemd_command == "watchdog":
+            result: list = _cli_systemd_watchdog(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        elif args.systemd_command == "wait-ready":
+            result: dict = _cli_systemd_wait_ready(args)
+            _logger.debug(f"{result = }")
+            return result
+
+    elif args.command == "auth":
+        _logger.debug(f"{args.auth_command = }")
+
+        if args.auth_command == "logout":
+            with _cli_harbor_client(args) as client:
+                client.logout()
+            return None
+
+        if args.auth_command == "benchmark":
+            result: dict = _cli_auth_benchmark(args)
+            _logger.debug(f"{result = }")
+            return result
+
+    elif args.command == "project":
+        _logger.debug(f"{args.project_command = }")
+
+        if args.project_command == "create":
+            result: list = _cli_project_create(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        if args.project_command == "delete":
+            result: list = _cli_project_delete(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        if args.project_command == "apply":
+            result: list = _cli_project_apply(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        if args.project_command == "ls":
+            result: int = _cli_project_ls(args)
+            _logger.debug(f"{result = }")
+            return result
+
+    elif args.command == "push":
+        with _cli_harbor_client(args) as client:
+            result: dict = oci_push(
+                client=client,
+                path=args.path,
+                project_name=args.project_name,
+                repository_name=args.repository_name,
+                tag=args.tag,
+                ref=args.ref,
+                mount_from=args.mount_from,
+                concurrency=args.concurrency,
+                chunk_size=args.chunk_size,
+            )
+        print(json.dumps(result))
+        _logger.debug(f"{result = }")
+        return result
+
+    elif args.command == "pull":
+        with _cli_harbor_client(args) as client:
+            result: dict = oci_pull(
+                client=client,
+                image=args.image,
+                oci_dir=args.oci_dir,
+                platform=None if args.platform == "all" else args.platform,
+                blob_store=args.blob_store,
+                concurrency=args.concurrency,
+            )
+        print(json.dumps(result))
+        _logger.debug(f"{result = }")
+        return result
+
+    elif args.command == "proxy-cache":
+        _logger.debug(f"{args.proxy_cache_command = }")
+
+        if args.proxy_cache_command == "warm":
+            result: list = _cli_proxy_cache_warm(args)
+            _logger.debug(f"{result = }")
+            return result
+
+    elif args.command == "gc":
+        _logger.debug(f"{args.gc_command = }")
+
+        if args.gc_command == "run":
+            result: dict = _cli_gc_run(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        if args.gc_command == "schedule":
+            result: dict = _cli_gc_schedule(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        if args.gc_command == "history":
+            result: int = _cli_gc_history(args)
+            _logger.debug(f"{result = }")
+            return result
+
+    elif args.command == "retention":
+        _logger.debug(f"{args.retention_command = }")
+
+        if args.retention_command == "apply":
+            result: list = _cli_retention_apply(args)
+            _logger.debug(f"{result = }")
+            return result
+
+    elif args.command == "replication":
+        _logger.debug(f"{args.replication_command = }")
+
+        if args.replication_command == "create":
+            result: dict = _cli_replication_create(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        if args.replication_command == "ls":
+            with _cli_harbor_client(args) as client:
+                result: int = _print_jsonl(iter_replication_policies(client=client))
+            _logger.debug(f"{result = }")
+            return result
+
+        if args.replication_command == "run":
+            result: dict = _cli_replication_run(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        if args.replication_command == "status":
+            with _cli_harbor_client(args) as client:
+                result: int = _print_jsonl(replication_status(client=client, name=args.name, limit=args.limit))
+            _logger.debug(f"{result = }")
+            return result
+
+    elif args.command == "quota":
+        _logger.debug(f"{args.quota_command = }")
+
+        if args.quota_command == "report":
+            result: list = _cli_quota_report(args)
+            _logger.debug(f"{result = }")
+            return result
+
+    elif args.command == "repo":
+        _logger.debug(f"{args.repo_command = }")
+
+        if args.repo_command == "ls":
+            result: int = _cli_repo_ls(args)
+            _logger.debug(f"{result = }")
+            return result
+
+    elif args.command == "artifact":
+        _logger.debug(f"{args.artifact_command = }")
+
+        if args.artifact_command == "ls":
+            result: int = _cli_artifact_ls(args)
+            _logger.debug(f"{result = }")
+            return result
+
+        if args.artifact_command == "copy":
+            with _cli_harbor_client(args) as client:
+                result: dict = artifact_copy(
+                    client=client,
+                    source=args.source,
+                    project_name=args.to_project_name,
+                    repository_name=args.to_repository_name,
+                )
+            print(json.dumps(result))
+            _logger.debug(f"{result = }")
+            return result
+
+        if args.artifact_command == "promote":
+            result: list = _cli_artifact_promote(args)
+            _logger.debug(f"{result = }")
+            return result
+
+
+def _cli_download(
+        args: argparse.Namespace,
+) -> pathlib.Path:
+
+    result = download(
+        url=args.url,
+        destination_directory=args.harbor_root_dir.joinpath(args.harbor_download),
+    )
+
+    return result
+
+
+def _cli_extract(
+        args: argparse.Namespace,
+) -> pathlib.Path:
+
+    result = extract(
+        extract_to=args.harbor_root_dir.joinpath(args.harbor_bin),
+        tar_file=args.tar_file,
+    )
+
+    return result
+
+
+def _cli_configure(
+        args: argparse.Namespace,
+) -> pathlib.Path:
+
+    harbor_yml_data: str = _configure(args=args)
+
+    result: pathlib.Path = configure(
+        destination_directory=args.harbor_root_dir.joinpath(args.harbor_bin),
+        overwrite=args.overwrite,
+        harbor_yml_data=harbor_yml_data,
+    )
+
+    if args.log_driver is not None:
+        compose_override_write(
+            harbor_bin_dir=args.harbor_root_dir.joinpath(args.harbor_bin),
+            override=_configure_logging(args),
+        )
+
+    return result
+
+
+def _configure_logging(
+        args: argparse.Namespace,
+) -> Dict:
+
+    compose_file = args.harbor_root_dir.joinpath(args.harbor_bin, "docker-compose.yml")
+
+    if compose_file.exists():
+        compose: dict | None = compose_load(compose_file=compose_file)
+        services: list[str] = list(compose.get("services") or {})
+    else:
+        _logger.warning(
+            f"{compose_file.as_posix()} not found (yet). "
+            f"Configuring logging for {HARBOR_SERVICES}."
+        )
+        compose = None
+        services = HARBOR_SERVICES
+
+    override: dict = compose_override_logging(
+        log_driver=args.log_driver,
+        services=services,
+        max_buffer_size=args.log_max_buffer_size,
+        compose=compose,
+    )
+
+    return override
+
+
+def _cli_install(
+        args: argparse.Namespace,
+) -> subprocess.CompletedProcess:
+
+    result: subprocess.CompletedProcess = prepare(
+        prepare_script=args.harbor_root_dir.joinpath(args.harbor_bin, args.harbor_prepare),
+        # config_file=None,  # args.config_file,
+    )
+
+    return result
+
+
+def _cli_pull_images(
+        args: argparse.Namespace,
+) -> dict:
+
+    result: dict = pull_images(
+        compose_file=args.harbor_root_dir.joinpath(args.harbor_bin, "docker-compose.yml"),
+        concurrency=args.concurrency,
+    )
+
+    return result
+
+
+def _cli_systemd_install(
+        args: argparse.Namespace,
+) -> list:
+
+    result: list = systemd_install(
+        su_method=args.su_method,
+        outfile=args.outfile,
+        start=args.start,
+        enable=args.enable,
+        harbor_bin_dir=args.harbor_root_dir.joinpath(args.harbor_bin),
+        start_mode=args.start_mode,
+        wait_ready_timeout=args.wait_ready_timeout,
+        host=args.host,
+        port=args.port,
+        stop_mode=args.stop_mode,
+        stop_timeout=args.stop_timeout,
+        timeout_stop_sec=args.timeout_stop_sec,
+        reload_mode=args.reload_mode,
+        resource_profile_=args.resource_profile,
+        watchdog_interval=args.watchdog_interval,
+    )
+
+    return result
+
+
+def _cli_systemd_uninstall(
+        args: argparse.Namespace,
+) -> list:
+
+    result: list = systemd_uninstall(
+        su_method=args.su_method,
+        harbor_bin_dir=args.harbor_root_dir.joinpath(args.harbor_bin),
+    )
+
+    return result
+
+
+def _cli_systemd_reset(
+        args: argparse.Namespace,
+) -> list:
+
+    result: list = systemd_reset(
+        su_method=args.su_method,
+        harbor_bin_dir=args.harbor_root_dir.joinpath(args.harbor_bin),
+        start=args.start,
+    )
+
+    return result
+
+
+def _cli_systemd_reload(
+        args: argparse.Namespace,
+) -> list:
+
+    if not (args.rolling or args.record):
+        result: list = systemd_reload()
+        return result
+
+    result: list = rolling_reload(
+        harbor_bin_dir=args.harbor_root_dir.joinpath(args.harbor_bin),
+        record_only=args.record,
+        health_timeout=args.health_timeout,
+    )
+
+    return result
+
+
+def _cli_systemd_watchdog(
+        args: argparse.Namespace,
+) -> list:
+
+    result: list = watchdog(
+        harbor_bin_dir=args.harbor_root_dir.joinpath(args.harbor_bin),
+        host=args.host,
+        port=args.port,
+        interval=args.interval,
+        backoff_initial=args.backoff_initial,
+        backoff_max=args.backoff_max,
+        grace_period=args.grace_period,
+    )
+
+    return result
+
+
+def _cli_systemd_benchmark_restart(
+        args: argparse.Namespace,
+) -> dict:
+
+    result: dict = benchmark_restart(
+        harbor_bin_dir=args.harbor_root_dir.joinpath(args.harbor_bin),
+        cycles=args.cycles,
+    )
+
+    return result
+
+
+def _cli_systemd_status() -> list:
+
+    result: list = systemd_status()
+
+    return result
+
+
+def _cli_systemd_journalctl() -> list:
+
+    result: list = systemd_journalctl()
+
+    return result
+
+
+def _cli_systemd_wait_ready(
+        args: argparse.Namespace,
+) -> dict:
+
+    result: dict = wait_ready(
+        host=args.host,
+        port=args.port,
+        timeout=args.timeout,
+        interval=args.interval,
+        notify=args.notify,
+    )
+
+    return result
+
+
+def _cli_harbor_client(
+        args: argparse.Namespace,
+) -> HarborClient:
+
+    concurrency: int | None = getattr(args, "concurrency", None)
+
+    if concurrency is None:
+        # commands without --concurrency (i.e. page prefetch)
+        adaptive_concurrency = AdaptiveConcurrency(max_rps=args.max_rps)
+    else:
+        adaptive_concurrency = AdaptiveConcurrency(
+            initial=min(4, concurrency),
+            max_limit=max(1, concurrency),
+            max_rps=args.max_rps,
+        )
+
+    client = HarborClient(
+        host=args.host,
+        port=args.port,
+        user=args.user,
+        password=args.password,
+        pool_maxsize=max(16, concurrency or 0),
+        auth=args.auth,
+        token=args.token,
+        concurrency=adaptive_concurrency,
+    )
+
+    return client
+
+
+def _cli_auth_benchmark(
+        args: argparse.Namespace,
+) -> dict:
+
+    result: dict = benchmark_auth(
+        host=args.host,
+        port=args.port,
+        user=args.user,
+        password=args.password,
+        auth_modes=args.auth_modes,
+        count=args.count,
+        token=args.token,
+    )
+
+    return result
+
+
+def _cli_project_create(
+        args: argparse.Namespace,
+) -> list | dict:
+
+    if args.print_curl:
+        if args.proxy_cache is not None:
+            raise HarborCLIError("--print-curl and --proxy-cache are mutually exclusive.")
+        result: list = project_create(
+            host=args.host,
+            port=args.port,
+            user=args.user,
+            password=args.password,
+            project_name=args.project_name,
+            storage_limit=args.storage_limit,
+        )
+        return result
+
+    with _cli_harbor_client(args) as client:
+        registry_id: int | None = None
+        # an existing project is skipped, leave its endpoint alone
+        # (the existence is cached for `project_create`)
+        if args.proxy_cache is not None and not client.project_exists(project_name=args.project_name):
+            registry_id = registry_endpoint_ensure(
+                client=client,
+                endpoint=args.proxy_cache,
+                credential=args.proxy_cache_credential,
+            )["id"]
+
+        result: dict = project_create(
+            host=args.host,
+            port=args.port,
+            user=args.user,
+            password=args.password,
+            project_name=args.project_name,
+            client=client,
+            storage_limit=args.storage_limit,
+            registry_id=registry_id,
+        )
+
+    return result
+
+
+def _cli_proxy_cache_warm(
+        args: argparse.Namespace,
+) -> list:
+
+    images: list = images_list(images_file=args.images_file)
+
+    start = time.monotonic()
+
+    with _cli_harbor_client(args) as client:
+        result: list = proxy_cache_warm(
+            client=client,
+            project_name=args.project_name,
+            images=images,
+            concurrency=args.concurrency,
+            platform=None if args.platform == "all" else args.platform,
+            blobs=args.blobs,
+        )
+
+    for record in result:
+        print(
+            json.dumps(
+                {
+                    "image": record["item"],
+                    "ok": record["ok"],
+                    **(record["result"] or {}),
+                    "latency_ms": round(record["latency"] * 1000, 1),
+                    "error": record["error"],
+                }
+            )
+        )
+
+    if not all(record["ok"] for record in result):
+        raise HarborCLIError(bulk_summary(records=result, duration=time.monotonic() - start))
+
+    return result
+
+
+def _cli_gc_run(
+        args: argparse.Namespace,
+) -> dict:
+
+    with _cli_harbor_client(args) as client:
+        result: dict = gc_run(
+            client=client,
+            dry_run=args.dry_run,
+            delete_untagged=args.delete_untagged,
+            workers=args.workers,
+            wait=not args.no_wait,
+            timeout=args.timeout,
+        )
+
+    print(json.dumps(result))
+
+    if result.get("status") == "error":
+        raise HarborCLIError(f"Garbage collection {result['id']} failed.")
+
+    return result
+
+
+def _cli_gc_schedule(
+        args: argparse.Namespace,
+) -> dict:
+
+    with _cli_harbor_client(args) as client:
+        result: dict = gc_schedule(
+            client=client,
+            cron=None if args.cron == "none" else args.cron,
+            delete_untagged=args.delete_untagged,
+            workers=args.workers,
+        )
+
+    return result
+
+
+def _cli_gc_history(
+        args: argparse.Namespace,
+) -> int:
+
+    with _cli_harbor_client(args) as client:
+        result: int = _print_jsonl(gc_history(client=client, limit=args.limit))
+
+    return result
+
+
+def _cli_retention_apply(
+        args: argparse.Namespace,
+) -> list:
+
+    policies: list = retention_manifest(manifest=args.manifest)
+
+    start = time.monotonic()
+
+    with _cli_harbor_client(args) as client:
+        result: list = retention_apply(
+            client=client,
+            policies=policies,
+            concurrency=args.concurrency,
+            simulate=args.simulate,
+        )
+
+    for record in result:
+        print(
+            json.dumps(
+                {
+                    "project_name": record["item"][0],
+                    "ok": record["ok"],
+                    **{k: v for k, v in (record["result"] or {}).items() if k != "project_name"},
+                    "error": record["error"],
+                }
+            )
+        )
+
+    summary = bulk_summary(records=result, duration=time.monotonic() - start)
+
+    if not all(record["ok"] for record in result):
+        raise HarborCLIError(summary)
+
+    return result
+
+
+def _cli_replication_create(
+        args: argparse.Namespace,
+) -> dict:
+
+    with _cli_harbor_client(args) as client:
+        registry: dict = registry_endpoint_ensure(
+            client=client,
+            endpoint=args.remote,
+            credential=args.remote_credential,
+            type_=args.remote_type,
+        )
+
+        result: dict = replication_policy_apply(
+            client=client,
+            policy=replication_policy(
+                name=args.name,
+                remote_registry_id=registry["id"],
+                direction=args.direction,
+                dest_namespace=args.dest_namespace,
+                name_filter=args.name_filter,
+                tag_filter=args.tag_filter,
+                resource_filter=args.resource_filter,
+                trigger=args.trigger,
+                cron=args.cron,
+                speed=-1 if args.speed is None or args.speed < 0 else max(1, args.speed // 1024),
+                override=not args.no_override,
+                deletion=args.deletion,
+            ),
+        )
+
+    print(json.dumps(result))
+
+    return result
+
+
+def _cli_replication_run(
+        args: argparse.Namespace,
+) -> dict:
+
+    with _cli_harbor_client(args) as client:
+        result: dict = replication_run(
+            client=client,
+            name=args.name,
+            wait=not args.no_wait,
+            timeout=args.timeout,
+        )
+
+    print(json.dumps(result))
+
+    if result.get("status") == "failed":
+        raise HarborCLIError(f"Replication execution {result['id']} failed ({result['failed']} tasks).")
+
+    return result
+
+
+def _cli_quota_report(
+        args: argparse.Namespace,
+) -> list:
+
+    with _cli_harbor_client(args) as client:
+        result: list = quota_report(
+            client=client,
+            concurrency=args.concurrency,
+            sort=args.sort,
+        )
+
+    print(quota_report_format(records=result, format_=args.format))
+
+    return result
+
+
+def _cli_project_delete(
+        args: argparse.Namespace,
+) -> list | dict:
+
+    if args.print_curl and args.purge:
+        raise HarborCLIError("--print-curl and --purge are mutually exclusive.")
+
+    if args.print_curl:
+        result: list = project_delete(
+            host=args.host,
+            port=args.port,
+            user=args.user,
+            password=args.password,
+            project_name=args.project_name,
+        )
+        return result
+
+    if args.purge:
+        with _cli_harbor_client(args) as client:
+            result: dict = project_purge(
+                host=args.host,
+                port=args.port,
+                user=args.user,
+                password=args.password,
+                project_name=args.project_name,
+                client=client,
+                concurrency=args.concurrency,
+                gc=args.gc,
+            )
+        print(json.dumps(result))
+        return result
+
+    with _cli_harbor_client(args) as client:
+        result: dict = project_delete(
+            host=args.host,
+            port=args.port,
+            user=args.user,
+            password=args.password,
+            project_name=args.project_name,
+            client=client,
+        )
+
+    return result
+
+
+def _cli_project_apply(
+        args: argparse.Namespace,
+) -> list:
+
+    projects: list = projects_manifest(manifest=args.manifest)
+
+    if args.print_curl:
+        result: list = project_apply_curl(
+            host=args.host,
+            port=args.port,
+            user=args.user,
+            password=args.password,
+            projects=projects,
+            config_file=args.curl_config,
+            parallel_max=args.concurrency,
+        )
+        return result
+
+    start = time.monotonic()
+
+    with _cli_harbor_client(args) as client:
+        result: list = project_apply(
+            host=args.host,
+            port=args.port,
+            user=args.user,
+            password=args.password,
+            projects=projects,
+            client=client,
+            concurrency=args.concurrency,
+        )
+
+    for record in result:
+        print(
+            json.dumps(
+                {
+                    "project_name": record["item"]["name"],
+                    "ok": record["ok"],
+                    "skipped": bool((record["result"] or {}).get("skipped")),
+                    "latency_ms": round(record["latency"] * 1000, 1),
+                    "error": record["error"],
+                }
+            )
+        )
+
+    summary = bulk_summary(records=result, duration=time.monotonic() - start)
+
+    if not all(record["ok"] for record in result):
+        raise HarborCLIError(summary)
+
+    return result
+
+
+def _print_jsonl(
+        records: typing.Iterable[Dict],
+) -> int:
+    """Print `records` as JSON lines as they come in.
+    Returns the number of records."""
+
+    count = 0
+
+    for record in records:
+        print(json.dumps(record), flush=True)
+        count += 1
+
+    return count
+
+
+def _cli_project_ls(
+        args: argparse.Namespace,
+) -> int:
+
+    with _cli_harbor_client(args) as client:
+        result: int = _print_jsonl(iter_projects(client=client, query=args.query))
+
+    return result
+
+
+def _cli_repo_ls(
+        args: argparse.Namespace,
+) -> int:
+
+    with _cli_harbor_client(args) as client:
+        result: int = _print_jsonl(iter_repositories(client=client, project_name=args.project_name))
+
+    return result
+
+
+def _cli_artifact_ls(
+        args: argparse.Namespace,
+) -> int:
+
+    with _cli_harbor_client(args) as client:
+        result: int = _print_jsonl(
+            iter_artifacts(
+                client=client,
+                project_name=args.project_name,
+                repository_name=args.repository_name,
+            )
+        )
+
+    return result
+
+
+def _cli_artifact_promote(
+        args: argparse.Namespace,
+) -> list:
+
+    sources: list = images_list(images_file=args.artifacts_file)
+
+    start = time.monotonic()
+
+    with _cli_harbor_client(args) as client:
+        result: list = artifact_promote(
+            client=client,
+            sources=sources,
+            project_name=args.to_project_name,
+            concurrency=args.concurrency,
+        )
+
+    for record in result:
+        print(
+            json.dumps(
+                {
+                    "source": record["item"],
+                    "ok": record["ok"],
+                    **(record["result"] or {}),
+                    "latency_ms": round(record["latency"] * 1000, 1),
+                    "error": record["error"],
+                }
+            )
+        )
+
+    if not all(record["ok"] for record in result):
+        raise HarborCLIError(bulk_summary(records=result, duration=time.monotonic() - start))
+
+    return result
+
+
+def _size_arg(
+        size: str,
+) -> int:
+    """`parse_size` as argparse `type` (usage error instead of a traceback)."""
+
+    try:
+        return parse_size(size)
+    except HarborCLIError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+_formatter = argparse.ArgumentDefaultsHelpFormatter
+
+
+def parse_args(args):
+    """Parse command line parameters
+
+    Args:
+      args (List[str]): command line parameters as list of strings
+          (for example  ``["--help"]``).
+
+    Returns:
+      :obj:`argparse.Namespace`: command line parameters namespace
+    """
+    main_parser = argparse.ArgumentParser(
+        prog="OpenStudioLandscapes Harbor CLI",
+        description="A tool to facilitate Harbor setup and "
+                    "getting it up and running using systemd.",
+        formatter_class=_formatter,
+    )
+    main_parser.add_argument(
+        "--version",
         action="version",
         version=f"OpenStudioLandscapesUtil-ReadmeGenerator {__version__}",
     )
-    # parser.add_argument(dest="n", help="n-th Fibonacci number", type=int, metavar="INT")
-    main_parser.add_argument(
-        "-v",
-        "--verbose",
-        dest="loglevel",
-        help="set loglevel to INFO",
-        action="store_const",
-        # action="count",
-        # https://stackoverflow.com/questions/6076690/verbose-level-with-argparse-and-multiple-v-options
-        const=logging.INFO,
+    # parser.add_argument(dest="n", help="n-th Fibonacci number", type=int, metavar="INT")
+    main_parser.add_argument(
+        "-v",
+        "--verbose",
+        dest="loglevel",
+        help="set loglevel to INFO",
+        action="store_const",
+        # action="count",
+        # https://stackoverflow.com/questions/6076690/verbose-level-with-argparse-and-multiple-v-options
+        const=logging.INFO,
+    )
+    main_parser.add_argument(
+        "-vv",
+        "--very-verbose",
+        dest="loglevel",
+        help="set loglevel to DEBUG",
+        action="store_const",
+        const=logging.DEBUG,
+    )
+    # main_parser.add_argument(
+    #     # "-e",
+    #     "--dot-env",
+    #     dest="dot_env",
+    #     required=not bool(OPENSTUDIOLANDSCAPES__DOT_ENV),
+    #     default=pathlib.Path(OPENSTUDIOLANDSCAPES__DOT_ENV) if bool(OPENSTUDIOLANDSCAPES__DOT_ENV) else None,
+    #     help="Full path to the .env file.",
+    #     metavar="OPENSTUDIOLANDSCAPES__DOT_ENV",
+    #     type=pathlib.Path,
+    # )
+
+    main_parser.add_argument(
+        "--user",
+        # "-h",
+        dest="user",
+        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_ADMIN),
+        default=OPENSTUDIOLANDSCAPES__HARBOR_ADMIN if bool(OPENSTUDIOLANDSCAPES__HARBOR_ADMIN) else None,
+        help="Harbor Admin User.",
+        metavar="OPENSTUDIOLANDSCAPES__HARBOR_ADMIN",
+        type=str,
+    )
+
+    main_parser.add_argument(
+        "--password",
+        # "-h",
+        dest="password",
+        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_PASSWORD),
+        default=OPENSTUDIOLANDSCAPES__HARBOR_PASSWORD if bool(OPENSTUDIOLANDSCAPES__HARBOR_PASSWORD) else None,
+        help="Harbor Admin Password.",
+        metavar="OPENSTUDIOLANDSCAPES__HARBOR_PASSWORD",
+        type=str,
+    )
+
+    main_parser.add_argument(
+        "--host",
+        # "-h",
+        dest="host",
+        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_HOSTNAME),
+        default=OPENSTUDIOLANDSCAPES__HARBOR_HOSTNAME if bool(OPENSTUDIOLANDSCAPES__HARBOR_HOSTNAME) else None,
+        help="The host where Harbor is running (FQDN).",
+        metavar="OPENSTUDIOLANDSCAPES__HARBOR_HOSTNAME",
+        type=str,
+    )
+
+    main_parser.add_argument(
+        "--port",
+        # "-p",
+        dest="port",
+        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_PORT),
+        default=OPENSTUDIOLANDSCAPES__HARBOR_PORT if bool(OPENSTUDIOLANDSCAPES__HARBOR_PORT) else None,
+        help="The port where Harbor is listening.",
+        metavar="OPENSTUDIOLANDSCAPES__HARBOR_PORT",
+        type=int,
+    )
+
+    main_parser.add_argument(
+        "--harbor-root-dir",
+        # "-hrd",
+        dest="harbor_root_dir",
+        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR),
+        default=OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR if bool(OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR) else None,
+        help="Full path of the Harbor root directory.",
+        metavar="OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR",
+        type=pathlib.Path,
+    )
+
+    main_parser.add_argument(
+        "--harbor-download",
+        # "-hrd",
+        dest="harbor_download",
+        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR),
+        default=OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR if bool(OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR) else None,
+        help="Where to save the downloaded files "
+             "(subdirectory of OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR).",
+        metavar="OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR",
+        type=str,
+    )
+
+    main_parser.add_argument(
+        "--harbor-bin",
+        # "-hrd",
+        dest="harbor_bin",
+        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_BIN_DIR),
+        default=OPENSTUDIOLANDSCAPES__HARBOR_BIN_DIR if bool(OPENSTUDIOLANDSCAPES__HARBOR_BIN_DIR) else None,
+        help="Name of the bin directory "
+             "(subdirectory of OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR).",
+        metavar="OPENSTUDIOLANDSCAPES__HARBOR_BIN_DIR",
+        type=str,
+    )
+
+    main_parser.add_argument(
+        "--harbor-data",
+        # "-hrd",
+        dest="harbor_data",
+        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_DATA_DIR),
+        default=OPENSTUDIOLANDSCAPES__HARBOR_DATA_DIR if bool(OPENSTUDIOLANDSCAPES__HARBOR_DATA_DIR) else None,
+        help="Name of the data directory "
+             "(subdirectory of OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR).",
+        metavar="OPENSTUDIOLANDSCAPES__HARBOR_DATA_DIR",
+        type=str,
+    )
+
+    main_parser.add_argument(
+        "--harbor-prepare",
+        # "-hrd",
+        dest="harbor_prepare",
+        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_PREPARE),
+        default=OPENSTUDIOLANDSCAPES__HARBOR_PREPARE if bool(OPENSTUDIOLANDSCAPES__HARBOR_PREPARE) else None,
+        help="Name of the prepare file "
+             "(file of the OPENSTUDIOLANDSCAPES__HARBOR_BIN subdirectory).",
+        metavar="OPENSTUDIOLANDSCAPES__HARBOR_PREPARE",
+        type=str,
+    )
+
+    main_parser.add_argument(
+        "--auth",
+        dest="auth",
+        required=False,
+        choices=AUTH_MODES,
+        default=AUTH_MODES[0],
+        help="How to authenticate against the Harbor API. "
+             "basic: Basic auth on every request. "
+             "session: log in once, reuse the session cookie and CSRF token. "
+             "bearer: use --token. "
+             "Sessions and tokens are cached in OPENSTUDIOLANDSCAPES__HARBOR_CACHE_DIR.",
+        metavar="AUTH",
+        type=str,
+    )
+
+    main_parser.add_argument(
+        "--token",
+        dest="token",
+        required=False,
+        default=OPENSTUDIOLANDSCAPES__HARBOR_TOKEN if bool(OPENSTUDIOLANDSCAPES__HARBOR_TOKEN) else None,
+        help="Bearer token (--auth bearer). Cached until it expires.",
+        metavar="OPENSTUDIOLANDSCAPES__HARBOR_TOKEN",
+        type=str,
+    )
+
+    main_parser.add_argument(
+        "--max-rps",
+        dest="max_rps",
+        required=False,
+        default=None,
+        help="Hard ceiling on the Harbor API requests per second. "
+             "Below it, the requests in flight adapt to Harbor's latency "
+             "and 429/5xx responses (up to --concurrency).",
+        metavar="MAX_RPS",
+        type=float,
+    )
+
+    base_subparsers = main_parser.add_subparsers(
+        dest="command",
+    )
+
+    ####################################################################################################################
+    # PREPARE
+
+    base_subparser_prepare = base_subparsers.add_parser(
+        name="prepare",
+        formatter_class=_formatter,
+    )
+
+    prepare_subparsers = base_subparser_prepare.add_subparsers(
+        dest="prepare_command",
+    )
+
+    ## DOWNLOAD
+
+    subparser_download = prepare_subparsers.add_parser(
+        name="download",
+        formatter_class=_formatter,
+        help="Download the Harbor Release from GitHub. "
+             "Existing files will be overwritten.",
+    )
+
+    subparser_download.add_argument(
+        "--url",
+        "-u",
+        dest="url",
+        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_INSTALLER),
+        default=OPENSTUDIOLANDSCAPES__HARBOR_INSTALLER if bool(OPENSTUDIOLANDSCAPES__HARBOR_INSTALLER) else None,
+        help="URL of the Harbor Installer TAR.",
+        metavar="URL",
+        type=str,
+    )
+
+    # subparser_download.add_argument(
+    #     "--destination-directory",
+    #     "-d",
+    #     dest="destination_directory",
+    #     required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR),
+    #     default=OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR if bool(OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR) else None,
+    #     help="Where to save the downloaded files "
+    #          "(subdirectory of OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR).",
+    #     metavar="DESTINATION_DIRECTORY",
+    #     type=str,
+    # )
+
+    ## EXTRACT
+
+    subparser_extract = prepare_subparsers.add_parser(
+        name="extract",
+        formatter_class=_formatter,
+    )
+
+    # subparser_extract.add_argument(
+    #     "--extract-to",
+    #     "-x",
+    #     dest="extract_to",
+    #     required=False,
+    #     default=pathlib.Path().cwd().joinpath(_HARBOR_BIN_DIR),
+    #     help="Where to extract the files to "
+    #          "(subdirectory of OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR).",
+    #     metavar="EXTRACT_TO",
+    #     type=str,
+    # )
+
+    subparser_extract.add_argument(
+        "--tar-file",
+        "-f",
+        dest="tar_file",
+        required=True,
+        # Todo
+        #  - [ ] default=pathlib.Path().cwd().joinpath(_HARBOR_DOWNLOAD_DIR, "harbor-*.tgz"),
+        help="Full path to the downloaded Harbor Release tar.",
+        metavar="TAR_FILE",
+        type=pathlib.Path,
+    )
+
+    # Todo
+    #  - [ ] --clear
+    # mutex_extract.add_argument(
+    #     "--clear",
+    #     "-c",
+    #     dest="clear",
+    #     action="store_true",
+    #     required=False,
+    #     default=False,
+    #     help="Remove the extracted files.",
+    #     # metavar="CLEAR",
+    #     # type=bool,
+    # )
+
+    ## CONFIGURE
+
+    subparser_configure = prepare_subparsers.add_parser(
+        name="configure",
+        formatter_class=_formatter,
+    )
+
+    mutex_configure = subparser_configure.add_mutually_exclusive_group()
+
+    mutex_configure.add_argument(
+        "--dry-run",
+        dest="dry_run",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Print the configuration to stdout.",
+    )
+
+    # mutex_configure.add_argument(
+    #     "--destination-directory",
+    #     "-d",
+    #     dest="destination_directory",
+    #     required=False,
+    #     default=pathlib.Path().cwd().relative_to(pathlib.Path().cwd()).joinpath(_HARBOR_BIN_DIR),
+    #     help="Directory where to save the harbor.yml file.",
+    #     metavar="DESTINATION_DIRECTORY",
+    #     type=str,
+    # )
+
+    subparser_configure.add_argument(
+        "--overwrite",
+        dest="overwrite",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Force overwriting existing harbor.yml file.",
+    )
+
+    subparser_configure.add_argument(
+        "--log-driver",
+        dest="log_driver",
+        required=False,
+        choices=LOG_DRIVERS,
+        default=None,
+        help=f"Write a logging driver override (mode: non-blocking) for all "
+             f"Harbor containers to {COMPOSE_OVERRIDE}. Harbor's default is "
+             f"syslog (shipping to the `log` container).",
+        metavar="LOG_DRIVER",
+        type=str,
+    )
+
+    subparser_configure.add_argument(
+        "--log-max-buffer-size",
+        dest="log_max_buffer_size",
+        required=False,
+        default="4m",
+        help="Per-container buffer for non-blocking logging. "
+             "Messages are dropped when it is full.",
+        metavar="SIZE",
+        type=str,
+    )
+
+    ## PREPARE
+
+    subparser_run_prepare = prepare_subparsers.add_parser(
+        name="install",
+        formatter_class=_formatter,
+    )
+
+    # subparser_run_prepare.add_argument(
+    #     "--prepare-script",
+    #     "-s",
+    #     dest="prepare_script",
+    #     required=False,
+    #     default=pathlib.Path().cwd().joinpath(_HARBOR_BIN_DIR, _HARBOR_PREPARE),
+    #     help="Full path to the extracted prepare script.",
+    #     metavar="PREPARE_SCRIPT",
+    #     type=pathlib.Path,
+    # )
+
+    # This is not working as expected:
+    # $ ./prepare --help
+    # prepare base dir is set to /home/michael/git/repos/OpenStudioLandscapesUtil-HarborCLI/test/extracted
+    # Usage: main.py prepare [OPTIONS]
+    #
+    # Options:
+    #   --conf TEXT   the path of Harbor configuration file
+    #   --with-trivy  the Harbor instance is to be deployed with Trivy
+    #   --help        Show this message and exit.
+    # Clean up the input dir
+    #
+    # subparser_run_prepare.add_argument(
+    #     "--config-file",
+    #     "-c",
+    #     dest="config_file",
+    #     required=False,
+    #     default=pathlib.Path().cwd().joinpath("harbor.yml"),
+    #     help="Full path to the harbor.yml config file.",
+    #     metavar="CONFIG_FILE",
+    #     type=pathlib.Path,
+    # )
+
+    ## PULL IMAGES
+
+    subparser_pull_images = prepare_subparsers.add_parser(
+        name="pull-images",
+        formatter_class=_formatter,
+        help="Pull the images of the generated docker-compose.yml "
+             "that are missing locally (run after `install`).",
+    )
+
+    subparser_pull_images.add_argument(
+        "--concurrency",
+        "-c",
+        dest="concurrency",
+        required=False,
+        default=4,
+        help="Number of images to pull in parallel.",
+        metavar="CONCURRENCY",
+        type=int,
+    )
+
+    ####################################################################################################################
+    # SYSTEMD
+
+    base_subparser_systemd = base_subparsers.add_parser(
+        name="systemd",
+        formatter_class=_formatter,
+    )
+
+    systemd_subparsers = base_subparser_systemd.add_subparsers(
+        dest="systemd_command",
+        help="A command generator for setting up "
+             "systemd with Harbor."
+    )
+
+    ## INSTALL
+
+    subparser_install = systemd_subparsers.add_parser(
+        name="install",
+        formatter_class=_formatter,
+        help="Install systemd unit.",
+    )
+
+    subparser_install.add_argument(
+        "--su-method",
+        dest="su_method",
+        required=False,
+        choices=_SU_METHODS.keys(),
+        default="pkexec",
+        help=f"Which SU method to use: {list(_SU_METHODS.keys())}.",
+        metavar="SU_METHOD",
+        type=str,
+    )
+
+    subparser_install.add_argument(
+        "--outfile",
+        "-f",
+        dest="outfile",
+        required=False,
+        default=SYSTEMD_UNIT.name,
+        help="Name of the unit file. "
+             "It will get copied to the final destination "
+             f"upon command completion: {SYSTEMD_UNIT.parent}.",
+        metavar="OUTFILE",
+        type=str,
+    )
+
+    subparser_install.add_argument(
+        "--enable",
+        dest="enable",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Enable systemd unit.",
+    )
+
+    subparser_install.add_argument(
+        "--start",
+        # "-d",
+        dest="start",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Start systemd unit.",
+    )
+
+    subparser_install.add_argument(
+        "--start-mode",
+        dest="start_mode",
+        required=False,
+        choices=START_MODES,
+        default=START_MODES[0],
+        help="foreground: the unit is active as soon as `docker compose up` runs. "
+             "wait: `docker compose up --detach --wait`, the unit is active "
+             "once all Harbor containers are healthy.",
+        metavar="START_MODE",
+        type=str,
+    )
+
+    subparser_install.add_argument(
+        "--wait-ready",
+        dest="wait_ready_timeout",
+        required=False,
+        default=None,
+        help="Seconds to wait for Harbor to become healthy before the unit "
+             "is considered started (foreground: via an `ExecStartPost` "
+             "polling /api/v2.0/health, wait: `TimeoutStartSec`).",
+        metavar="SECONDS",
+        type=int,
+    )
+
+    subparser_install.add_argument(
+        "--stop-mode",
+        dest="stop_mode",
+        required=False,
+        choices=STOP_MODES,
+        default=STOP_MODES[0],
+        help="down: ExecStop removes the containers and networks. "
+             "stop: ExecStop only stops the containers so that "
+             "restarts reuse them (use `systemd reset` to remove them).",
+        metavar="STOP_MODE",
+        type=str,
+    )
+
+    subparser_install.add_argument(
+        "--stop-timeout",
+        dest="stop_timeout",
+        required=False,
+        default=30,
+        help="Seconds each container gets to shut down "
+             "(`docker compose stop --timeout`, stop mode only).",
+        metavar="SECONDS",
+        type=int,
+    )
+
+    subparser_install.add_argument(
+        "--timeout-stop-sec",
+        dest="timeout_stop_sec",
+        required=False,
+        default=120,
+        help="TimeoutStopSec of the unit (stop mode only).",
+        metavar="SECONDS",
+        type=int,
+    )
+
+    subparser_install.add_argument(
+        "--reload-mode",
+        dest="reload_mode",
+        required=False,
+        choices=RELOAD_MODES,
+        default=RELOAD_MODES[0],
+        help="restart: ExecReload restarts all containers at once. "
+             "rolling: ExecReload restarts only the services whose "
+             "configuration changed, one by one (`systemd reload --rolling`).",
+        metavar="RELOAD_MODE",
+        type=str,
+    )
+
+    subparser_install.add_argument(
+        "--resource-profile",
+        dest="resource_profile",
+        required=False,
+        default=None,
+        help=f"Confine Harbor to a dedicated slice ({SYSTEMD_SLICE.name}) with "
+             f"CPUWeight, IOWeight, MemoryHigh and MemoryMax and write per-service "
+             f"limits (cpus, mem_limit, pids_limit, nofile) to {COMPOSE_OVERRIDE}. "
+             f"One of {list(RESOURCE_PROFILES)} or a YAML file with the same structure.",
+        metavar="RESOURCE_PROFILE",
+        type=str,
+    )
+
+    subparser_install.add_argument(
+        "--watchdog",
+        dest="watchdog_interval",
+        required=False,
+        default=None,
+        help=f"Install {SYSTEMD_WATCHDOG_UNIT.name} which checks the Harbor "
+             f"containers every SECONDS and restarts only the unhealthy ones "
+             f"(the Harbor unit then uses Restart=on-failure).",
+        metavar="SECONDS",
+        type=int,
+    )
+
+    ## RELOAD
+
+    subparser_reload = systemd_subparsers.add_parser(
+        name="reload",
+        formatter_class=_formatter,
+        help="Reload Harbor. Without flags, print the "
+             "`systemctl reload` command.",
+    )
+
+    mutex_reload = subparser_reload.add_mutually_exclusive_group()
+
+    mutex_reload.add_argument(
+        "--rolling",
+        dest="rolling",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Restart the services whose configuration (common/config/) "
+             "changed since the last start, one by one in dependency "
+             "order, waiting for each to become healthy.",
+    )
+
+    mutex_reload.add_argument(
+        "--record",
+        dest="record",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Only record the current configuration snapshot.",
+    )
+
+    subparser_reload.add_argument(
+        "--health-timeout",
+        dest="health_timeout",
+        required=False,
+        default=120.0,
+        help="Seconds to wait for each restarted service to become healthy.",
+        metavar="SECONDS",
+        type=float,
+    )
+
+    ## RESET
+
+    subparser_reset = systemd_subparsers.add_parser(
+        name="reset",
+        formatter_class=_formatter,
+        help="Stop the unit and remove all Harbor containers "
+             "and networks (docker compose down --remove-orphans).",
+    )
+
+    subparser_reset.add_argument(
+        "--su-method",
+        dest="su_method",
+        required=False,
+        choices=_SU_METHODS.keys(),
+        default="pkexec",
+        help=f"Which SU method to use: {list(_SU_METHODS.keys())}.",
+        metavar="SU_METHOD",
+        type=str,
+    )
+
+    subparser_reset.add_argument(
+        "--start",
+        dest="start",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Start systemd unit again afterwards.",
+    )
+
+    ## BENCHMARK-RESTART
+
+    subparser_benchmark_restart = systemd_subparsers.add_parser(
+        name="benchmark-restart",
+        formatter_class=_formatter,
+        help="Compare the restart latency of the stop modes "
+             "(down/up vs. stop/up). Stop the unit first.",
+    )
+
+    subparser_benchmark_restart.add_argument(
+        "--cycles",
+        dest="cycles",
+        required=False,
+        default=3,
+        help="Number of restarts per stop mode.",
+        metavar="CYCLES",
+        type=int,
+    )
+
+    ## WATCHDOG
+
+    subparser_watchdog = systemd_subparsers.add_parser(
+        name="watchdog",
+        formatter_class=_formatter,
+        help="Restart unhealthy Harbor containers individually "
+             f"(runs until stopped, recoveries are recorded in {HARBOR_WATCHDOG_JOURNAL}).",
+    )
+
+    subparser_watchdog.add_argument(
+        "--interval",
+        dest="interval",
+        required=False,
+        default=30.0,
+        help="Seconds between health checks.",
+        metavar="INTERVAL",
+        type=float,
+    )
+
+    subparser_watchdog.add_argument(
+        "--backoff-initial",
+        dest="backoff_initial",
+        required=False,
+        default=10.0,
+        help="Seconds before restarting the same service again "
+             "(doubles with every restart).",
+        metavar="SECONDS",
+        type=float,
+    )
+
+    subparser_watchdog.add_argument(
+        "--backoff-max",
+        dest="backoff_max",
+        required=False,
+        default=600.0,
+        help="Upper bound of the backoff.",
+        metavar="SECONDS",
+        type=float,
+    )
+
+    subparser_watchdog.add_argument(
+        "--grace-period",
+        dest="grace_period",
+        required=False,
+        default=300.0,
+        help="Seconds after startup before restarting anything "
+             "(ends early once all services are healthy).",
+        metavar="SECONDS",
+        type=float,
+    )
+
+    ## WAIT-READY
+
+    subparser_wait_ready = systemd_subparsers.add_parser(
+        name="wait-ready",
+        formatter_class=_formatter,
+        help="Block until /api/v2.0/health reports healthy "
+             "(optionally notifying systemd with READY=1).",
+    )
+
+    subparser_wait_ready.add_argument(
+        "--timeout",
+        dest="timeout",
+        required=False,
+        default=300.0,
+        help="Give up after TIMEOUT seconds.",
+        metavar="TIMEOUT",
+        type=float,
+    )
+
+    subparser_wait_ready.add_argument(
+        "--interval",
+        dest="interval",
+        required=False,
+        default=2.0,
+        help="Seconds between health checks.",
+        metavar="INTERVAL",
+        type=float,
+    )
+
+    subparser_wait_ready.add_argument(
+        "--notify",
+        dest="notify",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Send READY=1 to $NOTIFY_SOCKET once healthy.",
+    )
+
+    ## UNINSTALL
+
+    subparser_uninstall = systemd_subparsers.add_parser(
+        name="uninstall",
+        formatter_class=_formatter,
+        help="Stop, disable and uninstall systemd unit.",
+    )
+
+    subparser_uninstall.add_argument(
+        "--su-method",
+        dest="su_method",
+        required=False,
+        choices=_SU_METHODS.keys(),
+        default="pkexec",
+        help=f"Which SU method to use: {list(_SU_METHODS.keys())}.",
+        metavar="SU_METHOD",
+        type=str,
+    )
+
+    # Todo
+    # ## STATUS
+    #
+    # subparser_status = systemd_subparsers.add_parser(
+    #     name="status",
+    #     formatter_class=_formatter,
+    #     help="Systemd unit status.",
+    # )
+    #
+    # ## JOURNALCTL
+    #
+    # subparser_journalctl = systemd_subparsers.add_parser(
+    #     name="journalctl",
+    #     formatter_class=_formatter,
+    #     help="Follow logs.",
+    # )
+
+    ####################################################################################################################
+    # AUTH
+
+    base_subparser_auth = base_subparsers.add_parser(
+        name="auth",
+        formatter_class=_formatter,
+    )
+
+    auth_subparsers = base_subparser_auth.add_subparsers(
+        dest="auth_command",
+        help="Manage the cached Harbor API credentials.",
+    )
+
+    ## LOGOUT
+
+    auth_subparsers.add_parser(
+        name="logout",
+        formatter_class=_formatter,
+        help="Remove the cached session/token of --auth.",
+    )
+
+    ## BENCHMARK
+
+    subparser_auth_benchmark = auth_subparsers.add_parser(
+        name="benchmark",
+        formatter_class=_formatter,
+        help="Compare the request overhead of the auth modes.",
+    )
+
+    subparser_auth_benchmark.add_argument(
+        "--auth-modes",
+        dest="auth_modes",
+        nargs="+",
+        required=False,
+        choices=AUTH_MODES,
+        default=AUTH_MODES[:2],
+        help="The auth modes to compare (bearer requires --token).",
+        metavar="AUTH",
+        type=str,
+    )
+
+    subparser_auth_benchmark.add_argument(
+        "--count",
+        dest="count",
+        required=False,
+        default=100,
+        help="Requests per auth mode.",
+        metavar="COUNT",
+        type=int,
+    )
+
+    ####################################################################################################################
+    # PROJECT
+
+    base_subparser_systemd = base_subparsers.add_parser(
+        name="project",
+        formatter_class=_formatter,
+    )
+
+    project_subparsers = base_subparser_systemd.add_subparsers(
+        dest="project_command",
+        help="A simple interface to set up the basic "
+             "project structure in Harbor."
+    )
+
+    ## CREATE
+
+    subparser_project_create = project_subparsers.add_parser(
+        name="create",
+        formatter_class=_formatter,
+        help="Create project.",
+    )
+
+    subparser_project_create.add_argument(
+        "--project-name",
+        "-p",
+        dest="project_name",
+        required=True,
+        default="openstudiolandscapes",
+        help="The name of the project to be created.",
+        metavar="PROJECT_NAME",
+        type=str,
+    )
+
+    subparser_project_create.add_argument(
+        "--storage-limit",
+        dest="storage_limit",
+        required=False,
+        default=None,
+        help="Storage quota of the project, i.e. `500G` (binary units) or -1 "
+             "for unlimited. Harbor's default quota if omitted.",
+        metavar="STORAGE_LIMIT",
+        type=_size_arg,
+    )
+
+    subparser_project_create.add_argument(
+        "--proxy-cache",
+        dest="proxy_cache",
+        required=False,
+        default=None,
+        help="Create the project as pull-through cache of this upstream registry "
+             "(i.e. `docker.io`, `ghcr.io`, `https://registry.example.com`). "
+             "The registry endpoint is created if missing.",
+        metavar="REGISTRY_ENDPOINT",
+        type=str,
+    )
+
+    subparser_project_create.add_argument(
+        "--proxy-cache-credential",
+        dest="proxy_cache_credential",
+        required=False,
+        default=None,
+        help="`access_key:access_secret` for a new --proxy-cache registry endpoint "
+             "(anonymous otherwise, Docker Hub rate limits apply).",
+        metavar="CREDENTIAL",
+        type=str,
+    )
+
+    subparser_project_create.add_argument(
+        "--print-curl",
+        dest="print_curl",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Print the curl command instead of executing the request.",
+    )
+
+    ## APPLY
+
+    subparser_project_apply = project_subparsers.add_parser(
+        name="apply",
+        formatter_class=_formatter,
+        help="Create many projects concurrently.",
+    )
+
+    subparser_project_apply.add_argument(
+        "--file",
+        "-f",
+        dest="manifest",
+        required=False,
+        default=None,
+        help="YAML file listing the projects (`projects: [{name: ..., public: ...}, ...]` "
+             "or a list of names). Reads project names from stdin (one per line) "
+             "if omitted or `-`.",
+        metavar="MANIFEST",
+        type=pathlib.Path,
+    )
+
+    subparser_project_apply.add_argument(
+        "--concurrency",
+        "-c",
+        dest="concurrency",
+        required=False,
+        default=8,
+        help="Maximum number of requests in flight (adapts to Harbor's latency and 429/5xx responses).",
+        metavar="CONCURRENCY",
+        type=int,
+    )
+
+    subparser_project_apply.add_argument(
+        "--print-curl",
+        dest="print_curl",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Write all requests into one curl config (see --curl-config) and print "
+             "the single `curl --parallel` command running them instead of executing them.",
+    )
+
+    subparser_project_apply.add_argument(
+        "--curl-config",
+        dest="curl_config",
+        required=False,
+        default=pathlib.Path("harbor-project-apply.curl"),
+        help="The curl config written by --print-curl (contains the credentials, mode 0600).",
+        metavar="CURL_CONFIG",
+        type=pathlib.Path,
+    )
+
+    ## DELETE
+
+    subparser_project_delete = project_subparsers.add_parser(
+        name="delete",
+        formatter_class=_formatter,
+        help="Delete project.",
+    )
+
+    subparser_project_delete.add_argument(
+        "--project-name",
+        "-p",
+        dest="project_name",
+        required=True,
+        default="library",
+        help="The name of the project to be deleted.",
+        metavar="PROJECT_NAME",
+        type=str,
+    )
+
+    subparser_project_delete.add_argument(
+        "--print-curl",
+        dest="print_curl",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Print the curl command instead of executing the request.",
+    )
+
+    subparser_project_delete.add_argument(
+        "--purge",
+        dest="purge",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Delete all repositories of the project first "
+             "(Harbor refuses to delete non-empty projects).",
+    )
+
+    subparser_project_delete.add_argument(
+        "--concurrency",
+        "-c",
+        dest="concurrency",
+        required=False,
+        default=8,
+        help="Maximum number of repositories deleted at a time (--purge).",
+        metavar="CONCURRENCY",
+        type=int,
+    )
+
+    subparser_project_delete.add_argument(
+        "--gc",
+        dest="gc",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Trigger a garbage collection after --purge to free the disk space "
+             "(registry wide, untagged artifacts are kept).",
+    )
+
+    ## LS
+
+    subparser_project_ls = project_subparsers.add_parser(
+        name="ls",
+        formatter_class=_formatter,
+        help="List projects (JSON lines).",
+    )
+
+    subparser_project_ls.add_argument(
+        "--query",
+        "-q",
+        dest="query",
+        required=False,
+        default=None,
+        help="Harbor query, i.e. `name=~show`.",
+        metavar="QUERY",
+        type=str,
+    )
+
+    ####################################################################################################################
+    # PUSH
+
+    base_subparser_push = base_subparsers.add_parser(
+        name="push",
+        formatter_class=_formatter,
+    )
+
+    base_subparser_push.add_argument(
+        "path",
+        help="OCI image layout (directory or tarball) or `docker save` tarball.",
+        metavar="PATH",
+        type=pathlib.Path,
+    )
+
+    base_subparser_push.add_argument(
+        "--project-name",
+        "-p",
+        dest="project_name",
+        required=True,
+        help="The target project.",
+        metavar="PROJECT_NAME",
+        type=str,
+    )
+
+    base_subparser_push.add_argument(
+        "--repository",
+        "-r",
+        dest="repository_name",
+        required=True,
+        help="The target repository (within the project).",
+        metavar="REPOSITORY",
+        type=str,
+    )
+
+    base_subparser_push.add_argument(
+        "--tag",
+        "-t",
+        dest="tag",
+        required=False,
+        default=None,
+        help="The tag (the image's own tag or `latest` if omitted).",
+        metavar="TAG",
+        type=str,
+    )
+
+    base_subparser_push.add_argument(
+        "--ref",
+        dest="ref",
+        required=False,
+        default=None,
+        help="Select an image by name if PATH contains several (i.e. `nginx:1.27`).",
+        metavar="REF",
+        type=str,
+    )
+
+    base_subparser_push.add_argument(
+        "--mount-from",
+        dest="mount_from",
+        action="append",
+        required=False,
+        default=None,
+        help="Repository (`project/repository`) to mount existing blobs from instead of uploading them. "
+             "Can be given multiple times.",
+        metavar="REPOSITORY",
+        type=str,
+    )
+
+    base_subparser_push.add_argument(
+        "--concurrency",
+        "-c",
+        dest="concurrency",
+        required=False,
+        default=4,
+        help="Number of blobs uploaded concurrently.",
+        metavar="CONCURRENCY",
+        type=int,
+    )
+
+    base_subparser_push.add_argument(
+        "--chunk-size",
+        dest="chunk_size",
+        required=False,
+        default=BLOB_CHUNK_SIZE,
+        help="Size of the upload chunks (binary units, i.e. `16M`).",
+        metavar="CHUNK_SIZE",
+        type=_size_arg,
+    )
+
+    ####################################################################################################################
+    # PULL
+
+    base_subparser_pull = base_subparsers.add_parser(
+        name="pull",
+        formatter_class=_formatter,
+    )
+
+    base_subparser_pull.add_argument(
+        "image",
+        help="The image to pull: `project/repository[:tag|@digest]`.",
+        metavar="IMAGE",
+        type=str,
+    )
+
+    base_subparser_pull.add_argument(
+        "--to-oci-dir",
+        dest="oci_dir",
+        required=True,
+        help="The OCI image layout to pull into (created if missing, other images in it are kept).",
+        metavar="OCI_DIR",
+        type=pathlib.Path,
+    )
+
+    base_subparser_pull.add_argument(
+        "--platform",
+        dest="platform",
+        required=False,
+        default="linux/amd64",
+        help="Platform to pull of multi-platform images (`all` for all of them).",
+        metavar="PLATFORM",
+        type=str,
+    )
+
+    base_subparser_pull.add_argument(
+        "--blob-store",
+        dest="blob_store",
+        required=False,
+        default=None,
+        help="Content-addressed blob store shared between pulls "
+             "(`blobs` in OPENSTUDIOLANDSCAPES__HARBOR_CACHE_DIR if omitted).",
+        metavar="BLOB_STORE",
+        type=pathlib.Path,
+    )
+
+    base_subparser_pull.add_argument(
+        "--concurrency",
+        "-c",
+        dest="concurrency",
+        required=False,
+        default=4,
+        help="Number of blobs downloaded concurrently.",
+        metavar="CONCURRENCY",
+        type=int,
+    )
+
+    ####################################################################################################################
+    # PROXY-CACHE
+
+    base_subparser_proxy_cache = base_subparsers.add_parser(
+        name="proxy-cache",
+        formatter_class=_formatter,
     )
-    main_parser.add_argument(
-        "-vv",
-        "--very-verbose",
-        dest="loglevel",
-        help="set loglevel to DEBUG",
-        action="store_const",
-        const=logging.DEBUG,
+
+    proxy_cache_subparsers = base_subparser_proxy_cache.add_subparsers(
+        dest="proxy_cache_command",
+        help="Manage proxy cache projects (see `project create --proxy-cache`).",
     )
-    # main_parser.add_argument(
-    #     # "-e",
-    #     "--dot-env",
-    #     dest="dot_env",
-    #     required=not bool(OPENSTUDIOLANDSCAPES__DOT_ENV),
-    #     default=pathlib.Path(OPENSTUDIOLANDSCAPES__DOT_ENV) if bool(OPENSTUDIOLANDSCAPES__DOT_ENV) else None,
-    #     help="Full path to the .env file.",
-    #     metavar="OPENSTUDIOLANDSCAPES__DOT_ENV",
-    #     type=pathlib.Path,
-    # )
 
-    main_parser.add_argument(
-        "--user",
-        # "-h",
-        dest="user",
-        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_ADMIN),
-        default=OPENSTUDIOLANDSCAPES__HARBOR_ADMIN if bool(OPENSTUDIOLANDSCAPES__HARBOR_ADMIN) else None,
-        help="Harbor Admin User.",
-        metavar="OPENSTUDIOLANDSCAPES__HARBOR_ADMIN",
-        type=str,
+    ## WARM
+
+    subparser_proxy_cache_warm = proxy_cache_subparsers.add_parser(
+        name="warm",
+        formatter_class=_formatter,
+        help="Pull images through a proxy cache project so that Harbor caches them.",
     )
 
-    main_parser.add_argument(
-        "--password",
-        # "-h",
-        dest="password",
-        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_PASSWORD),
-        default=OPENSTUDIOLANDSCAPES__HARBOR_PASSWORD if bool(OPENSTUDIOLANDSCAPES__HARBOR_PASSWORD) else None,
-        help="Harbor Admin Password.",
-        metavar="OPENSTUDIOLANDSCAPES__HARBOR_PASSWORD",
+    subparser_proxy_cache_warm.add_argument(
+        "--project-name",
+        "-p",
+        dest="project_name",
+        required=True,
+        help="The proxy cache project.",
+        metavar="PROJECT_NAME",
         type=str,
     )
 
-    main_parser.add_argument(
-        "--host",
-        # "-h",
-        dest="host",
-        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_HOSTNAME),
-        default=OPENSTUDIOLANDSCAPES__HARBOR_HOSTNAME if bool(OPENSTUDIOLANDSCAPES__HARBOR_HOSTNAME) else None,
-        help="The host where Harbor is running (FQDN).",
-        metavar="OPENSTUDIOLANDSCAPES__HARBOR_HOSTNAME",
+    subparser_proxy_cache_warm.add_argument(
+        "--file",
+        "-f",
+        dest="images_file",
+        required=False,
+        default=None,
+        help="Image references (`nginx:1.27`, `grafana/grafana@sha256:...`), one per line. "
+             "Reads stdin if omitted or `-`.",
+        metavar="IMAGES_FILE",
+        type=pathlib.Path,
+    )
+
+    subparser_proxy_cache_warm.add_argument(
+        "--platform",
+        dest="platform",
+        required=False,
+        default="linux/amd64",
+        help="The platform manifest to pull from manifest lists (`all` for all of them).",
+        metavar="PLATFORM",
         type=str,
     )
 
-    main_parser.add_argument(
-        "--port",
-        # "-p",
-        dest="port",
-        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_PORT),
-        default=OPENSTUDIOLANDSCAPES__HARBOR_PORT if bool(OPENSTUDIOLANDSCAPES__HARBOR_PORT) else None,
-        help="The port where Harbor is listening.",
-        metavar="OPENSTUDIOLANDSCAPES__HARBOR_PORT",
+    subparser_proxy_cache_warm.add_argument(
+        "--blobs",
+        dest="blobs",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Also pull the config and layers (Harbor only caches what is pulled).",
+    )
+
+    subparser_proxy_cache_warm.add_argument(
+        "--concurrency",
+        "-c",
+        dest="concurrency",
+        required=False,
+        default=8,
+        help="Maximum number of images pulled at a time.",
+        metavar="CONCURRENCY",
         type=int,
     )
 
-    main_parser.add_argument(
-        "--harbor-root-dir",
-        # "-hrd",
-        dest="harbor_root_dir",
-        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR),
-        default=OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR if bool(OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR) else None,
-        help="Full path of the Harbor root directory.",
-        metavar="OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR",
-        type=pathlib.Path,
+    ####################################################################################################################
+    # GC
+
+    base_subparser_gc = base_subparsers.add_parser(
+        name="gc",
+        formatter_class=_formatter,
     )
 
-    main_parser.add_argument(
-        "--harbor-download",
-        # "-hrd",
-        dest="harbor_download",
-        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR),
-        default=OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR if bool(OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR) else None,
-        help="Where to save the downloaded files "
-             "(subdirectory of OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR).",
-        metavar="OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR",
-        type=str,
+    gc_subparsers = base_subparser_gc.add_subparsers(
+        dest="gc_command",
+        help="Garbage collection of the registry storage.",
     )
 
-    main_parser.add_argument(
-        "--harbor-bin",
-        # "-hrd",
-        dest="harbor_bin",
-        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_BIN_DIR),
-        default=OPENSTUDIOLANDSCAPES__HARBOR_BIN_DIR if bool(OPENSTUDIOLANDSCAPES__HARBOR_BIN_DIR) else None,
-        help="Name of the bin directory "
-             "(subdirectory of OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR).",
-        metavar="OPENSTUDIOLANDSCAPES__HARBOR_BIN_DIR",
-        type=str,
+    ## RUN
+
+    subparser_gc_run = gc_subparsers.add_parser(
+        name="run",
+        formatter_class=_formatter,
+        help="Run the garbage collection now and wait for its result.",
     )
 
-    main_parser.add_argument(
-        "--harbor-data",
-        # "-hrd",
-        dest="harbor_data",
-        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_DATA_DIR),
-        default=OPENSTUDIOLANDSCAPES__HARBOR_DATA_DIR if bool(OPENSTUDIOLANDSCAPES__HARBOR_DATA_DIR) else None,
-        help="Name of the data directory "
-             "(subdirectory of OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR).",
-        metavar="OPENSTUDIOLANDSCAPES__HARBOR_DATA_DIR",
-        type=str,
+    subparser_gc_run.add_argument(
+        "--dry-run",
+        dest="dry_run",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Only estimate the space it would free.",
     )
 
-    main_parser.add_argument(
-        "--harbor-prepare",
-        # "-hrd",
-        dest="harbor_prepare",
-        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_PREPARE),
-        default=OPENSTUDIOLANDSCAPES__HARBOR_PREPARE if bool(OPENSTUDIOLANDSCAPES__HARBOR_PREPARE) else None,
-        help="Name of the prepare file "
-             "(file of the OPENSTUDIOLANDSCAPES__HARBOR_BIN subdirectory).",
-        metavar="OPENSTUDIOLANDSCAPES__HARBOR_PREPARE",
+    subparser_gc_run.add_argument(
+        "--delete-untagged",
+        dest="delete_untagged",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Also delete untagged artifacts.",
+    )
+
+    subparser_gc_run.add_argument(
+        "--workers",
+        dest="workers",
+        required=False,
+        default=1,
+        help="Number of GC workers (1-5). More workers finish faster, "
+             "but put more load on the registry storage.",
+        metavar="WORKERS",
+        type=int,
+    )
+
+    subparser_gc_run.add_argument(
+        "--no-wait",
+        dest="no_wait",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Return as soon as the run is triggered.",
+    )
+
+    subparser_gc_run.add_argument(
+        "--timeout",
+        dest="timeout",
+        required=False,
+        default=3600.0,
+        help="Seconds to wait for the run to finish.",
+        metavar="TIMEOUT",
+        type=float,
+    )
+
+    ## SCHEDULE
+
+    subparser_gc_schedule = gc_subparsers.add_parser(
+        name="schedule",
+        formatter_class=_formatter,
+        help="Schedule the garbage collection.",
+    )
+
+    subparser_gc_schedule.add_argument(
+        dest="cron",
+        help="Cron expression (i.e. `0 3 * * 6`, Harbor's leading seconds field is optional), "
+             "`none` to remove the schedule.",
+        metavar="CRON",
         type=str,
     )
 
-    base_subparsers = main_parser.add_subparsers(
-        dest="command",
+    subparser_gc_schedule.add_argument(
+        "--delete-untagged",
+        dest="delete_untagged",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Also delete untagged artifacts.",
+    )
+
+    subparser_gc_schedule.add_argument(
+        "--workers",
+        dest="workers",
+        required=False,
+        default=1,
+        help="Number of GC workers (1-5).",
+        metavar="WORKERS",
+        type=int,
+    )
+
+    ## HISTORY
+
+    subparser_gc_history = gc_subparsers.add_parser(
+        name="history",
+        formatter_class=_formatter,
+        help="The last garbage collection runs with duration and bytes freed (JSON lines).",
+    )
+
+    subparser_gc_history.add_argument(
+        "--limit",
+        "-n",
+        dest="limit",
+        required=False,
+        default=20,
+        help="Number of runs.",
+        metavar="LIMIT",
+        type=int,
     )
 
     ####################################################################################################################
-    # PREPARE
+    # RETENTION
 
-    base_subparser_prepare = base_subparsers.add_parser(
-        name="prepare",
+    base_subparser_retention = base_subparsers.add_parser(
+        name="retention",
         formatter_class=_formatter,
     )
 
-    prepare_subparsers = base_subparser_prepare.add_subparsers(
-        dest="prepare_command",
+    retention_subparsers = base_subparser_retention.add_subparsers(
+        dest="retention_command",
+        help="Manage tag retention policies.",
     )
 
-    ## DOWNLOAD
+    ## APPLY
 
-    subparser_download = prepare_subparsers.add_parser(
-        name="download",
+    subparser_retention_apply = retention_subparsers.add_parser(
+        name="apply",
         formatter_class=_formatter,
-        help="Download the Harbor Release from GitHub. "
-             "Existing files will be overwritten.",
+        help="Create or update the retention policies of many projects concurrently.",
     )
 
-    subparser_download.add_argument(
-        "--url",
-        "-u",
-        dest="url",
-        required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_INSTALLER),
-        default=OPENSTUDIOLANDSCAPES__HARBOR_INSTALLER if bool(OPENSTUDIOLANDSCAPES__HARBOR_INSTALLER) else None,
-        help="URL of the Harbor Installer TAR.",
-        metavar="URL",
+    subparser_retention_apply.add_argument(
+        "--file",
+        "-f",
+        dest="manifest",
+        required=True,
+        help="YAML file with the policies (see `retention_manifest()`).",
+        metavar="MANIFEST",
+        type=pathlib.Path,
+    )
+
+    subparser_retention_apply.add_argument(
+        "--simulate",
+        dest="simulate",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Do not change anything, compute how many artifacts, tags and bytes "
+             "the policies would delete from the artifact listing instead.",
+    )
+
+    subparser_retention_apply.add_argument(
+        "--concurrency",
+        "-c",
+        dest="concurrency",
+        required=False,
+        default=8,
+        help="Maximum number of projects processed at a time.",
+        metavar="CONCURRENCY",
+        type=int,
+    )
+
+    ####################################################################################################################
+    # REPLICATION
+
+    base_subparser_replication = base_subparsers.add_parser(
+        name="replication",
+        formatter_class=_formatter,
+    )
+
+    replication_subparsers = base_subparser_replication.add_subparsers(
+        dest="replication_command",
+        help="Manage replication between registries.",
+    )
+
+    ## CREATE
+
+    subparser_replication_create = replication_subparsers.add_parser(
+        name="create",
+        formatter_class=_formatter,
+        help="Create (or update, by name) a replication policy.",
+    )
+
+    subparser_replication_create.add_argument(
+        "--name",
+        "-n",
+        dest="name",
+        required=True,
+        help="The name of the replication policy.",
+        metavar="NAME",
         type=str,
     )
 
-    # subparser_download.add_argument(
-    #     "--destination-directory",
-    #     "-d",
-    #     dest="destination_directory",
-    #     required=not bool(OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR),
-    #     default=OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR if bool(OPENSTUDIOLANDSCAPES__HARBOR_DOWNLOAD_DIR) else None,
-    #     help="Where to save the downloaded files "
-    #          "(subdirectory of OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR).",
-    #     metavar="DESTINATION_DIRECTORY",
-    #     type=str,
-    # )
+    subparser_replication_create.add_argument(
+        "--remote",
+        dest="remote",
+        required=True,
+        help="URL of the remote registry (the registry endpoint is created if missing).",
+        metavar="REMOTE",
+        type=str,
+    )
+
+    subparser_replication_create.add_argument(
+        "--remote-type",
+        dest="remote_type",
+        required=False,
+        default=None,
+        help="Harbor registry adapter of a new remote registry endpoint "
+             "(i.e. `harbor`). Guessed from --remote if not given.",
+        metavar="REMOTE_TYPE",
+        type=str,
+    )
+
+    subparser_replication_create.add_argument(
+        "--remote-credential",
+        dest="remote_credential",
+        required=False,
+        default=None,
+        help="`access_key:access_secret` of a new remote registry endpoint.",
+        metavar="CREDENTIAL",
+        type=str,
+    )
+
+    subparser_replication_create.add_argument(
+        "--direction",
+        dest="direction",
+        required=False,
+        choices=REPLICATION_DIRECTIONS,
+        default=REPLICATION_DIRECTIONS[0],
+        help="push: local to remote, pull: remote to local.",
+        metavar="DIRECTION",
+        type=str,
+    )
+
+    subparser_replication_create.add_argument(
+        "--dest-namespace",
+        dest="dest_namespace",
+        required=False,
+        default=None,
+        help="Destination project (the source's if omitted).",
+        metavar="DEST_NAMESPACE",
+        type=str,
+    )
+
+    subparser_replication_create.add_argument(
+        "--filter-name",
+        dest="name_filter",
+        required=False,
+        default=None,
+        help="Only replicate repositories matching this pattern (i.e. `show-a/**`).",
+        metavar="PATTERN",
+        type=str,
+    )
+
+    subparser_replication_create.add_argument(
+        "--filter-tag",
+        dest="tag_filter",
+        required=False,
+        default=None,
+        help="Only replicate tags matching this pattern (i.e. `v*`).",
+        metavar="PATTERN",
+        type=str,
+    )
+
+    subparser_replication_create.add_argument(
+        "--filter-resource",
+        dest="resource_filter",
+        required=False,
+        choices=["image", "artifact"],
+        default=None,
+        help="Only replicate this kind of resource.",
+        metavar="RESOURCE",
+        type=str,
+    )
 
-    ## EXTRACT
+    subparser_replication_create.add_argument(
+        "--trigger",
+        dest="trigger",
+        required=False,
+        choices=REPLICATION_TRIGGERS,
+        default=REPLICATION_TRIGGERS[0],
+        help="When to replicate (scheduled requires --cron).",
+        metavar="TRIGGER",
+        type=str,
+    )
 
-    subparser_extract = prepare_subparsers.add_parser(
-        name="extract",
-        formatter_class=_formatter,
+    subparser_replication_create.add_argument(
+        "--cron",
+        dest="cron",
+        required=False,
+        default=None,
+        help="Cron expression of scheduled triggers (Harbor's leading seconds field is optional).",
+        metavar="CRON",
+        type=str,
     )
 
-    # subparser_extract.add_argument(
-    #     "--extract-to",
-    #     "-x",
-    #     dest="extract_to",
-    #     required=False,
-    #     default=pathlib.Path().cwd().joinpath(_HARBOR_BIN_DIR),
-    #     help="Where to extract the files to "
-    #          "(subdirectory of OPENSTUDIOLANDSCAPES__HARBOR_ROOT_DIR).",
-    #     metavar="EXTRACT_TO",
-    #     type=str,
-    # )
+    subparser_replication_create.add_argument(
+        "--speed",
+        dest="speed",
+        required=False,
+        default=None,
+        help="Bandwidth limit per task and second, i.e. `10M` (binary units). Unlimited if omitted.",
+        metavar="SPEED",
+        type=_size_arg,
+    )
 
-    subparser_extract.add_argument(
-        "--tar-file",
-        "-f",
-        dest="tar_file",
-        required=True,
-        # Todo
-        #  - [ ] default=pathlib.Path().cwd().joinpath(_HARBOR_DOWNLOAD_DIR, "harbor-*.tgz"),
-        help="Full path to the downloaded Harbor Release tar.",
-        metavar="TAR_FILE",
-        type=pathlib.Path,
+    subparser_replication_create.add_argument(
+        "--no-override",
+        dest="no_override",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Do not override existing resources at the destination.",
     )
 
-    # Todo
-    #  - [ ] --clear
-    # mutex_extract.add_argument(
-    #     "--clear",
-    #     "-c",
-    #     dest="clear",
-    #     action="store_true",
-    #     required=False,
-    #     default=False,
-    #     help="Remove the extracted files.",
-    #     # metavar="CLEAR",
-    #     # type=bool,
-    # )
+    subparser_replication_create.add_argument(
+        "--deletion",
+        dest="deletion",
+        action="store_true",
+        required=False,
+        default=False,
+        help="Also replicate deletions.",
+    )
 
-    ## CONFIGURE
+    ## LS
 
-    subparser_configure = prepare_subparsers.add_parser(
-        name="configure",
+    replication_subparsers.add_parser(
+        name="ls",
         formatter_class=_formatter,
+        help="List the replication policies (JSON lines).",
     )
 
-    mutex_configure = subparser_configure.add_mutually_exclusive_group()
+    ## RUN
 
-    mutex_configure.add_argument(
-        "--dry-run",
-        dest="dry_run",
-        action="store_true",
-        required=False,
-        default=False,
-        help="Print the configuration to stdout.",
+    subparser_replication_run = replication_subparsers.add_parser(
+        name="run",
+        formatter_class=_formatter,
+        help="Start a replication and wait for its result.",
     )
 
-    # mutex_configure.add_argument(
-    #     "--destination-directory",
-    #     "-d",
-    #     dest="destination_directory",
-    #     required=False,
-    #     default=pathlib.Path().cwd().relative_to(pathlib.Path().cwd()).joinpath(_HARBOR_BIN_DIR),
-    #     help="Directory where to save the harbor.yml file.",
-    #     metavar="DESTINATION_DIRECTORY",
-    #     type=str,
-    # )
+    subparser_replication_run.add_argument(
+        "--name",
+        "-n",
+        dest="name",
+        required=True,
+        help="The name of the replication policy.",
+        metavar="NAME",
+        type=str,
+    )
 
-    subparser_configure.add_argument(
-        "--overwrite",
-        dest="overwrite",
+    subparser_replication_run.add_argument(
+        "--no-wait",
+        dest="no_wait",
         action="store_true",
         required=False,
         default=False,
-        help="Force overwriting existing harbor.yml file.",
+        help="Return as soon as the replication started.",
     )
 
-    ## PREPARE
+    subparser_replication_run.add_argument(
+        "--timeout",
+        dest="timeout",
+        required=False,
+        default=3600.0,
+        help="Seconds to wait for the replication to finish.",
+        metavar="TIMEOUT",
+        type=float,
+    )
 
-    subparser_run_prepare = prepare_subparsers.add_parser(
-        name="install",
+    ## STATUS
+
+    subparser_replication_status = replication_subparsers.add_parser(
+        name="status",
         formatter_class=_formatter,
+        help="The last executions of a replication policy with their throughput (JSON lines).",
     )
 
-    # subparser_run_prepare.add_argument(
-    #     "--prepare-script",
-    #     "-s",
-    #     dest="prepare_script",
-    #     required=False,
-    #     default=pathlib.Path().cwd().joinpath(_HARBOR_BIN_DIR, _HARBOR_PREPARE),
-    #     help="Full path to the extracted prepare script.",
-    #     metavar="PREPARE_SCRIPT",
-    #     type=pathlib.Path,
-    # )
+    subparser_replication_status.add_argument(
+        "--name",
+        "-n",
+        dest="name",
+        required=True,
+        help="The name of the replication policy.",
+        metavar="NAME",
+        type=str,
+    )
 
-    # This is not working as expected:
-    # $ ./prepare --help
-    # prepare base dir is set to /home/michael/git/repos/OpenStudioLandscapesUtil-HarborCLI/test/extracted
-    # Usage: main.py prepare [OPTIONS]
-    #
-    # Options:
-    #   --conf TEXT   the path of Harbor configuration file
-    #   --with-trivy  the Harbor instance is to be deployed with Trivy
-    #   --help        Show this message and exit.
-    # Clean up the input dir
-    #
-    # subparser_run_prepare.add_argument(
-    #     "--config-file",
-    #     "-c",
-    #     dest="config_file",
-    #     required=False,
-    #     default=pathlib.Path().cwd().joinpath("harbor.yml"),
-    #     help="Full path to the harbor.yml config file.",
-    #     metavar="CONFIG_FILE",
-    #     type=pathlib.Path,
-    # )
+    subparser_replication_status.add_argument(
+        "--limit",
+        dest="limit",
+        required=False,
+        default=10,
+        help="Number of executions.",
+        metavar="LIMIT",
+        type=int,
+    )
 
     ####################################################################################################################
-    # SYSTEMD
+    # QUOTA
 
-    base_subparser_systemd = base_subparsers.add_parser(
-        name="systemd",
+    base_subparser_quota = base_subparsers.add_parser(
+        name="quota",
         formatter_class=_formatter,
     )
 
-    systemd_subparsers = base_subparser_systemd.add_subparsers(
-        dest="systemd_command",
-        help="A command generator for setting up "
-             "systemd with Harbor."
+    quota_subparsers = base_subparser_quota.add_subparsers(
+        dest="quota_command",
+        help="Inspect the project storage quotas.",
     )
 
-    ## INSTALL
+    ## REPORT
 
-    subparser_install = systemd_subparsers.add_parser(
-        name="install",
+    subparser_quota_report = quota_subparsers.add_parser(
+        name="report",
         formatter_class=_formatter,
-        help="Install systemd unit.",
+        help="Storage quota usage of all projects, most critical first.",
     )
 
-    subparser_install.add_argument(
-        "--su-method",
-        dest="su_method",
+    subparser_quota_report.add_argument(
+        "--format",
+        dest="format",
         required=False,
-        choices=_SU_METHODS.keys(),
-        default="pkexec",
-        help=f"Which SU method to use: {list(_SU_METHODS.keys())}.",
-        metavar="SU_METHOD",
+        choices=QUOTA_REPORT_FORMATS,
+        default=QUOTA_REPORT_FORMATS[0],
+        help="Output format.",
+        metavar="FORMAT",
         type=str,
     )
 
-    subparser_install.add_argument(
-        "--outfile",
-        "-f",
-        dest="outfile",
+    subparser_quota_report.add_argument(
+        "--sort",
+        dest="sort",
         required=False,
-        default=SYSTEMD_UNIT.name,
-        help="Name of the unit file. "
-             "It will get copied to the final destination "
-             f"upon command completion: {SYSTEMD_UNIT.parent}.",
-        metavar="OUTFILE",
+        choices=QUOTA_SORT_KEYS,
+        default=QUOTA_SORT_KEYS[0],
+        help="usage: used/hard (highest first), headroom: hard - used (lowest first), "
+             "used: bytes used (highest first). Unlimited quotas last.",
+        metavar="SORT",
         type=str,
     )
 
-    subparser_install.add_argument(
-        "--enable",
-        dest="enable",
-        action="store_true",
+    subparser_quota_report.add_argument(
+        "--concurrency",
+        "-c",
+        dest="concurrency",
         required=False,
-        default=False,
-        help="Enable systemd unit.",
+        default=8,
+        help="Maximum number of pages fetched at a time.",
+        metavar="CONCURRENCY",
+        type=int,
     )
 
-    subparser_install.add_argument(
-        "--start",
-        # "-d",
-        dest="start",
-        action="store_true",
-        required=False,
-        default=False,
-        help="Start systemd unit.",
+    ####################################################################################################################
+    # REPO
+
+    base_subparser_repo = base_subparsers.add_parser(
+        name="repo",
+        formatter_class=_formatter,
     )
 
-    ## UNINSTALL
+    repo_subparsers = base_subparser_repo.add_subparsers(
+        dest="repo_command",
+        help="Inspect repositories.",
+    )
 
-    subparser_uninstall = systemd_subparsers.add_parser(
-        name="uninstall",
+    ## LS
+
+    subparser_repo_ls = repo_subparsers.add_parser(
+        name="ls",
         formatter_class=_formatter,
-        help="Stop, disable and uninstall systemd unit.",
+        help="List repositories (JSON lines).",
     )
 
-    subparser_uninstall.add_argument(
-        "--su-method",
-        dest="su_method",
+    subparser_repo_ls.add_argument(
+        "--project-name",
+        "-p",
+        dest="project_name",
         required=False,
-        choices=_SU_METHODS.keys(),
-        default="pkexec",
-        help=f"Which SU method to use: {list(_SU_METHODS.keys())}.",
-        metavar="SU_METHOD",
+        default=None,
+        help="Only list the repositories of this project.",
+        metavar="PROJECT_NAME",
         type=str,
     )
 
-    # Todo
-    # ## STATUS
-    #
-    # subparser_status = systemd_subparsers.add_parser(
-    #     name="status",
-    #     formatter_class=_formatter,
-    #     help="Systemd unit status.",
-    # )
-    #
-    # ## JOURNALCTL
-    #
-    # subparser_journalctl = systemd_subparsers.add_parser(
-    #     name="journalctl",
-    #     formatter_class=_formatter,
-    #     help="Follow logs.",
-    # )
-
     ####################################################################################################################
-    # PROJECT
+    # ARTIFACT
 
-    base_subparser_systemd = base_subparsers.add_parser(
-        name="project",
+    base_subparser_artifact = base_subparsers.add_parser(
+        name="artifact",
         formatter_class=_formatter,
     )
 
-    project_subparsers = base_subparser_systemd.add_subparsers(
-        dest="project_command",
-        help="A simple interface to set up the basic "
-             "project structure in Harbor."
+    artifact_subparsers = base_subparser_artifact.add_subparsers(
+        dest="artifact_command",
+        help="Inspect and copy artifacts.",
     )
 
-    ## CREATE
+    ## LS
 
-    subparser_project_create = project_subparsers.add_parser(
-        name="create",
+    subparser_artifact_ls = artifact_subparsers.add_parser(
+        name="ls",
         formatter_class=_formatter,
-        help="Create project.",
+        help="List artifacts and their tags (JSON lines).",
     )
 
-    subparser_project_create.add_argument(
+    subparser_artifact_ls.add_argument(
         "--project-name",
         "-p",
         dest="project_name",
         required=True,
-        default="openstudiolandscapes",
-        help="The name of the project to be created.",
+        help="The project of the artifacts.",
         metavar="PROJECT_NAME",
         type=str,
     )
 
-    ## DELETE
+    subparser_artifact_ls.add_argument(
+        "--repository",
+        "-r",
+        dest="repository_name",
+        required=False,
+        default=None,
+        help="Only list the artifacts of this repository (all repositories of the project otherwise).",
+        metavar="REPOSITORY",
+        type=str,
+    )
 
-    subparser_project_delete = project_subparsers.add_parser(
-        name="delete",
+    ## COPY
+
+    subparser_artifact_copy = artifact_subparsers.add_parser(
+        name="copy",
         formatter_class=_formatter,
-        help="Delete project.",
+        help="Copy an artifact to another project (server side, skipped if the digest exists there).",
     )
 
-    subparser_project_delete.add_argument(
-        "--project-name",
-        "-p",
-        dest="project_name",
+    subparser_artifact_copy.add_argument(
+        "source",
+        help="The artifact to copy: `project/repository[:tag|@digest]`.",
+        metavar="SOURCE",
+        type=str,
+    )
+
+    subparser_artifact_copy.add_argument(
+        "--to-project",
+        "-t",
+        dest="to_project_name",
         required=True,
-        default="library",
-        help="The name of the project to be deleted.",
+        help="The target project.",
+        metavar="PROJECT_NAME",
+        type=str,
+    )
+
+    subparser_artifact_copy.add_argument(
+        "--to-repository",
+        dest="to_repository_name",
+        required=False,
+        default=None,
+        help="The target repository (the source's if omitted).",
+        metavar="REPOSITORY",
+        type=str,
+    )
+
+    ## PROMOTE
+
+    subparser_artifact_promote = artifact_subparsers.add_parser(
+        name="promote",
+        formatter_class=_formatter,
+        help="Copy a list of artifacts to another project (server side, skipped if the digest exists there).",
+    )
+
+    subparser_artifact_promote.add_argument(
+        "--artifacts-file",
+        "-f",
+        dest="artifacts_file",
+        required=False,
+        default=None,
+        help="File with one `project/repository[:tag|@digest]` per line (stdin if omitted or `-`).",
+        metavar="ARTIFACTS_FILE",
+        type=pathlib.Path,
+    )
+
+    subparser_artifact_promote.add_argument(
+        "--to-project",
+        "-t",
+        dest="to_project_name",
+        required=True,
+        help="The target project.",
         metavar="PROJECT_NAME",
         type=str,
     )
 
+    subparser_artifact_promote.add_argument(
+        "--concurrency",
+        "-c",
+        dest="concurrency",
+        required=False,
+        default=8,
+        help="Number of artifacts copied concurrently.",
+        metavar="CONCURRENCY",
+        type=int,
+    )
+
     return main_parser.parse_args()
 
 
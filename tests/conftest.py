@@ -7,4 +7,769 @@
     - https://docs.pytest.org/en/stable/writing_plugins.html
 """
 
-# import pytest
+import base64
+import hashlib
+import http.server
+import json
+import pathlib
+import re
+import sys
+import textwrap
+import threading
+import time
+import urllib.parse
+import uuid
+
+import pytest
+
+
+_FAKE_DOCKER = textwrap.dedent(
+    """\
+    #!{python}
+    # A stand-in for the `docker` binary. Every call is
+    # appended to `calls.jsonl` next to this script. Local
+    # images are listed in `images.json`, container health
+    # in `health.json`.
+    import fcntl
+    import json
+    import pathlib
+    import sys
+
+    here = pathlib.Path(__file__).parent
+    argv = sys.argv[1:]
+
+    with open(here / "calls.jsonl", "a") as fa:
+        fa.write(json.dumps(argv) + "\\n")
+
+    images_file = here / "images.json"
+    images = json.loads(images_file.read_text()) if images_file.exists() else []
+
+    if argv[:2] == ["image", "inspect"]:
+        sys.exit(0 if argv[-1] in images else 1)
+
+    if argv[:1] == ["inspect"]:
+        # container health, as per `health.json` (default: healthy)
+        health_file = here / "health.json"
+        health = json.loads(health_file.read_text()) if health_file.exists() else {{}}
+        print(health.get(argv[-1], "healthy"))
+        sys.exit(0)
+
+    if argv[:1] == ["pull"]:
+        image = argv[-1]
+        if "fail" in image:
+            print(f"Error response from daemon: manifest for {{image}} not found")
+            sys.exit(1)
+        # concurrent pulls: read-modify-write under a lock
+        with open(here / "images.lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            images = json.loads(images_file.read_text()) if images_file.exists() else []
+            images.append(image)
+            images_file.write_text(json.dumps(images))
+        print(f"{{image}}")
+        sys.exit(0)
+
+    sys.exit(0)
+    """
+)
+
+
+@pytest.fixture(autouse=True)
+def harbor_cache_dir(tmp_path, monkeypatch) -> pathlib.Path:
+    """Keep cached sessions/tokens out of the home directory."""
+
+    import OpenStudioLandscapesUtil.Harbor_CLI.harbor_cli as harbor_cli
+
+    cache_dir = tmp_path.joinpath("cache")
+    monkeypatch.setattr(harbor_cli, "OPENSTUDIOLANDSCAPES__HARBOR_CACHE_DIR", cache_dir.as_posix())
+    # read at runtime by the credential helper (and its background process)
+    monkeypatch.setenv("OPENSTUDIOLANDSCAPES__HARBOR_CACHE_DIR", cache_dir.as_posix())
+
+    return cache_dir
+
+
+@pytest.fixture
+def fake_docker(tmp_path) -> pathlib.Path:
+    """Path to an executable stand-in for `docker`."""
+
+    docker = tmp_path.joinpath("fake_docker", "docker")
+    docker.parent.mkdir(parents=True)
+    docker.write_text(_FAKE_DOCKER.format(python=sys.executable))
+    docker.chmod(0o755)
+
+    return docker
+
+
+@pytest.fixture
+def fake_which(monkeypatch):
+    """Resolve every executable to `/usr/bin/<name>` so that
+    generated commands do not depend on the host."""
+
+    import OpenStudioLandscapesUtil.Harbor_CLI.harbor_cli as harbor_cli
+
+    def which(cmd, *args, **kwargs):
+        return f"/usr/bin/{cmd}"
+
+    monkeypatch.setattr(harbor_cli.shutil, "which", which)
+    monkeypatch.setattr(harbor_cli, "SHELL", [which("bash"), "-c"])
+    monkeypatch.setitem(harbor_cli._SU_METHODS, "sudo", [which("sudo"), "--user=root"])
+
+
+def fake_docker_calls(
+        docker: pathlib.Path,
+) -> list[list[str]]:
+
+    calls_file = docker.parent.joinpath("calls.jsonl")
+
+    if not calls_file.exists():
+        return []
+
+    return [json.loads(line) for line in calls_file.read_text().splitlines()]
+
+
+class HarborStandIn:
+    """An in-memory stand-in for the parts of the Harbor
+    API (`/api/v2.0`) used by the CLI.
+
+    Routes are registered with `route(method, pattern)`,
+    handlers return `(status, headers, body)`."""
+
+    user = "admin"
+    password = "Harbor12345"
+
+    def __init__(self):
+        self.routes: list = []
+        self.requests: list[dict] = []
+        self.connections: set = set()
+        self.projects: dict[str, dict] = {}
+        # "project/repository": [{"digest": ..., "size": ..., "tags": [{"name": ...}]}]
+        self.repositories: dict[str, list[dict]] = {}
+        self.gc_runs: list[dict] = []
+        # garbage collection runs: Pending, Running for `gc_polls` GETs, then Success
+        self.gc_jobs: list[dict] = []
+        self.gc_polls: int = 2
+        self.gc_schedule_: dict = {}
+        self.retentions: dict[int, dict] = {}
+        self.registries: list[dict] = []
+        self.replication_policies: list[dict] = []
+        # replication executions: InProgress for `replication_polls` GETs, then Succeed,
+        # each with a copy task per `replication_resources` entry ("project/repository:[tag,...]")
+        self.replication_executions: list[dict] = []
+        self.replication_polls: int = 1
+        self.replication_resources: list[str] = []
+        # registry (/v2): (repository, reference): (media type, body), digest: body
+        self.manifests: dict[tuple[str, str], tuple[str, bytes]] = {}
+        self.blobs: dict[str, bytes] = {}
+        # (repository, digest) of the blobs of each repository, blob uploads in progress
+        self.blob_links: set[tuple[str, str]] = set()
+        self.uploads: dict[str, dict] = {}
+        self.sessions: set[str] = set()
+        self.tokens: set[str] = set()
+        # registry tokens (/service/token): token: (scopes, expires_at)
+        self.registry_tokens: dict[str, tuple[set[str], float]] = {}
+        self.registry_token_ttl: int = 1800
+        # Seconds it takes to verify a password (Harbor hashes it)
+        self.basic_cost: float = 0.0
+        self.lock = threading.Lock()
+
+        self.route("GET", r"/api/v2.0/health")(self.health)
+        self.route("GET", r"/api/v2.0/systeminfo")(self.systeminfo)
+        self.route("POST", r"/c/login")(self.login)
+        self.route("GET", r"/service/token")(self.registry_token)
+        self.route("GET", r"/api/v2.0/projects")(self.project_list)
+        self.route("HEAD", r"/api/v2.0/projects")(self.project_head)
+        self.route("POST", r"/api/v2.0/projects")(self.project_create)
+        self.route("DELETE", r"/api/v2.0/projects/(?P<name>[^/]+)")(self.project_delete)
+        self.route("GET", r"/api/v2.0/projects/(?P<name>[^/]+)/summary")(self.project_summary)
+        self.route("GET", r"/api/v2.0/projects/(?P<name>[^/]+)")(self.project_get)
+        self.route("POST", r"/api/v2.0/retentions")(self.retention_create)
+        self.route("PUT", r"/api/v2.0/retentions/(?P<retention_id>\d+)")(self.retention_update)
+        self.route("DELETE", r"/api/v2.0/projects/(?P<project>[^/]+)/repositories/(?P<repository>[^/]+)")(
+            self.repository_delete
+        )
+        self.route("POST", r"/api/v2.0/system/gc/schedule")(self.gc_schedule)
+        self.route("PUT", r"/api/v2.0/system/gc/schedule")(self.gc_schedule)
+        self.route("GET", r"/api/v2.0/system/gc/schedule")(self.gc_schedule_get)
+        self.route("GET", r"/api/v2.0/system/gc")(self.gc_list)
+        self.route("GET", r"/api/v2.0/system/gc/(?P<gc_id>\d+)")(self.gc_get)
+        self.route("GET", r"/api/v2.0/system/gc/(?P<gc_id>\d+)/log")(self.gc_log)
+        self.route("GET", r"/api/v2.0/quotas")(self.quota_list)
+        self.route("GET", r"/api/v2.0/registries")(self.registry_list)
+        self.route("POST", r"/api/v2.0/registries")(self.registry_create)
+        self.route("GET", r"/api/v2.0/replication/policies")(self.replication_policy_list)
+        self.route("POST", r"/api/v2.0/replication/policies")(self.replication_policy_create)
+        self.route("PUT", r"/api/v2.0/replication/policies/(?P<policy_id>\d+)")(self.replication_policy_update)
+        self.route("GET", r"/api/v2.0/replication/executions")(self.replication_execution_list)
+        self.route("POST", r"/api/v2.0/replication/executions")(self.replication_execution_create)
+        self.route("GET", r"/api/v2.0/replication/executions/(?P<execution_id>\d+)")(self.replication_execution_get)
+        self.route("GET", r"/api/v2.0/replication/executions/(?P<execution_id>\d+)/tasks")(
+            self.replication_task_list
+        )
+        self.route("GET", r"/v2/(?P<name>.+)/manifests/(?P<reference>[^/]+)")(self.manifest_get)
+        self.route("GET", r"/v2/(?P<name>.+)/blobs/(?P<digest>[^/]+)")(self.blob_get)
+        self.route("HEAD", r"/v2/(?P<name>.+)/blobs/(?P<digest>[^/]+)")(self.blob_head)
+        self.route("POST", r"/v2/(?P<name>.+)/blobs/uploads/")(self.upload_start)
+        self.route("PATCH", r"/v2/(?P<name>.+)/blobs/uploads/(?P<uuid>[^/]+)")(self.upload_patch)
+        self.route("PUT", r"/v2/(?P<name>.+)/blobs/uploads/(?P<uuid>[^/]+)")(self.upload_complete)
+        self.route("DELETE", r"/v2/(?P<name>.+)/blobs/uploads/(?P<uuid>[^/]+)")(self.upload_cancel)
+        self.route("PUT", r"/v2/(?P<name>.+)/manifests/(?P<reference>[^/]+)")(self.manifest_put)
+        self.route("GET", r"/api/v2.0/repositories")(self.repository_list)
+        self.route("GET", r"/api/v2.0/projects/(?P<project>[^/]+)/repositories")(self.repository_list)
+        self.route(
+            "GET", r"/api/v2.0/projects/(?P<project>[^/]+)/repositories/(?P<repository>[^/]+)/artifacts"
+        )(self.artifact_list)
+        self.route(
+            "GET",
+            r"/api/v2.0/projects/(?P<project>[^/]+)/repositories/(?P<repository>[^/]+)"
+            r"/artifacts/(?P<reference>[^/]+)/tags",
+        )(self.tag_list)
+        self.route(
+            "GET",
+            r"/api/v2.0/projects/(?P<project>[^/]+)/repositories/(?P<repository>[^/]+)"
+            r"/artifacts/(?P<reference>[^/]+)",
+        )(self.artifact_get)
+        self.route(
+            "POST", r"/api/v2.0/projects/(?P<project>[^/]+)/repositories/(?P<repository>[^/]+)/artifacts"
+        )(self.artifact_copy)
+        self.route(
+            "POST",
+            r"/api/v2.0/projects/(?P<project>[^/]+)/repositories/(?P<repository>[^/]+)"
+            r"/artifacts/(?P<reference>[^/]+)/tags",
+        )(self.tag_create)
+
+    def route(self, method, pattern):
+        def decorator(handler):
+            self.routes.insert(0, (method, re.compile(pattern + "$"), handler))
+            return handler
+        return decorator
+
+    def authorized(self, request) -> bool:
+        authorization = request["headers"].get("authorization", "")
+
+        if authorization.startswith("Basic "):
+            if self.basic_cost:
+                time.sleep(self.basic_cost)
+            expected = base64.b64encode(f"{self.user}:{self.password}".encode()).decode()
+            return authorization == f"Basic {expected}"
+
+        if authorization.startswith("Bearer "):
+            return authorization[len("Bearer "):] in self.tokens
+
+        cookies = dict(
+            c.strip().split("=", 1) for c in request["headers"].get("cookie", "").split(";") if "=" in c
+        )
+
+        if cookies.get("sid") not in self.sessions:
+            return False
+
+        if request["method"] not in ["GET", "HEAD"]:
+            return request["headers"].get("x-harbor-csrf-token") == cookies.get("_gorilla_csrf")
+
+        return True
+
+    def handle(self, request) -> tuple:
+        with self.lock:
+            self.requests.append(request)
+            self.connections.add(request["client"])
+
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request["path"])
+            if match and method == request["method"]:
+                if request["path"].startswith("/v2/"):
+                    name = match.groupdict().get("name", "")
+                    action = "pull" if request["method"] in ["GET", "HEAD"] else "push"
+                    if not self.registry_authorized(request, name, action):
+                        realm = f"http://{self.host}:{self.port}/service/token"
+                        challenge = f'Bearer realm="{realm}",service="harbor-registry",scope="repository:{name}:{action}"'
+                        return 401, {"WWW-Authenticate": challenge}, {"errors": [{"code": "UNAUTHORIZED", "message": "unauthorized"}]}
+                    return handler(request, **match.groupdict())
+                if handler not in [self.health, self.systeminfo, self.login] and not self.authorized(request):
+                    return 401, {}, {"errors": [{"code": "UNAUTHORIZED", "message": "unauthorized"}]}
+                return handler(request, **match.groupdict())
+
+        return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"{request['path']} not found"}]}
+
+    def registry_authorized(self, request, name, action) -> bool:
+        """Harbor's registry accepts Basic auth and tokens of its token service."""
+
+        authorization = request["headers"].get("authorization", "")
+
+        if authorization.startswith("Basic "):
+            return self.authorized(request)
+
+        scopes, expires_at = self.registry_tokens.get(authorization.removeprefix("Bearer "), (set(), 0))
+
+        return expires_at > time.time() and any(
+            scope.rsplit(":", 1)[0] == f"repository:{name}" and action in scope.rsplit(":", 1)[1].split(",")
+            for scope in scopes
+        )
+
+    def registry_token(self, request):
+        if not request["headers"].get("authorization", "").startswith("Basic "):
+            return 401, {}, None
+        token = f"registry-{uuid.uuid4().hex}"
+        scopes = {v for k, v in request["query_list"] if k == "scope"}
+        self.registry_tokens[token] = (scopes, time.time() + self.registry_token_ttl)
+        return 200, {}, {"token": token, "expires_in": self.registry_token_ttl, "issued_at": "2026-10-19T00:00:00Z"}
+
+    def health(self, request):
+        return 200, {}, {"status": "healthy", "components": [{"name": "core", "status": "healthy"}]}
+
+    def systeminfo(self, request):
+        csrf_token = f"csrf-{len(self.requests)}"
+        return 200, {"X-Harbor-Csrf-Token": csrf_token, "Set-Cookie": f"_gorilla_csrf={csrf_token}; Path=/"}, {}
+
+    def login(self, request):
+        form = dict(urllib.parse.parse_qsl(request["body"].decode()))
+        cookies = dict(
+            c.strip().split("=", 1) for c in request["headers"].get("cookie", "").split(";") if "=" in c
+        )
+        if request["headers"].get("x-harbor-csrf-token") != cookies.get("_gorilla_csrf"):
+            return 403, {}, {"errors": [{"code": "FORBIDDEN", "message": "CSRF token invalid"}]}
+        if (form.get("principal"), form.get("password")) != (self.user, self.password):
+            return 401, {}, None
+        sid = f"sid-{len(self.requests)}"
+        with self.lock:
+            self.sessions.add(sid)
+        return 200, {"Set-Cookie": f"sid={sid}; Path=/"}, None
+
+    def paginate(self, request, items):
+        """Harbor style pagination (`page`, `page_size`, `Link`, `X-Total-Count`)."""
+        page = int(request["query"].get("page", 1))
+        page_size = min(int(request["query"].get("page_size", 10)), 100)
+        headers = {"X-Total-Count": str(len(items))}
+        if page * page_size < len(items):
+            query = urllib.parse.urlencode({**request["query"], "page": page + 1, "page_size": page_size})
+            headers["Link"] = f'<{request["path"]}?{query}>; rel="next"'
+        return 200, headers, items[(page - 1) * page_size:page * page_size]
+
+    def project_list(self, request):
+        return self.paginate(request, list(self.projects.values()))
+
+    def project_get(self, request, name):
+        if name not in self.projects:
+            return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"project {name} not found"}]}
+        return 200, {}, self.projects[name]
+
+    def retention_create(self, request):
+        policy = request["json"]
+        with self.lock:
+            retention_id = len(self.retentions) + 1
+            self.retentions[retention_id] = policy
+            project = next(p for p in self.projects.values() if p["project_id"] == policy["scope"]["ref"])
+            project.setdefault("metadata", {})["retention_id"] = str(retention_id)
+        return 201, {"Location": f"/api/v2.0/retentions/{retention_id}"}, None
+
+    def retention_update(self, request, retention_id):
+        if int(retention_id) not in self.retentions:
+            return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"retention {retention_id} not found"}]}
+        self.retentions[int(retention_id)] = request["json"]
+        return 200, {}, None
+
+    def project_summary(self, request, name):
+        if name not in self.projects:
+            return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"project {name} not found"}]}
+        repositories = [r for n, r in self.repositories.items() if n.startswith(f"{name}/")]
+        return 200, {}, {
+            "repo_count": len(repositories),
+            "quota": {"hard": {"storage": -1}, "used": {"storage": sum(a["size"] for r in repositories for a in r)}},
+        }
+
+    def add_image(self, name, reference, layers, platforms=None) -> str:
+        """Add an image (an index of `platforms` if given) to the registry. Returns its digest."""
+
+        def _blob(data: bytes) -> dict:
+            digest = f"sha256:{hashlib.sha256(data).hexdigest()}"
+            self.blobs[digest] = data
+            self.blob_links.add((name, digest))
+            return {"mediaType": "application/vnd.oci.image.layer.v1.tar+gzip", "digest": digest, "size": len(data)}
+
+        def _manifest(media_type: str, manifest: dict, references: list) -> dict:
+            body = json.dumps({"schemaVersion": 2, "mediaType": media_type, **manifest}).encode()
+            digest = f"sha256:{hashlib.sha256(body).hexdigest()}"
+            for reference_ in [digest, *references]:
+                self.manifests[(name, reference_)] = (media_type, body)
+            return {"mediaType": media_type, "digest": digest, "size": len(body)}
+
+        def _image(platform: str) -> dict:
+            config = {**_blob(json.dumps({"platform": platform}).encode()), "mediaType": "application/vnd.oci.image.config.v1+json"}
+            return _manifest(
+                "application/vnd.oci.image.manifest.v1+json",
+                {"config": config, "layers": [_blob(layer + platform.encode()) for layer in layers]},
+                [] if platforms else [reference],
+            )
+
+        if not platforms:
+            return _image("linux/amd64")["digest"]
+
+        index = [
+            {**_image(platform), "platform": dict(zip(["os", "architecture"], platform.split("/")))}
+            for platform in platforms
+        ]
+        return _manifest("application/vnd.oci.image.index.v1+json", {"manifests": index}, [reference])["digest"]
+
+    def registry_list(self, request):
+        return self.paginate(request, self.registries)
+
+    def registry_create(self, request):
+        with self.lock:
+            registry_id = len(self.registries) + 1
+            self.registries.append({"id": registry_id, **request["json"]})
+        return 201, {"Location": f"/api/v2.0/registries/{registry_id}"}, None
+
+    def replication_policy_list(self, request):
+        name = request["query"].get("name", "")
+        registries = {r["id"]: r for r in self.registries}
+
+        def _expand(registry):
+            # Harbor returns the full registry objects
+            return registries.get(registry["id"], registry) if registry else registry
+
+        return self.paginate(
+            request,
+            [
+                {**p, "src_registry": _expand(p.get("src_registry")), "dest_registry": _expand(p.get("dest_registry"))}
+                for p in self.replication_policies
+                if name in p["name"]
+            ],
+        )
+
+    def replication_policy_create(self, request):
+        with self.lock:
+            policy_id = len(self.replication_policies) + 1
+            self.replication_policies.append({"id": policy_id, **request["json"]})
+        return 201, {"Location": f"/api/v2.0/replication/policies/{policy_id}"}, None
+
+    def replication_policy_update(self, request, policy_id):
+        for policy in self.replication_policies:
+            if policy["id"] == int(policy_id):
+                policy.update(request["json"])
+                return 200, {}, None
+        return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"policy {policy_id} not found"}]}
+
+    def replication_execution_create(self, request):
+        with self.lock:
+            execution_id = len(self.replication_executions) + 1
+            self.replication_executions.insert(0, {
+                "id": execution_id,
+                "policy_id": request["json"]["policy_id"],
+                "status": "InProgress",
+                "trigger": "manual",
+                "start_time": "2026-10-19T04:00:00Z",
+                "end_time": None,
+                "total": len(self.replication_resources),
+                "succeed": 0,
+                "failed": 0,
+                "polls": 0,
+                "tasks": [
+                    {
+                        "id": i,
+                        "execution_id": execution_id,
+                        "status": "Succeed",
+                        "operation": "copy",
+                        "resource_type": "image",
+                        "src_resource": resource,
+                        "dst_resource": resource,
+                    }
+                    for i, resource in enumerate(self.replication_resources, 1)
+                ],
+            })
+        return 201, {"Location": f"/api/v2.0/replication/executions/{execution_id}"}, None
+
+    @staticmethod
+    def _replication_execution(execution):
+        return {k: v for k, v in execution.items() if k not in ["polls", "tasks"]}
+
+    def replication_execution_list(self, request):
+        policy_id = int(request["query"].get("policy_id", 0))
+        return self.paginate(
+            request,
+            [self._replication_execution(e) for e in self.replication_executions if e["policy_id"] == policy_id],
+        )
+
+    def replication_execution_get(self, request, execution_id):
+        for execution in self.replication_executions:
+            if execution["id"] == int(execution_id):
+                execution["polls"] += 1
+                if execution["status"] == "InProgress" and execution["polls"] > self.replication_polls:
+                    execution["status"] = "Succeed"
+                    execution["end_time"] = "2026-10-19T04:00:10Z"
+                    execution["succeed"] = execution["total"]
+                return 200, {}, self._replication_execution(execution)
+        return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"execution {execution_id} not found"}]}
+
+    def replication_task_list(self, request, execution_id):
+        execution = next(e for e in self.replication_executions if e["id"] == int(execution_id))
+        return self.paginate(request, execution["tasks"])
+
+    def manifest_get(self, request, name, reference):
+        if (name, reference) not in self.manifests:
+            return 404, {}, {"errors": [{"code": "MANIFEST_UNKNOWN", "message": f"manifest unknown: {name}:{reference}"}]}
+        media_type, body = self.manifests[(name, reference)]
+        digest = f"sha256:{hashlib.sha256(body).hexdigest()}"
+        return 200, {"Content-Type": media_type, "Docker-Content-Digest": digest}, body
+
+    def blob_get(self, request, name, digest):
+        if digest not in self.blobs:
+            return 404, {}, {"errors": [{"code": "BLOB_UNKNOWN", "message": f"blob unknown: {digest}"}]}
+        return 200, {"Content-Type": "application/octet-stream", "Docker-Content-Digest": digest}, self.blobs[digest]
+
+    def blob_head(self, request, name, digest):
+        if (name, digest) not in self.blob_links:
+            return 404, {}, None
+        return 200, {"Docker-Content-Digest": digest}, self.blobs[digest]
+
+    def upload_start(self, request, name):
+        digest, source = request["query"].get("mount"), request["query"].get("from")
+        if digest and (source, digest) in self.blob_links and self.registry_authorized(request, source, "pull"):
+            self.blob_links.add((name, digest))
+            return 201, {"Location": f"/v2/{name}/blobs/{digest}", "Docker-Content-Digest": digest}, None
+        upload = uuid.uuid4().hex
+        self.uploads[upload] = {"name": name, "data": bytearray()}
+        return 202, {"Location": f"/v2/{name}/blobs/uploads/{upload}?_state={upload}", "Range": "0-0"}, None
+
+    def upload_patch(self, request, name, uuid):
+        upload = self.uploads.get(uuid)
+        if upload is None or request["query"].get("_state") != uuid:
+            return 404, {}, {"errors": [{"code": "BLOB_UPLOAD_UNKNOWN", "message": f"upload {uuid} unknown"}]}
+        start, _, end = request["headers"].get("content-range", "").partition("-")
+        if int(start) != len(upload["data"]) or int(end) != int(start) + len(request["body"]) - 1:
+            return 416, {}, {"errors": [{"code": "BLOB_UPLOAD_INVALID", "message": "range"}]}
+        upload["data"] += request["body"]
+        return 202, {
+            "Location": f"/v2/{name}/blobs/uploads/{uuid}?_state={uuid}",
+            "Range": f"0-{len(upload['data']) - 1}",
+        }, None
+
+    def upload_complete(self, request, name, uuid):
+        upload = self.uploads.pop(uuid, None)
+        if upload is None:
+            return 404, {}, {"errors": [{"code": "BLOB_UPLOAD_UNKNOWN", "message": f"upload {uuid} unknown"}]}
+        data = bytes(upload["data"] + request["body"])
+        digest = request["query"]["digest"]
+        if f"sha256:{hashlib.sha256(data).hexdigest()}" != digest:
+            return 400, {}, {"errors": [{"code": "DIGEST_INVALID", "message": f"digest {digest}"}]}
+        self.blobs[digest] = data
+        self.blob_links.add((name, digest))
+        return 201, {"Location": f"/v2/{name}/blobs/{digest}", "Docker-Content-Digest": digest}, None
+
+    def upload_cancel(self, request, name, uuid):
+        if self.uploads.pop(uuid, None) is None:
+            return 404, {}, {"errors": [{"code": "BLOB_UPLOAD_UNKNOWN", "message": f"upload {uuid} unknown"}]}
+        return 204, {}, None
+
+    def manifest_put(self, request, name, reference):
+        body = request["body"]
+        manifest = json.loads(body)
+        digest = f"sha256:{hashlib.sha256(body).hexdigest()}"
+        for descriptor in [manifest.get("config"), *manifest.get("layers", [])]:
+            if descriptor and (name, descriptor["digest"]) not in self.blob_links:
+                return 400, {}, {"errors": [{"code": "MANIFEST_BLOB_UNKNOWN", "message": descriptor["digest"]}]}
+        for descriptor in manifest.get("manifests", []):
+            if (name, descriptor["digest"]) not in self.manifests:
+                return 400, {}, {"errors": [{"code": "MANIFEST_UNKNOWN", "message": descriptor["digest"]}]}
+        media_type = request["headers"]["content-type"]
+        self.manifests[(name, digest)] = self.manifests[(name, reference)] = (media_type, body)
+        return 201, {"Location": f"/v2/{name}/manifests/{digest}", "Docker-Content-Digest": digest}, None
+
+    def quota_list(self, request):
+        quotas = [
+            {
+                "id": project["project_id"],
+                "ref": {"id": project["project_id"], "name": name},
+                "hard": {"storage": project.get("storage_limit", -1)},
+                "used": {"storage": sum(a["size"] for n, r in self.repositories.items() if n.startswith(f"{name}/") for a in r)},
+            }
+            for name, project in self.projects.items()
+        ]
+        return self.paginate(request, quotas)
+
+    def repository_delete(self, request, project, repository):
+        name = f"{project}/{urllib.parse.unquote(urllib.parse.unquote(repository))}"
+        with self.lock:
+            if name not in self.repositories:
+                return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"repository {name} not found"}]}
+            del self.repositories[name]
+        return 200, {}, None
+
+    def gc_schedule(self, request):
+        schedule = request["json"]["schedule"]
+        if schedule["type"] != "Manual":
+            exists = self.gc_schedule_.get("schedule", {}).get("type") not in [None, "None"]
+            if exists != (request["method"] == "PUT"):
+                return 409 if exists else 404, {}, {"errors": [{"code": "CONFLICT", "message": "schedule"}]}
+            self.gc_schedule_ = request["json"]
+            return 200, {}, None
+        with self.lock:
+            self.gc_runs.append(request["json"])
+            gc_id = len(self.gc_runs)
+            self.gc_jobs.insert(0, {
+                "id": gc_id,
+                "job_status": "Pending",
+                "job_parameters": json.dumps(request["json"]["parameters"]),
+                "schedule": {"type": "Manual"},
+                "creation_time": "2026-10-19T03:00:00Z",
+                "update_time": "2026-10-19T03:00:00Z",
+                "polls": 0,
+            })
+        return 201, {"Location": f"/api/v2.0/system/gc/{gc_id}"}, None
+
+    def gc_schedule_get(self, request):
+        return 200, {}, self.gc_schedule_
+
+    def gc_list(self, request):
+        return self.paginate(request, [{k: v for k, v in job.items() if k != "polls"} for job in self.gc_jobs])
+
+    def gc_get(self, request, gc_id):
+        for job in self.gc_jobs:
+            if job["id"] == int(gc_id):
+                job["polls"] += 1
+                if job["job_status"] in ["Pending", "Running"]:
+                    job["job_status"] = "Running" if job["polls"] <= self.gc_polls else "Success"
+                    job["update_time"] = f"2026-10-19T03:{job['polls']:02}:30Z"
+                return 200, {}, {k: v for k, v in job.items() if k != "polls"}
+        return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"gc {gc_id} not found"}]}
+
+    def gc_log(self, request, gc_id):
+        job = next(job for job in self.gc_jobs if job["id"] == int(gc_id))
+        if json.loads(job["job_parameters"]).get("dry_run"):
+            log = "3 blobs and 1 manifests eligible for deletion\nThe GC could free up 12 MB space, the size is a rough estimate."
+        else:
+            log = "3 blobs and 1 manifests are actually deleted\nThe GC job actual frees up 12 MB space."
+        return 200, {"Content-Type": "text/plain"}, log.encode()
+
+    def repository_list(self, request, project=None):
+        names = [n for n in self.repositories if project is None or n.startswith(f"{project}/")]
+        return self.paginate(
+            request,
+            [{"name": n, "artifact_count": len(self.repositories[n])} for n in names],
+        )
+
+    def artifact_list(self, request, project, repository):
+        name = f"{project}/{urllib.parse.unquote(urllib.parse.unquote(repository))}"
+        if name not in self.repositories:
+            return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"repository {name} not found"}]}
+        return self.paginate(request, self.repositories[name])
+
+    def artifact_get(self, request, project, repository, reference):
+        name = f"{project}/{urllib.parse.unquote(urllib.parse.unquote(repository))}"
+        reference = urllib.parse.unquote(reference)
+        for artifact in self.repositories.get(name, []):
+            if reference == artifact["digest"] or reference in [t["name"] for t in artifact["tags"]]:
+                return 200, {}, artifact
+        return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"artifact {reference} not found"}]}
+
+    def artifact_copy(self, request, project, repository):
+        name = f"{project}/{urllib.parse.unquote(urllib.parse.unquote(repository))}"
+        source, _, digest = request["query"]["from"].partition("@")
+        artifact = next((a for a in self.repositories.get(source, []) if a["digest"] == digest), None)
+        if artifact is None:
+            return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"artifact {source}@{digest} not found"}]}
+        with self.lock:
+            if any(a["digest"] == digest for a in self.repositories.get(name, [])):
+                return 409, {}, {"errors": [{"code": "CONFLICT", "message": f"artifact {digest} exists"}]}
+            self.repositories.setdefault(name, []).append(
+                {**artifact, "tags": [dict(tag) for tag in artifact["tags"]]}
+            )
+        return 201, {"Location": f"{request['path']}/{digest}"}, None
+
+    def tag_create(self, request, project, repository, reference):
+        name = f"{project}/{urllib.parse.unquote(urllib.parse.unquote(repository))}"
+        reference = urllib.parse.unquote(reference)
+        tag = request["json"]["name"]
+        with self.lock:
+            if any(tag in [t["name"] for t in a["tags"]] for a in self.repositories.get(name, [])):
+                return 409, {}, {"errors": [{"code": "CONFLICT", "message": f"tag {tag} exists"}]}
+            for artifact in self.repositories.get(name, []):
+                if artifact["digest"] == reference:
+                    artifact["tags"].append({"name": tag})
+                    return 201, {}, None
+        return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"artifact {reference} not found"}]}
+
+    def tag_list(self, request, project, repository, reference):
+        name = f"{project}/{urllib.parse.unquote(urllib.parse.unquote(repository))}"
+        reference = urllib.parse.unquote(reference)
+        for artifact in self.repositories.get(name, []):
+            if reference == artifact["digest"] or reference in [t["name"] for t in artifact["tags"]]:
+                return self.paginate(request, artifact["tags"])
+        return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"artifact {reference} not found"}]}
+
+    def project_head(self, request):
+        if request["query"].get("project_name") in self.projects:
+            return 200, {}, None
+        return 404, {}, None
+
+    def project_create(self, request):
+        project = request["json"]
+        with self.lock:
+            if project["project_name"] in self.projects:
+                return 409, {}, {"errors": [{"code": "CONFLICT", "message": f"The project named {project['project_name']} already exists"}]}
+            project_id = len(self.projects) + 1
+            self.projects[project["project_name"]] = {"project_id": project_id, "name": project["project_name"], **project}
+        return 201, {"Location": f"/api/v2.0/projects/{project_id}"}, None
+
+    def project_delete(self, request, name):
+        with self.lock:
+            if name not in self.projects:
+                return 404, {}, {"errors": [{"code": "NOT_FOUND", "message": f"project {name} not found"}]}
+            if any(n.startswith(f"{name}/") for n in self.repositories):
+                return 412, {}, {"errors": [{"code": "PRECONDITION", "message": f"the project contains repositories, can not be deleted"}]}
+            del self.projects[name]
+        return 200, {}, None
+
+
+class _HarborStandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _handle(self):
+        url = urllib.parse.urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        request = {
+            "method": self.command,
+            "path": url.path,
+            "query": dict(urllib.parse.parse_qsl(url.query)),
+            "query_list": urllib.parse.parse_qsl(url.query),
+            "headers": {k.lower(): v for k, v in self.headers.items()},
+            "body": body,
+            "json": json.loads(body) if body and "json" in self.headers.get("Content-Type", "") else None,
+            "client": self.client_address,
+        }
+
+        status, headers, payload = self.server.stand_in.handle(request)
+
+        if isinstance(payload, (dict, list)):
+            data = json.dumps(payload).encode()
+            headers = {"Content-Type": "application/json", **headers}
+        else:
+            data = payload or b""
+
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _handle
+
+
+@pytest.fixture
+def harbor_server():
+    """A `HarborStandIn` served on localhost (`.host`, `.port`)."""
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _HarborStandInHandler)
+    server.daemon_threads = True
+    server.stand_in = HarborStandIn()
+    server.stand_in.host, server.stand_in.port = server.server_address
+
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+
+    yield server.stand_in
+
+    server.shutdown()
+    server.server_close()
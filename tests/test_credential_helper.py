@@ -0,0 +1,163 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import OpenStudioLandscapesUtil.Harbor_CLI.harbor_cli as harbor_cli
+import OpenStudioLandscapesUtil.Harbor_CLI.credential_helper as credential_helper
+
+
+def helper(monkeypatch, capsys, *args, stdin: str = "") -> tuple[int, str]:
+    monkeypatch.setattr(sys, "stdin", io.StringIO(stdin))
+    code = credential_helper.main(list(args))
+    return code, capsys.readouterr().out
+
+
+@pytest.fixture
+def refreshes(monkeypatch) -> list:
+    """Background refreshes requested by `get`."""
+
+    calls = []
+    monkeypatch.setattr(credential_helper, "_refresh_background", lambda server_url: calls.append(server_url))
+    return calls
+
+
+def test_store_get_erase(monkeypatch, capsys, harbor_cache_dir, refreshes):
+    credentials = {"ServerURL": "https://harbor.example.com", "Username": "robot$render", "Secret": "s3cret"}
+
+    assert helper(monkeypatch, capsys, "store", stdin=json.dumps(credentials)) == (0, "")
+    assert oct((harbor_cache_dir / "credentials.json").stat().st_mode & 0o777) == "0o600"
+
+    # Docker hands over the host (or URL) of the image reference
+    code, out = helper(monkeypatch, capsys, "get", stdin="harbor.example.com\n")
+    assert (code, json.loads(out)) == (0, credentials)
+    # never checked yet
+    assert refreshes == ["https://harbor.example.com"]
+
+    code, out = helper(monkeypatch, capsys, "list")
+    assert json.loads(out) == {"https://harbor.example.com": "robot$render"}
+
+    assert helper(monkeypatch, capsys, "erase", stdin="https://harbor.example.com/v2/") == (0, "")
+    assert helper(monkeypatch, capsys, "get", stdin="harbor.example.com") == (1, f"{credential_helper.CREDENTIALS_NOT_FOUND}\n")
+
+
+def test_get_checked(monkeypatch, capsys, refreshes):
+    credential_helper.store({"ServerURL": "harbor.example.com", "Username": "robot$render", "Secret": "s3cret"})
+    credential_helper._update(key="harbor.example.com", checked_at=time.time())
+
+    assert credential_helper.get(server_url="harbor.example.com")["Secret"] == "s3cret"
+    assert refreshes == []
+
+    credential_helper._update(key="harbor.example.com", invalid=True)
+    with pytest.raises(credential_helper.CredentialsNotFound):
+        credential_helper.get(server_url="harbor.example.com")
+
+
+def test_refresh_background_once(monkeypatch):
+    spawned = []
+    monkeypatch.setattr(subprocess, "Popen", lambda cmd, **kwargs: spawned.append(cmd))
+
+    credential_helper.store({"ServerURL": "harbor.example.com", "Username": "robot$render", "Secret": "s3cret"})
+
+    # concurrent `get`s before the check is done
+    for _ in range(5):
+        credential_helper.get(server_url="harbor.example.com")
+
+    assert len(spawned) == 1
+    assert spawned[0][-2:] == ["refresh", "harbor.example.com"]
+
+    # the check did not finish in time
+    credential_helper._update(
+        key="harbor.example.com",
+        refresh_started_at=time.time() - credential_helper.REFRESH_TIMEOUT,
+    )
+    credential_helper.get(server_url="harbor.example.com")
+
+    assert len(spawned) == 2
+
+
+def test_invalid_input(monkeypatch, capsys):
+    assert helper(monkeypatch, capsys, "store", stdin="{}")[0] == 1
+    assert helper(monkeypatch, capsys, "login")[0] == 1
+
+
+def test_refresh(harbor_server, harbor_cache_dir):
+    server_url = f"http://{harbor_server.host}:{harbor_server.port}"
+    credential_helper.store({"ServerURL": server_url, "Username": harbor_server.user, "Secret": harbor_server.password})
+
+    harbor_server.add_image("show-a/nuke", "15.1", layers=[b"nuke"])
+    with harbor_cli.HarborClient(
+            host=harbor_server.host, port=harbor_server.port, user=harbor_server.user, password=harbor_server.password
+    ) as client:
+        client.send(client.prepare_registry(method=harbor_cli.RequestMethod.GET, path="/show-a/nuke/manifests/15.1"))
+        cache_file = client.registry_tokens.cache_file
+
+    # due
+    tokens = json.loads(cache_file.read_text())
+    for entry in tokens.values():
+        entry["refresh_at"] = time.time() - 1
+    cache_file.write_text(json.dumps(tokens))
+
+    credential_helper.refresh(server_url=server_url)
+
+    entry = credential_helper._read()[credential_helper.server_key(server_url)]
+    assert entry["invalid"] is False
+    assert entry["checked_at"] > time.time() - 10
+    # the check and the refreshed pull token
+    assert [r["query"].get("scope") for r in harbor_server.requests if r["path"] == "/service/token"] == [
+        "repository:show-a/nuke:pull",
+        None,
+        "repository:show-a/nuke:pull",
+    ]
+    assert json.loads(cache_file.read_text())[f"harbor-registry repository:show-a/nuke:pull"]["refresh_at"] > time.time()
+
+
+def test_refresh_rejected(harbor_server):
+    server_url = f"http://{harbor_server.host}:{harbor_server.port}"
+    credential_helper.store({"ServerURL": server_url, "Username": "robot$render", "Secret": "expired"})
+
+    credential_helper.refresh(server_url=server_url)
+
+    with pytest.raises(credential_helper.CredentialsNotFound):
+        credential_helper.get(server_url=server_url)
+
+
+def test_minimal_imports():
+    # `get` runs on every pull: none of the CLI's dependencies
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, OpenStudioLandscapesUtil.Harbor_CLI.credential_helper; "
+            "print(sorted(m for m in ['requests', 'yaml', 'urllib3', 'subprocess', "
+            "'OpenStudioLandscapesUtil.Harbor_CLI.harbor_cli'] if m in sys.modules))",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_get_refreshes_in_background(harbor_server, monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(sys.path))
+    server_url = f"http://{harbor_server.host}:{harbor_server.port}"
+    credential_helper.store({"ServerURL": server_url, "Username": harbor_server.user, "Secret": harbor_server.password})
+
+    start = time.monotonic()
+    assert credential_helper.get(server_url=server_url)["Username"] == harbor_server.user
+
+    # without waiting for the check
+    assert not [r for r in harbor_server.requests if r["path"] == "/service/token"]
+
+    while not credential_helper._read()[credential_helper.server_key(server_url)]["checked_at"]:
+        assert time.monotonic() - start < 30
+        time.sleep(0.1)
+
+    assert [r["path"] for r in harbor_server.requests] == ["/service/token"]
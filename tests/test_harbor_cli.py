@@ -1,16 +1,28 @@
 import argparse
+import base64
+import hashlib
+import io
+import configparser
+import json
 import os
 import pathlib
 import shutil
+import socket
+import subprocess
+import tarfile
 import textwrap
+import threading
+import time
 from typing import Any, Generator
 
 import requests
+import yaml
 from dotenv import load_dotenv
 
 import pytest
 
 import OpenStudioLandscapesUtil.Harbor_CLI.harbor_cli as harbor_cli
+from conftest import fake_docker_calls
 
 __author__ = "Michael Mussato"
 __copyright__ = "Michael Mussato"
@@ -342,6 +354,623 @@ def test_systemd_install():
     assert result == expected
 
 
+def test_systemd_install_wait(tmp_path, fake_docker, fake_which):
+    outfile = tmp_path.joinpath(harbor_cli.SYSTEMD_UNIT.name)
+
+    harbor_cli.systemd_install(
+        su_method="sudo",
+        outfile=outfile,
+        start=False,
+        enable=False,
+        harbor_bin_dir=tmp_path,
+        start_mode="wait",
+        wait_ready_timeout=900,
+        docker=fake_docker.as_posix(),
+    )
+
+    unit = configparser.ConfigParser()
+    unit.optionxform = str
+    unit.read(outfile)
+
+    assert unit["Service"]["Type"] == "oneshot"
+    assert unit["Service"]["RemainAfterExit"] == "yes"
+    assert unit["Service"]["TimeoutStartSec"] == "900"
+    assert "Restart" not in unit["Service"]
+    assert unit["Service"]["ExecStart"].endswith("up --detach --wait --remove-orphans")
+
+
+def test_systemd_install_wait_ready(tmp_path, fake_docker, fake_which):
+    outfile = tmp_path.joinpath(harbor_cli.SYSTEMD_UNIT.name)
+
+    harbor_cli.systemd_install(
+        su_method="sudo",
+        outfile=outfile,
+        start=False,
+        enable=False,
+        harbor_bin_dir=tmp_path,
+        wait_ready_timeout=120,
+        host="harbor.openstudiolandscapes.lan",
+        port=80,
+        docker=fake_docker.as_posix(),
+    )
+
+    unit = configparser.ConfigParser()
+    unit.optionxform = str
+    unit.read(outfile)
+
+    assert unit["Service"]["Type"] == "simple"
+    assert unit["Service"]["Restart"] == "always"
+    assert unit["Service"]["ExecStart"].endswith("up --remove-orphans")
+    assert unit["Service"]["ExecStartPost"].endswith(
+        "-m OpenStudioLandscapesUtil.Harbor_CLI.harbor_cli "
+        "--host harbor.openstudiolandscapes.lan --port 80 "
+        "systemd wait-ready --timeout 120"
+    )
+    assert unit["Service"]["TimeoutStartSec"] == "150"
+
+
+def test_systemd_install_stop_mode(tmp_path, fake_docker, fake_which):
+    outfile = tmp_path.joinpath(harbor_cli.SYSTEMD_UNIT.name)
+
+    harbor_cli.systemd_install(
+        su_method="sudo",
+        outfile=outfile,
+        start=False,
+        enable=False,
+        harbor_bin_dir=tmp_path,
+        stop_mode="stop",
+        stop_timeout=20,
+        timeout_stop_sec=90,
+        docker=fake_docker.as_posix(),
+    )
+
+    unit = configparser.ConfigParser()
+    unit.optionxform = str
+    unit.read(outfile)
+
+    assert unit["Service"]["ExecStop"].endswith("--project-name openstudiolandscapes-harbor stop --timeout 20")
+    assert unit["Service"]["TimeoutStopSec"] == "90"
+
+
+def test_systemd_install_rolling(tmp_path, fake_docker, fake_which):
+    outfile = tmp_path.joinpath(harbor_cli.SYSTEMD_UNIT.name)
+
+    harbor_cli.systemd_install(
+        su_method="sudo",
+        outfile=outfile,
+        start=False,
+        enable=False,
+        harbor_bin_dir=tmp_path.joinpath("bin"),
+        reload_mode="rolling",
+        docker=fake_docker.as_posix(),
+    )
+
+    unit = configparser.ConfigParser()
+    unit.optionxform = str
+    unit.read(outfile)
+
+    assert unit["Service"]["ExecReload"].endswith(
+        f"--harbor-root-dir {tmp_path.as_posix()} --harbor-bin bin systemd reload --rolling"
+    )
+    assert unit["Service"]["ExecStartPre"].endswith("systemd reload --record")
+
+
+def test_systemd_install_resource_profile(tmp_path, fake_docker, fake_which):
+    outfile = tmp_path.joinpath(harbor_cli.SYSTEMD_UNIT.name)
+
+    compose_yml(
+        directory=tmp_path,
+        services={
+            "log": {"image": "goharbor/harbor-log:v2.12.2"},
+            "registry": {"image": "goharbor/registry-photon:v2.12.2"},
+            "trivy-adapter": {"image": "goharbor/trivy-adapter-photon:v2.12.2"},
+        },
+    )
+
+    result = harbor_cli.systemd_install(
+        su_method="sudo",
+        outfile=outfile,
+        start=False,
+        enable=False,
+        harbor_bin_dir=tmp_path,
+        resource_profile_="shared",
+        docker=fake_docker.as_posix(),
+    )
+
+    assert f"/usr/bin/cp {tmp_path.joinpath(harbor_cli.SYSTEMD_SLICE.name).as_posix()} " \
+           f"{harbor_cli.SYSTEMD_SLICE.as_posix()}" in result[-1]
+
+    unit = configparser.ConfigParser()
+    unit.optionxform = str
+    unit.read(outfile)
+
+    assert unit["Service"]["Slice"] == "openstudiolandscapes-harbor.slice"
+    assert f"--file {tmp_path.joinpath('docker-compose.override.yml').as_posix()}" in unit["Service"]["ExecStart"]
+
+    slice_unit = configparser.ConfigParser()
+    slice_unit.optionxform = str
+    slice_unit.read(tmp_path.joinpath(harbor_cli.SYSTEMD_SLICE.name))
+
+    assert dict(slice_unit["Slice"]) == {
+        "CPUWeight": "50",
+        "IOWeight": "50",
+        "MemoryHigh": "6G",
+        "MemoryMax": "8G",
+    }
+
+    override = yaml.safe_load(tmp_path.joinpath("docker-compose.override.yml").read_text())
+
+    assert override["services"]["log"] == {"cgroup_parent": "openstudiolandscapes-harbor.slice"}
+    assert override["services"]["registry"] == {
+        "cgroup_parent": "openstudiolandscapes-harbor.slice",
+        "cpus": 2.0,
+        "mem_limit": "2g",
+        "pids_limit": 1024,
+        "ulimits": {"nofile": {"soft": 65536, "hard": 65536}},
+    }
+    assert override["services"]["trivy-adapter"]["cpus"] == 1.0
+
+
+def test_resource_profile(tmp_path):
+    assert harbor_cli.resource_profile(profile="shared") is harbor_cli.RESOURCE_PROFILES["shared"]
+
+    profile_file = tmp_path.joinpath("profile.yml")
+    profile_file.write_text(yaml.dump(harbor_cli.RESOURCE_PROFILES["dedicated"]))
+
+    assert harbor_cli.resource_profile(profile=profile_file.as_posix()) == harbor_cli.RESOURCE_PROFILES["dedicated"]
+
+    for content, missing in [
+        ("", "not a mapping"),
+        ("services: {}", "`slice`"),
+        ("slice: {CPUWeight: 50}", "`services`"),
+        ("slice: {CPUWeight: 50}\nservices: {core: {cpus: 1.0}}", "`services.core.mem_limit`"),
+    ]:
+        profile_file.write_text(content)
+        with pytest.raises(harbor_cli.HarborCLIError, match=missing):
+            harbor_cli.resource_profile(profile=profile_file.as_posix())
+
+    with pytest.raises(harbor_cli.HarborCLIError, match="Unknown resource profile"):
+        harbor_cli.resource_profile(profile="huge")
+
+
+def test_compose_override_write(tmp_path):
+    harbor_cli.compose_override_write(
+        harbor_bin_dir=tmp_path,
+        override={"services": {"core": {"cpus": 1.0, "ulimits": {"nofile": {"soft": 1, "hard": 1}}}}},
+    )
+    override_file = harbor_cli.compose_override_write(
+        harbor_bin_dir=tmp_path,
+        override={"services": {"core": {"logging": {"driver": "local"}}, "log": {"cpus": 0.5}}},
+    )
+
+    assert yaml.safe_load(override_file.read_text()) == {
+        "services": {
+            "core": {
+                "cpus": 1.0,
+                "ulimits": {"nofile": {"soft": 1, "hard": 1}},
+                "logging": {"driver": "local"},
+            },
+            "log": {"cpus": 0.5},
+        },
+    }
+
+
+def test_compose_override_logging_local():
+    result = harbor_cli.compose_override_logging(
+        log_driver="local",
+        services=["core", "registry"],
+        max_buffer_size="8m",
+    )
+
+    assert result == {
+        "services": {
+            service: {
+                "logging": {
+                    "driver": "local",
+                    "options": {
+                        "mode": "non-blocking",
+                        "max-buffer-size": "8m",
+                        "max-size": "50m",
+                        "max-file": "5",
+                    },
+                },
+            }
+            for service in ["core", "registry"]
+        },
+    }
+
+
+def test_compose_override_logging_syslog():
+    compose = {
+        "services": {
+            "core": {
+                "logging": {
+                    "driver": "syslog",
+                    "options": {"syslog-address": "tcp://127.0.0.1:1514", "tag": "harbor-core"},
+                },
+            },
+        },
+    }
+
+    result = harbor_cli.compose_override_logging(
+        log_driver="syslog",
+        services=["log", "core"],
+        compose=compose,
+    )
+
+    # harbor-log is the syslog server
+    assert "log" not in result["services"]
+
+    assert result["services"]["core"]["logging"] == {
+        "driver": "syslog",
+        "options": {
+            "mode": "non-blocking",
+            "max-buffer-size": "4m",
+            "syslog-address": "tcp://127.0.0.1:1514",
+            "tag": "harbor-core",
+        },
+    }
+
+    with pytest.raises(harbor_cli.HarborCLIError):
+        harbor_cli.compose_override_logging(log_driver="gelf", services=["core"])
+
+
+def test_systemd_reset(tmp_path, fake_docker, fake_which):
+    result = harbor_cli.systemd_reset(
+        su_method="sudo",
+        harbor_bin_dir=tmp_path,
+        start=True,
+        docker=fake_docker.as_posix(),
+    )
+
+    assert result == [
+        "/usr/bin/sudo",
+        "--user=root",
+        "/usr/bin/bash",
+        "-c",
+        "/usr/bin/systemctl stop openstudiolandscapes-harbor.service && "
+        f"{fake_docker.as_posix()} compose --progress plain "
+        f"--file {tmp_path.joinpath('docker-compose.yml').as_posix()} "
+        "--project-name openstudiolandscapes-harbor down --remove-orphans && "
+        "/usr/bin/systemctl start openstudiolandscapes-harbor.service",
+    ]
+
+
+def test_benchmark_restart(tmp_path, fake_docker):
+    result = harbor_cli.benchmark_restart(
+        harbor_bin_dir=tmp_path,
+        cycles=2,
+        docker=fake_docker.as_posix(),
+    )
+
+    assert list(result) == ["down", "stop"]
+    assert all(len(durations) == 2 for durations in result.values())
+
+    subcommands = [call[7] for call in fake_docker_calls(fake_docker)]
+
+    # left down, as the unit was
+    assert subcommands == ["up", "down", "up", "down", "up", "stop", "up", "stop", "up", "down"]
+
+
+def test_benchmark_restart_invalid_cycles(tmp_path, fake_docker):
+    with pytest.raises(harbor_cli.HarborCLIError, match="Invalid number of cycles"):
+        harbor_cli.benchmark_restart(
+            harbor_bin_dir=tmp_path,
+            cycles=0,
+            docker=fake_docker.as_posix(),
+        )
+
+    with pytest.raises(harbor_cli.HarborCLIError, match="Invalid stop mode"):
+        harbor_cli.benchmark_restart(
+            harbor_bin_dir=tmp_path,
+            stop_modes=["stop", "kill"],
+            docker=fake_docker.as_posix(),
+        )
+
+    assert fake_docker_calls(fake_docker) == []
+
+
+def test_compose_service_order():
+    compose = {
+        "services": {
+            "proxy": {"depends_on": ["registry", "core", "portal"]},
+            "core": {"depends_on": ["log", "registry", "redis", "postgresql"]},
+            "log": {},
+            "registry": {"depends_on": ["log"]},
+            "portal": {"depends_on": ["log"]},
+            "redis": {"depends_on": {"log": {"condition": "service_started"}}},
+            "postgresql": {"depends_on": ["log"]},
+        },
+    }
+
+    result = harbor_cli.compose_service_order(compose=compose)
+
+    assert result == ["log", "registry", "portal", "redis", "postgresql", "core", "proxy"]
+
+    compose["services"]["log"] = {"depends_on": ["proxy"]}
+
+    with pytest.raises(harbor_cli.HarborCLIError, match="Circular"):
+        harbor_cli.compose_service_order(compose=compose)
+
+
+def test_config_changed_services():
+    services = ["log", "registry", "core", "postgresql", "proxy"]
+    previous = {
+        "core/app.conf": "a",
+        "nginx/nginx.conf": "b",
+        "registry/config.yml": "c",
+    }
+
+    assert harbor_cli.config_changed_services(previous, dict(previous), services) == set()
+
+    assert harbor_cli.config_changed_services(
+        previous,
+        {**previous, "nginx/nginx.conf": "x", "db/env": "y"},
+        services,
+    ) == {"proxy", "postgresql"}
+
+    assert harbor_cli.config_changed_services(
+        previous,
+        {**previous, "shared/trust-certificates/ca.crt": "z"},
+        services,
+    ) == set(services)
+
+
+def test_rolling_reload(tmp_path, fake_docker):
+    config_dir = tmp_path.joinpath("common", "config")
+    for f, content in {
+        "core/app.conf": "core",
+        "nginx/nginx.conf": "nginx",
+        "registry/config.yml": "registry",
+    }.items():
+        config_dir.joinpath(f).parent.mkdir(parents=True, exist_ok=True)
+        config_dir.joinpath(f).write_text(content)
+
+    compose_yml(
+        directory=tmp_path,
+        services={
+            "proxy": {"container_name": "nginx", "depends_on": ["core", "registry"]},
+            "core": {"container_name": "harbor-core", "depends_on": ["registry"]},
+            "registry": {"container_name": "registry"},
+        },
+    )
+
+    assert harbor_cli.rolling_reload(
+        harbor_bin_dir=tmp_path,
+        record_only=True,
+        docker=fake_docker.as_posix(),
+    ) == []
+
+    assert harbor_cli.rolling_reload(
+        harbor_bin_dir=tmp_path,
+        docker=fake_docker.as_posix(),
+    ) == []
+
+    config_dir.joinpath("nginx", "nginx.conf").write_text("nginx changed")
+    config_dir.joinpath("core", "app.conf").write_text("core changed")
+
+    assert harbor_cli.rolling_reload(
+        harbor_bin_dir=tmp_path,
+        interval=0.01,
+        docker=fake_docker.as_posix(),
+    ) == ["core", "proxy"]
+
+    calls = fake_docker_calls(fake_docker)
+
+    assert [call[7:] for call in calls if "up" in call] == [
+        ["up", "--detach", "--no-deps", "--force-recreate", "core"],
+        ["up", "--detach", "--no-deps", "--force-recreate", "proxy"],
+    ]
+    assert not [call for call in calls if "restart" in call]
+    assert [call[-1] for call in calls if call[0] == "inspect"] == ["harbor-core", "nginx"]
+
+    # snapshot updated
+    assert harbor_cli.rolling_reload(
+        harbor_bin_dir=tmp_path,
+        docker=fake_docker.as_posix(),
+    ) == []
+
+
+def test_rolling_reload_unhealthy(tmp_path, fake_docker):
+    fake_docker.parent.joinpath("health.json").write_text('{"registry": "unhealthy"}')
+
+    compose_yml(
+        directory=tmp_path,
+        services={
+            "registry": {"container_name": "registry"},
+        },
+    )
+
+    with pytest.raises(harbor_cli.HarborCLIError, match="registry not healthy"):
+        harbor_cli.rolling_reload(
+            harbor_bin_dir=tmp_path,
+            health_timeout=0.05,
+            interval=0.01,
+            docker=fake_docker.as_posix(),
+        )
+
+
+def test_watchdog(tmp_path, fake_docker, monkeypatch):
+    health_file = fake_docker.parent.joinpath("health.json")
+    health_file.write_text('{"registry": "unhealthy"}')
+
+    compose_yml(
+        directory=tmp_path,
+        services={
+            "registry": {"container_name": "registry"},
+            "core": {"container_name": "harbor-core", "depends_on": ["registry"]},
+            "jobservice": {"container_name": "harbor-jobservice", "depends_on": ["core"]},
+        },
+    )
+
+    healths = [
+        # cycle 1: registry container unhealthy, core down
+        requests.ConnectionError(),
+        # cycle 2: registry recovered, jobservice component unhealthy
+        {"status": "unhealthy", "components": [{"name": "jobservice", "status": "unhealthy"}]},
+        # cycle 3: jobservice still unhealthy, but backing off
+        {"status": "unhealthy", "components": [{"name": "jobservice", "status": "unhealthy"}]},
+    ]
+
+    def harbor_health(**kwargs):
+        health = healths.pop(0)
+        health_file.write_text("{}")
+        if isinstance(health, Exception):
+            raise health
+        return health
+
+    monkeypatch.setattr(harbor_cli, "harbor_health", harbor_health)
+
+    result = harbor_cli.watchdog(
+        harbor_bin_dir=tmp_path,
+        host="harbor.openstudiolandscapes.lan",
+        port=80,
+        interval=0,
+        backoff_initial=60,
+        grace_period=0,
+        cycles=3,
+        docker=fake_docker.as_posix(),
+    )
+
+    assert [(r["service"], r["restarts"]) for r in result] == [("registry", 1)]
+
+    restarts = [call[-1] for call in fake_docker_calls(fake_docker) if "restart" in call]
+
+    assert restarts == ["registry", "jobservice"]
+
+    journal = tmp_path.joinpath(harbor_cli.HARBOR_WATCHDOG_JOURNAL).read_text().splitlines()
+
+    assert [json.loads(line)["service"] for line in journal] == ["registry"]
+
+
+def test_watchdog_grace_period(tmp_path, fake_docker, monkeypatch):
+    health_file = fake_docker.parent.joinpath("health.json")
+    health_file.write_text('{"registry": "created", "harbor-core": "starting"}')
+
+    compose_yml(
+        directory=tmp_path,
+        services={
+            "registry": {"container_name": "registry"},
+            "core": {"container_name": "harbor-core", "depends_on": ["registry"]},
+        },
+    )
+
+    def harbor_health(**kwargs):
+        raise requests.ConnectionError()
+
+    monkeypatch.setattr(harbor_cli, "harbor_health", harbor_health)
+
+    result = harbor_cli.watchdog(
+        harbor_bin_dir=tmp_path,
+        host="harbor.openstudiolandscapes.lan",
+        port=80,
+        interval=0,
+        grace_period=3600,
+        cycles=2,
+        docker=fake_docker.as_posix(),
+    )
+
+    assert result == []
+    assert not [call for call in fake_docker_calls(fake_docker) if "restart" in call or "up" in call]
+
+
+def test_systemd_install_watchdog(tmp_path, fake_docker, fake_which):
+    outfile = tmp_path.joinpath(harbor_cli.SYSTEMD_UNIT.name)
+
+    result = harbor_cli.systemd_install(
+        su_method="sudo",
+        outfile=outfile,
+        start=True,
+        enable=True,
+        harbor_bin_dir=tmp_path,
+        watchdog_interval=60,
+        docker=fake_docker.as_posix(),
+    )
+
+    assert result[-1].endswith(
+        "/usr/bin/systemctl start openstudiolandscapes-harbor.service "
+        "openstudiolandscapes-harbor-watchdog.service && "
+        "/usr/bin/systemctl enable openstudiolandscapes-harbor.service "
+        "openstudiolandscapes-harbor-watchdog.service"
+    )
+
+    unit = configparser.ConfigParser()
+    unit.optionxform = str
+    unit.read(outfile)
+
+    assert unit["Service"]["Restart"] == "on-failure"
+
+    watchdog_unit = configparser.ConfigParser()
+    watchdog_unit.optionxform = str
+    watchdog_unit.read(tmp_path.joinpath(harbor_cli.SYSTEMD_WATCHDOG_UNIT.name))
+
+    assert watchdog_unit["Unit"]["BindsTo"] == "openstudiolandscapes-harbor.service"
+    assert watchdog_unit["Service"]["ExecStart"].endswith("systemd watchdog --interval 60")
+
+
+def test_sd_notify(tmp_path, monkeypatch):
+    notify_socket = tmp_path.joinpath("notify")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+        sock.bind(notify_socket.as_posix())
+        monkeypatch.setenv("NOTIFY_SOCKET", notify_socket.as_posix())
+
+        assert harbor_cli.sd_notify("READY=1")
+        assert sock.recv(1024) == b"READY=1"
+
+    monkeypatch.delenv("NOTIFY_SOCKET")
+
+    assert not harbor_cli.sd_notify("READY=1")
+
+
+def test_wait_ready(monkeypatch):
+    responses = [
+        requests.ConnectionError(),
+        {"status": "unhealthy", "components": [{"name": "core", "status": "unhealthy"}]},
+        {"status": "healthy", "components": [{"name": "core", "status": "healthy"}]},
+    ]
+    notifications = []
+
+    def harbor_health(**kwargs):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(harbor_cli, "harbor_health", harbor_health)
+    monkeypatch.setattr(harbor_cli, "sd_notify", notifications.append)
+
+    result = harbor_cli.wait_ready(
+        host="harbor.openstudiolandscapes.lan",
+        port=80,
+        timeout=10,
+        interval=0.01,
+        notify=True,
+    )
+
+    assert result["status"] == "healthy"
+    assert notifications[-1].startswith("READY=1")
+    assert notifications[:2] == [
+        "STATUS=Waiting for Harbor: ConnectionError",
+        "STATUS=Waiting for Harbor: unhealthy (core)",
+    ]
+
+
+def test_wait_ready_timeout(monkeypatch):
+    def harbor_health(**kwargs):
+        raise requests.ConnectionError()
+
+    monkeypatch.setattr(harbor_cli, "harbor_health", harbor_health)
+
+    with pytest.raises(harbor_cli.HarborCLIError):
+        harbor_cli.wait_ready(
+            host="harbor.openstudiolandscapes.lan",
+            port=80,
+            timeout=0.05,
+            interval=0.01,
+        )
+
+
 def test_systemd_uninstall():
     expected: list = [
         '/usr/bin/sudo',
@@ -362,6 +991,29 @@ def test_systemd_uninstall():
     assert result == expected
 
 
+def test_systemd_uninstall_watchdog_slice(tmp_path, fake_which):
+    override_file = harbor_cli.compose_override_write(
+        harbor_bin_dir=tmp_path,
+        override={"services": {"registry": {"cgroup_parent": harbor_cli.SYSTEMD_SLICE.name, "cpus": 2.0}}},
+    )
+
+    result = harbor_cli.systemd_uninstall(
+        su_method="sudo",
+        harbor_bin_dir=tmp_path,
+    )
+
+    assert result[-1] == (
+        "/usr/bin/systemctl disable --now openstudiolandscapes-harbor-watchdog.service 2>/dev/null || true && "
+        "/usr/bin/systemctl disable --now openstudiolandscapes-harbor.service && "
+        "/usr/bin/rm /usr/lib/systemd/system/openstudiolandscapes-harbor.service && "
+        "/usr/bin/rm -f /usr/lib/systemd/system/openstudiolandscapes-harbor-watchdog.service && "
+        "/usr/bin/rm -f /usr/lib/systemd/system/openstudiolandscapes-harbor.slice && "
+        "/usr/bin/systemctl daemon-reload"
+    )
+    # the limits do not depend on the slice
+    assert yaml.safe_load(override_file.read_text()) == {"services": {"registry": {"cpus": 2.0}}}
+
+
 def test_systemd_status():
     expected: list = [
         '/usr/bin/bash',
@@ -435,6 +1087,1551 @@ def test_project_delete():
     assert result == expected
 
 
+def compose_yml(
+        directory: pathlib.Path,
+        services: dict,
+) -> pathlib.Path:
+    compose_file = directory.joinpath("docker-compose.yml")
+    compose_file.write_text(yaml.dump({"services": services}, sort_keys=False))
+    return compose_file
+
+
+def test_compose_images(tmp_path):
+    compose_file = compose_yml(
+        directory=tmp_path,
+        services={
+            "log": {"image": "goharbor/harbor-log:v2.12.2"},
+            "registry": {"image": "goharbor/registry-photon:v2.12.2"},
+            "registryctl": {"image": "goharbor/harbor-registryctl:v2.12.2"},
+            "core": {"image": "goharbor/harbor-core:v2.12.2"},
+            "duplicate": {"image": "goharbor/harbor-log:v2.12.2"},
+            "build_only": {"build": "."},
+        },
+    )
+
+    result = harbor_cli.compose_images(compose_file=compose_file)
+
+    assert result == [
+        "goharbor/harbor-log:v2.12.2",
+        "goharbor/registry-photon:v2.12.2",
+        "goharbor/harbor-registryctl:v2.12.2",
+        "goharbor/harbor-core:v2.12.2",
+    ]
+
+
+def test_compose_images_missing(tmp_path):
+    with pytest.raises(harbor_cli.HarborCLIError):
+        harbor_cli.compose_images(compose_file=tmp_path.joinpath("docker-compose.yml"))
+
+
+def test_pull_images(tmp_path, fake_docker):
+    fake_docker.parent.joinpath("images.json").write_text('["goharbor/harbor-log:v2.12.2"]')
+
+    compose_file = compose_yml(
+        directory=tmp_path,
+        services={
+            "log": {"image": "goharbor/harbor-log:v2.12.2"},
+            "registry": {"image": "goharbor/registry-photon:v2.12.2"},
+            "core": {"image": "goharbor/harbor-core:v2.12.2"},
+        },
+    )
+
+    result = harbor_cli.pull_images(
+        compose_file=compose_file,
+        concurrency=2,
+        docker=fake_docker.as_posix(),
+    )
+
+    assert result == {
+        "goharbor/registry-photon:v2.12.2": 0,
+        "goharbor/harbor-core:v2.12.2": 0,
+    }
+
+    pulls = [call[-1] for call in fake_docker_calls(fake_docker) if call[0] == "pull"]
+
+    assert sorted(pulls) == ["goharbor/harbor-core:v2.12.2", "goharbor/registry-photon:v2.12.2"]
+
+    # Second run: everything is present
+    assert harbor_cli.pull_images(
+        compose_file=compose_file,
+        docker=fake_docker.as_posix(),
+    ) == {}
+
+
+def test_pull_images_failed(tmp_path, fake_docker):
+    compose_file = compose_yml(
+        directory=tmp_path,
+        services={
+            "core": {"image": "goharbor/harbor-core:v2.12.2"},
+            "broken": {"image": "goharbor/fail:v2.12.2"},
+        },
+    )
+
+    with pytest.raises(harbor_cli.HarborCLIError, match="goharbor/fail:v2.12.2"):
+        harbor_cli.pull_images(
+            compose_file=compose_file,
+            docker=fake_docker.as_posix(),
+        )
+
+
+def harbor_client(
+        harbor_server,
+        **kwargs,
+) -> harbor_cli.HarborClient:
+    kwargs = {
+        "host": harbor_server.host,
+        "port": harbor_server.port,
+        "user": harbor_server.user,
+        "password": harbor_server.password,
+        **kwargs,
+    }
+    return harbor_cli.HarborClient(**kwargs)
+
+
+def test_harbor_client_project_create_delete(harbor_server):
+    with harbor_client(harbor_server) as client:
+        result = harbor_cli.project_create(
+            host=harbor_server.host,
+            port=harbor_server.port,
+            user="admin",
+            password="Harbor12345",
+            project_name="my-harbor-project",
+            client=client,
+        )
+
+        assert result == {
+            "project_name": "my-harbor-project",
+            "status_code": 201,
+            "location": "/api/v2.0/projects/1",
+        }
+        assert harbor_server.projects["my-harbor-project"]["public"] is True
+
+        with pytest.raises(harbor_cli.HarborConflictError, match="already exists") as e:
+            client.request(
+                harbor_cli.RequestMethod.POST,
+                "/projects",
+                json={"project_name": "my-harbor-project", "public": True},
+            )
+
+        assert e.value.status_code == 409
+        assert e.value.errors[0]["code"] == "CONFLICT"
+
+        result = harbor_cli.project_delete(
+            host=harbor_server.host,
+            port=harbor_server.port,
+            user="admin",
+            password="Harbor12345",
+            project_name="my-harbor-project",
+            client=client,
+        )
+
+        assert result == {"project_name": "my-harbor-project", "status_code": 200}
+
+        with pytest.raises(harbor_cli.HarborNotFoundError):
+            client.request(harbor_cli.RequestMethod.DELETE, "/projects/my-harbor-project")
+
+    # All requests were sent over one kept-alive connection
+    assert [r["method"] for r in harbor_server.requests] == ["HEAD", "POST", "POST", "HEAD", "DELETE", "DELETE"]
+    assert len(harbor_server.connections) == 1
+
+
+def test_project_create_delete_existing(harbor_server):
+    harbor_server.projects["existing"] = {"project_id": 1, "name": "existing"}
+
+    with harbor_client(harbor_server) as client:
+        assert client.project_exists("existing")
+        assert not client.project_exists("missing")
+
+        result = harbor_cli.project_create(
+            host=harbor_server.host,
+            port=harbor_server.port,
+            user="admin",
+            password="Harbor12345",
+            project_name="existing",
+            client=client,
+        )
+
+        assert result == {"project_name": "existing", "status_code": 200, "skipped": True}
+
+        result = harbor_cli.project_delete(
+            host=harbor_server.host,
+            port=harbor_server.port,
+            user="admin",
+            password="Harbor12345",
+            project_name="missing",
+            client=client,
+        )
+
+        assert result == {"project_name": "missing", "status_code": 404, "skipped": True}
+
+    assert [r["method"] for r in harbor_server.requests] == ["HEAD"] * 4
+
+
+def test_harbor_client_errors(harbor_server):
+    with harbor_client(harbor_server, password="wrong") as client:
+        assert client.request(harbor_cli.RequestMethod.GET, "/health")["status"] == "healthy"
+
+        with pytest.raises(harbor_cli.HarborAuthError):
+            client.request(harbor_cli.RequestMethod.POST, "/projects", json={"project_name": "p"})
+
+    @harbor_server.route("GET", r"/api/v2.0/systeminfo")
+    def systeminfo(request):
+        return 503, {}, b"Service Unavailable"
+
+    with harbor_client(harbor_server) as client:
+        with pytest.raises(harbor_cli.HarborServerError) as e:
+            client.request(harbor_cli.RequestMethod.GET, "/systeminfo")
+
+    assert e.value.status_code == 503
+
+
+def test_projects_manifest(tmp_path, monkeypatch):
+    manifest = tmp_path.joinpath("projects.yaml")
+    manifest.write_text(
+        textwrap.dedent(
+            """\
+            projects:
+              - name: show-a
+                public: false
+              - show-b
+            """
+        )
+    )
+
+    assert harbor_cli.projects_manifest(manifest=manifest) == [
+        {"name": "show-a", "public": False},
+        {"name": "show-b"},
+    ]
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("show-c\n\n# comment\nshow-d\n"))
+
+    assert harbor_cli.projects_manifest(manifest=pathlib.Path("-")) == [
+        {"name": "show-c"},
+        {"name": "show-d"},
+    ]
+
+
+def test_project_apply(harbor_server):
+    harbor_server.projects["show-007"] = {"project_id": 1000, "name": "show-007"}
+
+    projects = [{"name": f"show-{i:03d}", "public": i % 2 == 0} for i in range(50)]
+
+    with harbor_client(harbor_server, pool_maxsize=8) as client:
+        result = harbor_cli.project_apply(
+            host=harbor_server.host,
+            port=harbor_server.port,
+            user=harbor_server.user,
+            password=harbor_server.password,
+            projects=projects,
+            client=client,
+            concurrency=8,
+        )
+
+    assert [r["item"]["name"] for r in result] == [p["name"] for p in projects]
+    assert all(r["ok"] for r in result)
+    assert [r["item"]["name"] for r in result if r["result"].get("skipped")] == ["show-007"]
+    assert all(r["latency"] >= 0 for r in result)
+    assert len(harbor_server.projects) == 50
+    assert harbor_server.projects["show-002"]["public"] is True
+    assert harbor_server.projects["show-003"]["public"] is False
+    assert len(harbor_server.connections) <= 8
+
+
+def test_project_apply_reconcile(harbor_server):
+    projects = [{"name": f"show-{i:03d}"} for i in range(20)]
+
+    with harbor_client(harbor_server) as client:
+        for _ in range(2):
+            harbor_server.requests.clear()
+
+            result = harbor_cli.project_apply(
+                host=harbor_server.host,
+                port=harbor_server.port,
+                user=harbor_server.user,
+                password=harbor_server.password,
+                projects=projects + projects,
+                client=client,
+                concurrency=1,
+            )
+
+            assert all(r["ok"] for r in result)
+
+        # 2nd run: one HEAD per project, duplicates served from the cache
+        assert [r["method"] for r in harbor_server.requests] == ["HEAD"] * 20
+        assert all(r["result"]["skipped"] for r in result)
+        assert client.existence_cache is None
+
+
+def test_harbor_client_session(harbor_server):
+    with harbor_client(harbor_server, auth="session") as client:
+        result = harbor_cli.project_create(
+            host=harbor_server.host,
+            port=harbor_server.port,
+            user="admin",
+            password="Harbor12345",
+            project_name="my-harbor-project",
+            client=client,
+        )
+
+        assert result["status_code"] == 201
+
+    # The Basic header of the prepared request was replaced by the session
+    assert [(r["method"], r["path"]) for r in harbor_server.requests] == [
+        ("GET", "/api/v2.0/systeminfo"),
+        ("POST", "/c/login"),
+        ("HEAD", "/api/v2.0/projects"),
+        ("POST", "/api/v2.0/projects"),
+    ]
+    assert "authorization" not in harbor_server.requests[-1]["headers"]
+
+    # 2nd client: cached session, no login
+    harbor_server.requests.clear()
+
+    with harbor_client(harbor_server, auth="session") as client:
+        assert client.project_exists("my-harbor-project")
+
+    assert [r["path"] for r in harbor_server.requests] == ["/api/v2.0/projects"]
+
+    # Session invalidated server side: logs in again
+    harbor_server.sessions.clear()
+    harbor_server.requests.clear()
+
+    with harbor_client(harbor_server, auth="session") as client:
+        client.request(harbor_cli.RequestMethod.DELETE, "/projects/my-harbor-project")
+
+    assert [r["path"] for r in harbor_server.requests] == [
+        "/api/v2.0/projects/my-harbor-project",
+        "/api/v2.0/systeminfo",
+        "/c/login",
+        "/api/v2.0/projects/my-harbor-project",
+    ]
+
+
+def test_harbor_client_bearer(harbor_server, harbor_cache_dir):
+    harbor_server.tokens.add("my-token")
+
+    with pytest.raises(harbor_cli.HarborCLIError, match="--token"):
+        harbor_client(harbor_server, auth="bearer")
+
+    with harbor_client(harbor_server, auth="bearer", token="my-token") as client:
+        assert client.request(harbor_cli.RequestMethod.GET, "/projects") == []
+
+    cache_file = harbor_cli.auth_cache_file(
+        kind="bearer",
+        host=harbor_server.host,
+        port=harbor_server.port,
+        user="admin",
+    )
+
+    assert cache_file.is_relative_to(harbor_cache_dir)
+    assert cache_file.stat().st_mode & 0o777 == 0o600
+
+    # cached
+    with harbor_client(harbor_server, auth="bearer") as client:
+        assert client.request(harbor_cli.RequestMethod.GET, "/projects") == []
+
+    assert all(r["headers"]["authorization"] == "Bearer my-token" for r in harbor_server.requests)
+
+
+def test_token_expiry():
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": 1700000000}).encode()).decode().rstrip("=")
+
+    assert harbor_cli.token_expiry(token=f"header.{payload}.signature", ttl=60) == 1700000000
+    assert abs(harbor_cli.token_expiry(token="opaque", ttl=60) - (time.time() + 60)) < 5
+
+
+def test_benchmark_auth(harbor_server):
+    harbor_server.basic_cost = 0.01
+
+    result = harbor_cli.benchmark_auth(
+        host=harbor_server.host,
+        port=harbor_server.port,
+        user="admin",
+        password="Harbor12345",
+        auth_modes=["basic", "session"],
+        count=10,
+    )
+
+    assert result["basic"]["count"] == result["session"]["count"] == 10
+    assert result["basic"]["mean"] > result["session"]["mean"]
+    assert len([r for r in harbor_server.requests if r["path"] == "/c/login"]) == 1
+
+
+def test_iter_pages(harbor_server):
+    for i in range(250):
+        harbor_server.projects[f"show-{i:03}"] = {"project_id": i, "name": f"show-{i:03}", "metadata": {"public": "true"}}
+
+    with harbor_client(harbor_server) as client:
+        pages = client.iter_pages(path="/projects")
+
+        assert next(pages)["name"] == "show-000"
+        # the 2nd page is being fetched in the background
+        time.sleep(0.2)
+        assert [r["query"]["page"] for r in harbor_server.requests] == ["1", "2"]
+
+        pages.close()
+
+        projects = list(harbor_cli.iter_projects(client=client))
+
+    assert len(projects) == 250
+    assert projects[-1] == {
+        "name": "show-249",
+        "project_id": 249,
+        "public": True,
+        "repo_count": 0,
+        "creation_time": None,
+    }
+    assert [r["query"]["page_size"] for r in harbor_server.requests[2:]] == ["100"] * 3
+
+
+def test_iter_artifacts(harbor_server):
+    harbor_server.repositories = {
+        "show-a/plates/sh010": [
+            {"digest": f"sha256:{i:064}", "size": i, "tags": [{"name": f"v{i}"}]} for i in range(120)
+        ],
+        "show-a/comp": [
+            {"digest": "sha256:" + "f" * 64, "size": 1, "tags": []},
+        ],
+        "show-b/comp": [],
+    }
+
+    with harbor_client(harbor_server) as client:
+        repositories = list(harbor_cli.iter_repositories(client=client, project_name="show-a"))
+        artifacts = list(harbor_cli.iter_artifacts(client=client, project_name="show-a"))
+        tags = list(
+            harbor_cli.iter_tags(
+                client=client,
+                project_name="show-a",
+                repository_name="plates/sh010",
+                reference=f"sha256:{7:064}",
+            )
+        )
+
+    assert [r["name"] for r in repositories] == ["show-a/plates/sh010", "show-a/comp"]
+    assert len(artifacts) == 121
+    assert artifacts[7] == {
+        "repository": "show-a/plates/sh010",
+        "digest": f"sha256:{7:064}",
+        "size": 7,
+        "push_time": None,
+        "pull_time": None,
+        "tags": ["v7"],
+    }
+    assert [t["name"] for t in tags] == ["v7"]
+    assert "/api/v2.0/projects/show-a/repositories/plates%252Fsh010/artifacts" in [
+        r["path"] for r in harbor_server.requests
+    ]
+
+
+def test_cli_artifact_ls(harbor_server, capsys):
+    harbor_server.repositories = {
+        "show-a/comp": [{"digest": "sha256:" + "f" * 64, "size": 1, "tags": [{"name": "latest"}]}],
+    }
+
+    args = argparse.Namespace(
+        command="artifact",
+        artifact_command="ls",
+        host=harbor_server.host,
+        port=harbor_server.port,
+        user="admin",
+        password="Harbor12345",
+        auth="basic",
+        token=None,
+        max_rps=None,
+        project_name="show-a",
+        repository_name="comp",
+    )
+
+    assert harbor_cli.eval_(args) == 1
+    assert json.loads(capsys.readouterr().out)["tags"] == ["latest"]
+
+
+def test_cli_harbor_client_concurrency(harbor_server):
+    args = argparse.Namespace(
+        host=harbor_server.host,
+        port=harbor_server.port,
+        user="admin",
+        password="Harbor12345",
+        auth="basic",
+        token=None,
+        max_rps=None,
+    )
+
+    # without --concurrency: the default limits
+    with harbor_cli._cli_harbor_client(args) as client:
+        assert client.concurrency.max_limit == harbor_cli.AdaptiveConcurrency().max_limit
+
+    args.concurrency = 2
+
+    with harbor_cli._cli_harbor_client(args) as client:
+        assert client.concurrency.max_limit == 2
+
+
+def test_retry_after(harbor_server):
+    attempts = []
+
+    @harbor_server.route("GET", r"/api/v2.0/projects")
+    def throttled(request):
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            return 429, {"Retry-After": "0.1"}, {"errors": [{"code": "TOO_MANY_REQUESTS", "message": "slow down"}]}
+        return 200, {}, []
+
+    with harbor_client(harbor_server, concurrency=harbor_cli.AdaptiveConcurrency(initial=4)) as client:
+        assert client.request(harbor_cli.RequestMethod.GET, "/projects") == []
+        # halved once per round trip
+        assert client.concurrency.stats()["throttled"] == 2
+        assert client.concurrency.stats()["decreases"] == 1
+
+    assert len(attempts) == 3
+    assert attempts[2] - attempts[0] >= 0.2
+
+    # out of retries
+    attempts.clear()
+    with harbor_client(harbor_server, retries=1) as client:
+        with pytest.raises(harbor_cli.HarborRateLimitError):
+            client.request(harbor_cli.RequestMethod.GET, "/projects")
+
+    assert len(attempts) == 2
+
+
+def test_adaptive_concurrency():
+    concurrency = harbor_cli.AdaptiveConcurrency(initial=2, max_limit=8, window=5)
+
+    def respond(latency, throttled=False):
+        concurrency.acquire()
+        concurrency.release(latency=latency, throttled=throttled)
+
+    # additive increase: +1 per `limit` healthy responses
+    for _ in range(2 + 3 + 4):
+        respond(0.01)
+    assert concurrency.limit == 5
+
+    # multiplicative decrease on throttling, once per round trip
+    respond(0.01, throttled=True)
+    respond(0.01, throttled=True)
+    assert concurrency.limit == 2
+
+    # and on latency spikes
+    for _ in range(30):
+        respond(0.01)
+    limit = concurrency.limit
+    for _ in range(5):
+        respond(0.1)
+    assert concurrency.limit == limit // 2
+
+    assert concurrency.stats()["decreases"] == 2
+
+
+def test_adaptive_concurrency_max_rps():
+    concurrency = harbor_cli.AdaptiveConcurrency(initial=8, max_rps=50)
+
+    start = time.monotonic()
+    for _ in range(10):
+        with concurrency.slot():
+            pass
+
+    assert time.monotonic() - start >= 9 / 50
+
+
+def test_project_apply_adaptive(harbor_server):
+    inflight = []
+    lock = threading.Lock()
+
+    @harbor_server.route("POST", r"/api/v2.0/projects")
+    def overloaded(request):
+        with lock:
+            inflight.append(1)
+            overload = len(inflight) > 3
+        try:
+            if overload:
+                return 429, {"Retry-After": "0.05"}, None
+            time.sleep(0.01)
+            return harbor_server.project_create(request)
+        finally:
+            with lock:
+                inflight.pop()
+
+    concurrency = harbor_cli.AdaptiveConcurrency(initial=8, max_limit=16)
+
+    with harbor_client(harbor_server, concurrency=concurrency, retries=10) as client:
+        records = harbor_cli.project_apply(
+            host=harbor_server.host,
+            port=harbor_server.port,
+            user="admin",
+            password="Harbor12345",
+            projects=[{"name": f"show-{i}"} for i in range(40)],
+            client=client,
+            concurrency=16,
+        )
+
+    assert all(record["ok"] for record in records)
+    assert len(harbor_server.projects) == 40
+    assert concurrency.stats()["decreases"] >= 1
+
+
+def test_curl_config():
+    request = harbor_cli.project_create_request(
+        host="localhost",
+        port=80,
+        user="admin",
+        password="Harbor12345",
+        project_name='my "quoted" project',
+    )
+
+    config = harbor_cli.curl_config([request, request])
+
+    assert config.count("\nnext\n") == 1
+    assert 'url = "http://localhost:80/api/v2.0/projects"\nrequest = "POST"\n' in config
+    assert 'data-binary = "{\\"project_name\\": \\"my \\\\\\"quoted\\\\\\" project\\", \\"public\\": true}"' in config
+    assert "Content-Length" not in config
+
+
+@pytest.mark.skipif(shutil.which("curl") is None, reason="curl not installed")
+def test_project_apply_curl(harbor_server, tmp_path, capsys):
+    harbor_server.projects["show-0"] = {"project_id": 1, "name": "show-0"}
+
+    cmd = harbor_cli.project_apply_curl(
+        host=harbor_server.host,
+        port=harbor_server.port,
+        user="admin",
+        password="Harbor12345",
+        projects=[{"name": f"show-{i}", "public": i % 2 == 0} for i in range(20)],
+        config_file=tmp_path.joinpath("apply.curl"),
+        parallel_max=4,
+    )
+
+    assert capsys.readouterr().out == f"{' '.join(cmd)}\n"
+    assert tmp_path.joinpath("apply.curl").stat().st_mode & 0o777 == 0o600
+    assert cmd[1:4] == ["--parallel", "--parallel-max", "4"]
+
+    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+
+    status_codes = sorted(line.split()[0] for line in result.stdout.splitlines())
+    assert status_codes == ["201"] * 19 + ["409"]
+    assert len(harbor_server.projects) == 20
+    assert harbor_server.projects["show-1"]["public"] is False
+    # connections are reused
+    assert len(harbor_server.connections) <= 4
+
+
+def test_project_purge(harbor_server):
+    harbor_server.projects["show-a"] = {"project_id": 1, "name": "show-a"}
+    harbor_server.projects["show-b"] = {"project_id": 2, "name": "show-b"}
+    harbor_server.repositories = {
+        **{f"show-a/plates/sh{i:03}": [{"digest": f"sha256:{i:064}", "size": 100, "tags": []}] for i in range(150)},
+        "show-b/comp": [{"digest": "sha256:" + "f" * 64, "size": 1, "tags": []}],
+    }
+
+    with harbor_client(harbor_server) as client:
+        with pytest.raises(harbor_cli.HarborAPIError, match="contains repositories"):
+            harbor_cli.project_delete(
+                host=harbor_server.host,
+                port=harbor_server.port,
+                user="admin",
+                password="Harbor12345",
+                project_name="show-a",
+                client=client,
+            )
+
+        result = harbor_cli.project_purge(
+            host=harbor_server.host,
+            port=harbor_server.port,
+            user="admin",
+            password="Harbor12345",
+            project_name="show-a",
+            client=client,
+            concurrency=8,
+            gc=True,
+        )
+
+    assert result == {
+        "project_name": "show-a",
+        "status_code": 200,
+        "repositories": 150,
+        "bytes_freed": 15000,
+        "gc": {"id": 1, "location": "/api/v2.0/system/gc/1"},
+    }
+    assert list(harbor_server.projects) == ["show-b"]
+    assert list(harbor_server.repositories) == ["show-b/comp"]
+    # registry wide: leave the untagged artifacts of other projects alone
+    assert harbor_server.gc_runs == [{"schedule": {"type": "Manual"}, "parameters": {"delete_untagged": False, "workers": 1}}]
+    assert "/api/v2.0/projects/show-a/repositories/plates%252Fsh000" in [r["path"] for r in harbor_server.requests]
+
+
+def test_project_purge_failed(harbor_server):
+    harbor_server.projects["show-a"] = {"project_id": 1, "name": "show-a"}
+    harbor_server.repositories = {
+        "show-a/comp": [],
+        "show-a/locked": [],
+    }
+
+    @harbor_server.route("DELETE", r"/api/v2.0/projects/show-a/repositories/locked")
+    def locked(request):
+        return 403, {}, {"errors": [{"code": "FORBIDDEN", "message": "immutable"}]}
+
+    with harbor_client(harbor_server) as client:
+        with pytest.raises(harbor_cli.HarborCLIError, match="1 of 2 repositories could not be deleted: show-a/locked: 403: immutable"):
+            harbor_cli.project_purge(
+                host=harbor_server.host,
+                port=harbor_server.port,
+                user="admin",
+                password="Harbor12345",
+                project_name="show-a",
+                client=client,
+            )
+
+    assert "show-a" in harbor_server.projects
+
+
+def test_parse_size(capsys, monkeypatch):
+    assert harbor_cli.parse_size("10G") == 10 * 1024 ** 3
+    assert harbor_cli.parse_size("500Mi") == 500 * 1024 ** 2
+    assert harbor_cli.parse_size("1.5TB") == int(1.5 * 1024 ** 4)
+    assert harbor_cli.parse_size("1024") == 1024
+    assert harbor_cli.parse_size("-1") == -1
+    assert harbor_cli.parse_size(42) == 42
+    # i.e. from YAML
+    assert harbor_cli.parse_size(1.5e9) == 1500000000
+
+    with pytest.raises(harbor_cli.HarborCLIError):
+        harbor_cli.parse_size("ten gigs")
+
+    with pytest.raises(harbor_cli.HarborCLIError):
+        harbor_cli.parse_size(-5)
+
+    for size in ["inf", "-inf", "nan", "1e400", "1e300T", float("inf"), float("nan")]:
+        with pytest.raises(harbor_cli.HarborCLIError, match="Invalid size"):
+            harbor_cli.parse_size(size)
+
+    # usage error, no traceback
+    argv = ["harbor-cli", "push", "image.tar", "-p", "show-a", "-r", "comp", "--chunk-size", "10Q"]
+    monkeypatch.setattr(harbor_cli.sys, "argv", argv)
+    with pytest.raises(SystemExit):
+        harbor_cli.parse_args(argv[1:])
+    assert "Invalid size: 10Q." in capsys.readouterr().err
+
+    assert harbor_cli.format_size(1536) == "1.5K"
+    assert harbor_cli.format_size(-1) == "unlimited"
+
+
+def test_project_create_storage_limit(harbor_server):
+    with harbor_client(harbor_server) as client:
+        harbor_cli.project_create(
+            host=harbor_server.host,
+            port=harbor_server.port,
+            user="admin",
+            password="Harbor12345",
+            project_name="show-a",
+            client=client,
+            storage_limit=harbor_cli.parse_size("500G"),
+        )
+
+    assert harbor_server.projects["show-a"]["storage_limit"] == 500 * 1024 ** 3
+
+
+def test_quota_report(harbor_server):
+    for i in range(250):
+        harbor_server.projects[f"show-{i:03}"] = {"project_id": i, "name": f"show-{i:03}", "storage_limit": 1000}
+    harbor_server.projects["show-007"]["storage_limit"] = -1
+    harbor_server.repositories = {
+        "show-001/comp": [{"digest": "sha256:1", "size": 900, "tags": []}],
+        "show-002/comp": [{"digest": "sha256:2", "size": 500, "tags": []}],
+        "show-007/comp": [{"digest": "sha256:7", "size": 5000, "tags": []}],
+    }
+
+    with harbor_client(harbor_server) as client:
+        records = harbor_cli.quota_report(client=client, concurrency=4)
+        by_used = harbor_cli.quota_report(client=client, sort="used")
+
+    assert len(records) == 250
+    assert records[:2] == [
+        {"project_name": "show-001", "hard": 1000, "used": 900, "usage": 0.9, "headroom": 100},
+        {"project_name": "show-002", "hard": 1000, "used": 500, "usage": 0.5, "headroom": 500},
+    ]
+    assert records[-1]["project_name"] == "show-007"
+    assert records[-1]["usage"] is None
+    assert by_used[0]["project_name"] == "show-007"
+    # 3 pages, the 2nd and 3rd concurrently
+    assert sorted(r["query"]["page"] for r in harbor_server.requests[:3]) == ["1", "2", "3"]
+
+    table = harbor_cli.quota_report_format(records=records[:2] + records[-1:], format_="table")
+    assert table.splitlines() == [
+        "PROJECT        HARD  USED  USAGE  HEADROOM",
+        "show-001       1000   900  90.0%       100",
+        "show-002       1000   500  50.0%       500",
+        "show-007  unlimited  4.9K      -         -",
+    ]
+
+    csv_ = harbor_cli.quota_report_format(records=records[:1], format_="csv")
+    assert csv_ == "project_name,hard,used,usage,headroom\nshow-001,1000,900,0.9,100"
+
+    assert json.loads(harbor_cli.quota_report_format(records=records, format_="json")) == records
+
+
+def test_registry_endpoint_ensure(harbor_server):
+    with harbor_client(harbor_server) as client:
+        created = harbor_cli.registry_endpoint_ensure(client=client, endpoint="docker.io", credential="me:secret")
+        existing = harbor_cli.registry_endpoint_ensure(client=client, endpoint="https://hub.docker.com/")
+        other = harbor_cli.registry_endpoint_ensure(client=client, endpoint="registry.example.com:5000")
+
+    assert created == {"id": 1, "name": "docker.io", "url": "https://hub.docker.com", "type": "docker-hub", "created": True}
+    assert existing == {**created, "created": False}
+    assert other["type"] == "docker-registry"
+    assert other["url"] == "https://registry.example.com:5000"
+    assert harbor_server.registries[0]["credential"] == {"type": "basic", "access_key": "me", "access_secret": "secret"}
+
+
+def test_project_create_proxy_cache(harbor_server):
+    args = argparse.Namespace(
+        command="project",
+        project_command="create",
+        host=harbor_server.host,
+        port=harbor_server.port,
+        user="admin",
+        password="Harbor12345",
+        auth="basic",
+        token=None,
+        max_rps=None,
+        project_name="dockerhub",
+        storage_limit=None,
+        proxy_cache="docker.io",
+        proxy_cache_credential=None,
+        print_curl=False,
+    )
+
+    harbor_cli.eval_(args)
+
+    assert harbor_server.projects["dockerhub"]["registry_id"] == 1
+    assert harbor_server.registries[0]["type"] == "docker-hub"
+
+    # skipped project: the endpoint is not touched
+    args.proxy_cache = "ghcr.io"
+
+    harbor_cli.eval_(args)
+
+    assert [registry["url"] for registry in harbor_server.registries] == ["https://hub.docker.com"]
+
+
+@pytest.mark.parametrize(
+    "image, expected",
+    [
+        ("nginx", ("library/nginx", "latest")),
+        ("nginx:1.27", ("library/nginx", "1.27")),
+        ("docker.io/grafana/grafana:11.0.0", ("grafana/grafana", "11.0.0")),
+        ("localhost:5000/a/b@sha256:abc", ("a/b", "sha256:abc")),
+        ("ghcr.io/owner/image", ("owner/image", "latest")),
+    ],
+)
+def test_parse_image_reference(image, expected):
+    assert harbor_cli.parse_image_reference(image) == expected
+
+
+def test_proxy_cache_warm(harbor_server):
+    harbor_server.add_image(
+        name="dockerhub/library/nginx",
+        reference="1.27",
+        layers=[b"layer-0", b"layer-1"],
+        platforms=["linux/amd64", "linux/arm64"],
+    )
+    harbor_server.add_image(name="dockerhub/grafana/grafana", reference="11.0.0", layers=[b"layer"])
+
+    with harbor_client(harbor_server, auth="session") as client:
+        records = harbor_cli.proxy_cache_warm(
+            client=client,
+            project_name="dockerhub",
+            images=["nginx:1.27", "grafana/grafana:11.0.0", "missing:1.0"],
+            concurrency=2,
+            blobs=True,
+        )
+
+    assert [record["ok"] for record in records] == [True, True, False]
+    assert records[0]["result"]["manifests"] == 2
+    # config and 2 layers of linux/amd64
+    assert records[0]["result"]["blobs"] == 3
+    assert records[1]["result"]["media_type"] == "application/vnd.oci.image.manifest.v1+json"
+    assert "manifest unknown" in records[2]["error"]
+
+    registry_requests = [r for r in harbor_server.requests if r["path"].startswith("/v2/")]
+    assert len(registry_requests) == 2 + 3 + 1 + 2 + 1
+    # registry tokens, even with --auth session: one per repository
+    assert all(r["headers"]["authorization"].startswith("Bearer registry-") for r in registry_requests)
+    assert len([r for r in harbor_server.requests if r["path"] == "/service/token"]) == 3
+
+
+def test_gc_log_parse():
+    assert harbor_cli.gc_log_parse(
+        "2026-10-19T03:00:01Z [INFO] 1204 blobs and 87 manifests are actually deleted\n"
+        "2026-10-19T03:00:01Z [INFO] The GC job actual frees up 1.5 GB space."
+    ) == {"blobs": 1204, "manifests": 87, "bytes_freed": int(1.5 * 1024 ** 3)}
+
+    assert harbor_cli.gc_log_parse("") == {"blobs": None, "manifests": None, "bytes_freed": None}
+
+
+@pytest.mark.parametrize("dry_run", [False, True])
+def test_gc_run(harbor_server, monkeypatch, dry_run):
+    sleeps = []
+    monkeypatch.setattr(harbor_cli.time, "sleep", sleeps.append)
+
+    with harbor_client(harbor_server) as client:
+        result = harbor_cli.gc_run(client=client, dry_run=dry_run, delete_untagged=True)
+
+    assert result == {
+        "id": 1,
+        "status": "success",
+        "trigger": "Manual",
+        "dry_run": dry_run,
+        "delete_untagged": True,
+        "creation_time": "2026-10-19T03:00:00Z",
+        "update_time": "2026-10-19T03:03:30Z",
+        "duration": 210.0,
+        "blobs": 3,
+        "manifests": 1,
+        "bytes_freed": 12 * 1024 ** 2,
+    }
+    # backoff
+    assert sleeps == [1.0, 1.5]
+    assert harbor_server.gc_runs[0]["parameters"].get("dry_run", False) is dry_run
+
+
+def test_gc_wait_timeout(harbor_server, monkeypatch):
+    monkeypatch.setattr(harbor_cli.time, "sleep", lambda _: None)
+    harbor_server.gc_polls = 1000
+
+    with harbor_client(harbor_server) as client:
+        with pytest.raises(harbor_cli.HarborCLIError, match="not done after 0.0s"):
+            harbor_cli.gc_run(client=client, timeout=0.0)
+
+
+def test_gc_schedule(harbor_server):
+    with harbor_client(harbor_server) as client:
+        assert harbor_cli.gc_schedule(client=client, cron="0 3 * * 6") == {"type": "Custom", "cron": "0 0 3 * * 6"}
+        # like `gc schedule` without --delete-untagged
+        assert harbor_server.gc_schedule_["parameters"]["delete_untagged"] is False
+        # replaces the existing schedule (PUT)
+        harbor_cli.gc_schedule(client=client, cron="0 0 4 * * 6", delete_untagged=True)
+        assert harbor_server.gc_schedule_["schedule"]["cron"] == "0 0 4 * * 6"
+        assert harbor_server.gc_schedule_["parameters"]["delete_untagged"] is True
+        harbor_cli.gc_schedule(client=client, cron=None)
+        assert harbor_server.gc_schedule_["schedule"] == {"type": "None"}
+
+        with pytest.raises(harbor_cli.HarborCLIError, match="Invalid cron"):
+            harbor_cli.gc_schedule(client=client, cron="daily")
+
+
+def test_gc_history(harbor_server, monkeypatch):
+    monkeypatch.setattr(harbor_cli.time, "sleep", lambda _: None)
+
+    with harbor_client(harbor_server) as client:
+        for dry_run in [True, False, False]:
+            harbor_cli.gc_run(client=client, dry_run=dry_run)
+        harbor_cli.gc_run(client=client, wait=False)
+
+        history = harbor_cli.gc_history(client=client, limit=3)
+
+    assert [(r["id"], r["status"], r["dry_run"]) for r in history] == [
+        (4, "pending", False),
+        (3, "success", False),
+        (2, "success", False),
+    ]
+    assert "bytes_freed" not in history[0]
+    assert history[1]["bytes_freed"] == 12 * 1024 ** 2
+
+
+def retention_rules_yml(directory: pathlib.Path) -> pathlib.Path:
+    rules = directory.joinpath("rules.yaml")
+    rules.write_text(
+        textwrap.dedent(
+            """\
+            policies:
+              - projects: ["show-*"]
+                schedule: "0 3 * * *"
+                rules:
+                  - template: latestPushedK
+                    value: 2
+                    tags: "ci-*"
+                    untagged: false
+                  - template: always
+                    tags: "{v,release}*"
+                    untagged: false
+            """
+        )
+    )
+    return rules
+
+
+@pytest.mark.parametrize(
+    "pattern, value, expected",
+    [
+        ("**", "plates/sh010", True),
+        ("*", "plates/sh010", False),
+        ("plates/*", "plates/sh010", True),
+        ("ci-?", "ci-1", True),
+        ("{v,release}*", "release-1", True),
+        ("{v,release}*", "ci-1", False),
+    ],
+)
+def test_doublestar_match(pattern, value, expected):
+    assert harbor_cli.doublestar_match(pattern, value) is expected
+
+
+def test_retention_apply(harbor_server, tmp_path):
+    for i, name in enumerate(["show-a", "show-b", "library"]):
+        harbor_server.projects[name] = {"project_id": i + 1, "name": name, "metadata": {"public": "true"}}
+
+    policies = harbor_cli.retention_manifest(manifest=retention_rules_yml(tmp_path))
+
+    with harbor_client(harbor_server) as client:
+        created = harbor_cli.retention_apply(client=client, policies=policies, concurrency=2)
+        updated = harbor_cli.retention_apply(client=client, policies=policies, concurrency=2)
+
+    assert [(r["item"][0], r["result"]["created"]) for r in created] == [("show-a", True), ("show-b", True)]
+    assert [(r["item"][0], r["result"]["created"]) for r in updated] == [("show-a", False), ("show-b", False)]
+    assert "retention_id" not in harbor_server.projects["library"]["metadata"]
+
+    policy = harbor_server.retentions[int(harbor_server.projects["show-a"]["metadata"]["retention_id"])]
+    assert policy["trigger"]["settings"]["cron"] == "0 0 3 * * *"
+    assert policy["scope"] == {"level": "project", "ref": 1}
+    assert policy["rules"][0]["params"] == {"latestPushedK": 2}
+    assert policy["rules"][0]["tag_selectors"][0] == {
+        "kind": "doublestar",
+        "decoration": "matches",
+        "pattern": "ci-*",
+        "extras": json.dumps({"untagged": False}),
+    }
+    assert policy["rules"][1]["params"] == {}
+
+
+def test_retention_simulate(harbor_server, tmp_path):
+    harbor_server.projects["show-a"] = {"project_id": 1, "name": "show-a"}
+    harbor_server.repositories = {
+        "show-a/comp": [
+            {
+                "digest": f"sha256:{i:064}",
+                "size": 100,
+                "push_time": f"2026-10-{i + 1:02}T00:00:00Z",
+                "tags": [{"name": f"ci-{i}"}] + ([{"name": "v1"}] if i == 0 else []),
+            }
+            for i in range(10)
+        ] + [{"digest": "sha256:" + "f" * 64, "size": 1000, "push_time": None, "tags": []}],
+        "show-a/plates/sh010": [
+            {"digest": f"sha256:{i:063}e", "size": 10, "push_time": f"2026-09-{i + 1:02}T00:00:00Z", "tags": [{"name": f"ci-{i}"}]}
+            for i in range(5)
+        ],
+    }
+
+    policy = harbor_cli.retention_manifest(manifest=retention_rules_yml(tmp_path))[0]
+
+    with harbor_client(harbor_server) as client:
+        result = harbor_cli.retention_simulate(client=client, project_name="show-a", policy=policy)
+
+    # comp:     keeps ci-9, ci-8 (latest 2) and ci-0 (v1), removes ci-1..ci-7 and the untagged one
+    # sh010:    keeps ci-4, ci-3
+    assert result == {
+        "project_name": "show-a",
+        "artifacts": 16,
+        "tags": 16,
+        "removed_artifacts": 7 + 1 + 3,
+        "removed_tags": 7 + 3,
+        "removed_bytes": 700 + 1000 + 30,
+        "rules": [
+            {"template": "latestPushedK", "value": 2, "retained": 4},
+            {"template": "always", "value": None, "retained": 1},
+        ],
+    }
+    # nothing changed
+    assert not harbor_server.retentions
+    assert all(r["method"] == "GET" for r in harbor_server.requests)
+
+
+def test_replication_policy_apply(harbor_server):
+    with harbor_client(harbor_server) as client:
+        registry = harbor_cli.registry_endpoint_ensure(
+            client=client, endpoint="https://harbor.remote.example.com", type_="harbor"
+        )
+        policy = harbor_cli.replication_policy(
+            name="show-a-offsite",
+            remote_registry_id=registry["id"],
+            name_filter="show-a/**",
+            tag_filter="v*",
+            speed=harbor_cli.parse_size("10M") // 1024,
+        )
+        created = harbor_cli.replication_policy_apply(client=client, policy=policy)
+        updated = harbor_cli.replication_policy_apply(client=client, policy={**policy, "speed": -1})
+        policies = list(harbor_cli.iter_replication_policies(client=client))
+
+    assert harbor_server.registries[0]["type"] == "harbor"
+    assert created == {"id": 1, "name": "show-a-offsite", "created": True}
+    assert updated == {"id": 1, "name": "show-a-offsite", "created": False}
+    assert policies == [
+        {
+            "id": 1,
+            "name": "show-a-offsite",
+            "direction": "push",
+            "remote": "https://harbor.remote.example.com",
+            "trigger": "manual",
+            "speed": -1,
+            "filters": {"name": "show-a/**", "tag": "v*"},
+            "enabled": True,
+        }
+    ]
+    assert policy["speed"] == 10240
+    assert policy["src_registry"] is None
+
+
+def test_cli_replication_create(harbor_server, monkeypatch, capsys):
+    argv = [
+        "harbor-cli",
+        "--host", harbor_server.host,
+        "--port", str(harbor_server.port),
+        "replication", "create",
+        "--name", "pull-base",
+        "--remote", "docker.io",
+        "--direction", "pull",
+    ]
+    monkeypatch.setattr(harbor_cli.sys, "argv", argv)
+
+    args = harbor_cli.parse_args(argv[1:])
+
+    assert args.remote_type is None
+
+    harbor_cli.eval_(args)
+
+    # guessed from --remote
+    assert harbor_server.registries[0]["type"] == "docker-hub"
+    assert json.loads(capsys.readouterr().out)["created"] is True
+
+
+def test_replication_policy_invalid():
+    with pytest.raises(harbor_cli.HarborCLIError, match="cron expression is required"):
+        harbor_cli.replication_policy(name="nightly", remote_registry_id=1, trigger="scheduled")
+
+    policy = harbor_cli.replication_policy(
+        name="nightly", remote_registry_id=1, direction="pull", trigger="scheduled", cron="0 2 * * *"
+    )
+    assert policy["trigger"]["trigger_settings"]["cron"] == "0 0 2 * * *"
+    assert policy["src_registry"] == {"id": 1}
+
+
+def test_replication_run(harbor_server, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(harbor_cli.time, "sleep", sleeps.append)
+
+    harbor_server.replication_policies = [
+        {"id": 1, "name": "show-a-offsite", "src_registry": None, "dest_registry": {"id": 1}, "speed": 1024}
+    ]
+    harbor_server.repositories = {
+        "show-a/comp": [
+            {"digest": "sha256:" + "a" * 64, "size": 6 * 1024 ** 2, "tags": [{"name": "v1"}, {"name": "v1.0"}]},
+            {"digest": "sha256:" + "b" * 64, "size": 4 * 1024 ** 2, "tags": [{"name": "v2"}]},
+        ],
+    }
+    # v1 and v1.0: the same digest
+    harbor_server.replication_resources = ["show-a/comp:[v1,v1.0,v2]", "show-a/gone:[v1]"]
+
+    with harbor_client(harbor_server) as client:
+        result = harbor_cli.replication_run(client=client, name="show-a-offsite")
+        with pytest.raises(harbor_cli.HarborCLIError, match="not found"):
+            harbor_cli.replication_run(client=client, name="missing")
+
+    # only this execution is looked at
+    assert not [
+        request for request in harbor_server.requests
+        if request["method"] == "GET" and request["path"] == "/api/v2.0/replication/executions"
+    ]
+    assert sleeps == [1.0]
+    assert result["status"] == "succeed"
+    assert result["tasks"] == result["succeed"] == 2
+    assert result["artifacts"] == 3
+    assert result["unknown_size"] == 1
+    assert result["bytes"] == 10 * 1024 ** 2
+    assert result["duration"] == 10.0
+    # 1 MiB/s of a 1 MiB/s (per task) limit
+    assert result["throughput"] == 1024 ** 2
+    assert result["speed"] == 1024 ** 2
+    assert result["utilization"] == 1.0
+
+
+def test_replication_status(harbor_server, monkeypatch):
+    monkeypatch.setattr(harbor_cli.time, "sleep", lambda _: None)
+
+    harbor_server.replication_policies = [
+        {"id": 1, "name": "pull-base", "src_registry": {"id": 1}, "dest_registry": None, "speed": -1}
+    ]
+    harbor_server.repositories = {
+        "library/base": [{"digest": "sha256:" + "a" * 64, "size": 1000, "tags": [{"name": "latest"}]}],
+    }
+    harbor_server.replication_resources = ["library/base:[latest]"]
+
+    with harbor_client(harbor_server) as client:
+        for _ in range(3):
+            harbor_cli.replication_run(client=client, name="pull-base")
+        records = harbor_cli.replication_status(client=client, name="pull-base", limit=2)
+
+    assert [r["id"] for r in records] == [3, 2]
+    assert [r["throughput"] for r in records] == [100.0, 100.0]
+    assert [r["utilization"] for r in records] == [None, None]
+
+
+def test_artifact_reference():
+    assert harbor_cli.artifact_reference("show-dev/comp/nuke:v1") == ("show-dev", "comp/nuke", "v1")
+    assert harbor_cli.artifact_reference("show-dev/comp") == ("show-dev", "comp", "latest")
+    assert harbor_cli.artifact_reference(f"show-dev/comp@sha256:{'a' * 64}") == ("show-dev", "comp", f"sha256:{'a' * 64}")
+
+    with pytest.raises(harbor_cli.HarborCLIError, match="Invalid artifact"):
+        harbor_cli.artifact_reference("nginx:1.27")
+
+
+def test_artifact_promote(harbor_server):
+    harbor_server.repositories = {
+        "show-dev/comp": [
+            {"digest": "sha256:" + "a" * 64, "size": 100, "tags": [{"name": "v1"}, {"name": "v1.0"}]},
+            {"digest": "sha256:" + "b" * 64, "size": 200, "tags": [{"name": "v2"}]},
+        ],
+        "show-dev/plates/sh010": [
+            {"digest": "sha256:" + "c" * 64, "size": 300, "tags": [{"name": "v1"}]},
+        ],
+        "show-prod/comp": [
+            {"digest": "sha256:" + "b" * 64, "size": 200, "tags": [{"name": "v2"}]},
+        ],
+    }
+
+    with harbor_client(harbor_server) as client:
+        result = harbor_cli.artifact_promote(
+            client=client,
+            sources=[
+                "show-dev/comp:v1",
+                "show-dev/comp:v2",
+                "show-dev/plates/sh010@sha256:" + "c" * 64,
+                "show-dev/comp:missing",
+            ],
+            project_name="show-prod",
+            concurrency=2,
+        )
+
+    assert [r["result"] and r["result"]["status"] for r in result] == ["copied", "exists", "copied", None]
+    assert "404" in result[3]["error"]
+    assert result[0]["result"]["target"] == "show-prod/comp@sha256:" + "a" * 64
+    # with all of its tags
+    assert [t["name"] for t in harbor_server.repositories["show-prod/comp"][1]["tags"]] == ["v1", "v1.0"]
+    assert "show-prod/plates/sh010" in harbor_server.repositories
+    # no layers through the client
+    assert not [r for r in harbor_server.requests if r["path"].startswith("/v2/")]
+
+    with harbor_client(harbor_server) as client:
+        # a tag the existing digest is missing in the target
+        harbor_server.repositories["show-dev/comp"][1]["tags"].append({"name": "approved"})
+        tagged = harbor_cli.artifact_copy(client=client, source="show-dev/comp:approved", project_name="show-prod")
+        again = harbor_cli.artifact_copy(client=client, source="show-dev/comp:approved", project_name="show-prod")
+
+    assert (tagged["status"], again["status"]) == ("tagged", "exists")
+    assert [t["name"] for t in harbor_server.repositories["show-prod/comp"][0]["tags"]] == ["v2", "approved"]
+
+
+def oci_layout(path: pathlib.Path, layers: list[bytes], platforms: list[str], name: str = "1.27") -> pathlib.Path:
+    """An OCI image layout of an index of `platforms` sharing `layers`."""
+
+    (path / "blobs" / "sha256").mkdir(parents=True)
+    (path / "oci-layout").write_text(json.dumps({"imageLayoutVersion": "1.0.0"}))
+
+    def _blob(data: bytes, media_type: str) -> dict:
+        digest = hashlib.sha256(data).hexdigest()
+        (path / "blobs" / "sha256" / digest).write_bytes(data)
+        return {"mediaType": media_type, "digest": f"sha256:{digest}", "size": len(data)}
+
+    manifests = []
+    for platform in platforms:
+        config = _blob(json.dumps({"architecture": platform.split("/")[1]}).encode(), "application/vnd.oci.image.config.v1+json")
+        manifest = {
+            "schemaVersion": 2,
+            "mediaType": "application/vnd.oci.image.manifest.v1+json",
+            "config": config,
+            "layers": [_blob(layer, "application/vnd.oci.image.layer.v1.tar+gzip") for layer in layers],
+        }
+        manifests.append({
+            **_blob(json.dumps(manifest).encode(), manifest["mediaType"]),
+            "platform": dict(zip(["os", "architecture"], platform.split("/"))),
+        })
+
+    index = _blob(
+        json.dumps({"schemaVersion": 2, "mediaType": "application/vnd.oci.image.index.v1+json", "manifests": manifests}).encode(),
+        "application/vnd.oci.image.index.v1+json",
+    )
+    (path / "index.json").write_text(
+        json.dumps({"schemaVersion": 2, "manifests": [{**index, "annotations": {"org.opencontainers.image.ref.name": name}}]})
+    )
+
+    return path
+
+
+def test_oci_push(harbor_server, tmp_path):
+    layers = [b"base" * 1000, b"app" * 500]
+    layout = oci_layout(tmp_path / "layout", layers=layers, platforms=["linux/amd64", "linux/arm64"])
+
+    with harbor_client(harbor_server) as client:
+        result = harbor_cli.oci_push(
+            client=client,
+            path=layout,
+            project_name="show-a",
+            repository_name="tools/nuke",
+            concurrency=3,
+            chunk_size=1024,
+        )
+
+    # 2 configs, the layers once
+    assert {k: result[k] for k in ["repository", "tag", "manifests", "blobs", "uploaded", "exists", "mounted"]} == {
+        "repository": "show-a/tools/nuke",
+        "tag": "1.27",
+        "manifests": 3,
+        "blobs": 4,
+        "uploaded": 4,
+        "exists": 0,
+        "mounted": 0,
+    }
+    index_digest = json.loads((layout / "index.json").read_text())["manifests"][0]["digest"]
+    assert result["digest"] == index_digest
+    assert harbor_server.manifests[("show-a/tools/nuke", "1.27")][0] == "application/vnd.oci.image.index.v1+json"
+    assert all(harbor_server.blobs[f"sha256:{hashlib.sha256(layer).hexdigest()}"] == layer for layer in layers)
+    # chunked: 4000 bytes in 4 PATCHes, 1500 in 2, the configs in 1 each
+    patches = [r for r in harbor_server.requests if r["method"] == "PATCH"]
+    assert len(patches) == 4 + 2 + 1 + 1
+    assert result["bytes_uploaded"] == sum(
+        len(harbor_server.blobs[digest]) for name, digest in harbor_server.blob_links if name == "show-a/tools/nuke"
+    )
+
+    with harbor_client(harbor_server) as client:
+        again = harbor_cli.oci_push(client=client, path=layout, project_name="show-a", repository_name="tools/nuke", tag="v2")
+        mounted = harbor_cli.oci_push(
+            client=client,
+            path=layout,
+            project_name="show-b",
+            repository_name="nuke",
+            mount_from=["show-x/empty", "show-a/tools/nuke"],
+        )
+
+    assert (again["exists"], again["uploaded"], again["bytes_uploaded"]) == (4, 0, 0)
+    assert (mounted["mounted"], mounted["uploaded"]) == (4, 0)
+    assert ("show-b/nuke", "1.27") in harbor_server.manifests
+    # the uploads started by show-x/empty are cancelled
+    assert len([r for r in harbor_server.requests if r["method"] == "DELETE"]) == 4
+    assert harbor_server.uploads == {}
+
+
+def test_oci_push_docker_save(harbor_server, tmp_path):
+    layers = [b"base" * 100, b"app" * 100]
+    config = json.dumps(
+        {"rootfs": {"type": "layers", "diff_ids": [f"sha256:{hashlib.sha256(layer).hexdigest()}" for layer in layers]}}
+    ).encode()
+
+    tarball = tmp_path / "nuke.tar"
+    with tarfile.open(tarball, "w") as tar:
+        def _add(name: str, data: bytes) -> None:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+        _add("config.json", config)
+        for i, layer in enumerate(layers):
+            _add(f"{i}/layer.tar", layer)
+        _add("manifest.json", json.dumps(
+            [{"Config": "config.json", "RepoTags": ["nuke:15.1"], "Layers": ["0/layer.tar", "1/layer.tar"]}]
+        ).encode())
+
+    with harbor_client(harbor_server) as client:
+        result = harbor_cli.oci_push(client=client, path=tarball, project_name="show-a", repository_name="nuke")
+
+    assert (result["tag"], result["manifests"], result["uploaded"]) == ("15.1", 1, 3)
+    media_type, body = harbor_server.manifests[("show-a/nuke", "15.1")]
+    assert media_type == harbor_cli.OCI_MANIFEST_MEDIA_TYPE
+    assert [layer["digest"] for layer in json.loads(body)["layers"]] == json.loads(config)["rootfs"]["diff_ids"]
+
+    with pytest.raises(harbor_cli.HarborCLIError, match="0 images match"):
+        harbor_cli.oci_image_load(path=tarball, ref="missing")
+
+
+@pytest.mark.parametrize("mode", ["w", "w:gz"])
+def test_oci_push_tarball(harbor_server, tmp_path, mode):
+    layout = oci_layout(tmp_path / "layout", layers=[b"base" * 100, b"app" * 100], platforms=["linux/amd64"])
+
+    tarball = tmp_path / "nuke.tar"
+    with tarfile.open(tarball, mode) as tar:
+        tar.add(layout, arcname=".")
+
+    source = harbor_cli._OCISource(path=tarball)
+    # compressed: extracted once, uncompressed: read in place
+    assert bool(source.members) == (mode == "w")
+    assert source.read("oci-layout") == (layout / "oci-layout").read_bytes()
+
+    with harbor_client(harbor_server) as client:
+        result = harbor_cli.oci_push(client=client, path=tarball, project_name="show-a", repository_name="nuke")
+
+    assert (result["tag"], result["manifests"], result["uploaded"]) == ("1.27", 2, 3)
+    assert all(
+        harbor_server.blobs[f"sha256:{file.name}"] == file.read_bytes()
+        for file in (layout / "blobs" / "sha256").iterdir()
+        if ("show-a/nuke", f"sha256:{file.name}") in harbor_server.blob_links
+    )
+
+
+def test_oci_push_digest_mismatch(harbor_server, tmp_path):
+    layout = oci_layout(tmp_path / "layout", layers=[b"layer"], platforms=["linux/amd64"])
+    layer = layout / "blobs" / "sha256" / hashlib.sha256(b"layer").hexdigest()
+    layer.write_bytes(b"LAYER")
+
+    with harbor_client(harbor_server) as client:
+        with pytest.raises(harbor_cli.HarborCLIError, match="1 blobs failed.*content has digest"):
+            harbor_cli.oci_push(client=client, path=layout, project_name="show-a", repository_name="nuke")
+
+    assert not [key for key in harbor_server.manifests if key[0] == "show-a/nuke"]
+
+
+def test_oci_pull(harbor_server, tmp_path, harbor_cache_dir):
+    harbor_server.add_image("show-a/nuke", "15.1", layers=[b"base" * 1000, b"nuke" * 1000])
+    harbor_server.add_image("show-a/houdini", "20.5", layers=[b"base" * 1000, b"houdini" * 1000])
+
+    with harbor_client(harbor_server) as client:
+        nuke = harbor_cli.oci_pull(client=client, image="show-a/nuke:15.1", oci_dir=tmp_path / "nuke", concurrency=2)
+        houdini = harbor_cli.oci_pull(client=client, image="show-a/houdini:20.5", oci_dir=tmp_path / "houdini")
+        again = harbor_cli.oci_pull(client=client, image="show-a/houdini:20.5", oci_dir=tmp_path / "nuke")
+
+    # config and 2 layers, the config (of the same platform) and the base layer shared
+    assert (nuke["downloaded"], nuke["cached"]) == (3, 0)
+    assert (houdini["downloaded"], houdini["cached"]) == (1, 2)
+    assert houdini["bytes_downloaded"] == len(b"houdini" * 1000 + b"linux/amd64")
+    assert (again["downloaded"], again["cached"]) == (0, 3)
+    assert again["bytes_downloaded"] == 0
+
+    for digest, data in harbor_server.blobs.items():
+        store = harbor_cache_dir / "blobs" / "sha256" / digest.removeprefix("sha256:")
+        assert store.read_bytes() == data
+        assert hashlib.sha256(store.read_bytes()).hexdigest() == digest.removeprefix("sha256:")
+
+    # a valid OCI image layout with both images
+    index = json.loads((tmp_path / "nuke" / "index.json").read_text())
+    assert [d["annotations"]["org.opencontainers.image.ref.name"] for d in index["manifests"]] == ["15.1", "20.5"]
+    image = harbor_cli.oci_image_load(path=tmp_path / "nuke", ref="20.5")
+    assert (image["tag"], len(image["blobs"])) == ("20.5", 3)
+
+
+def test_oci_pull_platforms(harbor_server, tmp_path):
+    digest = harbor_server.add_image("library/base", "1", layers=[b"base"], platforms=["linux/amd64", "linux/arm64"])
+
+    with harbor_client(harbor_server) as client:
+        arm64 = harbor_cli.oci_pull(
+            client=client, image="library/base:1", oci_dir=tmp_path / "arm64", platform="linux/arm64"
+        )
+        everything = harbor_cli.oci_pull(client=client, image=f"library/base@{digest}", oci_dir=tmp_path / "all", platform=None)
+        with pytest.raises(harbor_cli.HarborCLIError, match="no manifest for linux/s390x"):
+            harbor_cli.oci_pull(client=client, image="library/base:1", oci_dir=tmp_path / "s390x", platform="linux/s390x")
+
+    assert (arm64["manifests"], arm64["blobs"]) == (1, 2)
+    assert arm64["digest"] != digest
+    assert (everything["manifests"], everything["blobs"], everything["digest"]) == (3, 4, digest)
+    assert "annotations" not in json.loads((tmp_path / "all" / "index.json").read_text())["manifests"][0]
+
+
+def test_oci_pull_digest_mismatch(harbor_server, tmp_path, harbor_cache_dir):
+    harbor_server.add_image("show-a/nuke", "15.1", layers=[b"nuke"])
+    layer = next(d for d, data in harbor_server.blobs.items() if data.startswith(b"nuke"))
+    harbor_server.blobs[layer] = b"tampered"
+
+    with harbor_client(harbor_server) as client:
+        with pytest.raises(harbor_cli.HarborCLIError, match="1 blobs failed.*content has digest"):
+            harbor_cli.oci_pull(client=client, image="show-a/nuke:15.1", oci_dir=tmp_path / "nuke")
+
+    # the config is stored, the layer neither stored nor left behind
+    assert len(list((harbor_cache_dir / "blobs" / "sha256").iterdir())) == 1
+    assert not (harbor_cache_dir / "blobs" / "sha256" / layer.removeprefix("sha256:")).exists()
+    assert not list((harbor_cache_dir / "blobs").rglob("*.tmp"))
+    assert not (tmp_path / "nuke").exists()
+
+
+def test_registry_scopes():
+    def _scopes(method, path):
+        return harbor_cli.registry_scopes(requests.Request(method=method, url=f"http://harbor:80/v2{path}").prepare())
+
+    assert _scopes("GET", "/show-a/tools/nuke/manifests/15.1") == ["repository:show-a/tools/nuke:pull"]
+    assert _scopes("PATCH", "/show-a/nuke/blobs/uploads/abc?_state=abc") == ["repository:show-a/nuke:pull,push"]
+    assert _scopes("POST", "/show-b/nuke/blobs/uploads/?mount=sha256:a&from=show-a/nuke") == [
+        "repository:show-b/nuke:pull,push",
+        "repository:show-a/nuke:pull",
+    ]
+    assert _scopes("GET", "/") == []
+
+
+def test_registry_token_cache_shared(harbor_cache_dir):
+    fetches = []
+
+    def _fetch(cache):
+        fetches.append(1)
+        time.sleep(0.05)
+        return cache.entry(ttl=100, token=f"token-{len(fetches)}")
+
+    # one cache per "process", sharing the file
+    caches = [harbor_cli.RegistryTokenCache(cache_file=harbor_cache_dir / "registry.json") for _ in range(8)]
+
+    threads = [
+        threading.Thread(target=lambda c=cache: c.token(key="repository:a:pull", fetch=lambda: _fetch(c)))
+        for cache in caches
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(fetches) == 1
+    assert {cache.token(key="repository:a:pull", fetch=lambda: _fetch(caches[0])) for cache in caches} == {"token-1"}
+    assert oct((harbor_cache_dir / "registry.json").stat().st_mode & 0o777) == "0o600"
+
+
+def test_registry_token_cache_refresh(harbor_cache_dir, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(harbor_cli.time, "time", lambda: now[0])
+
+    cache = harbor_cli.RegistryTokenCache(cache_file=harbor_cache_dir / "registry.json")
+    other = harbor_cli.RegistryTokenCache(cache_file=harbor_cache_dir / "registry.json")
+    tokens = iter(f"token-{i}" for i in range(10))
+
+    def _token(cache_):
+        return cache_.token(key="scope", fetch=lambda: cache_.entry(ttl=100, token=next(tokens)))
+
+    assert _token(cache) == "token-0"
+    now[0] += 50
+    assert _token(other) == "token-0"
+    # refreshed early (after 75% of its lifetime)
+    now[0] += 30
+    assert _token(cache) == "token-1"
+    # being refreshed by another process: the still valid token
+    now[0] += 80
+    with other._locked():
+        assert _token(cache) == "token-1"
+    assert _token(cache) == "token-2"
+    # expired
+    now[0] += 200
+    assert _token(other) == "token-3"
+
+    cache.invalidate()
+    assert not (harbor_cache_dir / "registry.json").exists()
+
+
+def test_registry_token_shared_by_clients(harbor_server, tmp_path):
+    harbor_server.add_image("show-a/nuke", "15.1", layers=[b"nuke"])
+
+    for i in range(3):
+        with harbor_client(harbor_server) as client:
+            harbor_cli.oci_pull(client=client, image="show-a/nuke:15.1", oci_dir=tmp_path / f"nuke-{i}")
+
+    token_requests = [r for r in harbor_server.requests if r["path"] == "/service/token"]
+    assert [r["query"]["scope"] for r in token_requests] == ["repository:show-a/nuke:pull"]
+
+    # revoked server side: a new one on the 401 challenge
+    harbor_server.registry_tokens.clear()
+    with harbor_client(harbor_server) as client:
+        harbor_cli.oci_pull(client=client, image="show-a/nuke:15.1", oci_dir=tmp_path / "nuke-3")
+
+    assert len([r for r in harbor_server.requests if r["path"] == "/service/token"]) == 2
+
+
 @pytest.mark.skip("Todo")
 def test_download():
     pass